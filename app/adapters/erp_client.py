@@ -7,7 +7,7 @@ No mock data - only real API calls with proper error handling.
 
 from datetime import date, datetime, UTC
 from decimal import Decimal
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence
 import asyncio
 import httpx
 import logfire
@@ -27,6 +27,9 @@ from app.ports import ERPClientProtocol
 
 logger = logging.getLogger(__name__)
 
+# Purchase orders per `or`-joined Document_No filter when reading lines in bulk.
+_POLINE_DOCUMENTS_PER_REQUEST = 15
+
 
 class ERPClient(ERPClientProtocol):
     """
@@ -218,6 +221,33 @@ class ERPClient(ERPClientProtocol):
         resource = f"BOMComponentLines?$filter=Production_BOM_No eq '{sanitized}'"
         return await self._fetch_odata_collection(resource)
 
+    async def get_bom_component_lines_batch(
+        self,
+        production_bom_nos: List[str],
+        *,
+        chunk_size: int = 25,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Retrieve BOM component lines for several production BOMs with `or`-joined filters.
+
+        Numbers are chunked to keep the request URL within Business Central limits; the
+        result maps every requested BOM number to its (possibly empty) line list.
+        """
+        unique_nos = list(dict.fromkeys(no.strip() for no in production_bom_nos if no and no.strip()))
+        grouped: Dict[str, List[Dict[str, Any]]] = {no: [] for no in unique_nos}
+        for start in range(0, len(unique_nos), max(1, chunk_size)):
+            chunk = unique_nos[start : start + max(1, chunk_size)]
+            clauses = " or ".join(
+                f"Production_BOM_No eq '{no.replace(chr(39), chr(39) * 2)}'" for no in chunk
+            )
+            encoded_filter = quote(clauses, safe="'")
+            rows = await self._fetch_odata_collection(f"BOMComponentLines?%24filter={encoded_filter}")
+            for row in rows:
+                bom_no = str(row.get("Production_BOM_No") or "").strip()
+                if bom_no in grouped:
+                    grouped[bom_no].append(row)
+        return grouped
+
     async def get_bom_cost_shares(self, item_no: str) -> List[Dict[str, Any]]:
         """
         Retrieve BOM cost share breakdown for a given item.
@@ -281,6 +311,14 @@ class ERPClient(ERPClientProtocol):
                 return rows[0]
         return None
 
+    async def get_work_centers(self) -> List[Dict[str, Any]]:
+        """
+        Retrieve every work center (used to warm the in-memory costing rate table).
+        """
+        return await self._fetch_with_candidate_resources(
+            resource_candidates=["WorkCentres", "WorkCenters"],
+        )
+
     async def _fetch_with_candidate_resources(
         self,
         *,
@@ -766,6 +804,56 @@ class ERPClient(ERPClientProtocol):
             except Exception as e:
                 logfire.error(f"Error updating PO line quantity {po_id}/{line_no}: {e}")
                 raise
+
+    async def get_polines_for_documents(self, po_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Retrieve the lines of several purchase orders with `or`-joined Document_No filters.
+
+        Rows are returned raw (including `@odata.etag`), a handful of documents per request
+        so the filter stays within URL limits.
+        """
+        documents = list(dict.fromkeys(po_id for po_id in po_ids if po_id))
+        with logfire.span("ERP get_polines_for_documents", document_count=len(documents)):
+            lines: List[Dict[str, Any]] = []
+            for start in range(0, len(documents), _POLINE_DOCUMENTS_PER_REQUEST):
+                chunk = documents[start : start + _POLINE_DOCUMENTS_PER_REQUEST]
+                expression = " or ".join(
+                    "Document_No eq '{}'".format(po_id.replace("'", "''")) for po_id in chunk
+                )
+                lines.extend(await self._fetch_odata_collection(f"Gilbert_PurchaseOrderLines?$filter={expression}"))
+            return lines
+
+    async def patch_poline(self, system_id: str, updates: Dict[str, Any], etag: str) -> Dict[str, Any]:
+        """
+        Patch a purchase order line guarded by its ETag.
+
+        Returns the updated line as echoed by Business Central (empty when the response
+        has no body). A changed or missing ETag surfaces as `ERPConflict`; the line is
+        never overwritten blindly with `If-Match: *`.
+        """
+        if not etag:
+            raise ERPConflict(f"Missing ETag for PO line {system_id}; refusing to overwrite it blindly")
+        with logfire.span("ERP patch_poline", system_id=system_id, fields=list(updates.keys())):
+            try:
+                response = await self.http_client.patch(
+                    f"Gilbert_PurchaseOrderLines('{system_id}')",
+                    json=updates,
+                    headers={"If-Match": etag},
+                )
+                response.raise_for_status()
+                if response.status_code == 204 or not response.content:
+                    return {}
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    raise ERPNotFound("Purchase Order Line", system_id)
+                if e.response.status_code in (409, 412):
+                    raise ERPConflict(f"PO line was modified concurrently: {e.response.text}")
+                if e.response.status_code == 503:
+                    raise ERPUnavailable()
+                raise ERPError(f"API error: {e.response.status_code} - {e.response.text}")
+            except httpx.TimeoutException:
+                raise ERPUnavailable("ERP API timeout")
     
     async def get_purchase_order(self, po_id: str) -> Optional[Dict[str, Any]]:
         """
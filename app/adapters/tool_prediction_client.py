@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from typing import Any, Optional
+import asyncio
 import logging
 
 import httpx
@@ -21,12 +22,14 @@ class ToolPredictionClient:
         base_url: Optional[str] = None,
         api_path: Optional[str] = None,
         timeout_seconds: Optional[float] = None,
+        batch_size: Optional[int] = None,
     ) -> None:
         self._base_url = (base_url or settings.tool_prediction_api_base_url or "").rstrip("/")
         self._api_path = (api_path or settings.tool_prediction_api_path or "/predict/future-needs").strip() or "/predict/future-needs"
         if not self._api_path.startswith("/"):
             self._api_path = f"/{self._api_path}"
         self._timeout = timeout_seconds or settings.tool_prediction_api_timeout_seconds
+        self._batch_size = batch_size or settings.tool_prediction_api_batch_size
 
     @property
     def is_configured(self) -> bool:
@@ -38,21 +41,43 @@ class ToolPredictionClient:
         machine_center: str,
         rows: list[dict[str, Any]],
     ) -> dict[str, dict[str, Any]]:
+        """
+        Score tool rows, splitting large sets into `tool_prediction_api_batch_size`
+        requests sent concurrently over one connection pool.
+        """
         if not rows:
             return {}
         if not self._base_url:
             return self._heuristic_predictions(rows)
 
+        batch_size = max(int(self._batch_size), 1)
+        batches = [rows[start : start + batch_size] for start in range(0, len(rows), batch_size)]
+        async with httpx.AsyncClient(base_url=self._base_url, timeout=self._timeout, verify=False) as client:
+            results = await asyncio.gather(
+                *(self._predict_batch(client, machine_center=machine_center, rows=batch) for batch in batches)
+            )
+
+        predictions: dict[str, dict[str, Any]] = {}
+        for result in results:
+            predictions.update(result)
+        return predictions
+
+    async def _predict_batch(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        machine_center: str,
+        rows: list[dict[str, Any]],
+    ) -> dict[str, dict[str, Any]]:
         payload = {
             "machine_center": machine_center,
             "rows": rows,
         }
 
         try:
-            async with httpx.AsyncClient(base_url=self._base_url, timeout=self._timeout, verify=False) as client:
-                response = await client.post(self._api_path, json=payload)
-                response.raise_for_status()
-                body = response.json()
+            response = await client.post(self._api_path, json=payload)
+            response.raise_for_status()
+            body = response.json()
         except (httpx.HTTPError, ValueError) as exc:
             logger.warning(
                 "Tool prediction endpoint call failed; falling back to heuristic scoring",
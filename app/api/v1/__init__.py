@@ -14,6 +14,7 @@ from .finance.router import router as finance_router
 from .kpi import router as kpi_router
 from .ocr import router as ocr_router
 from .sandvik import router as sandvik_router
+from .search import router as search_router
 from .service import router as service_router
 from .tooling import router as tooling_router
 from .toolkit import router as toolkit_router
@@ -39,5 +40,6 @@ router.include_router(finance_router)
 router.include_router(kpi_router)
 router.include_router(service_router)
 router.include_router(crm_router)
+router.include_router(search_router)
 router.include_router(ventes_sous_traitance_router)
 router.include_router(tooling_router)
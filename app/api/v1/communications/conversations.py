@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
 import io
+import json
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import logfire
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
@@ -27,7 +31,8 @@ from app.domain.communications.models import (
     ReceivablesEmailSendRequest,
     ReceivablesEmailSendResponse,
 )
-from app.errors import BaseAPIException
+from app.errors import AuthenticationError, BaseAPIException, ValidationException
+from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +41,57 @@ router = APIRouter(prefix="/conversations", tags=["Communications - Conversation
 conversation_service = ConversationService()
 
 
+def _verify_front_signature(body: bytes, signature: Optional[str], timestamp: Optional[str]) -> bool:
+    """Check a Front webhook signature against `front_webhook_secret`."""
+    secret = (settings.front_webhook_secret or "").encode("utf-8")
+    if timestamp:
+        # Application webhooks sign "<timestamp>:<body>" with SHA-256.
+        digest = hmac.new(secret, timestamp.encode("utf-8") + b":" + body, hashlib.sha256).digest()
+    else:
+        digest = hmac.new(secret, body, hashlib.sha1).digest()
+    expected = base64.b64encode(digest).decode("ascii")
+    return bool(signature) and hmac.compare_digest(expected, signature)
+
+
+@router.post(
+    "/webhooks/front",
+    responses={
+        200: {"description": "Webhook processed"},
+        401: {"description": "Invalid webhook signature", "model": ErrorResponse},
+        422: {"description": "Invalid webhook payload", "model": ErrorResponse},
+    },
+    summary="Receive Front webhook",
+)
+async def receive_front_webhook(request: Request) -> Dict[str, Any]:
+    """Invalidate cached conversations touched by a Front event."""
+    body = await request.body()
+    if settings.front_webhook_secret and not _verify_front_signature(
+        body,
+        request.headers.get("X-Front-Signature"),
+        request.headers.get("X-Front-Request-Timestamp"),
+    ):
+        raise AuthenticationError("Invalid Front webhook signature")
+
+    challenge = request.headers.get("X-Front-Challenge")
+    if challenge:
+        return {"challenge": challenge}
+
+    try:
+        event = json.loads(body or b"{}")
+    except ValueError:
+        raise ValidationException("Front webhook body is not valid JSON")
+    if not isinstance(event, dict):
+        raise ValidationException("Front webhook body must be a JSON object")
+
+    conversation_ids = conversation_service.handle_webhook_event(event)
+    logfire.info(
+        "Front webhook received",
+        event_type=event.get("type"),
+        conversation_ids=conversation_ids,
+    )
+    return {"invalidated": conversation_ids}
+
+
 @router.get(
     "/{conversation_id}",
     response_model=SingleResponse[ConversationResponse],
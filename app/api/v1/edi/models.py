@@ -1,7 +1,7 @@
 """Pydantic models for EDI API endpoints."""
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -21,3 +21,31 @@ class PurchaseOrder850Response(BaseModel):
     generated_at: datetime
     remote_path: Optional[str] = None
     message: Optional[str] = None
+
+
+class PurchaseOrder850BatchRequest(BaseModel):
+    """Request payload to transmit several EDI 850 documents at once."""
+
+    po_numbers: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Purchase order numbers to send (duplicates are sent once)",
+    )
+
+
+class PurchaseOrder850BatchItem(BaseModel):
+    """Outcome for one purchase order of a bulk EDI 850 transmission."""
+
+    po_number: str
+    status: str = Field(..., description="sent, failed (upload failed) or error (document not generated)")
+    result: Optional[PurchaseOrder850Response] = None
+    error: Optional[Dict[str, Any]] = None
+
+
+class PurchaseOrder850BatchResponse(BaseModel):
+    """Response payload for a bulk EDI 850 transmission."""
+
+    sent: int
+    failed: int
+    results: List[PurchaseOrder850BatchItem]
@@ -4,8 +4,14 @@ from fastapi import APIRouter, status
 import logfire
 
 from app.api.v1.models import SingleResponse
-from app.domain.edi import EDIService
-from .models import PurchaseOrder850Request, PurchaseOrder850Response
+from app.domain.edi import EDIService, EDITransmissionResult
+from .models import (
+    PurchaseOrder850BatchItem,
+    PurchaseOrder850BatchRequest,
+    PurchaseOrder850BatchResponse,
+    PurchaseOrder850Request,
+    PurchaseOrder850Response,
+)
 
 router = APIRouter(prefix="/edi", tags=["EDI"])
 
@@ -23,7 +29,46 @@ async def send_purchase_order_850(request: PurchaseOrder850Request) -> SingleRes
     with logfire.span("edi.send_purchase_order_850", po_number=request.po_number):
         result = await edi_service.send_purchase_order_850(request.po_number)
 
-    response = PurchaseOrder850Response(
+    return SingleResponse(data=_to_response(result))
+
+
+@router.post(
+    "/purchase-orders/850/send-batch",
+    response_model=SingleResponse[PurchaseOrder850BatchResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Send several Purchase Orders via EDI 850",
+    description=(
+        "Generate EDI 850 documents for the given purchase orders (ERP fetches run concurrently) "
+        "and transmit them in batches over a shared SFTP session. Each purchase order reports its own outcome."
+    ),
+)
+async def send_purchase_orders_850(
+    request: PurchaseOrder850BatchRequest,
+) -> SingleResponse[PurchaseOrder850BatchResponse]:
+    with logfire.span("edi.send_purchase_orders_850", count=len(request.po_numbers)):
+        outcomes = await edi_service.send_purchase_orders_850(request.po_numbers)
+
+    items = []
+    for outcome in outcomes:
+        if outcome.result is None:
+            items.append(PurchaseOrder850BatchItem(po_number=outcome.po_number, status="error", error=outcome.error))
+            continue
+        items.append(
+            PurchaseOrder850BatchItem(
+                po_number=outcome.po_number,
+                status="sent" if outcome.result.sent else "failed",
+                result=_to_response(outcome.result),
+            )
+        )
+
+    sent = sum(1 for item in items if item.status == "sent")
+    return SingleResponse(
+        data=PurchaseOrder850BatchResponse(sent=sent, failed=len(items) - sent, results=items)
+    )
+
+
+def _to_response(result: EDITransmissionResult) -> PurchaseOrder850Response:
+    return PurchaseOrder850Response(
         po_number=result.po_number,
         file_name=result.file_name,
         sent=result.sent,
@@ -31,5 +76,3 @@ async def send_purchase_order_850(request: PurchaseOrder850Request) -> SingleRes
         remote_path=result.remote_path,
         message=result.message,
     )
-
-    return SingleResponse(data=response)
@@ -3,16 +3,30 @@
 from __future__ import annotations
 
 import asyncio
+import csv
+import io
+import json
 import logging
+import re
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple, Union
 from urllib.parse import quote
 
 import httpx
 import logfire
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
+from app.api.v1.models import CollectionResponse, PaginationMeta
 from app.domain.erp.business_central_data_service import BusinessCentralODataService
+from app.domain.erp.customer_directory import (
+    customer_directory,
+    fetch_customer_division_map,
+    fetch_ship_to_map,
+    has_address_fields,
+    ship_to_code,
+    ship_to_name,
+)
 from app.domain.erp.customer_geocode_cache import customer_geocode_cache
 from app.domain.erp.models import (
     CustomerAddressResponse,
@@ -20,8 +34,10 @@ from app.domain.erp.models import (
     CustomerSummaryResponse,
     GeocodedLocation,
     PostedSalesInvoiceCommentCreate,
+    PostedSalesInvoiceTrackingBatchRequest,
     VendorContactResponse,
 )
+from app.domain.erp.posted_invoice_tracking_index import posted_invoice_tracking_index
 from app.domain.erp.vendor_contact_service import VendorContactService
 from app.settings import settings
 
@@ -29,6 +45,11 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/bc", tags=["ERP - Business Central Data"])
 
+_SELECT_FIELD = re.compile(r"^[A-Za-z0-9_]+$")
+_TRACKING_LIVE_FALLBACK_CONCURRENCY = 4
+
+ExportFormat = Literal["json", "ndjson", "csv"]
+
 
 def get_odata_service() -> BusinessCentralODataService:
     """FastAPI dependency for the Business Central OData service."""
@@ -49,22 +70,32 @@ async def _fetch_with_handling(
     filter_value: Optional[str],
     top: Optional[int],
     service: BusinessCentralODataService,
+    select: Optional[List[str]] = None,
 ) -> List[Dict[str, Any]]:
     """Centralized error handling for upstream fetch operations."""
+    # Only forward $select when requested so plain lookups keep the original call shape.
+    projection = {"select": select} if select else {}
     try:
         return await service.fetch_collection(
             resource,
             filter_field=filter_field,
             filter_value=filter_value,
             top=top,
+            **projection,
         )
-    except httpx.HTTPStatusError as exc:
+    except (httpx.HTTPStatusError, httpx.RequestError) as exc:
+        raise _upstream_http_exception(resource, exc) from exc
+
+
+def _upstream_http_exception(resource: str, exc: httpx.HTTPError) -> HTTPException:
+    """Map an upstream httpx failure to the 502 payload shared by these endpoints."""
+    if isinstance(exc, httpx.HTTPStatusError):
         status_code = exc.response.status_code if exc.response else status.HTTP_502_BAD_GATEWAY
         logger.error(
             "Business Central returned HTTP error",
             extra={"resource": resource, "status_code": status_code},
         )
-        raise HTTPException(
+        return HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail={
                 "error": {
@@ -73,21 +104,129 @@ async def _fetch_with_handling(
                     "upstream_status": status_code,
                 }
             },
-        ) from exc
-    except httpx.RequestError as exc:
-        logger.error(
-            "Business Central request failed",
-            extra={"resource": resource, "error": str(exc)},
         )
+    logger.error(
+        "Business Central request failed",
+        extra={"resource": resource, "error": str(exc)},
+    )
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail={
+            "error": {
+                "code": "BC_UPSTREAM_UNAVAILABLE",
+                "message": "Business Central service unreachable",
+            }
+        },
+    )
+
+
+def _parse_select(select: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated `$select` list, rejecting anything but plain field names."""
+    if not select:
+        return None
+    fields = [field.strip() for field in select.split(",") if field.strip()]
+    invalid = [field for field in fields if not _SELECT_FIELD.match(field)]
+    if invalid:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail={
                 "error": {
-                    "code": "BC_UPSTREAM_UNAVAILABLE",
-                    "message": "Business Central service unreachable",
+                    "code": "INVALID_SELECT",
+                    "message": "select must be a comma-separated list of field names",
+                    "fields": invalid,
                 }
             },
-        ) from exc
+        )
+    return fields or None
+
+
+async def _list_or_stream(
+    *,
+    resource: str,
+    filter_field: Optional[str],
+    filter_value: Optional[str],
+    top: Optional[int],
+    select: Optional[str],
+    output_format: str,
+    service: BusinessCentralODataService,
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
+    """
+    Return the collection as a JSON list, or stream it page by page as NDJSON/CSV.
+
+    The first page is fetched before the response starts so upstream failures still
+    surface as 502s; a failure on a later page aborts the response mid-transfer so
+    clients never mistake a partial export for a complete one.
+    """
+    fields = _parse_select(select)
+    if output_format == "json":
+        return await _fetch_with_handling(
+            resource=resource,
+            filter_field=filter_field,
+            filter_value=filter_value,
+            top=top,
+            service=service,
+            select=fields,
+        )
+
+    pages = service.iter_collection_pages(
+        resource,
+        filter_field=filter_field,
+        filter_value=filter_value,
+        top=top,
+        select=fields,
+    )
+    try:
+        first_page = await anext(pages, [])
+    except (httpx.HTTPStatusError, httpx.RequestError) as exc:
+        raise _upstream_http_exception(resource, exc) from exc
+
+    async def _pages() -> AsyncIterator[List[Dict[str, Any]]]:
+        if first_page:
+            yield first_page
+        try:
+            async for page in pages:
+                yield page
+        except httpx.HTTPError as exc:
+            logger.error(
+                "Business Central export stream aborted",
+                extra={"resource": resource, "error": str(exc)},
+            )
+            # Re-raise so the server aborts the chunked transfer; ending normally would
+            # hand clients a truncated export that looks complete.
+            raise
+
+    filename = resource.lower()
+    if output_format == "csv":
+        return StreamingResponse(
+            _csv_chunks(_pages(), fields, first_page),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
+        )
+    return StreamingResponse(_ndjson_chunks(_pages()), media_type="application/x-ndjson")
+
+
+async def _ndjson_chunks(pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for page in pages:
+        yield "".join(json.dumps(record, default=str) + "\n" for record in page).encode("utf-8")
+
+
+async def _csv_chunks(
+    pages: AsyncIterator[List[Dict[str, Any]]],
+    fields: Optional[List[str]],
+    first_page: List[Dict[str, Any]],
+) -> AsyncIterator[bytes]:
+    # Without $select the header comes from the first record; later extra keys are dropped.
+    columns = fields or [key for key in (first_page[0] if first_page else {}) if not key.startswith("@odata")]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
 
 
 async def _fetch_ship_to_addresses(
@@ -136,93 +275,6 @@ async def _fetch_ship_to_addresses(
     return []
 
 
-async def _fetch_ship_to_map(
-    customer_nos: set[str],
-    service: BusinessCentralODataService,
-) -> Dict[str, List[Dict[str, Any]]]:
-    """Fetch all ShipToAddress entries once and group by customer number."""
-    resource_candidates = (
-        "ShipToAddress",
-        "ShipToAddresses",
-        "Ship_to_Address",
-        "Ship_to_Addresses",
-    )
-    ship_to_records: List[Dict[str, Any]] = []
-    for resource in resource_candidates:
-        try:
-            ship_to_records = await service.fetch_collection_paged(resource)
-            if ship_to_records:
-                break
-        except httpx.HTTPStatusError:
-            continue
-        except httpx.RequestError:
-            return {}
-
-    ship_to_map: Dict[str, List[Dict[str, Any]]] = {}
-    for ship_to in ship_to_records:
-        customer_no = (
-            ship_to.get("Customer_No")
-            or ship_to.get("CustomerNo")
-            or ship_to.get("Customer_No_")
-            or ship_to.get("CustomerNumber")
-        )
-        if not customer_no:
-            continue
-        customer_no = str(customer_no)
-        if customer_no not in customer_nos:
-            continue
-        ship_to_map.setdefault(customer_no, []).append(ship_to)
-    return ship_to_map
-
-
-def _ship_to_code(record: Dict[str, Any]) -> Optional[str]:
-    for key in ("Code", "ShipToCode", "Ship_to_Code", "ShipTo_Code"):
-        value = record.get(key)
-        if value:
-            return str(value)
-    return None
-
-
-def _ship_to_name(record: Dict[str, Any]) -> Optional[str]:
-    for key in ("Name", "ShipToName", "Ship_to_Name", "ShipTo_Name"):
-        value = record.get(key)
-        if value:
-            return str(value)
-    return None
-
-
-def _has_address_fields(address: str) -> bool:
-    return bool(address and address.strip())
-
-
-def _dimension_code(record: Dict[str, Any]) -> str:
-    for key in ("Dimension_Code", "DimensionCode"):
-        value = record.get(key)
-        if value:
-            return str(value).strip()
-    return ""
-
-
-def _dimension_value(record: Dict[str, Any]) -> Optional[str]:
-    for key in ("Dimension_Value_Code", "DimensionValueCode", "Dimension_Value", "DimensionValue"):
-        value = record.get(key)
-        if value:
-            return str(value).strip()
-    return None
-
-
-def _dimension_table_id(record: Dict[str, Any]) -> Optional[int]:
-    for key in ("Table_ID", "TableID"):
-        value = record.get(key)
-        if value is None:
-            continue
-        try:
-            return int(value)
-        except (TypeError, ValueError):
-            continue
-    return None
-
-
 def _normalize_tracking_number(tracking_number: str) -> str:
     """Normalize tracking numbers received from scanners/copy-paste."""
     return tracking_number.strip().lstrip(":")
@@ -408,70 +460,6 @@ async def _fetch_posted_sales_invoice_lines(
     return []
 
 
-async def _fetch_customer_division_map(
-    customer_nos: set[str],
-    service: BusinessCentralODataService,
-) -> Dict[str, str]:
-    """Fetch customer division values from DefaultDimensions."""
-    if not customer_nos:
-        return {}
-
-    filter_candidates = (
-        "Table_ID eq 18 and Dimension_Code eq 'Division'",
-        "Table_ID eq 18 and Dimension_Code eq 'DIVISION'",
-        "Dimension_Code eq 'Division'",
-        "Dimension_Code eq 'DIVISION'",
-        "",
-    )
-
-    for filter_expr in filter_candidates:
-        if filter_expr:
-            encoded_filter = quote(filter_expr, safe="'")
-            resource = f"DefaultDimensions?%24filter={encoded_filter}"
-        else:
-            resource = "DefaultDimensions"
-        try:
-            rows = await service.fetch_collection_paged(resource)
-        except httpx.HTTPStatusError as exc:
-            status_code = exc.response.status_code if exc.response else None
-            if status_code in {400, 404}:
-                continue
-            logger.warning(
-                "DefaultDimensions lookup failed",
-                extra={"status_code": status_code, "resource": resource},
-            )
-            return {}
-        except httpx.RequestError as exc:
-            logger.warning(
-                "DefaultDimensions lookup unavailable",
-                extra={"error": str(exc)},
-            )
-            return {}
-
-        division_map: Dict[str, str] = {}
-        for row in rows:
-            customer_no = row.get("No")
-            if not customer_no:
-                continue
-            customer_no = str(customer_no)
-            if customer_no not in customer_nos:
-                continue
-            table_id = _dimension_table_id(row)
-            if table_id is not None and table_id != 18:
-                continue
-            if _dimension_code(row).lower() != "division":
-                continue
-            division_value = _dimension_value(row)
-            if not division_value:
-                continue
-            division_map.setdefault(customer_no, division_value)
-
-        if division_map or not filter_expr:
-            return division_map
-
-    return {}
-
-
 async def _seed_geocode_cache_without_lookup(
     records: List[Dict[str, Any]],
     ship_to_map: Dict[str, List[Dict[str, Any]]],
@@ -483,7 +471,7 @@ async def _seed_geocode_cache_without_lookup(
         if not customer_no:
             continue
         customer_address = customer_geocode_cache.build_address(record)
-        if _has_address_fields(customer_address):
+        if has_address_fields(customer_address):
             tasks.append(
                 asyncio.create_task(
                     customer_geocode_cache.mark_cached_without_geocode(
@@ -494,7 +482,7 @@ async def _seed_geocode_cache_without_lookup(
 
         for ship_to in ship_to_map.get(customer_no, []):
             ship_to_address = customer_geocode_cache.build_address_from_ship_to(ship_to)
-            if not _has_address_fields(ship_to_address):
+            if not has_address_fields(ship_to_address):
                 continue
             tasks.append(
                 asyncio.create_task(
@@ -525,18 +513,28 @@ async def list_posted_sales_invoice_headers(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return posted sales invoice headers."""
-    with logfire.span("bc_api.list_posted_sales_invoice_headers", no=no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_posted_sales_invoice_headers", no=no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="PostedSalesInvoiceHeaders",
             filter_field="No",
             filter_value=no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -639,9 +637,9 @@ async def get_posted_sales_invoices_by_tracking(
         tracking_number=normalized_tracking,
         transport_line_no=transport_line_no,
     ):
-        headers = await _fetch_posted_sales_invoices_by_tracking(service, normalized_tracking)
+        invoices = await _fetch_tracking_invoices_live(service, normalized_tracking)
 
-        if not headers:
+        if not invoices:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail={
@@ -653,106 +651,207 @@ async def get_posted_sales_invoices_by_tracking(
                 },
             )
 
-        matches: List[Dict[str, Any]] = []
-        total_transport_charge_amount_excl_tax = Decimal("0")
-        transport_totals_by_currency: Dict[str, Decimal] = {}
-        for header in headers:
-            invoice_no = _extract_invoice_no(header)
-            if not invoice_no:
-                continue
-            lines = await _fetch_posted_sales_invoice_lines(service, invoice_no)
-
-            transport_lines = [
-                line
-                for line in lines
-                if _line_matches_transport_selector(line, transport_line_no)
-            ]
-
-            transport_amount_values: List[Decimal] = []
-            for transport_line in transport_lines:
-                amount_value = _first_decimal(
-                    transport_line,
-                    [
-                        "Line_Amount_Excl_Tax",
-                        "LineAmountExclTax",
-                        "Line_Amount_Excluding_VAT",
-                        "LineAmount",
-                        "Line_Amount",
-                        "Amount",
-                        "Amount_Excl_Tax",
-                    ],
-                )
-                if amount_value is not None:
-                    transport_amount_values.append(amount_value)
+        return _summarize_tracking_matches(normalized_tracking, invoices, transport_line_no)
 
-            transport_amount_excl_tax: Optional[Decimal]
-            if transport_lines:
-                transport_amount_excl_tax = sum(transport_amount_values, Decimal("0"))
-            else:
-                transport_amount_excl_tax = None
 
-            sales_order_amount_excl_tax = _first_decimal(
-                header,
+@router.post(
+    "/posted-sales-invoices/by-tracking/batch",
+    response_model=Dict[str, Any],
+    summary="Resolve many tracking numbers to posted sales invoices",
+    description=(
+        "Resolve carrier tracking numbers against the local Package_Tracking_No index "
+        "(synced incrementally from posted sales invoices) and return the same per-number "
+        "payload as the single lookup. Unknown numbers are listed in not_found."
+    ),
+)
+async def get_posted_sales_invoices_by_tracking_batch(
+    payload: PostedSalesInvoiceTrackingBatchRequest,
+    service: BusinessCentralODataService = Depends(get_odata_service),
+) -> Dict[str, Any]:
+    tracking_numbers = list(
+        dict.fromkeys(
+            normalized
+            for normalized in (_normalize_tracking_number(number) for number in payload.tracking_numbers)
+            if normalized
+        )
+    )
+    if not tracking_numbers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": {
+                    "code": "INVALID_TRACKING_NUMBER",
+                    "message": "tracking_numbers must contain at least one non-empty value",
+                }
+            },
+        )
+    if not posted_invoice_tracking_index.is_configured:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "BC_TRACKING_INDEX_UNAVAILABLE",
+                    "message": "Posted invoice tracking index storage is not configured",
+                }
+            },
+        )
+
+    with logfire.span(
+        "bc_api.get_posted_sales_invoices_by_tracking_batch",
+        tracking_numbers=len(tracking_numbers),
+        live_fallback=payload.live_fallback,
+    ):
+        # Answer from the index as it is; a stale one is caught up in the background.
+        posted_invoice_tracking_index.sync_in_background_if_stale()
+
+        indexed = await asyncio.to_thread(posted_invoice_tracking_index.lookup, tracking_numbers)
+        missing = [number for number in tracking_numbers if number not in indexed]
+        if payload.live_fallback and missing:
+            semaphore = asyncio.Semaphore(_TRACKING_LIVE_FALLBACK_CONCURRENCY)
+
+            async def _live(number: str) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+                async with semaphore:
+                    return await _fetch_tracking_invoices_live(service, number)
+
+            for number, invoices in zip(missing, await asyncio.gather(*(_live(number) for number in missing))):
+                if invoices:
+                    indexed[number] = invoices
+
+        results = [
+            _summarize_tracking_matches(number, indexed[number], payload.transport_line_no)
+            for number in tracking_numbers
+            if number in indexed
+        ]
+
+    return {
+        "requested_count": len(tracking_numbers),
+        "found_count": len(results),
+        "results": results,
+        "not_found": [number for number in tracking_numbers if number not in indexed],
+        "index": posted_invoice_tracking_index.status(),
+    }
+
+
+async def _fetch_tracking_invoices_live(
+    service: BusinessCentralODataService,
+    tracking_number: str,
+) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Query Business Central for a tracking number's invoice headers and their lines."""
+    headers = [
+        header
+        for header in await _fetch_posted_sales_invoices_by_tracking(service, tracking_number)
+        if _extract_invoice_no(header)
+    ]
+    lines = await asyncio.gather(
+        *(_fetch_posted_sales_invoice_lines(service, _extract_invoice_no(header)) for header in headers)
+    )
+    return list(zip(headers, lines))
+
+
+def _summarize_tracking_matches(
+    tracking_number: str,
+    invoices: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+    transport_line_no: str,
+) -> Dict[str, Any]:
+    matches: List[Dict[str, Any]] = []
+    total_transport_charge_amount_excl_tax = Decimal("0")
+    transport_totals_by_currency: Dict[str, Decimal] = {}
+    for header, lines in invoices:
+        invoice_no = _extract_invoice_no(header)
+        if not invoice_no:
+            continue
+
+        transport_lines = [
+            line
+            for line in lines
+            if _line_matches_transport_selector(line, transport_line_no)
+        ]
+
+        transport_amount_values: List[Decimal] = []
+        for transport_line in transport_lines:
+            amount_value = _first_decimal(
+                transport_line,
                 [
-                    "Amount_Excl_Tax",
-                    "Amount_Excluding_VAT",
-                    "AmountExcludingVAT",
+                    "Line_Amount_Excl_Tax",
+                    "LineAmountExclTax",
+                    "Line_Amount_Excluding_VAT",
+                    "LineAmount",
+                    "Line_Amount",
                     "Amount",
+                    "Amount_Excl_Tax",
                 ],
             )
-            sales_order_amount_incl_tax = _first_decimal(
-                header,
-                [
-                    "Amount_Including_VAT",
-                    "AmountIncludingVAT",
-                    "Amount_Incl_Tax",
-                ],
-            )
-            invoice_currency = header.get("Currency_Code") or header.get("CurrencyCode")
-
-            if transport_amount_excl_tax is not None:
-                total_transport_charge_amount_excl_tax += transport_amount_excl_tax
-                if invoice_currency:
-                    transport_totals_by_currency[invoice_currency] = (
-                        transport_totals_by_currency.get(invoice_currency, Decimal("0"))
-                        + transport_amount_excl_tax
-                    )
+            if amount_value is not None:
+                transport_amount_values.append(amount_value)
 
-            matches.append(
-                {
-                    "invoice_no": invoice_no,
-                    "package_tracking_no": _extract_package_tracking_no(header),
-                    "sales_order_totals": {
-                        "amount_excl_tax": (
-                            float(sales_order_amount_excl_tax)
-                            if sales_order_amount_excl_tax is not None
-                            else None
-                        ),
-                        "amount_incl_tax": (
-                            float(sales_order_amount_incl_tax)
-                            if sales_order_amount_incl_tax is not None
-                            else None
-                        ),
-                        "currency_code": invoice_currency,
-                    },
-                    "transport_charge": {
-                        "line_no": transport_line_no,
-                        "matched_lines_count": len(transport_lines),
-                        "amount_excl_tax": (
-                            float(transport_amount_excl_tax)
-                            if transport_amount_excl_tax is not None
-                            else None
-                        ),
-                        "line": transport_lines[0] if transport_lines else None,
-                        "lines": transport_lines,
-                    },
-                    "header": header,
-                    "lines": lines,
-                }
-            )
+        transport_amount_excl_tax: Optional[Decimal]
+        if transport_lines:
+            transport_amount_excl_tax = sum(transport_amount_values, Decimal("0"))
+        else:
+            transport_amount_excl_tax = None
+
+        sales_order_amount_excl_tax = _first_decimal(
+            header,
+            [
+                "Amount_Excl_Tax",
+                "Amount_Excluding_VAT",
+                "AmountExcludingVAT",
+                "Amount",
+            ],
+        )
+        sales_order_amount_incl_tax = _first_decimal(
+            header,
+            [
+                "Amount_Including_VAT",
+                "AmountIncludingVAT",
+                "Amount_Incl_Tax",
+            ],
+        )
+        invoice_currency = header.get("Currency_Code") or header.get("CurrencyCode")
+
+        if transport_amount_excl_tax is not None:
+            total_transport_charge_amount_excl_tax += transport_amount_excl_tax
+            if invoice_currency:
+                transport_totals_by_currency[invoice_currency] = (
+                    transport_totals_by_currency.get(invoice_currency, Decimal("0"))
+                    + transport_amount_excl_tax
+                )
+
+        matches.append(
+            {
+                "invoice_no": invoice_no,
+                "package_tracking_no": _extract_package_tracking_no(header),
+                "sales_order_totals": {
+                    "amount_excl_tax": (
+                        float(sales_order_amount_excl_tax)
+                        if sales_order_amount_excl_tax is not None
+                        else None
+                    ),
+                    "amount_incl_tax": (
+                        float(sales_order_amount_incl_tax)
+                        if sales_order_amount_incl_tax is not None
+                        else None
+                    ),
+                    "currency_code": invoice_currency,
+                },
+                "transport_charge": {
+                    "line_no": transport_line_no,
+                    "matched_lines_count": len(transport_lines),
+                    "amount_excl_tax": (
+                        float(transport_amount_excl_tax)
+                        if transport_amount_excl_tax is not None
+                        else None
+                    ),
+                    "line": transport_lines[0] if transport_lines else None,
+                    "lines": transport_lines,
+                },
+                "header": header,
+                "lines": lines,
+            }
+        )
 
     return {
-        "tracking_number": normalized_tracking,
+        "tracking_number": tracking_number,
         "matches_count": len(matches),
         "total_transport_charge_amount_excl_tax": float(total_transport_charge_amount_excl_tax),
         "total_transport_charge_by_currency": {
@@ -852,18 +951,28 @@ async def list_purchase_order_lines(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return purchase order lines from the Gilbert-specific view."""
-    with logfire.span("bc_api.list_purchase_order_lines", document_no=document_no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_purchase_order_lines", document_no=document_no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="Gilbert_PurchaseOrderLines",
             filter_field="Document_No",
             filter_value=document_no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -883,18 +992,28 @@ async def list_vendors(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return vendor records."""
-    with logfire.span("bc_api.list_vendors", no=no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_vendors", no=no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="Vendors",
             filter_field="No",
             filter_value=no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -951,18 +1070,19 @@ async def list_customers(
                 for record in records
                 if record.get("No") is not None
             }
-            division_map = await _fetch_customer_division_map(customer_nos, service)
+            division_map = await fetch_customer_division_map(customer_nos, service)
             if no:
                 ship_to_semaphore = asyncio.Semaphore(settings.google_geocode_max_concurrency)
-                ship_to_map = {}
-                for customer_no in customer_nos:
-                    if not customer_no:
-                        continue
-                    ship_to_map[customer_no] = await _fetch_ship_to_addresses(
-                        customer_no, service, ship_to_semaphore
+                lookup_nos = [customer_no for customer_no in customer_nos if customer_no]
+                ship_to_results = await asyncio.gather(
+                    *(
+                        _fetch_ship_to_addresses(customer_no, service, ship_to_semaphore)
+                        for customer_no in lookup_nos
                     )
+                )
+                ship_to_map = dict(zip(lookup_nos, ship_to_results))
             else:
-                ship_to_map = await _fetch_ship_to_map(customer_nos, service)
+                ship_to_map = await fetch_ship_to_map(customer_nos, service)
 
         if regenerate_cache and records:
             await _seed_geocode_cache_without_lookup(records, ship_to_map)
@@ -972,7 +1092,7 @@ async def list_customers(
             if not customer_no:
                 continue
             address = customer_geocode_cache.build_address(record)
-            if _has_address_fields(address):
+            if has_address_fields(address):
                 geocode = customer_geocode_cache.get_cached(customer_no, address)
             else:
                 geocode = GeocodedLocation(status="MISSING_ADDRESS")
@@ -999,7 +1119,7 @@ async def list_customers(
             if (
                 not regenerate_cache
                 and customer_no
-                and _has_address_fields(address)
+                and has_address_fields(address)
                 and geocode is None
             ):
                 if settings.google_geocode_block_on_miss and geocode is None:
@@ -1025,7 +1145,7 @@ async def list_customers(
                     ship_to_address = customer_geocode_cache.build_address_from_ship_to(
                         ship_to
                     )
-                    if _has_address_fields(ship_to_address):
+                    if has_address_fields(ship_to_address):
                         ship_to_geocode = customer_geocode_cache.get_cached(
                             customer_no, ship_to_address
                         )
@@ -1033,8 +1153,8 @@ async def list_customers(
                         ship_to_geocode = GeocodedLocation(status="MISSING_ADDRESS")
                     ship_to_entry = CustomerAddressResponse(
                         source="ship_to",
-                        ship_to_code=_ship_to_code(ship_to),
-                        name=_ship_to_name(ship_to),
+                        ship_to_code=ship_to_code(ship_to),
+                        name=ship_to_name(ship_to),
                         address_1=ship_to.get("Address"),
                         address_2=ship_to.get("Address_2") or ship_to.get("Address2"),
                         address_3=ship_to.get("Address_3") or ship_to.get("Address3"),
@@ -1052,7 +1172,7 @@ async def list_customers(
                     if (
                         not regenerate_cache
                         and customer_no
-                        and _has_address_fields(ship_to_address)
+                        and has_address_fields(ship_to_address)
                         and ship_to_geocode is None
                     ):
                         if (
@@ -1120,6 +1240,97 @@ async def list_customers(
     return summaries
 
 
+@router.get(
+    "/customers/directory",
+    response_model=CollectionResponse[Dict[str, Any]],
+    summary="Page the customer directory",
+    description=(
+        "Serve customer summaries (division, ship-to addresses, cached geocodes) from the "
+        "locally materialized directory, with pagination and field projection. Until the "
+        "directory is first built, responds 503 with Retry-After while it is built in the background."
+    ),
+)
+async def list_customer_directory(
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(100, ge=1, le=1000, description="Customers per page"),
+    division: Optional[str] = Query(default=None, description="Filter by division."),
+    search: Optional[str] = Query(
+        default=None,
+        description="Case-insensitive customer name match, or customer number prefix.",
+    ),
+    fields: Optional[str] = Query(
+        default=None,
+        description="Comma-separated CustomerSummaryResponse fields to return (customer_no is always included).",
+    ),
+    service: BusinessCentralODataService = Depends(get_odata_service),
+) -> CollectionResponse[Dict[str, Any]]:
+    """Return one page of the materialized customer directory."""
+    projection = _parse_directory_fields(fields)
+    if not customer_directory.is_configured:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "BC_CUSTOMER_DIRECTORY_UNAVAILABLE",
+                    "message": "Customer directory storage is not configured",
+                }
+            },
+        )
+
+    with logfire.span("bc_api.list_customer_directory", page=page, per_page=per_page, division=division):
+        if customer_directory.refresh_in_background_if_cold(service):
+            # Never built yet (the startup refresh is still running or failed): build it
+            # in the background instead of making this request wait on Business Central.
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "error": {
+                        "code": "BC_CUSTOMER_DIRECTORY_WARMING_UP",
+                        "message": "Customer directory is being built; retry shortly",
+                    }
+                },
+                headers={"Retry-After": "30"},
+            )
+
+        total, rows = await asyncio.to_thread(
+            customer_directory.page, page=page, per_page=per_page, division=division, search=search
+        )
+        if projection:
+            rows = [{field: row.get(field) for field in projection} for row in rows]
+
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    return CollectionResponse(
+        data=rows,
+        meta=PaginationMeta(
+            pagination={
+                "page": page,
+                "per_page": per_page,
+                "total_pages": total_pages,
+                "total_items": total,
+            }
+        ),
+    )
+
+
+def _parse_directory_fields(fields: Optional[str]) -> Optional[List[str]]:
+    requested = _parse_select(fields)
+    if not requested:
+        return None
+    unknown = [field for field in requested if field not in CustomerSummaryResponse.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": {
+                    "code": "INVALID_FIELDS",
+                    "message": "fields must name CustomerSummaryResponse fields",
+                    "fields": unknown,
+                }
+            },
+        )
+    return list(dict.fromkeys(["customer_no", *requested]))
+
+
 @router.get(
     "/customers/{customer_no}",
     response_model=Dict[str, Any],
@@ -1220,18 +1431,28 @@ async def list_items(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return item master records."""
-    with logfire.span("bc_api.list_items", no=no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_items", no=no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="Items",
             filter_field="No",
             filter_value=no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -1251,18 +1472,28 @@ async def list_purchase_order_headers(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return purchase order headers."""
-    with logfire.span("bc_api.list_purchase_order_headers", no=no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_purchase_order_headers", no=no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="PurchaseOrderHeaders",
             filter_field="No",
             filter_value=no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -1282,18 +1513,28 @@ async def list_sales_order_headers(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return sales order headers."""
-    with logfire.span("bc_api.list_sales_order_headers", no=no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_sales_order_headers", no=no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="SalesOrderHeaders",
             filter_field="No",
             filter_value=no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -1313,18 +1554,28 @@ async def list_sales_order_lines(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return sales order lines from the Gilbert-specific view."""
-    with logfire.span("bc_api.list_sales_order_lines", document_no=document_no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_sales_order_lines", document_no=document_no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="Gilbert_SalesOrderLines",
             filter_field="DocumentNo",
             filter_value=document_no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -1344,18 +1595,28 @@ async def list_sales_quote_headers(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return sales quote header records."""
-    with logfire.span("bc_api.list_sales_quote_headers", no=no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_sales_quote_headers", no=no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="SalesOrderQuotesH",
             filter_field="No",
             filter_value=no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -1375,18 +1636,28 @@ async def list_sales_quote_lines(
         le=500,
         description="Limit the number of records returned.",
     ),
+    select: Optional[str] = Query(
+        default=None,
+        description="Comma-separated fields to return (OData $select).",
+    ),
+    output_format: ExportFormat = Query(
+        default="json",
+        alias="format",
+        description="json returns one document; ndjson or csv stream the collection page by page.",
+    ),
     service: BusinessCentralODataService = Depends(get_odata_service),
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], StreamingResponse]:
     """Return sales quote lines."""
-    with logfire.span("bc_api.list_sales_quote_lines", document_no=document_no, top=top):
-        records = await _fetch_with_handling(
+    with logfire.span("bc_api.list_sales_quote_lines", document_no=document_no, top=top, output_format=output_format):
+        return await _list_or_stream(
             resource="SalesQuoteLines",
             filter_field="Document_No",
             filter_value=document_no,
             top=top,
+            select=select,
+            output_format=output_format,
             service=service,
         )
-    return records
 
 
 @router.get(
@@ -1,12 +1,13 @@
 """
 ERP Items endpoints
 """
-from typing import Optional
+from typing import AsyncIterator, Optional
 import logging
 
 import httpx
 import logfire
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi.responses import StreamingResponse
 
 from app.api.v1.models import SingleResponse, ErrorResponse
 from app.domain.erp.item_service import ItemService
@@ -17,6 +18,7 @@ from app.domain.erp.models import (
     CreateItemRequest,
     CreatePurchasedItemRequest,
     ItemPricesResponse,
+    TariffBatchRequest,
     TariffCalculationResponse,
     ItemAvailabilityResponse,
     ItemAttributesResponse,
@@ -438,6 +440,47 @@ async def get_item_prices(
         )
 
 
+@router.post(
+    "/tariff/batch",
+    responses={
+        200: {
+            "description": "One TariffBatchItemResult JSON object per line, in request order",
+            "content": {"application/x-ndjson": {}},
+        },
+    },
+    summary="Calculate steel weight/value for many items",
+    description=(
+        "Runs the tariff calculator for a list of finished goods. BOM explosions and component "
+        "items are shared across the batch and mill test certificates are resolved in one query "
+        "per chunk. Results stream as NDJSON; an item that fails is reported with status=error."
+    ),
+)
+async def calculate_item_tariff_batch(
+    payload: TariffBatchRequest,
+    tariff_service: TariffCalculationService = Depends(get_tariff_service),
+) -> StreamingResponse:
+    async def _lines() -> AsyncIterator[bytes]:
+        with logfire.span("items.tariff_batch", item_count=len(payload.item_ids)):
+            async for entry in tariff_service.calculate_batch(payload.item_ids):
+                if entry.result is not None and not payload.include_details:
+                    entry.result = _tariff_summary_only(entry.result)
+                yield entry.model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+def _tariff_summary_only(result: TariffCalculationResponse) -> TariffCalculationResponse:
+    return TariffCalculationResponse(
+        item_id=result.item_id,
+        production_bom_no=result.production_bom_no,
+        summary=result.summary,
+        materials=None,
+        parent_country_of_melt_and_pour=result.parent_country_of_melt_and_pour,
+        parent_country_of_manufacture=result.parent_country_of_manufacture,
+        report=None,
+    )
+
+
 @router.get(
     "/{item_id}/tariff",
     response_model=SingleResponse[TariffCalculationResponse],
@@ -463,15 +506,7 @@ async def get_item_tariff(
     try:
         result = await tariff_service.calculate(item_id)
         if not include_details:
-            result = TariffCalculationResponse(
-                item_id=result.item_id,
-                production_bom_no=result.production_bom_no,
-                summary=result.summary,
-                materials=None,
-                parent_country_of_melt_and_pour=result.parent_country_of_melt_and_pour,
-                parent_country_of_manufacture=result.parent_country_of_manufacture,
-                report=None,
-            )
+            result = _tariff_summary_only(result)
         return SingleResponse(data=result)
     except BaseAPIException:
         raise
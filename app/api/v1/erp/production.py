@@ -103,7 +103,8 @@ async def get_bom_cost_share(
     },
     summary="Get routing lines with cost",
     description=(
-        "Expands BomRoutingLines for the item's routing, joins Work Centers to derive per-minute rates, "
+        "Reads the item's routing lines from the latest Cedule costing snapshot (falling back to "
+        "BomRoutingLines), joins cached Work Center rates to derive per-minute costs, "
         "and returns setup/run/total costs per line."
     ),
 )
@@ -1,8 +1,9 @@
 """
 ERP Purchase Orders endpoints
 """
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import logging
 import logfire
@@ -24,6 +25,8 @@ from app.domain.erp.models import (
 )
 from app.domain.purchasing_service import PurchasingService
 from app.domain.dtos import (
+    BulkUpdatePOLinesBody,
+    BulkUpdatePOLinesCommand,
     POLineDTO,
     UpdatePOLineDateBody,
     UpdatePOLinePriceBody,
@@ -238,6 +241,42 @@ async def reopen_purchase_order_endpoint(
         )
 
 
+@router.post(
+    "/lines/bulk-update",
+    responses={
+        200: {
+            "description": "One BulkPOLineResult JSON object per line, in completion order",
+            "content": {"application/x-ndjson": {}},
+        },
+    },
+    summary="Update many PO lines",
+    description=(
+        "Apply promise date, unit price and/or quantity changes to many purchase order lines. "
+        "Lines are read in bulk and validated with the single-line rules, then patched concurrently "
+        "with ETag concurrency. Results stream as NDJSON; a rejected line is reported with status=error."
+    ),
+)
+async def bulk_update_polines(
+    body: BulkUpdatePOLinesBody,
+    ctx: RequestContext = Depends(get_request_context),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    command = BulkUpdatePOLinesCommand(
+        changes=body.changes,
+        reason=body.reason,
+        actor=ctx.actor,
+        trace_id=ctx.trace_id,
+    )
+    service = _get_purchasing_service()
+
+    async def _lines() -> AsyncIterator[bytes]:
+        with logfire.span("POST /purchase-orders/lines/bulk-update", change_count=len(command.changes)):
+            async for result in service.update_polines_bulk(command, db):
+                yield result.model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @router.post(
     "/{po_id}/lines/{line_no}/date",
     response_model=POLineDTO,
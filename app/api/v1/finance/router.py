@@ -105,12 +105,18 @@ async def get_cashflow_projection(
         False,
         description="Force recomputing cashflow projection instead of using daily cache.",
     ),
+    include_entries: bool = Query(
+        True,
+        description="Include the individual cashflow entries behind each daily total.",
+    ),
     token: str = Depends(verify_finance_token),
     svc: CashflowService = Depends(get_service)
 ) -> CashflowProjection:
     """
     Get cashflow projection for the specified period.
     Aggregates data from ERP (Sales, Purchasing, Jobs) and manual entries.
+    Totals-only projections (`include_entries=false`) are computed without building
+    per-entry detail and are not written to the daily cache.
     """
     cache_date = date.today().isoformat()
     start_iso = start_date.isoformat()
@@ -125,14 +131,17 @@ async def get_cashflow_projection(
             currency_code=currency_code,
         )
         if cached:
-            return CashflowProjection.model_validate(cached)
+            return _cached_projection(cached, include_entries)
         stale = cashflow_projection_cache.get_latest_snapshot(
             start_date=start_iso,
             end_date=end_iso,
             currency_code=currency_code,
         )
         if stale:
-            return CashflowProjection.model_validate(stale)
+            return _cached_projection(stale, include_entries)
+
+    if not include_entries:
+        return await svc.get_projection(start_date, end_date, currency, include_entries=False)
 
     projection = await svc.get_projection(start_date, end_date, currency)
 
@@ -149,6 +158,14 @@ async def get_cashflow_projection(
 
     return projection
 
+def _cached_projection(payload: Dict[str, Any], include_entries: bool) -> CashflowProjection:
+    if not include_entries:
+        payload = {
+            **payload,
+            "daily_flows": [{**flow, "entries": []} for flow in payload.get("daily_flows") or []],
+        }
+    return CashflowProjection.model_validate(payload)
+
 @router.get("/cashflow/entries", response_model=List[ManualEntry])
 async def list_manual_entries(
     token: str = Depends(verify_finance_token),
@@ -215,14 +232,24 @@ async def list_open_ar_invoices(
 ) -> CollectionResponse[AccountsReceivableInvoice]:
     cache_key = "open_invoices"
     if use_cache:
+        # Filtered, ordered and paged by the cache; only the requested page is loaded.
         _require_cache(svc)
-        cached = svc.get_cached_open_invoices(cache_key)
-        if cached is None:
+        filters = {
+            "due_from": due_from,
+            "due_to": due_to,
+            "customer_no": customer_no,
+            "invoice_no": invoice_no,
+        }
+        total_items = svc.count_cached_open_invoices(cache_key, **filters)
+        if total_items is None:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="AR open invoice cache not initialized; call /accounts-receivable/cache/refresh",
             )
-        invoices = cached
+        paginated = svc.get_cached_open_invoices(
+            cache_key, **filters, limit=per_page, offset=(page - 1) * per_page
+        ) or []
+        total_pages = max(1, (total_items + per_page - 1) // per_page)
     else:
         invoices = await svc.list_open_invoices(
             due_from=due_from,
@@ -231,21 +258,21 @@ async def list_open_ar_invoices(
             invoice_no=invoice_no,
         )
 
-    if due_from:
-        invoices = [inv for inv in invoices if inv.due_date and inv.due_date >= due_from]
-    if due_to:
-        invoices = [inv for inv in invoices if inv.due_date and inv.due_date <= due_to]
-    if customer_no:
-        invoices = [inv for inv in invoices if inv.customer_no == customer_no]
-    if invoice_no:
-        invoices = [inv for inv in invoices if inv.invoice_no == invoice_no]
-    invoices = [inv for inv in invoices if not (inv.customer_no or "").upper().startswith("ZZ")]
-
-    total_items = len(invoices)
-    total_pages = max(1, (total_items + per_page - 1) // per_page)
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    paginated = invoices[start_idx:end_idx]
+        if due_from:
+            invoices = [inv for inv in invoices if inv.due_date and inv.due_date >= due_from]
+        if due_to:
+            invoices = [inv for inv in invoices if inv.due_date and inv.due_date <= due_to]
+        if customer_no:
+            invoices = [inv for inv in invoices if inv.customer_no == customer_no]
+        if invoice_no:
+            invoices = [inv for inv in invoices if inv.invoice_no == invoice_no]
+        invoices = [inv for inv in invoices if not (inv.customer_no or "").upper().startswith("ZZ")]
+
+        total_items = len(invoices)
+        total_pages = max(1, (total_items + per_page - 1) // per_page)
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        paginated = invoices[start_idx:end_idx]
 
     meta = PaginationMeta(
         pagination={
@@ -333,7 +360,14 @@ async def list_ar_collections(
     cache_key = "open_invoices"
     if use_cache:
         _require_cache(svc)
-        cached = svc.get_cached_open_invoices(cache_key)
+        # Filters and due-date ordering run in the cache; only matching rows are loaded.
+        cached = svc.get_cached_open_invoices(
+            cache_key,
+            due_from=due_from,
+            due_to=due_to,
+            customer_no=customer_no,
+            invoice_no=invoice_no,
+        )
         if cached is None:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -348,15 +382,15 @@ async def list_ar_collections(
             invoice_no=invoice_no,
         )
 
-    if due_from:
-        invoices = [inv for inv in invoices if inv.due_date and inv.due_date >= due_from]
-    if due_to:
-        invoices = [inv for inv in invoices if inv.due_date and inv.due_date <= due_to]
-    if customer_no:
-        invoices = [inv for inv in invoices if inv.customer_no == customer_no]
-    if invoice_no:
-        invoices = [inv for inv in invoices if inv.invoice_no == invoice_no]
-    invoices = [inv for inv in invoices if not (inv.customer_no or "").upper().startswith("ZZ")]
+        if due_from:
+            invoices = [inv for inv in invoices if inv.due_date and inv.due_date >= due_from]
+        if due_to:
+            invoices = [inv for inv in invoices if inv.due_date and inv.due_date <= due_to]
+        if customer_no:
+            invoices = [inv for inv in invoices if inv.customer_no == customer_no]
+        if invoice_no:
+            invoices = [inv for inv in invoices if inv.invoice_no == invoice_no]
+        invoices = [inv for inv in invoices if not (inv.customer_no or "").upper().startswith("ZZ")]
 
     items = svc.list_priority_collections_from_invoices(
         invoices,
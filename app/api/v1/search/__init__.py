@@ -0,0 +1 @@
+from .router import router
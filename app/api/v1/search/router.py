@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, Query
+
+from app.domain.search.index import search_index
+from app.domain.search.models import SearchEntityType, SearchResponse
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get(
+    "/typeahead",
+    response_model=SearchResponse,
+    summary="Unified typeahead search",
+    description=(
+        "Search items, customers, vendors, CRM accounts and subcontracting customers by "
+        "number, name or description from the local trigram index. Exact and prefix "
+        "number matches rank first, then name prefixes, then relevance."
+    ),
+)
+async def typeahead(
+    q: str = Query(..., min_length=1, max_length=100, description="Search text"),
+    types: Optional[List[SearchEntityType]] = Query(default=None, description="Restrict to these entity types"),
+    limit: int = Query(default=20, ge=1, le=100),
+) -> SearchResponse:
+    started = time.perf_counter()
+    hits = await asyncio.to_thread(search_index.search, q, entity_types=types, limit=limit)
+    return SearchResponse(
+        query=q,
+        items=hits,
+        count=len(hits),
+        took_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
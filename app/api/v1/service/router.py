@@ -5,10 +5,11 @@ from __future__ import annotations
 from functools import lru_cache
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Path, Query
+from fastapi import APIRouter, Depends, Header, Path, Query, Response
 
 from app.api.v1.models import CollectionResponse, ErrorResponse, SingleResponse
 from app.domain.service.models import (
+    ServiceCatalogBundle,
     ServiceDivision,
     ServiceEquipement,
     ServiceModele,
@@ -21,6 +22,7 @@ from app.domain.service.models import (
 )
 from app.domain.service.service_catalog_service import ServiceCatalogService
 from app.errors import DatabaseError
+from app.integrations.sql_executor import CEDULE_DB, AsyncRepository
 
 router = APIRouter(prefix="/service", tags=["Service"])
 
@@ -37,6 +39,50 @@ def get_service() -> ServiceCatalogService:
     return service
 
 
+def get_sql_service(
+    service: ServiceCatalogService = Depends(get_service),
+) -> AsyncRepository[ServiceCatalogService]:
+    """Run the catalog's Cedule calls on the dedicated Cedule SQL executor."""
+    return AsyncRepository(service, CEDULE_DB)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get(
+    "/catalog",
+    response_model=SingleResponse[ServiceCatalogBundle],
+    responses={
+        200: {"description": "Service catalog tree retrieved successfully"},
+        304: {"description": "Catalog unchanged since the version named in If-None-Match"},
+        503: {"description": "Cedule database unavailable", "model": ErrorResponse},
+    },
+    summary="Get the whole service catalog",
+    description=(
+        "Return divisions, equipments, models and optional field types as one tree. "
+        "Send the returned ETag in If-None-Match to revalidate without downloading it again."
+    ),
+)
+async def get_service_catalog(
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
+) -> SingleResponse[ServiceCatalogBundle] | Response:
+    bundle = await service.get_catalog_bundle()
+    headers = {"ETag": bundle.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, bundle.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return SingleResponse(data=bundle)
+
+
 @router.get(
     "/divisions",
     response_model=CollectionResponse[ServiceDivision],
@@ -47,9 +93,9 @@ def get_service() -> ServiceCatalogService:
     summary="List service divisions",
 )
 async def list_service_divisions(
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceDivision]:
-    divisions = service.list_divisions()
+    divisions = await service.list_divisions()
     return CollectionResponse(data=divisions)
 
 
@@ -68,9 +114,9 @@ async def list_service_equipements(
         ge=1,
         description="Optional division id to filter equipments.",
     ),
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceEquipement]:
-    equipements = service.list_equipements(division_id=division_id)
+    equipements = await service.list_equipements(division_id=division_id)
     return CollectionResponse(data=equipements)
 
 
@@ -88,9 +134,9 @@ async def list_service_modeles(
         default=None,
         description="Optional equipment id to filter models.",
     ),
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceModele]:
-    modeles = service.list_modeles(equipement_id=equipement_id)
+    modeles = await service.list_modeles(equipement_id=equipement_id)
     return CollectionResponse(data=modeles)
 
 
@@ -113,9 +159,9 @@ async def list_service_items(
         ge=1,
         description="Optional service item id to filter service items.",
     ),
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceItem]:
-    items = service.list_service_items(customer_id=customer_id, service_item_id=service_item_id)
+    items = await service.list_service_items(customer_id=customer_id, service_item_id=service_item_id)
     return CollectionResponse(data=items)
 
 
@@ -132,9 +178,9 @@ async def list_service_items(
 )
 async def create_service_item(
     payload: ServiceItemCreateRequest,
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> SingleResponse[ServiceItemCreateResponse]:
-    created = service.create_service_item(payload)
+    created = await service.create_service_item(payload)
     return SingleResponse(data=created)
 
 
@@ -149,9 +195,9 @@ async def create_service_item(
 )
 async def list_service_item_optional_fields(
     service_item_id: int = Path(..., ge=1, description="Service item id."),
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceItemOptionalField]:
-    fields = service.list_optional_fields(service_item_id=service_item_id)
+    fields = await service.list_optional_fields(service_item_id=service_item_id)
     return CollectionResponse(data=fields)
 
 
@@ -173,9 +219,9 @@ async def list_service_optional_field_types(
         default=None,
         description="Optional type to filter field types.",
     ),
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceItemOptionalFieldType]:
-    types = service.list_optional_field_types(equipment=equipment, field_type=field_type)
+    types = await service.list_optional_field_types(equipment=equipment, field_type=field_type)
     return CollectionResponse(data=types)
 
 
@@ -194,8 +240,8 @@ async def list_service_optional_field_types(
 )
 async def list_customer_service_assets(
     customer_id: str = Path(..., min_length=1, description="Customer id."),
-    service: ServiceCatalogService = Depends(get_service),
+    service: AsyncRepository[ServiceCatalogService] = Depends(get_sql_service),
 ) -> CollectionResponse[ServiceItemAsset]:
-    assets = service.get_customer_assets(customer_id)
+    assets = await service.get_customer_assets(customer_id)
     return CollectionResponse(data=assets)
 
@@ -32,10 +32,12 @@ from app.domain.usinage.fastems1.autopilot.providers import (
 )
 from app.domain.usinage.fastems1.autopilot.repositories import AutopilotRepository
 from app.domain.usinage.fastems1.autopilot.services import (
+    MACHINE_NAME_TO_ID,
     AutopilotControlService,
     AutopilotPlannerService,
     AutopilotSuggestionService,
 )
+from app.domain.usinage.fastems1.autopilot.shop_floor import ShopFloorStatePoller
 from app.settings import settings
 
 router = APIRouter(prefix="/autopilot", tags=["Fastems1 Autopilot"])
@@ -63,6 +65,20 @@ def _get_providers() -> tuple[WorkOrderProvider, FixtureProvider, ToolingProvide
     )
 
 
+@lru_cache(maxsize=1)
+def get_shop_floor_poller() -> ShopFloorStatePoller:
+    """Process-wide shop-floor poller built on the provider singletons."""
+    workorder, fixture, tooling, material, pallet_route = _get_providers()
+    return ShopFloorStatePoller(
+        workorder_provider=workorder,
+        tooling_provider=tooling,
+        pallet_route_provider=pallet_route,
+        material_provider=material,
+        fixture_provider=fixture,
+        machine_ids=sorted(set(MACHINE_NAME_TO_ID.values())),
+    )
+
+
 def get_workorder_provider(_: None = Depends(ensure_enabled)) -> WorkOrderProvider:
     return _get_providers()[0]
 
@@ -118,6 +134,7 @@ def get_suggestion_service(
         tooling_provider,
         pallet_route_provider,
         workorder_provider,
+        shop_floor=get_shop_floor_poller() if settings.fastems1_shop_floor_poll_enabled else None,
     )
 
 
@@ -1,15 +1,13 @@
 from __future__ import annotations
 
-import io
+import asyncio
 import json
-import base64
 from functools import lru_cache
 from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
-import fitz
-from pypdf import PdfReader
+from fastapi.concurrency import run_in_threadpool
 
 from app.domain.ventes_sous_traitance.models import (
     CustomerCreateRequest,
@@ -46,8 +44,10 @@ from app.domain.ventes_sous_traitance.models import (
     RoutingStepUpdateRequest,
     RoutingUpdateRequest,
 )
+from app.domain.documents.pdf_rendering import InvalidPdfError, PageRenderSpec, pdf_renderer
 from app.domain.ventes_sous_traitance.service import VentesSousTraitanceService
 from app.errors import DatabaseError
+from app.integrations.sql_executor import CEDULE_DB, AsyncRepository
 
 router = APIRouter(tags=["Ventes - Sous-Traitance"])
 MAX_ANALYZE_UPLOAD_BYTES = 50 * 1024 * 1024
@@ -67,6 +67,13 @@ def get_service() -> VentesSousTraitanceService:
     return service
 
 
+def get_sql_service(
+    service: VentesSousTraitanceService = Depends(get_service),
+) -> AsyncRepository[VentesSousTraitanceService]:
+    """Run the service's Cedule calls on the dedicated Cedule SQL executor."""
+    return AsyncRepository(service, CEDULE_DB)
+
+
 async def _read_and_validate_pdf_upload(file: UploadFile) -> bytes:
     filename = (file.filename or "").lower()
     if not filename.endswith(".pdf"):
@@ -82,47 +89,29 @@ async def _read_and_validate_pdf_upload(file: UploadFile) -> bytes:
     return content
 
 
-def _extract_pdf_text_from_bytes(file_content: bytes) -> str:
+async def _extract_pdf_text_from_bytes(file_content: bytes) -> str:
     try:
-        reader = PdfReader(io.BytesIO(file_content))
-    except Exception as exc:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid PDF: {exc}") from exc
+        pages = await pdf_renderer.extract_text(file_content)
+    except InvalidPdfError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
     chunks: list[str] = []
-    for idx, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
+    for idx, text in enumerate(pages):
         if text.strip():
             chunks.append(f"[Page {idx + 1}]\n{text.strip()}")
     return "\n\n".join(chunks).strip()
 
 
-def _extract_pdf_image_data_urls(file_content: bytes) -> list[str]:
+async def _extract_pdf_image_data_urls(file_content: bytes) -> list[str]:
     """
     Render PDF pages to image data URLs for multimodal LLM extraction.
     Includes first page title-block crop to improve metadata extraction.
     """
-    urls: list[str] = []
+    specs = [PageRenderSpec(0, 1.6), PageRenderSpec(0, 2.0, clip=(0.55, 0.55, 1.0, 1.0))]
+    specs.extend(PageRenderSpec(idx, 1.6) for idx in range(1, MAX_ANALYZE_IMAGE_PAGES))
     try:
-        doc = fitz.open(stream=file_content, filetype="pdf")
-    except Exception as exc:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid PDF: {exc}") from exc
-
-    try:
-        for idx, page in enumerate(doc):
-            if idx >= MAX_ANALYZE_IMAGE_PAGES:
-                break
-            pix = page.get_pixmap(matrix=fitz.Matrix(1.6, 1.6), alpha=False)
-            png_bytes = pix.tobytes("png")
-            urls.append(f"data:image/png;base64,{base64.b64encode(png_bytes).decode('ascii')}")
-
-            if idx == 0 and len(urls) < MAX_ANALYZE_IMAGE_DATA_URLS:
-                rect = page.rect
-                clip = fitz.Rect(rect.width * 0.55, rect.height * 0.55, rect.width, rect.height)
-                crop_pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0), clip=clip, alpha=False)
-                crop_png = crop_pix.tobytes("png")
-                urls.append(f"data:image/png;base64,{base64.b64encode(crop_png).decode('ascii')}")
-    finally:
-        doc.close()
-
+        urls = await pdf_renderer.render_data_urls(file_content, specs, max_pages=MAX_ANALYZE_IMAGE_PAGES)
+    except InvalidPdfError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
     return urls[:MAX_ANALYZE_IMAGE_DATA_URLS]
 
 
@@ -149,35 +138,35 @@ def _parse_part_cues_json(part_cues_json: Optional[str]) -> list[dict]:
 @router.post("/quotes", response_model=QuoteSummary, status_code=status.HTTP_201_CREATED)
 async def create_quote(
     payload: QuoteCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuoteSummary:
-    return service.create_quote(payload)
+    return await service.create_quote(payload)
 
 
 @router.get("/customers", response_model=list[CustomerSummary])
 async def list_customers(
     search: Optional[str] = Query(default=None, alias="q"),
     limit: int = Query(default=200, ge=1, le=1000),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[CustomerSummary]:
-    return service.list_customers(search=search, limit=limit)
+    return await service.list_customers(search=search, limit=limit)
 
 
 @router.post("/customers", response_model=CustomerSummary, status_code=status.HTTP_201_CREATED)
 async def create_customer(
     payload: CustomerCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> CustomerSummary:
-    return service.create_customer(payload)
+    return await service.create_customer(payload)
 
 
 @router.patch("/customers/{customer_id}", response_model=CustomerSummary)
 async def update_customer(
     customer_id: UUID,
     payload: CustomerUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> CustomerSummary:
-    customer = service.update_customer(customer_id, payload)
+    customer = await service.update_customer(customer_id, payload)
     if not customer:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Customer not found")
     return customer
@@ -186,9 +175,9 @@ async def update_customer(
 @router.delete("/customers/{customer_id}", response_model=dict[str, bool])
 async def delete_customer(
     customer_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> dict[str, bool]:
-    deleted = service.delete_customer(customer_id)
+    deleted = await service.delete_customer(customer_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Customer not found")
     return {"deleted": True}
@@ -198,26 +187,26 @@ async def delete_customer(
 async def list_machine_groups(
     search: Optional[str] = Query(default=None, alias="q"),
     limit: int = Query(default=200, ge=1, le=1000),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[MachineGroupSummary]:
-    return service.list_machine_groups(search=search, limit=limit)
+    return await service.list_machine_groups(search=search, limit=limit)
 
 
 @router.post("/machine-groups", response_model=MachineGroupSummary, status_code=status.HTTP_201_CREATED)
 async def create_machine_group(
     payload: MachineGroupCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineGroupSummary:
-    return service.create_machine_group(payload)
+    return await service.create_machine_group(payload)
 
 
 @router.patch("/machine-groups/{machine_group_id}", response_model=MachineGroupSummary)
 async def update_machine_group(
     machine_group_id: str,
     payload: MachineGroupUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineGroupSummary:
-    machine_group = service.update_machine_group(machine_group_id, payload)
+    machine_group = await service.update_machine_group(machine_group_id, payload)
     if not machine_group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine group not found")
     return machine_group
@@ -226,9 +215,9 @@ async def update_machine_group(
 @router.delete("/machine-groups/{machine_group_id}", response_model=dict[str, bool])
 async def delete_machine_group(
     machine_group_id: str,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> dict[str, bool]:
-    deleted = service.delete_machine_group(machine_group_id)
+    deleted = await service.delete_machine_group(machine_group_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine group not found")
     return {"deleted": True}
@@ -239,9 +228,9 @@ async def list_machine_capability_options(
     search: Optional[str] = Query(default=None, alias="q"),
     capability_code: Optional[str] = Query(default=None),
     limit: int = Query(default=200, ge=1, le=1000),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[MachineCapabilityOption]:
-    return service.list_machine_capability_options(
+    return await service.list_machine_capability_options(
         search=search,
         capability_code=capability_code,
         limit=limit,
@@ -251,18 +240,18 @@ async def list_machine_capability_options(
 @router.post("/machine-capabilities/options", response_model=MachineCapabilityOptionEntry, status_code=status.HTTP_201_CREATED)
 async def create_machine_capability_option(
     payload: MachineCapabilityOptionCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineCapabilityOptionEntry:
-    return service.create_machine_capability_option(payload)
+    return await service.create_machine_capability_option(payload)
 
 
 @router.patch("/machine-capabilities/options/{option_id}", response_model=MachineCapabilityOptionEntry)
 async def update_machine_capability_option(
     option_id: UUID,
     payload: MachineCapabilityOptionUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineCapabilityOptionEntry:
-    option = service.update_machine_capability_option(option_id, payload)
+    option = await service.update_machine_capability_option(option_id, payload)
     if not option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine capability option not found")
     return option
@@ -272,9 +261,9 @@ async def update_machine_capability_option(
 async def list_machine_capability_catalog(
     search: Optional[str] = Query(default=None, alias="q"),
     limit: int = Query(default=200, ge=1, le=1000),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[MachineCapabilityCatalogItem]:
-    return service.list_machine_capability_catalog(search=search, limit=limit)
+    return await service.list_machine_capability_catalog(search=search, limit=limit)
 
 
 @router.get("/machines", response_model=list[MachineResponse])
@@ -283,9 +272,9 @@ async def list_machines(
     machine_group_id: Optional[str] = Query(default=None),
     active_only: bool = Query(default=True),
     limit: int = Query(default=200, ge=1, le=1000),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[MachineResponse]:
-    return service.list_machines(
+    return await service.list_machines(
         search=search,
         machine_group_id=machine_group_id,
         active_only=active_only,
@@ -296,9 +285,9 @@ async def list_machines(
 @router.get("/machines/{machine_id}", response_model=MachineResponse)
 async def get_machine(
     machine_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineResponse:
-    machine = service.get_machine(machine_id)
+    machine = await service.get_machine(machine_id)
     if not machine:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine not found")
     return machine
@@ -307,18 +296,18 @@ async def get_machine(
 @router.post("/machines", response_model=MachineResponse, status_code=status.HTTP_201_CREATED)
 async def create_machine(
     payload: MachineCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineResponse:
-    return service.create_machine(payload)
+    return await service.create_machine(payload)
 
 
 @router.patch("/machines/{machine_id}", response_model=MachineResponse)
 async def update_machine(
     machine_id: UUID,
     payload: MachineUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> MachineResponse:
-    machine = service.update_machine(machine_id, payload)
+    machine = await service.update_machine(machine_id, payload)
     if not machine:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine not found")
     return machine
@@ -327,9 +316,9 @@ async def update_machine(
 @router.delete("/machines/{machine_id}", response_model=dict[str, bool])
 async def delete_machine(
     machine_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> dict[str, bool]:
-    deleted = service.delete_machine(machine_id)
+    deleted = await service.delete_machine(machine_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine not found")
     return {"deleted": True}
@@ -339,17 +328,17 @@ async def delete_machine(
 async def list_quotes(
     status_filter: Optional[str] = Query(default=None, alias="status"),
     customer: Optional[UUID] = Query(default=None),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[QuoteSummary]:
-    return service.list_quotes(status=status_filter, customer_id=customer)
+    return await service.list_quotes(status=status_filter, customer_id=customer)
 
 
 @router.get("/quotes/{quote_id}", response_model=QuoteSummary)
 async def get_quote(
     quote_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuoteSummary:
-    quote = service.get_quote(quote_id)
+    quote = await service.get_quote(quote_id)
     if not quote:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
     return quote
@@ -359,9 +348,9 @@ async def get_quote(
 async def update_quote(
     quote_id: UUID,
     payload: QuoteUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuoteSummary:
-    quote = service.update_quote(quote_id, payload)
+    quote = await service.update_quote(quote_id, payload)
     if not quote:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
     return quote
@@ -370,19 +359,19 @@ async def update_quote(
 @router.get("/quotes/{quote_id}/parts", response_model=list[QuotePartSummary])
 async def list_quote_parts(
     quote_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[QuotePartSummary]:
-    if not service.get_quote(quote_id):
+    if not await service.get_quote(quote_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
-    return service.list_quote_parts(quote_id)
+    return await service.list_quote_parts(quote_id)
 
 
 @router.delete("/quotes/{quote_id}", response_model=dict[str, bool])
 async def delete_quote(
     quote_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> dict[str, bool]:
-    deleted = service.delete_quote(quote_id)
+    deleted = await service.delete_quote(quote_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
     return {"deleted": True}
@@ -392,9 +381,9 @@ async def delete_quote(
 async def update_quote_status(
     quote_id: UUID,
     payload: QuoteStatusUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuoteSummary:
-    quote = service.update_quote_status(quote_id, payload)
+    quote = await service.update_quote_status(quote_id, payload)
     if not quote:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
     return quote
@@ -403,11 +392,11 @@ async def update_quote_status(
 @router.post("/quotes/{quote_id}/analyze", response_model=QuoteAnalysisStartResponse)
 async def analyze_quote(
     quote_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuoteAnalysisStartResponse:
-    if not service.get_quote(quote_id):
+    if not await service.get_quote(quote_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
-    job_id = service.start_analysis(quote_id)
+    job_id = await run_in_threadpool(service.sync.start_analysis, quote_id)
     return QuoteAnalysisStartResponse(job_id=job_id, quote_id=quote_id, status="scheduled")
 
 
@@ -420,14 +409,16 @@ async def analyze_quote_upload(
         default=None,
         description="JSON array of per-part cues, e.g. [{\"part_ref\":\"A\",\"cue\":\"lathe first\"}]",
     ),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuoteAnalysisStartResponse:
-    if not service.get_quote(quote_id):
+    if not await service.get_quote(quote_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
 
     file_content = await _read_and_validate_pdf_upload(file)
-    extracted_text = _extract_pdf_text_from_bytes(file_content)
-    image_data_urls = _extract_pdf_image_data_urls(file_content)
+    extracted_text, image_data_urls = await asyncio.gather(
+        _extract_pdf_text_from_bytes(file_content),
+        _extract_pdf_image_data_urls(file_content),
+    )
     has_user_cue = bool(user_cue and user_cue.strip())
     if not extracted_text and not image_data_urls and not has_user_cue:
         raise HTTPException(
@@ -435,7 +426,8 @@ async def analyze_quote_upload(
             detail="No text or visual content could be extracted from PDF. Provide user_cue or upload a valid PDF.",
     )
     part_cues = _parse_part_cues_json(part_cues_json)
-    job_id = service.start_analysis_from_text(
+    job_id = await run_in_threadpool(
+        service.sync.start_analysis_from_text,
         quote_id,
         source_text=extracted_text,
         user_cue=user_cue,
@@ -450,19 +442,19 @@ async def list_quote_jobs(
     quote_id: UUID,
     status_filter: Optional[str] = Query(default=None, alias="status"),
     limit: int = Query(default=200, ge=1, le=1000),
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[JobStatusResponse]:
-    if not service.get_quote(quote_id):
+    if not await service.get_quote(quote_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quote not found")
-    return service.list_quote_jobs(quote_id, status=status_filter, limit=limit)
+    return await service.list_quote_jobs(quote_id, status=status_filter, limit=limit)
 
 
 @router.get("/jobs/{job_id}", response_model=JobStatusResponse)
 async def get_job_status(
     job_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> JobStatusResponse:
-    job = service.get_job(job_id)
+    job = await service.get_job(job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
     return job
@@ -471,9 +463,9 @@ async def get_job_status(
 @router.get("/parts/{part_id}", response_model=QuotePartSummary)
 async def get_part(
     part_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuotePartSummary:
-    part = service.get_quote_part(part_id)
+    part = await service.get_quote_part(part_id)
     if not part:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Part not found")
     return part
@@ -483,9 +475,9 @@ async def get_part(
 async def update_part(
     part_id: UUID,
     payload: QuotePartUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> QuotePartSummary:
-    part = service.update_quote_part(part_id, payload)
+    part = await service.update_quote_part(part_id, payload)
     if not part:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Part not found")
     return part
@@ -494,36 +486,36 @@ async def update_part(
 @router.get("/parts/{part_id}/features", response_model=PartFeatureSetResponse)
 async def get_part_features(
     part_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> PartFeatureSetResponse:
-    return service.get_part_feature_set(part_id)
+    return await service.get_part_feature_set(part_id)
 
 
 @router.put("/parts/{part_id}/features", response_model=PartFeatureSetResponse)
 async def replace_part_features(
     part_id: UUID,
     payload: PartFeatureSetUpsertRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> PartFeatureSetResponse:
-    return service.replace_part_feature_set(part_id, payload)
+    return await service.replace_part_feature_set(part_id, payload)
 
 
 @router.post("/parts/{part_id}/features", response_model=PartFeatureResponse, status_code=status.HTTP_201_CREATED)
 async def create_part_feature(
     part_id: UUID,
     payload: PartFeatureCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> PartFeatureResponse:
-    return service.create_part_feature(part_id, payload)
+    return await service.create_part_feature(part_id, payload)
 
 
 @router.patch("/part-features/{feature_id}", response_model=PartFeatureResponse)
 async def update_part_feature(
     feature_id: UUID,
     payload: PartFeatureUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> PartFeatureResponse:
-    updated = service.update_part_feature(feature_id, payload)
+    updated = await service.update_part_feature(feature_id, payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Part feature not found")
     return updated
@@ -532,38 +524,38 @@ async def update_part_feature(
 @router.post("/parts/{part_id}/generate-routings", response_model=list[RoutingResponse])
 async def generate_routings(
     part_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[RoutingResponse]:
-    routings = service.list_routings(part_id)
+    routings = await service.list_routings(part_id)
     if routings:
         return routings
-    created = service.create_routing(part_id, RoutingCreateRequest(scenario_name="Generated Baseline", selected=True))
+    created = await service.create_routing(part_id, RoutingCreateRequest(scenario_name="Generated Baseline", selected=True))
     return [created]
 
 
 @router.get("/parts/{part_id}/routings", response_model=list[RoutingResponse])
 async def list_routings(
     part_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[RoutingResponse]:
-    return service.list_routings(part_id)
+    return await service.list_routings(part_id)
 
 
 @router.post("/parts/{part_id}/routings", response_model=RoutingResponse, status_code=status.HTTP_201_CREATED)
 async def create_routing(
     part_id: UUID,
     payload: RoutingCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> RoutingResponse:
-    return service.create_routing(part_id, payload)
+    return await service.create_routing(part_id, payload)
 
 
 @router.get("/routings/{routing_id}", response_model=RoutingResponse)
 async def get_routing(
     routing_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> RoutingResponse:
-    routing = service.get_routing(routing_id)
+    routing = await service.get_routing(routing_id)
     if not routing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing not found")
     return routing
@@ -573,9 +565,9 @@ async def get_routing(
 async def update_routing(
     routing_id: UUID,
     payload: RoutingUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> RoutingResponse:
-    routing = service.update_routing(routing_id, payload)
+    routing = await service.update_routing(routing_id, payload)
     if not routing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing not found")
     return routing
@@ -584,9 +576,9 @@ async def update_routing(
 @router.delete("/routings/{routing_id}", response_model=dict[str, bool])
 async def delete_routing(
     routing_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> dict[str, bool]:
-    deleted = service.delete_routing(routing_id)
+    deleted = await service.delete_routing(routing_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing not found")
     return {"deleted": True}
@@ -595,27 +587,27 @@ async def delete_routing(
 @router.get("/routings/{routing_id}/steps", response_model=list[RoutingStepResponse])
 async def list_routing_steps(
     routing_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> list[RoutingStepResponse]:
-    return service.list_routing_steps(routing_id)
+    return await service.list_routing_steps(routing_id)
 
 
 @router.post("/routings/{routing_id}/steps", response_model=RoutingStepResponse, status_code=status.HTTP_201_CREATED)
 async def create_routing_step(
     routing_id: UUID,
     payload: RoutingStepCreateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> RoutingStepResponse:
-    return service.create_routing_step(routing_id, payload)
+    return await service.create_routing_step(routing_id, payload)
 
 
 @router.patch("/routing_steps/{step_id}", response_model=RoutingStepResponse)
 async def update_routing_step(
     step_id: UUID,
     payload: RoutingStepUpdateRequest,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> RoutingStepResponse:
-    step = service.update_routing_step(step_id, payload)
+    step = await service.update_routing_step(step_id, payload)
     if not step:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing step not found")
     return step
@@ -624,9 +616,9 @@ async def update_routing_step(
 @router.delete("/routing_steps/{step_id}", response_model=dict[str, bool])
 async def delete_routing_step(
     step_id: UUID,
-    service: VentesSousTraitanceService = Depends(get_service),
+    service: AsyncRepository[VentesSousTraitanceService] = Depends(get_sql_service),
 ) -> dict[str, bool]:
-    deleted = service.delete_routing_step(step_id)
+    deleted = await service.delete_routing_step(step_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing step not found")
     return {"deleted": True}
@@ -5,11 +5,26 @@ This module provides functions for:
 - Idempotency key storage and retrieval
 - Audit trail logging for all ERP operations
 - Database-backed operation tracking
+
+Audit and idempotency inserts are write-behind by default: they are buffered in a
+bounded in-process queue and flushed by a background thread in multi-row INSERTs,
+so ERP-modifying requests no longer wait on an extra commit. A failed flush is retried
+with backoff; rows that still cannot be written go to a local JSONL dead-letter file
+that a scheduled job replays, so a database outage delays audit rows instead of losing
+them. Critical actions pass ``durable=True`` to insert and commit inline as before. Idempotency lookups consult
+an in-memory LRU (which also holds still-buffered records) before reaching SQL.
 """
 
+import asyncio
 import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy import text, Table, MetaData
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
@@ -17,6 +32,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+from app.db import get_engine
 from app.errors import IdempotencyException
 from app.settings import settings
 
@@ -42,6 +58,415 @@ except ImportError:  # pragma: no cover - fallback for environments without logf
     logfire = _LogfireStub()
 
 
+class _IdempotencyCache:
+    """Thread-safe LRU of idempotency key -> (response data, created_at)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            response_data, created_at = entry
+            if datetime.now(timezone.utc) > created_at + timedelta(hours=settings.idempotency_ttl_hours):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response_data
+
+    def put(self, key: str, response_data: Dict[str, Any], created_at: Optional[datetime] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (response_data, created_at or datetime.now(timezone.utc))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+idempotency_cache = _IdempotencyCache(settings.idempotency_cache_size)
+
+
+@dataclass
+class _PendingWrite:
+    kind: str  # "audit" or "idempotency"
+    bind: Any
+    params: Dict[str, Any]
+
+
+class AuditWriteBehind:
+    """
+    Bounded queue of audit and idempotency rows flushed in multi-row INSERTs.
+
+    Rows are written through the engine the caller's session is bound to, by one
+    background thread, whenever `flush_batch_size` rows are waiting or
+    `flush_interval_seconds` elapsed. `enqueue` returns False when the queue is full
+    so the caller can write inline instead of dropping the row. A group that still
+    fails after `max_retries` retries is appended to the dead-letter file and written
+    again by `replay_dead_letters`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: Optional[int] = None,
+        flush_batch_size: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff_seconds: Optional[float] = None,
+        dead_letter_path: Optional[str] = None,
+    ):
+        self.flush_batch_size = flush_batch_size or settings.audit_flush_batch_size
+        self.flush_interval_seconds = (
+            settings.audit_flush_interval_ms / 1000 if flush_interval_seconds is None else flush_interval_seconds
+        )
+        self.max_retries = settings.audit_flush_max_retries if max_retries is None else max_retries
+        self.retry_backoff_seconds = (
+            settings.audit_flush_retry_backoff_ms / 1000 if retry_backoff_seconds is None else retry_backoff_seconds
+        )
+        self.dead_letter_path = dead_letter_path or settings.audit_dead_letter_path
+        self._dead_letter_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_PendingWrite]]" = queue.Queue(maxsize=max_size or settings.audit_queue_max_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._counters = {
+            "enqueued": 0,
+            "rejected": 0,
+            "flushed_rows": 0,
+            "flushes": 0,
+            "retries": 0,
+            "failed_rows": 0,
+            "dead_lettered_rows": 0,
+            "replayed_rows": 0,
+        }
+
+    def enqueue(self, kind: str, bind: Any, params: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._ensure_worker()
+            try:
+                self._queue.put_nowait(_PendingWrite(kind, bind, params))
+            except queue.Full:
+                self._counters["rejected"] += 1
+                return False
+            self._in_flight += 1
+            self._counters["enqueued"] += 1
+            return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until every row enqueued so far was written (or `timeout` elapsed)."""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Flush what is buffered and stop the writer thread."""
+        self.flush(timeout)
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "queued": self._in_flight, "max_size": self._queue.maxsize}
+
+    def replay_dead_letters(self, bind: Any) -> int:
+        """Write dead-lettered rows through `bind`; rows that fail again stay in the file."""
+        replay_path = self.dead_letter_path + ".replay"
+        with self._dead_letter_lock:
+            if os.path.exists(self.dead_letter_path):
+                # Claim the current file; rows failing from now on start a new one.
+                with open(self.dead_letter_path, "r", encoding="utf-8") as source, open(
+                    replay_path, "a", encoding="utf-8"
+                ) as target:
+                    target.write(source.read())
+                os.remove(self.dead_letter_path)
+        if not os.path.exists(replay_path):
+            return 0
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        with open(replay_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.error("Skipping unreadable audit dead-letter line")
+                    continue
+                groups.setdefault(record["kind"], []).append(_restore_params(record["params"]))
+
+        replayed = 0
+        for kind, rows in groups.items():
+            for start in range(0, len(rows), self.flush_batch_size):
+                chunk = rows[start : start + self.flush_batch_size]
+                try:
+                    with bind.begin() as connection:
+                        _insert_rows(connection, kind, chunk)
+                except Exception as e:
+                    logfire.error(f"Error replaying dead-lettered {kind} rows: {e}")
+                    self._dead_letter(kind, chunk)
+                    continue
+                replayed += len(chunk)
+        os.remove(replay_path)
+        with self._lock:
+            self._counters["replayed_rows"] += replayed
+        return replayed
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval_seconds
+            stop = False
+            while len(batch) < self.flush_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[_PendingWrite]) -> None:
+        groups: Dict[Tuple[int, str], List[_PendingWrite]] = {}
+        for item in batch:
+            groups.setdefault((id(item.bind), item.kind), []).append(item)
+        try:
+            for (_, kind), items in groups.items():
+                rows = [item.params for item in items]
+                if not self._write_with_retries(items[0].bind, kind, rows):
+                    with self._lock:
+                        self._counters["failed_rows"] += len(items)
+                    self._dead_letter(kind, rows)
+                    if kind == "idempotency":
+                        # Unwritten keys must not keep answering from memory alone.
+                        for item in items:
+                            idempotency_cache.discard(item.params["key"])
+                    continue
+                with self._lock:
+                    self._counters["flushed_rows"] += len(items)
+            with self._lock:
+                self._counters["flushes"] += 1
+        finally:
+            with self._idle:
+                self._in_flight -= len(batch)
+                self._idle.notify_all()
+
+
+    def _write_with_retries(self, bind: Any, kind: str, rows: List[Dict[str, Any]]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with bind.begin() as connection:
+                    _insert_rows(connection, kind, rows)
+                return True
+            except Exception as e:
+                logfire.error(f"Error flushing buffered {kind} rows (attempt {attempt + 1}): {e}")
+                if attempt == self.max_retries:
+                    return False
+                with self._lock:
+                    self._counters["retries"] += 1
+                time.sleep(self.retry_backoff_seconds * (2 ** attempt))
+        return False
+
+    def _dead_letter(self, kind: str, rows: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps({"kind": kind, "params": row}, default=_json_default) + "\n" for row in rows)
+        try:
+            with self._dead_letter_lock:
+                directory = os.path.dirname(self.dead_letter_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.dead_letter_path, "a", encoding="utf-8") as handle:
+                    handle.write(lines)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+        except OSError as e:
+            logger.critical("Audit rows lost: dead-letter file unwritable (%s): %s", self.dead_letter_path, e)
+            return
+        with self._lock:
+            self._counters["dead_lettered_rows"] += len(rows)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _restore_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    restored = dict(params)
+    for column in ("at", "created_at"):
+        if isinstance(restored.get(column), str):
+            restored[column] = datetime.fromisoformat(restored[column])
+    return restored
+
+
+def _insert_rows(connection: Any, kind: str, rows: List[Dict[str, Any]]) -> None:
+    if kind == "audit":
+        _insert_audit_rows(connection, rows)
+    else:
+        _insert_idempotency_rows(connection, rows)
+
+
+_AUDIT_COLUMNS = ("at", "actor", "action", "po_id", "line_no", "previous", "next", "reason", "trace_id")
+
+
+def _insert_audit_rows(connection: Any, rows: List[Dict[str, Any]]) -> None:
+    values = []
+    params: Dict[str, Any] = {}
+    for index, row in enumerate(rows):
+        values.append("(" + ", ".join(f":{column}_{index}" for column in _AUDIT_COLUMNS) + ")")
+        params.update({f"{column}_{index}": row[column] for column in _AUDIT_COLUMNS})
+    connection.execute(
+        text(
+            "INSERT INTO [platform-code-app_audit] "
+            "(at, actor, action, po_id, line_no, previous, [next], reason, trace_id) VALUES "
+            + ", ".join(values)
+        ),
+        params,
+    )
+
+
+def _insert_idempotency_rows(connection: Any, rows: List[Dict[str, Any]]) -> None:
+    unique = list({row["key"]: row for row in rows}.values())
+    values = []
+    params: Dict[str, Any] = {}
+    for index, row in enumerate(unique):
+        values.append(f"(:key_{index}, :response_json_{index}, :created_at_{index})")
+        params.update(
+            {
+                f"key_{index}": row["key"],
+                f"response_json_{index}": row["response_json"],
+                f"created_at_{index}": row["created_at"],
+            }
+        )
+    result = connection.execute(
+        text(
+            f"""
+            INSERT INTO [platform-code-app_idempotency] ([key], response_json, created_at)
+            OUTPUT INSERTED.[key]
+            SELECT v.[key], v.response_json, v.created_at
+            FROM (VALUES {", ".join(values)}) AS v([key], response_json, created_at)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM [platform-code-app_idempotency] existing WHERE existing.[key] = v.[key]
+            )
+            """
+        ),
+        params,
+    )
+    inserted = {row[0] for row in result.fetchall()}
+    for row in unique:
+        if row["key"] not in inserted:
+            # A concurrent request stored its own response first; let lookups read SQL.
+            logger.warning("Idempotency key already exists: %s", row["key"])
+            idempotency_cache.discard(row["key"])
+
+
+audit_writer = AuditWriteBehind()
+
+
+async def replay_audit_dead_letters() -> None:
+    """Scheduled replay of audit/idempotency rows that could not be flushed."""
+    try:
+        replayed = await asyncio.to_thread(audit_writer.replay_dead_letters, get_engine())
+    except Exception as e:
+        logger.warning("Audit dead-letter replay failed: %s", e)
+        return
+    if replayed:
+        logger.info("Replayed %d dead-lettered audit rows", replayed)
+
+
+def _write_behind_bind(session: Session) -> Optional[Any]:
+    """Engine to flush buffered rows through, or None when rows must be written inline."""
+    if not settings.audit_write_behind_enabled:
+        return None
+    try:
+        return session.get_bind()
+    except Exception:
+        return None
+
+
+def _audit_row(
+    action: str,
+    actor: str,
+    trace_id: Optional[str],
+    po_id: Optional[str],
+    line_no: Optional[int],
+    previous: Optional[Any],
+    next: Optional[Any],
+    reason: Optional[str],
+    additional_fields: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Serialize one audit entry into the row written to the audit table."""
+    # Include additional fields in the reason
+    if additional_fields:
+        extra_context = json.dumps(additional_fields)
+        reason = f"{reason} | Context: {extra_context}" if reason else f"Context: {extra_context}"
+    # Truncate reason if too long
+    if reason and len(reason) > 200:
+        reason = reason[:197] + "..."
+    return {
+        "at": _utcnow_naive(),
+        "actor": actor,
+        "action": action,
+        "po_id": po_id,
+        "line_no": line_no,
+        "previous": json.dumps(previous) if previous is not None else None,
+        "next": json.dumps(next) if next is not None else None,
+        "reason": reason,
+        "trace_id": trace_id,
+    }
+
+
+def _utcnow_naive() -> datetime:
+    # Matches SYSUTCDATETIME(): UTC without an offset.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 def get_idempotency_record(
     session: Session,
     idempotency_key: str
@@ -58,6 +483,10 @@ def get_idempotency_record(
     
     Used to return cached responses for duplicate requests.
     """
+    cached = idempotency_cache.get(idempotency_key)
+    if cached is not None:
+        return cached
+
     with logfire.span("Get idempotency record", idempotency_key=idempotency_key):
         try:
             result = session.execute(
@@ -86,7 +515,12 @@ def get_idempotency_record(
                         return None
                 
                 logfire.info(f"Idempotency key found: {idempotency_key}")
-                return json.loads(response_json) if response_json else None
+                response_data = json.loads(response_json) if response_json else None
+                if response_data is not None:
+                    if created_at.tzinfo is None:
+                        created_at = created_at.replace(tzinfo=timezone.utc)
+                    idempotency_cache.put(idempotency_key, response_data, created_at)
+                return response_data
             
             return None
             
@@ -99,7 +533,8 @@ def get_idempotency_record(
 def save_idempotency_record(
     session: Session,
     idempotency_key: str,
-    response_data: Dict[str, Any]
+    response_data: Dict[str, Any],
+    durable: bool = False
 ) -> bool:
     """
     Save idempotency record with response data.
@@ -108,14 +543,38 @@ def save_idempotency_record(
         session: Database session
         idempotency_key: Unique idempotency key
         response_data: Response data to cache
+        durable: Insert and commit inline instead of buffering the write
     
     Returns:
-        True if saved successfully, False if key already exists
+        True if saved (or buffered), False if key already exists
     
     Raises:
         IdempotencyException: If key exists with different data
     """
     with logfire.span("Save idempotency record", idempotency_key=idempotency_key):
+        existing = idempotency_cache.get(idempotency_key)
+        if existing is not None:
+            if existing != response_data:
+                raise IdempotencyException(
+                    "Idempotency key was already used for a different response",
+                    idempotency_key=idempotency_key
+                )
+            return False
+
+        bind = None if durable else _write_behind_bind(session)
+        if bind is not None:
+            created_at = datetime.now(timezone.utc)
+            params = {
+                "key": idempotency_key,
+                "response_json": json.dumps(response_data),
+                "created_at": created_at.replace(tzinfo=None),
+            }
+            # Cache first so a retry arriving before the flush is answered from memory.
+            idempotency_cache.put(idempotency_key, response_data, created_at)
+            if audit_writer.enqueue("idempotency", bind, params):
+                return True
+            idempotency_cache.discard(idempotency_key)
+
         try:
             response_json = json.dumps(response_data)
             
@@ -127,6 +586,7 @@ def save_idempotency_record(
                 {"key": idempotency_key, "response_json": response_json}
             )
             session.commit()
+            idempotency_cache.put(idempotency_key, response_data)
             logfire.info(f"Idempotency record saved: {idempotency_key}")
             return True
             
@@ -139,8 +599,8 @@ def save_idempotency_record(
             existing = get_idempotency_record(session, idempotency_key)
             if existing and existing != response_data:
                 raise IdempotencyException(
-                    idempotency_key,
-                    context={"existing": existing, "attempted": response_data}
+                    "Idempotency key was already used for a different response",
+                    idempotency_key=idempotency_key
                 )
             return False
             
@@ -160,8 +620,9 @@ def write_audit_log(
     previous: Optional[Any] = None,
     next: Optional[Any] = None,
     reason: Optional[str] = None,
+    durable: bool = False,
     **additional_fields
-) -> int:
+) -> Optional[int]:
     """
     Write an audit log entry for an operation.
     
@@ -175,10 +636,11 @@ def write_audit_log(
         previous: Previous state (will be JSON serialized)
         next: New state (will be JSON serialized)
         reason: Business reason for the change
+        durable: Insert and commit inline instead of buffering the entry
         **additional_fields: Additional context to log
     
     Returns:
-        ID of the created audit record
+        ID of the created audit record, or None when the entry was buffered
     
     All ERP-modifying operations should create audit entries.
     """
@@ -190,21 +652,14 @@ def write_audit_log(
         line_no=line_no
     ):
         try:
-            # Serialize previous and next states if provided
-            previous_json = json.dumps(previous) if previous is not None else None
-            next_json = json.dumps(next) if next is not None else None
+            row = _audit_row(action, actor, trace_id, po_id, line_no, previous, next, reason, additional_fields)
             
-            # Include additional fields in the reason or separate column
-            if additional_fields:
-                extra_context = json.dumps(additional_fields)
-                if reason:
-                    reason = f"{reason} | Context: {extra_context}"
-                else:
-                    reason = f"Context: {extra_context}"
-            
-            # Truncate reason if too long
-            if reason and len(reason) > 200:
-                reason = reason[:197] + "..."
+            bind = None if durable else _write_behind_bind(session)
+            if bind is not None:
+                if audit_writer.enqueue("audit", bind, row):
+                    logfire.info(f"Audit log buffered: {action}", action=action, actor=actor)
+                    return None
+                logger.warning("Audit write-behind queue full; writing %s inline", action)
             
             result = session.execute(
                 text("""
@@ -214,16 +669,7 @@ def write_audit_log(
                     VALUES (SYSUTCDATETIME(), :actor, :action, :po_id, :line_no, 
                             :previous, :next, :reason, :trace_id)
                 """),
-                {
-                    "actor": actor,
-                    "action": action,
-                    "po_id": po_id,
-                    "line_no": line_no,
-                    "previous": previous_json,
-                    "next": next_json,
-                    "reason": reason,
-                    "trace_id": trace_id
-                }
+                {column: row[column] for column in _AUDIT_COLUMNS if column != "at"}
             )
             
             audit_id = result.scalar()
@@ -244,6 +690,62 @@ def write_audit_log(
             raise
 
 
+def write_audit_logs(
+    session: Session,
+    entries: List[Dict[str, Any]],
+    durable: bool = False
+) -> int:
+    """
+    Write several audit log entries at once.
+    
+    Args:
+        session: Database session
+        entries: Keyword arguments of `write_audit_log` (without session) per entry
+        durable: Insert and commit inline instead of buffering the entries
+    
+    Returns:
+        Number of entries written or buffered
+    
+    Inline writes go out as multi-row INSERTs in one commit.
+    """
+    if not entries:
+        return 0
+    with logfire.span("Write audit logs", count=len(entries)):
+        rows = []
+        for entry in entries:
+            fields = dict(entry)
+            rows.append(
+                _audit_row(
+                    fields.pop("action"),
+                    fields.pop("actor"),
+                    fields.pop("trace_id", None),
+                    fields.pop("po_id", None),
+                    fields.pop("line_no", None),
+                    fields.pop("previous", None),
+                    fields.pop("next", None),
+                    fields.pop("reason", None),
+                    fields,
+                )
+            )
+        
+        bind = None if durable else _write_behind_bind(session)
+        if bind is not None:
+            rows = [row for row in rows if not audit_writer.enqueue("audit", bind, row)]
+            if not rows:
+                return len(entries)
+            logger.warning("Audit write-behind queue full; writing %d entries inline", len(rows))
+        
+        try:
+            for start in range(0, len(rows), settings.audit_flush_batch_size):
+                _insert_audit_rows(session, rows[start : start + settings.audit_flush_batch_size])
+            session.commit()
+        except Exception as e:
+            logfire.error(f"Error writing audit logs: {e}")
+            session.rollback()
+            raise
+        return len(entries)
+
+
 def cleanup_expired_idempotency_keys(session: Session) -> int:
     """
     Remove expired idempotency keys from the database.
@@ -339,7 +841,8 @@ class AuditContext:
         session: Session,
         action: str,
         actor: str,
-        trace_id: Optional[str] = None
+        trace_id: Optional[str] = None,
+        durable: bool = False
     ):
         """
         Initialize audit context.
@@ -349,11 +852,13 @@ class AuditContext:
             action: Action being performed
             actor: User or system performing the action
             trace_id: Request trace ID
+            durable: Write the entry inline instead of buffering it
         """
         self.session = session
         self.action = action
         self.actor = actor
         self.trace_id = trace_id
+        self.durable = durable
         self.po_id = None
         self.line_no = None
         self.previous = None
@@ -394,5 +899,6 @@ class AuditContext:
                 self.previous,
                 self.next,
                 self.reason,
+                durable=self.durable,
                 **self.additional
             )
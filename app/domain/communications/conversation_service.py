@@ -1,10 +1,21 @@
-"""Conversation service for Front email client integration."""
+"""Conversation service for Front email client integration.
+
+Assembling a conversation takes the conversation, its comments and every message page.
+The first three requests are independent and go out together; Front paginates messages
+with opaque `next` links, so later pages are followed in order, but each one is
+requested before the previous page is mapped. Assembled conversations are kept for
+`front_conversation_cache_ttl_seconds` and dropped on our own writes and on Front
+webhooks.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Sequence, Type
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Sequence, Tuple, Type
 
 import logfire
 
@@ -37,6 +48,80 @@ from app.settings import settings
 logger = logging.getLogger(__name__)
 
 
+class ConversationCache:
+    """Short-lived cache of assembled conversations, dropped on writes and webhooks."""
+
+    def __init__(self, *, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None) -> None:
+        self._ttl = float(
+            settings.front_conversation_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        )
+        self._max_entries = max_entries or settings.front_conversation_cache_max_entries
+        self._entries: "OrderedDict[str, Tuple[float, ConversationResponse]]" = OrderedDict()
+        # Version of the latest invalidation per conversation, so a fetch that started
+        # before a write cannot store the pre-write state once it completes.
+        self._version = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    def begin(self) -> int:
+        """Return the token a fetch started now must hand back to `put`."""
+        return self._version
+
+    def get(self, conversation_id: str) -> Optional[ConversationResponse]:
+        entry = self._entries.get(conversation_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[conversation_id]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(conversation_id)
+        self._hits += 1
+        return entry[1]
+
+    def put(self, conversation_id: str, conversation: ConversationResponse, token: int) -> None:
+        if not self.enabled or token < self._floor:
+            return
+        if self._invalidated.get(conversation_id, -1) > token:
+            return
+        self._entries[conversation_id] = (time.monotonic() + self._ttl, conversation)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, conversation_id: str) -> None:
+        self._version += 1
+        self._invalidations += 1
+        self._entries.pop(conversation_id, None)
+        self._invalidated[conversation_id] = self._version
+        self._invalidated.move_to_end(conversation_id)
+        while len(self._invalidated) > self._max_entries:
+            # Forgetting a marker means rejecting every fetch that started before it.
+            _, version = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, version)
+
+    def clear(self) -> None:
+        self._version += 1
+        self._floor = self._version
+        self._entries.clear()
+        self._invalidated.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self._ttl,
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "invalidations": self._invalidations,
+        }
+
+
 class ConversationService:
     """Service for conversation operations with the Front API."""
 
@@ -44,9 +129,11 @@ class ConversationService:
         self,
         front_client_class: Type[FrontClientProtocol] = FrontClient,
         odata_service: Optional[BusinessCentralODataService] = None,
+        cache: Optional[ConversationCache] = None,
     ):
         self._front_client_class = front_client_class
         self._odata_service = odata_service
+        self.cache = cache if cache is not None else ConversationCache()
 
     def _client(self, *, api_key: Optional[str] = None) -> FrontClientProtocol:
         if api_key:
@@ -60,23 +147,60 @@ class ConversationService:
 
     async def get_conversation(self, conversation_id: str) -> Optional[ConversationResponse]:
         """Get full conversation data including messages and comments."""
+        cached = self.cache.get(conversation_id)
+        if cached is not None:
+            return cached
+
+        token = self.cache.begin()
         with logfire.span("conversation_service.get_conversation", conversation_id=conversation_id):
             async with self._client() as client:
-                conversation_data = await client.get_conversation(conversation_id)
+                conversation_data, comments_data, first_page = await _gather_or_cancel(
+                    client.get_conversation(conversation_id),
+                    client.get_conversation_comments(conversation_id),
+                    client.get_conversation_messages(conversation_id),
+                )
                 if not conversation_data:
                     return None
 
-                messages_data = await self._collect_all_messages(client, conversation_id)
-                comments_data = await client.get_conversation_comments(conversation_id)
-
-        return self._build_conversation(conversation_data, messages_data, comments_data)
+                messages: List[Message] = []
+                async for page in self._iter_message_pages(client, conversation_id, first_page):
+                    messages.extend(self._map_message(message) for message in page)
+
+        conversation = self._assemble_conversation(conversation_data, messages, comments_data)
+        self.cache.put(conversation_id, conversation, token)
+        return conversation
+
+    def invalidate_conversation(self, conversation_id: str) -> None:
+        """Drop the cached copy of a conversation that changed in Front."""
+        self.cache.invalidate(conversation_id)
+
+    def handle_webhook_event(self, event: Dict[str, Any]) -> List[str]:
+        """Invalidate the conversations referenced by a Front webhook event."""
+        # Rule webhooks post the event itself; application webhooks wrap it in `payload`.
+        candidates = [event, event.get("payload") or {}]
+        conversation_ids: List[str] = []
+        for candidate in candidates:
+            if not isinstance(candidate, dict):
+                continue
+            conversation = candidate.get("conversation") or {}
+            conversation_id = conversation.get("id") if isinstance(conversation, dict) else None
+            if conversation_id and conversation_id not in conversation_ids:
+                conversation_ids.append(conversation_id)
+        for conversation_id in conversation_ids:
+            self.invalidate_conversation(conversation_id)
+        return conversation_ids
 
     async def get_messages(self, conversation_id: str) -> List[Message]:
         """Return all messages of a conversation."""
+        cached = self.cache.get(conversation_id)
+        if cached is not None:
+            return list(cached.messages)
+
+        messages: List[Message] = []
         with logfire.span("conversation_service.get_messages", conversation_id=conversation_id):
             async with self._client() as client:
-                raw_messages = await self._collect_all_messages(client, conversation_id)
-        messages = [self._map_message(message) for message in raw_messages]
+                async for page in self._iter_message_pages(client, conversation_id):
+                    messages.extend(self._map_message(message) for message in page)
         return sorted(messages, key=lambda msg: msg.created_at)
 
     async def get_last_message(self, conversation_id: str) -> Optional[Message]:
@@ -95,6 +219,7 @@ class ConversationService:
                     request.body,
                     author_id=request.author_id,
                 )
+        self.invalidate_conversation(conversation_id)
 
         comment = self._map_comment(comment_data)
         return ConversationCommentResponse(
@@ -146,6 +271,7 @@ class ConversationService:
 
             async with self._client() as client:
                 reply_data = await client.send_conversation_reply(conversation_id, payload)
+            self.invalidate_conversation(conversation_id)
 
             message = self._map_message(reply_data)
 
@@ -195,6 +321,7 @@ class ConversationService:
         with logfire.span("conversation_service.archive_conversation", conversation_id=conversation_id):
             async with self._client() as client:
                 await client.archive_conversation(conversation_id)
+        self.invalidate_conversation(conversation_id)
 
         archived_at = datetime.now(timezone.utc)
         return ConversationArchiveResponse(
@@ -214,6 +341,7 @@ class ConversationService:
         ):
             async with self._client() as client:
                 await client.snooze_conversation(conversation_id, request.snooze_until)
+        self.invalidate_conversation(conversation_id)
 
         return ConversationSnoozeResponse(
             conversation_id=conversation_id,
@@ -296,32 +424,39 @@ class ConversationService:
                 message_data = await client.get_message(message_id)
         return self._map_message(message_data)
 
-    async def _collect_all_messages(
-        self, client: FrontClientProtocol, conversation_id: str
-    ) -> List[Dict[str, Any]]:
-        """Collect all messages for a conversation, following pagination."""
-        messages: List[Dict[str, Any]] = []
-        next_page: Optional[str] = None
-
-        while True:
-            response = await client.get_conversation_messages(conversation_id, page=next_page)
-            results = response.get("_results", [])
-            messages.extend(results)
-
-            pagination = response.get("_pagination") or {}
-            next_page = pagination.get("next")
-            if not next_page:
-                break
-
-        return messages
-
-    def _build_conversation(
+    async def _iter_message_pages(
+        self,
+        client: FrontClientProtocol,
+        conversation_id: str,
+        first_page: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield message pages, requesting the next page before the current one is consumed."""
+        pending: Optional["asyncio.Future[Dict[str, Any]]"] = None
+        response = first_page
+        try:
+            if response is None:
+                response = await client.get_conversation_messages(conversation_id)
+            while True:
+                next_page = (response.get("_pagination") or {}).get("next")
+                if next_page:
+                    pending = asyncio.ensure_future(
+                        client.get_conversation_messages(conversation_id, page=next_page)
+                    )
+                yield response.get("_results", [])
+                if pending is None:
+                    return
+                response = await pending
+                pending = None
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    def _assemble_conversation(
         self,
         conversation_data: Dict[str, Any],
-        messages_data: Sequence[Dict[str, Any]],
+        messages: List[Message],
         comments_data: Dict[str, Any],
     ) -> ConversationResponse:
-        messages = [self._map_message(message) for message in messages_data]
         messages.sort(key=lambda msg: msg.created_at)
 
         comment_results = comments_data.get("_results", []) if comments_data else []
@@ -518,3 +653,15 @@ class ConversationService:
             )
 
         return [email], customer_no
+
+
+async def _gather_or_cancel(*requests: Awaitable[Any]) -> List[Any]:
+    """Await independent Front requests together; cancel the rest when one fails."""
+    tasks = [asyncio.ensure_future(request) for request in requests]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,438 @@
+"""Local SQLite mirror of Dynamics 365 opportunities, accounts and contacts."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.adapters.dynamics_crm_client import CRMClientError, CRMConfigurationError, DynamicsCRMClient
+from app.integrations.sqlite_mirror import SQLiteMirrorStore
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_FIELDS = [
+    "accountid",
+    "name",
+    "accountnumber",
+    "telephone1",
+    "emailaddress1",
+    "address1_city",
+    "address1_country",
+    "revenue",
+    "modifiedon",
+]
+CONTACT_FIELDS = [
+    "contactid",
+    "fullname",
+    "firstname",
+    "lastname",
+    "emailaddress1",
+    "mobilephone",
+    "telephone1",
+    "_parentcustomerid_value",
+    "modifiedon",
+]
+OPPORTUNITY_FIELDS = [
+    "opportunityid",
+    "name",
+    "estimatedvalue",
+    "closeprobability",
+    "estimatedclosedate",
+    "stepname",
+    "statecode",
+    "statuscode",
+    "_ownerid_value",
+    "_customerid_value",
+    "actualvalue",
+    "actualclosedate",
+    "modifiedon",
+]
+
+
+@dataclass(frozen=True)
+class CRMMirrorRefreshResult:
+    full: bool
+    accounts_seen: int
+    contacts_seen: int
+    opportunities_seen: int
+    rows_deleted: int
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _day(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    raw = str(value).strip()[:10]
+    try:
+        return date.fromisoformat(raw).isoformat()
+    except ValueError:
+        return None
+
+
+def _lower(value: Any) -> str:
+    return str(value or "").lower()
+
+
+def _account_row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        str(record["accountid"]),
+        _lower(record.get("name")),
+        record.get("modifiedon"),
+        json.dumps(record, default=str),
+    )
+
+
+def _contact_row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        str(record["contactid"]),
+        _lower(record.get("fullname")),
+        _lower(record.get("emailaddress1")),
+        record.get("modifiedon"),
+        json.dumps(record, default=str),
+    )
+
+
+def _opportunity_row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    state = record.get("statecode")
+    return (
+        str(record["opportunityid"]),
+        int(state) if state is not None else None,
+        _number(record.get("estimatedvalue")),
+        _number(record.get("closeprobability")),
+        _day(record.get("estimatedclosedate")),
+        _number(record.get("actualvalue")),
+        _day(record.get("actualclosedate")),
+        record.get("modifiedon"),
+        json.dumps(record, default=str),
+    )
+
+
+_ENTITIES: Dict[str, Dict[str, Any]] = {
+    "accounts": {
+        "table": "crm_accounts",
+        "key": "accountid",
+        "fields": ACCOUNT_FIELDS,
+        "columns": ("account_id", "name_search", "modified_on", "record_json"),
+        "row": _account_row,
+    },
+    "contacts": {
+        "table": "crm_contacts",
+        "key": "contactid",
+        "fields": CONTACT_FIELDS,
+        "columns": ("contact_id", "name_search", "email_search", "modified_on", "record_json"),
+        "row": _contact_row,
+    },
+    "opportunities": {
+        "table": "crm_opportunities",
+        "key": "opportunityid",
+        "fields": OPPORTUNITY_FIELDS,
+        "columns": (
+            "opportunity_id",
+            "statecode",
+            "estimated_value",
+            "close_probability",
+            "estimated_close_date",
+            "actual_value",
+            "actual_close_date",
+            "modified_on",
+            "record_json",
+        ),
+        "row": _opportunity_row,
+    },
+}
+
+
+class CRMMirror(SQLiteMirrorStore):
+    """
+    SQLite mirror of the Dynamics entities behind the CRM endpoints.
+
+    Accounts, contacts and opportunities are pulled incrementally by their `modifiedon`
+    watermark (the three entity sets are read concurrently), so pipeline totals,
+    forecast buckets, sales stats and account/contact search are answered from indexed
+    local tables instead of paging through the Dataverse Web API on every request.
+    Incremental reads cannot see deletions; a periodic full refresh drops them.
+    """
+
+    _label = "CRM mirror"
+    _state_table = "crm_mirror_state"
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self._refresh_lock = asyncio.Lock()
+        super().__init__(db_path or settings.crm_mirror_db_path)
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Whether a refresh completed within `crm_mirror_max_staleness_minutes`.
+
+        When refreshes keep failing the mirror stops being ready, so callers fall back
+        to the live Web API instead of serving stale data indefinitely.
+        """
+        age = self._seconds_since_state("last_refreshed_at")
+        return age is not None and age / 60 <= settings.crm_mirror_max_staleness_minutes
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crm_accounts (
+                    account_id TEXT PRIMARY KEY,
+                    name_search TEXT NOT NULL,
+                    modified_on TEXT,
+                    record_json TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_crm_accounts_modified ON crm_accounts (modified_on)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crm_contacts (
+                    contact_id TEXT PRIMARY KEY,
+                    name_search TEXT NOT NULL,
+                    email_search TEXT NOT NULL,
+                    modified_on TEXT,
+                    record_json TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_crm_contacts_modified ON crm_contacts (modified_on)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crm_opportunities (
+                    opportunity_id TEXT PRIMARY KEY,
+                    statecode INTEGER,
+                    estimated_value REAL,
+                    close_probability REAL,
+                    estimated_close_date TEXT,
+                    actual_value REAL,
+                    actual_close_date TEXT,
+                    modified_on TEXT,
+                    record_json TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_crm_opportunities_open "
+                "ON crm_opportunities (statecode, estimated_close_date)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_crm_opportunities_closed "
+                "ON crm_opportunities (actual_close_date, statecode)"
+            )
+            self._create_state_table(conn)
+            conn.commit()
+
+    def search_accounts(self, *, top: int = 100, search: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return raw account records, newest first, optionally filtered by name."""
+        where, params = "", []
+        if search:
+            where, params = "WHERE name_search LIKE ?", [f"%{search.strip().lower()}%"]
+        return self._records("crm_accounts", where, params, "modified_on DESC", top)
+
+    def accounts_modified_since(self, watermark: Optional[str]) -> List[Dict[str, Any]]:
+        """Return raw account records modified at or after `watermark` (all when None)."""
+        if watermark:
+            return self._records("crm_accounts", "WHERE modified_on >= ?", [watermark], "modified_on", None)
+        return self._records("crm_accounts", "", [], "modified_on", None)
+
+    def search_contacts(self, *, top: int = 100, search: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return raw contact records, newest first, optionally filtered by name or email."""
+        where, params = "", []
+        if search:
+            term = f"%{search.strip().lower()}%"
+            where, params = "WHERE name_search LIKE ? OR email_search LIKE ?", [term, term]
+        return self._records("crm_contacts", where, params, "modified_on DESC", top)
+
+    def open_opportunities(self, *, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return raw open opportunities ordered by estimated close date."""
+        return self._records(
+            "crm_opportunities",
+            "WHERE statecode = 0",
+            [],
+            "estimated_close_date IS NULL, estimated_close_date, opportunity_id",
+            top,
+        )
+
+    def pipeline_totals(self) -> Tuple[int, float, float]:
+        """Return (count, pipeline amount, weighted amount) over every open opportunity."""
+        with self._connect() as conn:
+            count, amount, weighted = conn.execute(
+                """
+                SELECT COUNT(*),
+                       COALESCE(SUM(estimated_value), 0),
+                       COALESCE(SUM(COALESCE(estimated_value, 0) * COALESCE(close_probability, 0) / 100.0), 0)
+                FROM crm_opportunities
+                WHERE statecode = 0
+                """
+            ).fetchone()
+        return int(count), float(amount), float(weighted)
+
+    def closed_between(self, start: date, end: date) -> Dict[int, Tuple[int, float]]:
+        """Return {statecode: (count, actual amount)} for opportunities closed in [start, end)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT statecode, COUNT(*), COALESCE(SUM(actual_value), 0)
+                FROM crm_opportunities
+                WHERE actual_close_date >= ? AND actual_close_date < ? AND statecode IN (1, 2)
+                GROUP BY statecode
+                """,
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return {int(state): (int(count), float(amount)) for state, count, amount in rows}
+
+    def forecast(self, start: date, end: date) -> Dict[str, Tuple[int, float, float]]:
+        """Return {YYYY-MM: (count, weighted, unweighted)} for open opportunities closing in [start, end)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT substr(estimated_close_date, 1, 7) AS month,
+                       COUNT(*),
+                       COALESCE(SUM(COALESCE(estimated_value, 0) * COALESCE(close_probability, 0) / 100.0), 0),
+                       COALESCE(SUM(estimated_value), 0)
+                FROM crm_opportunities
+                WHERE statecode = 0 AND estimated_close_date >= ? AND estimated_close_date < ?
+                GROUP BY month
+                """,
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return {month: (int(count), float(weighted), float(amount)) for month, count, weighted, amount in rows}
+
+    def status(self) -> Dict[str, Any]:
+        if not self._enabled:
+            return {"configured": False}
+        with self._connect() as conn:
+            counts = {
+                entity: int(conn.execute(f"SELECT COUNT(*) FROM {spec['table']}").fetchone()[0])
+                for entity, spec in _ENTITIES.items()
+            }
+            state = self._all_state(conn)
+        return {
+            "configured": True,
+            "counts": counts,
+            "watermarks": {entity: state.get(f"{entity}_watermark") for entity in _ENTITIES},
+            "last_refreshed_at": state.get("last_refreshed_at"),
+            "last_full_refresh_at": state.get("last_full_refresh_at"),
+        }
+
+    async def refresh(self, client: DynamicsCRMClient, *, full: Optional[bool] = None) -> CRMMirrorRefreshResult:
+        """
+        Pull entities changed since their watermark (or everything on a full refresh).
+
+        `full=None` runs a full refresh when none has happened within
+        `crm_mirror_full_refresh_hours`.
+        """
+        if not self._enabled:
+            raise ValueError("CRM mirror storage not configured")
+        async with self._refresh_lock:
+            if full is None:
+                full = self._full_refresh_due(settings.crm_mirror_full_refresh_hours)
+            entities = list(_ENTITIES)
+            results = await asyncio.gather(
+                *(self._fetch_changes(client, entity, None if full else self._get_state(f"{entity}_watermark"))
+                  for entity in entities)
+            )
+            changes = dict(zip(entities, results))
+            deleted = await asyncio.to_thread(self._apply, changes, full)
+
+            now = datetime.now(timezone.utc).isoformat()
+            for entity, records in changes.items():
+                previous = "" if full else (self._get_state(f"{entity}_watermark") or "")
+                watermark = max(
+                    [previous] + [str(record["modifiedon"]) for record in records if record.get("modifiedon")]
+                )
+                if watermark:
+                    self._set_state(f"{entity}_watermark", watermark)
+            self._set_state("last_refreshed_at", now)
+            if full:
+                self._set_state("last_full_refresh_at", now)
+
+        result = CRMMirrorRefreshResult(
+            full=full,
+            accounts_seen=len(changes["accounts"]),
+            contacts_seen=len(changes["contacts"]),
+            opportunities_seen=len(changes["opportunities"]),
+            rows_deleted=deleted,
+        )
+        logger.info("CRM mirror refreshed", extra=asdict(result))
+        return result
+
+    async def _fetch_changes(
+        self, client: DynamicsCRMClient, entity: str, watermark: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        spec = _ENTITIES[entity]
+        # `ge` re-reads records sharing the watermark second; upserts make that harmless.
+        filter_expr = f"modifiedon ge {watermark}" if watermark else None
+        rows = await client.get_collection(
+            entity,
+            select=spec["fields"],
+            filter_expr=filter_expr,
+            order_by="modifiedon asc",
+        )
+        return [row for row in rows if row.get(spec["key"])]
+
+    def _apply(self, changes: Dict[str, List[Dict[str, Any]]], full: bool) -> int:
+        deleted = 0
+        with self._connect() as conn:
+            for entity, records in changes.items():
+                spec = _ENTITIES[entity]
+                columns = spec["columns"]
+                rows = [spec["row"](record) for record in records]
+                if full:
+                    deleted += self._delete_missing(conn, spec["table"], columns[0], (row[0] for row in rows))
+                updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+                conn.executemany(
+                    f"""
+                    INSERT INTO {spec['table']} ({', '.join(columns)})
+                    VALUES ({', '.join('?' for _ in columns)})
+                    ON CONFLICT({columns[0]}) DO UPDATE SET {updates}
+                    """,
+                    rows,
+                )
+            conn.commit()
+        return deleted
+
+    def _records(
+        self, table: str, where: str, params: List[Any], order_by: str, top: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        if not self._enabled:
+            return []
+        limit = "LIMIT ?" if top else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT record_json FROM {table} {where} ORDER BY {order_by} {limit}",
+                [*params, int(top)] if top else params,
+            ).fetchall()
+        return [json.loads(record_json) for (record_json,) in rows]
+
+
+async def refresh_crm_mirror() -> None:
+    """Scheduled refresh of the CRM mirror (incremental, periodically full)."""
+    if not crm_mirror.is_configured or not settings.crm_web_api_endpoint:
+        logger.debug("CRM mirror not configured; skipping refresh")
+        return
+    client: Optional[DynamicsCRMClient] = None
+    try:
+        client = DynamicsCRMClient()
+        await crm_mirror.refresh(client)
+    except (CRMClientError, CRMConfigurationError, ValueError) as exc:
+        logger.warning("CRM mirror refresh failed", extra={"error": str(exc)})
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+crm_mirror = CRMMirror()
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
 from app.adapters.dynamics_crm_client import DynamicsCRMClient
+from app.domain.crm.mirror import ACCOUNT_FIELDS, CONTACT_FIELDS, CRMMirror, crm_mirror
 from app.domain.crm.models import (
     CRMAccountSummary,
     CRMAccountsResponse,
@@ -63,94 +65,151 @@ def _first_present(row: Dict[str, Any], *keys: str) -> Any:
     return None
 
 
+def _month_keys(months: int) -> List[str]:
+    cursor = date.today().replace(day=1)
+    month_keys: List[str] = []
+    for _ in range(months):
+        month_keys.append(_month_key(cursor) or "")
+        if cursor.month == 12:
+            cursor = date(cursor.year + 1, 1, 1)
+        else:
+            cursor = date(cursor.year, cursor.month + 1, 1)
+    return month_keys
+
+
+def _account_summary(row: Dict[str, Any]) -> CRMAccountSummary:
+    return CRMAccountSummary(
+        account_id=str(row.get("accountid", "")),
+        name=str(row.get("name") or ""),
+        account_number=row.get("accountnumber"),
+        telephone=row.get("telephone1"),
+        email=row.get("emailaddress1"),
+        city=row.get("address1_city"),
+        country=row.get("address1_country"),
+        annual_revenue=_to_float(row.get("revenue")) if row.get("revenue") is not None else None,
+        modified_on=row.get("modifiedon"),
+    )
+
+
+def _contact_summary(row: Dict[str, Any]) -> CRMContactSummary:
+    return CRMContactSummary(
+        contact_id=str(row.get("contactid", "")),
+        full_name=str(row.get("fullname") or ""),
+        first_name=row.get("firstname"),
+        last_name=row.get("lastname"),
+        email=row.get("emailaddress1"),
+        mobile_phone=row.get("mobilephone"),
+        business_phone=row.get("telephone1"),
+        parent_customer_id=row.get("_parentcustomerid_value"),
+        parent_customer_name=row.get("_parentcustomerid_value@OData.Community.Display.V1.FormattedValue"),
+        modified_on=row.get("modifiedon"),
+    )
+
+
+def _build_pipeline(rows: List[Dict[str, Any]]) -> CRMSalesPipelineResponse:
+    items: List[CRMPipelineOpportunity] = []
+    pipeline_total = Decimal("0")
+    weighted_total = Decimal("0")
+
+    for row in rows:
+        estimated_value = _to_decimal(row.get("estimatedvalue"))
+        probability = _to_decimal(row.get("closeprobability"))
+        weighted = estimated_value * (probability / Decimal("100"))
+        pipeline_total += estimated_value
+        weighted_total += weighted
+
+        items.append(
+            CRMPipelineOpportunity(
+                opportunity_id=str(row.get("opportunityid", "")),
+                name=str(row.get("name") or ""),
+                customer_name=row.get("_customerid_value@OData.Community.Display.V1.FormattedValue"),
+                estimated_close_date=_to_date(row.get("estimatedclosedate")),
+                estimated_value=round(float(estimated_value), 2),
+                probability_percent=round(float(probability), 2) if row.get("closeprobability") is not None else None,
+                weighted_estimated_value=round(float(weighted), 2),
+                stage=row.get("stepname"),
+                status=row.get("statuscode@OData.Community.Display.V1.FormattedValue"),
+                owner_name=row.get("_ownerid_value@OData.Community.Display.V1.FormattedValue"),
+            )
+        )
+
+    return CRMSalesPipelineResponse(
+        as_of=date.today(),
+        total_open_opportunities=len(items),
+        total_pipeline_amount=round(float(pipeline_total), 2),
+        total_weighted_pipeline_amount=round(float(weighted_total), 2),
+        items=items,
+    )
+
+
 class CRMService:
-    def __init__(self, client: Optional[DynamicsCRMClient] = None) -> None:
-        self._client = client or DynamicsCRMClient()
+    """
+    Sales and contact reads for Dynamics 365 CRM.
 
-    async def get_accounts(self, *, top: int = 100, search: Optional[str] = None) -> CRMAccountsResponse:
-        filter_expr = None
-        if search:
-            escaped = search.replace("'", "''")
-            filter_expr = f"contains(name,'{escaped}')"
+    Once the local mirror (`app.domain.crm.mirror`) has completed a refresh, every read
+    is answered from it; until then, or when it is not configured, the service queries
+    the Dataverse Web API directly.
+    """
 
-        rows = await self._client.get_collection(
-            "accounts",
-            select=[
-                "accountid",
-                "name",
-                "accountnumber",
-                "telephone1",
-                "emailaddress1",
-                "address1_city",
-                "address1_country",
-                "revenue",
-                "modifiedon",
-            ],
-            filter_expr=filter_expr,
-            order_by="modifiedon desc",
-            top=top,
-        )
+    def __init__(self, client: Optional[DynamicsCRMClient] = None, mirror: Optional[CRMMirror] = None) -> None:
+        self._client_instance = client
+        self._mirror = mirror if mirror is not None else crm_mirror
 
-        items = [
-            CRMAccountSummary(
-                account_id=str(row.get("accountid", "")),
-                name=str(row.get("name") or ""),
-                account_number=row.get("accountnumber"),
-                telephone=row.get("telephone1"),
-                email=row.get("emailaddress1"),
-                city=row.get("address1_city"),
-                country=row.get("address1_country"),
-                annual_revenue=_to_float(row.get("revenue")) if row.get("revenue") is not None else None,
-                modified_on=row.get("modifiedon"),
+    @property
+    def _client(self) -> DynamicsCRMClient:
+        if self._client_instance is None:
+            self._client_instance = DynamicsCRMClient()
+        return self._client_instance
+
+    async def _mirror_ready(self) -> bool:
+        return self._mirror.is_configured and await asyncio.to_thread(lambda: self._mirror.is_ready)
+
+    async def get_accounts(self, *, top: int = 100, search: Optional[str] = None) -> CRMAccountsResponse:
+        if await self._mirror_ready():
+            rows = await asyncio.to_thread(self._mirror.search_accounts, top=top, search=search)
+        else:
+            filter_expr = None
+            if search:
+                escaped = search.replace("'", "''")
+                filter_expr = f"contains(name,'{escaped}')"
+
+            rows = await self._client.get_collection(
+                "accounts",
+                select=ACCOUNT_FIELDS,
+                filter_expr=filter_expr,
+                order_by="modifiedon desc",
+                top=top,
             )
-            for row in rows
-        ]
+
+        items = [_account_summary(row) for row in rows]
         return CRMAccountsResponse(items=items, count=len(items))
 
     async def get_contacts(self, *, top: int = 100, search: Optional[str] = None) -> CRMContactsResponse:
-        filter_expr = None
-        if search:
-            escaped = search.replace("'", "''")
-            filter_expr = (
-                f"contains(fullname,'{escaped}') or contains(emailaddress1,'{escaped}')"
-            )
-
-        rows = await self._client.get_collection(
-            "contacts",
-            select=[
-                "contactid",
-                "fullname",
-                "firstname",
-                "lastname",
-                "emailaddress1",
-                "mobilephone",
-                "telephone1",
-                "_parentcustomerid_value",
-                "modifiedon",
-            ],
-            filter_expr=filter_expr,
-            order_by="modifiedon desc",
-            top=top,
-        )
+        if await self._mirror_ready():
+            rows = await asyncio.to_thread(self._mirror.search_contacts, top=top, search=search)
+        else:
+            filter_expr = None
+            if search:
+                escaped = search.replace("'", "''")
+                filter_expr = (
+                    f"contains(fullname,'{escaped}') or contains(emailaddress1,'{escaped}')"
+                )
 
-        items = [
-            CRMContactSummary(
-                contact_id=str(row.get("contactid", "")),
-                full_name=str(row.get("fullname") or ""),
-                first_name=row.get("firstname"),
-                last_name=row.get("lastname"),
-                email=row.get("emailaddress1"),
-                mobile_phone=row.get("mobilephone"),
-                business_phone=row.get("telephone1"),
-                parent_customer_id=row.get("_parentcustomerid_value"),
-                parent_customer_name=row.get("_parentcustomerid_value@OData.Community.Display.V1.FormattedValue"),
-                modified_on=row.get("modifiedon"),
+            rows = await self._client.get_collection(
+                "contacts",
+                select=CONTACT_FIELDS,
+                filter_expr=filter_expr,
+                order_by="modifiedon desc",
+                top=top,
             )
-            for row in rows
-        ]
+
+        items = [_contact_summary(row) for row in rows]
         return CRMContactsResponse(items=items, count=len(items))
 
     async def get_sales_pipeline(self, *, top: int = 200) -> CRMSalesPipelineResponse:
+        if await self._mirror_ready():
+            return _build_pipeline(await asyncio.to_thread(self._mirror.open_opportunities, top=top))
+
         rows = await self._client.get_collection(
             "opportunities",
             select=[
@@ -169,47 +228,31 @@ class CRMService:
             order_by="estimatedclosedate asc",
             top=top,
         )
-
-        items: List[CRMPipelineOpportunity] = []
-        pipeline_total = Decimal("0")
-        weighted_total = Decimal("0")
-
-        for row in rows:
-            estimated_value = _to_decimal(row.get("estimatedvalue"))
-            probability = _to_decimal(row.get("closeprobability"))
-            weighted = estimated_value * (probability / Decimal("100"))
-            pipeline_total += estimated_value
-            weighted_total += weighted
-
-            items.append(
-                CRMPipelineOpportunity(
-                    opportunity_id=str(row.get("opportunityid", "")),
-                    name=str(row.get("name") or ""),
-                    customer_name=row.get("_customerid_value@OData.Community.Display.V1.FormattedValue"),
-                    estimated_close_date=_to_date(row.get("estimatedclosedate")),
-                    estimated_value=round(float(estimated_value), 2),
-                    probability_percent=round(float(probability), 2) if row.get("closeprobability") is not None else None,
-                    weighted_estimated_value=round(float(weighted), 2),
-                    stage=row.get("stepname"),
-                    status=row.get("statuscode@OData.Community.Display.V1.FormattedValue"),
-                    owner_name=row.get("_ownerid_value@OData.Community.Display.V1.FormattedValue"),
-                )
-            )
-
-        return CRMSalesPipelineResponse(
-            as_of=date.today(),
-            total_open_opportunities=len(items),
-            total_pipeline_amount=round(float(pipeline_total), 2),
-            total_weighted_pipeline_amount=round(float(weighted_total), 2),
-            items=items,
-        )
+        return _build_pipeline(rows)
 
     async def get_sales_stats(self) -> CRMSalesStatsResponse:
-        pipeline = await self.get_sales_pipeline(top=5000)
         today = date.today()
         month_start = today.replace(day=1)
         next_month = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
 
+        if await self._mirror_ready():
+            (open_count, open_amount, weighted_amount), closed = await asyncio.gather(
+                asyncio.to_thread(self._mirror.pipeline_totals),
+                asyncio.to_thread(self._mirror.closed_between, month_start, next_month),
+            )
+            won_count, won_total = closed.get(1, (0, 0.0))
+            lost_count, _ = closed.get(2, (0, 0.0))
+            return CRMSalesStatsResponse(
+                as_of=today,
+                open_opportunities_count=open_count,
+                open_pipeline_amount=round(open_amount, 2),
+                weighted_pipeline_amount=round(weighted_amount, 2),
+                won_this_month_count=won_count,
+                won_this_month_amount=round(won_total, 2),
+                lost_this_month_count=lost_count,
+            )
+
+        pipeline = await self.get_sales_pipeline(top=5000)
         rows = await self._client.get_collection(
             "opportunities",
             select=[
@@ -248,17 +291,7 @@ class CRMService:
         )
 
     async def get_sales_forecast(self, *, months: int = 6) -> CRMSalesForecastResponse:
-        pipeline = await self.get_sales_pipeline(top=5000)
-
-        today = date.today().replace(day=1)
-        month_keys: List[str] = []
-        cursor = today
-        for _ in range(months):
-            month_keys.append(_month_key(cursor) or "")
-            if cursor.month == 12:
-                cursor = date(cursor.year + 1, 1, 1)
-            else:
-                cursor = date(cursor.year, cursor.month + 1, 1)
+        month_keys = _month_keys(months)
 
         aggregations: Dict[str, Dict[str, float | int]] = defaultdict(
             lambda: {
@@ -268,14 +301,22 @@ class CRMService:
             }
         )
 
-        for item in pipeline.items:
-            key = _month_key(item.estimated_close_date)
-            if not key or key not in month_keys:
-                continue
-            bucket = aggregations[key]
-            bucket["count"] = int(bucket["count"]) + 1
-            bucket["weighted"] = float(bucket["weighted"]) + item.weighted_estimated_value
-            bucket["unweighted"] = float(bucket["unweighted"]) + item.estimated_value
+        if await self._mirror_ready():
+            start = date.fromisoformat(f"{month_keys[0]}-01")
+            end_year, end_month = divmod(start.year * 12 + start.month - 1 + months, 12)
+            local = await asyncio.to_thread(self._mirror.forecast, start, date(end_year, end_month + 1, 1))
+            for key, (count, weighted, unweighted) in local.items():
+                aggregations[key] = {"count": count, "weighted": weighted, "unweighted": unweighted}
+        else:
+            pipeline = await self.get_sales_pipeline(top=5000)
+            for item in pipeline.items:
+                key = _month_key(item.estimated_close_date)
+                if not key or key not in month_keys:
+                    continue
+                bucket = aggregations[key]
+                bucket["count"] = int(bucket["count"]) + 1
+                bucket["weighted"] = float(bucket["weighted"]) + item.weighted_estimated_value
+                bucket["unweighted"] = float(bucket["unweighted"]) + item.estimated_value
 
         buckets = [
             CRMForecastBucket(
@@ -0,0 +1,440 @@
+"""
+Shared PDF rendering and text extraction on a process pool.
+
+Rasterising drawings with PyMuPDF and walking pages with pypdf are CPU-bound and hold the
+GIL, so running them on the event loop (or the default thread pool) stalls every other
+request. This service pushes that work to a small process pool, splits the pages of one
+document across workers, caches rendered pages by (content hash, page, zoom, clip) and
+enforces per-request page and byte budgets so one large drawing cannot exhaust memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import math
+import multiprocessing
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import fitz  # PyMuPDF
+from pypdf import PdfReader
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Clip = Tuple[float, float, float, float]
+
+DATA_URL_PREFIX = "data:image/png;base64,"
+# Multiple of 3 so every chunk encodes to whole base64 quanta without padding.
+_BASE64_CHUNK_BYTES = 3 * 64 * 1024
+
+
+class InvalidPdfError(ValueError):
+    """The payload could not be opened as a PDF."""
+
+
+@dataclass(frozen=True)
+class PageRenderSpec:
+    """One raster to produce: a 0-based page, a zoom factor and an optional clip.
+
+    `clip` is given as fractions of the page rectangle (x0, y0, x1, y1) so the same spec
+    works for any page size, e.g. ``(0.55, 0.55, 1.0, 1.0)`` for a bottom-right title block.
+    """
+
+    page: int
+    zoom: float = 1.0
+    clip: Optional[Clip] = None
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    spec: PageRenderSpec
+    png: bytes
+    cached: bool = False
+
+    @property
+    def encoded_size(self) -> int:
+        return len(DATA_URL_PREFIX) + 4 * math.ceil(len(self.png) / 3)
+
+    def iter_data_url(self, chunk_size: int = _BASE64_CHUNK_BYTES) -> Iterator[str]:
+        """Yield the data URL in pieces without materialising the whole base64 string."""
+        chunk_size = max(3, chunk_size - chunk_size % 3)
+        view = memoryview(self.png)
+        yield DATA_URL_PREFIX
+        for start in range(0, len(view), chunk_size):
+            yield base64.b64encode(view[start : start + chunk_size]).decode("ascii")
+
+    def data_url(self) -> str:
+        """Build the data URL with one intermediate buffer instead of bytes, str and f-string copies."""
+        buffer = bytearray(self.encoded_size)
+        prefix = DATA_URL_PREFIX.encode("ascii")
+        buffer[: len(prefix)] = prefix
+        offset = len(prefix)
+        view = memoryview(self.png)
+        for start in range(0, len(view), _BASE64_CHUNK_BYTES):
+            encoded = base64.b64encode(view[start : start + _BASE64_CHUNK_BYTES])
+            buffer[offset : offset + len(encoded)] = encoded
+            offset += len(encoded)
+        return buffer.decode("ascii")
+
+
+# --------------------------------------------------------------------------------------
+# Worker-side functions. These run in the pool processes, so they only take and return
+# picklable values and never touch the cache or settings.
+# --------------------------------------------------------------------------------------
+
+
+def _open_document(pdf_bytes: bytes) -> "fitz.Document":
+    try:
+        return fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as exc:
+        raise InvalidPdfError(f"Invalid PDF: {exc}") from None
+
+
+def render_pdf_pages(
+    pdf_bytes: bytes,
+    specs: Sequence[PageRenderSpec],
+    *,
+    max_page_pixels: int,
+    max_bytes: Optional[int] = None,
+) -> List[Tuple[PageRenderSpec, Optional[bytes]]]:
+    """Render `specs` from one open document; pages past the end come back as ``None``.
+
+    Zoom is lowered for pages that would exceed `max_page_pixels`, and rendering stops
+    once the PNG output reaches `max_bytes`.
+    """
+    doc = _open_document(pdf_bytes)
+    results: List[Tuple[PageRenderSpec, Optional[bytes]]] = []
+    produced = 0
+    try:
+        for spec in specs:
+            if max_bytes is not None and produced >= max_bytes:
+                break
+            if not 0 <= spec.page < doc.page_count:
+                results.append((spec, None))
+                continue
+            page = doc[spec.page]
+            rect = page.rect
+            clip = None
+            if spec.clip is not None:
+                x0, y0, x1, y1 = spec.clip
+                clip = fitz.Rect(rect.width * x0, rect.height * y0, rect.width * x1, rect.height * y1)
+            area = (clip or rect).width * (clip or rect).height
+            zoom = spec.zoom
+            if area * zoom * zoom > max_page_pixels > 0:
+                zoom = math.sqrt(max_page_pixels / area)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+            png = pixmap.tobytes("png")
+            pixmap = None
+            produced += len(png)
+            results.append((spec, png))
+    finally:
+        doc.close()
+    return results
+
+
+def extract_pdf_text(pdf_bytes: bytes, *, max_pages: Optional[int] = None) -> List[str]:
+    """Return the pypdf text of each page (``""`` for pages that fail to extract)."""
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+    except Exception as exc:
+        raise InvalidPdfError(f"Invalid PDF: {exc}") from None
+
+    pages: List[str] = []
+    for index, page in enumerate(reader.pages):
+        if max_pages is not None and index >= max_pages:
+            break
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception:
+            pages.append("")
+    return pages
+
+
+# --------------------------------------------------------------------------------------
+# Parent-side service
+# --------------------------------------------------------------------------------------
+
+
+CacheKey = Tuple[str, int, float, Optional[Clip]]
+
+
+class RenderedPageCache:
+    """LRU of rendered PNGs bounded by total bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return png
+
+    def put(self, key: CacheKey, png: bytes) -> None:
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class PdfRenderService:
+    """Process-pool PDF rasteriser and text extractor shared by the API and OCR services."""
+
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = None,
+        max_concurrent_requests: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        max_request_bytes: Optional[int] = None,
+        max_page_pixels: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.max_workers = max_workers or settings.pdf_render_max_workers
+        self.max_concurrent_requests = max_concurrent_requests or settings.pdf_render_max_concurrent_requests
+        self.max_pages = max_pages or settings.pdf_render_max_pages
+        self.max_request_bytes = max_request_bytes or settings.pdf_render_max_request_mb * 1024 * 1024
+        self.max_page_pixels = max_page_pixels or settings.pdf_render_max_page_megapixels * 1_000_000
+        self.cache = RenderedPageCache(
+            cache_max_bytes if cache_max_bytes is not None else settings.pdf_render_cache_mb * 1024 * 1024
+        )
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._executor_lock = threading.Lock()
+        # asyncio primitives bind to one loop; keep one admission semaphore per loop.
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._pages_rendered = 0
+        self._pages_skipped = 0
+        self._budget_exceeded = 0
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run a picklable, module-level `fn(*args, **kwargs)` on the render pool."""
+        async with self._slots_for(asyncio.get_running_loop()):
+            return await self._submit(fn, *args, **kwargs)
+
+    async def render_pages(
+        self,
+        pdf_bytes: bytes,
+        specs: Sequence[PageRenderSpec],
+        *,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[RenderedPage]:
+        """Render `specs` in order, serving repeats from the cache.
+
+        At most `max_pages` distinct pages are rendered, and output stops before the encoded
+        size would exceed `max_bytes`; both default to (and are capped by) the service budgets.
+        Specs for pages past the end of the document are dropped. Raises `InvalidPdfError`.
+        """
+        page_budget = min(max_pages or self.max_pages, self.max_pages)
+        byte_budget = min(max_bytes or self.max_request_bytes, self.max_request_bytes)
+
+        allowed_pages: List[int] = []
+        budgeted: List[PageRenderSpec] = []
+        for spec in specs:
+            if spec.page not in allowed_pages:
+                if len(allowed_pages) >= page_budget:
+                    continue
+                allowed_pages.append(spec.page)
+            budgeted.append(spec)
+        if len(budgeted) < len(specs):
+            self._count(budget_exceeded=1)
+
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        rendered: Dict[PageRenderSpec, Optional[bytes]] = {}
+        missing: List[PageRenderSpec] = []
+        for spec in dict.fromkeys(budgeted):
+            png = self.cache.get(self._cache_key(digest, spec))
+            if png is None:
+                missing.append(spec)
+            else:
+                rendered[spec] = png
+        cached_specs = set(rendered)
+
+        if missing:
+            groups = self._partition(missing)
+            # Split the budget so the groups together hold about one budget of PNGs, not one each.
+            group_budget = math.ceil(byte_budget / len(groups))
+            async with self._slots_for(asyncio.get_running_loop()):
+                chunks = await asyncio.gather(
+                    *(
+                        self._submit(
+                            render_pdf_pages,
+                            pdf_bytes,
+                            group,
+                            max_page_pixels=self.max_page_pixels,
+                            max_bytes=group_budget,
+                        )
+                        for group in groups
+                    )
+                )
+            for chunk in chunks:
+                for spec, png in chunk:
+                    rendered[spec] = png
+                    if png is not None:
+                        self.cache.put(self._cache_key(digest, spec), png)
+
+        pages: List[RenderedPage] = []
+        used = 0
+        for spec in budgeted:
+            png = rendered.get(spec)
+            if png is None:
+                continue
+            page = RenderedPage(spec=spec, png=png, cached=spec in cached_specs)
+            if used + page.encoded_size > byte_budget:
+                self._count(budget_exceeded=1)
+                logger.warning("PDF render budget of %d bytes reached after %d images", byte_budget, len(pages))
+                break
+            used += page.encoded_size
+            pages.append(page)
+
+        self._count(
+            requests=1,
+            pages_rendered=sum(1 for spec in missing if rendered.get(spec) is not None),
+            pages_skipped=len(budgeted) - len(pages),
+        )
+        return pages
+
+    async def render_data_urls(
+        self,
+        pdf_bytes: bytes,
+        specs: Sequence[PageRenderSpec],
+        *,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[str]:
+        pages = await self.render_pages(pdf_bytes, specs, max_pages=max_pages, max_bytes=max_bytes)
+        return [page.data_url() for page in pages]
+
+    async def extract_text(self, pdf_bytes: bytes, *, max_pages: Optional[int] = None) -> List[str]:
+        """Per-page pypdf text, extracted off the event loop. Raises `InvalidPdfError`."""
+        return await self.run(extract_pdf_text, pdf_bytes, max_pages=max_pages)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "requests": self._requests,
+                "pages_rendered": self._pages_rendered,
+                "pages_skipped": self._pages_skipped,
+                "budget_exceeded": self._budget_exceeded,
+            }
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrent_requests": self.max_concurrent_requests,
+            "pool_started": self._executor is not None,
+            **counters,
+            "cache": self.cache.metrics(),
+        }
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._owns_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _cache_key(digest: str, spec: PageRenderSpec) -> CacheKey:
+        return (digest, spec.page, round(spec.zoom, 4), spec.clip)
+
+    def _partition(self, specs: Sequence[PageRenderSpec]) -> List[List[PageRenderSpec]]:
+        """Split specs across workers, keeping every spec of a page in the same group."""
+        by_page: Dict[int, List[PageRenderSpec]] = {}
+        for spec in specs:
+            by_page.setdefault(spec.page, []).append(spec)
+        groups: List[List[PageRenderSpec]] = [[] for _ in range(min(self.max_workers, len(by_page)))]
+        for index, page_specs in enumerate(by_page.values()):
+            groups[index % len(groups)].extend(page_specs)
+        return groups
+
+    async def _submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        executor = self._get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed on a pathological file); start a fresh pool next time.
+            with self._executor_lock:
+                if self._executor is executor and self._owns_executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: forking a process that runs an event loop and thread pools is unsafe.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._owns_executor = True
+            return self._executor
+
+    def _slots_for(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_concurrent_requests)
+            self._slots[loop] = slots
+        return slots
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                attribute = f"_{name}"
+                setattr(self, attribute, getattr(self, attribute) + delta)
+
+
+pdf_renderer = PdfRenderService()
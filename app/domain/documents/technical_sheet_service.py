@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
 import logging
 import re
@@ -11,9 +13,15 @@ from typing import Any, Dict, Optional, Tuple
 
 import pdfrw
 from fillpdf import fillpdfs
-from pypdf import PdfReader
 
 from app.domain.documents.file_share_service import FileShareService
+from app.domain.documents.pdf_rendering import InvalidPdfError, pdf_renderer
+from app.domain.documents.technical_sheet_templates import (
+    CompiledTemplate,
+    CompiledTemplateCache,
+    IncrementalFormWriter,
+    compiled_template_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +34,10 @@ class TechnicalSheetService:
         *,
         file_share_service: Optional[FileShareService] = None,
         template_root: Optional[Path] = None,
+        template_cache: Optional[CompiledTemplateCache] = None,
     ) -> None:
         self._file_share_service = file_share_service or FileShareService()
+        self._template_cache = template_cache or compiled_template_cache
         repo_root = template_root or Path(__file__).resolve().parents[3]
         self._templates: Dict[str, Path] = {
             "fiche-produit": repo_root / "docs" / "FicheProduit.pdf",
@@ -44,7 +54,7 @@ class TechnicalSheetService:
                     "error_code": "PDF_NOT_FOUND",
                 }
 
-            fields, field_map, source = self._extract_fields_from_pdf(
+            fields, field_map, source = await self._extract_fields_from_pdf(
                 pdf_bytes=pdf_data["content"],
             )
 
@@ -111,6 +121,47 @@ class TechnicalSheetService:
                 "error_code": "PROCESSING_ERROR",
             }
 
+        try:
+            template = await self._compile_template(pdf_bytes, cache=not item_no)
+            mapped_fields, invalid_options = self._map_fill_fields(fields, template)
+            if invalid_options:
+                return {
+                    "success": False,
+                    "error": "One or more fields have invalid option values",
+                    "error_code": "INVALID_OPTION",
+                    "details": invalid_options,
+                }
+            if not mapped_fields:
+                return {
+                    "success": False,
+                    "error": "No matching fields found for the template",
+                    "error_code": "NO_FIELDS",
+                }
+
+            filled_bytes = await asyncio.to_thread(self._write_filled_pdf, template, pdf_bytes, mapped_fields)
+
+            if not filled_bytes:
+                return {
+                    "success": False,
+                    "error": "Generated PDF is empty",
+                    "error_code": "EMPTY_PDF",
+                }
+
+            return {
+                "success": True,
+                "content": filled_bytes,
+                "filename": filename,
+                "size": len(filled_bytes),
+                "content_type": "application/pdf",
+            }
+        except Exception as exc:
+            logger.error("Failed to fill technical sheet", exc_info=exc)
+            return {
+                "success": False,
+                "error": str(exc),
+                "error_code": "PROCESSING_ERROR",
+            }
+
     async def get_template_fields(
         self,
         *,
@@ -144,18 +195,11 @@ class TechnicalSheetService:
             }
 
         try:
-            template_fields = self._extract_form_fields(pdf_bytes)
-            field_options = self._extract_form_options(pdf_bytes)
-            normalized_fields, field_map = self._normalize_fields(template_fields)
-
-            options_map: Dict[str, list[str]] = {}
-            for raw_key, options in field_options.items():
-                normalized_key = self._normalize_field_key(raw_key)
-                if not normalized_key:
-                    continue
-                options_map[normalized_key] = self._clean_options(options)
+            template = await self._compile_template(pdf_bytes, cache=not item_no)
+            options_map = template.options_map
+            field_map = template.field_map
 
-            suggested_fields = sorted(normalized_fields.keys(), key=str.lower)
+            suggested_fields = sorted(template.normalized_fields.keys(), key=str.lower)
             fields_detail = []
             for key in suggested_fields:
                 detail = {
@@ -187,65 +231,6 @@ class TechnicalSheetService:
                 "error_code": "PROCESSING_ERROR",
             }
 
-        try:
-            template_fields = self._extract_form_fields(pdf_bytes)
-            field_options = self._extract_form_options(pdf_bytes)
-            mapped_fields, invalid_options = self._map_fill_fields(
-                fields,
-                template_fields,
-                field_options,
-            )
-            if invalid_options:
-                return {
-                    "success": False,
-                    "error": "One or more fields have invalid option values",
-                    "error_code": "INVALID_OPTION",
-                    "details": invalid_options,
-                }
-            if not mapped_fields:
-                return {
-                    "success": False,
-                    "error": "No matching fields found for the template",
-                    "error_code": "NO_FIELDS",
-                }
-
-            with tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as input_tmp, \
-                tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as output_tmp:
-                input_tmp.write(pdf_bytes)
-                input_tmp.flush()
-
-                fillpdfs.write_fillable_pdf(
-                    input_tmp.name,
-                    output_tmp.name,
-                    mapped_fields,
-                    flatten=False,
-                )
-
-                output_tmp.seek(0)
-                filled_bytes = output_tmp.read()
-
-            if not filled_bytes:
-                return {
-                    "success": False,
-                    "error": "Generated PDF is empty",
-                    "error_code": "EMPTY_PDF",
-                }
-
-            return {
-                "success": True,
-                "content": filled_bytes,
-                "filename": filename,
-                "size": len(filled_bytes),
-                "content_type": "application/pdf",
-            }
-        except Exception as exc:
-            logger.error("Failed to fill technical sheet", exc_info=exc)
-            return {
-                "success": False,
-                "error": str(exc),
-                "error_code": "PROCESSING_ERROR",
-            }
-
     async def _load_template(
         self,
         *,
@@ -267,39 +252,102 @@ class TechnicalSheetService:
 
         return template_path.read_bytes(), template_path.name
 
-    def _extract_fields_from_pdf(self, *, pdf_bytes: bytes) -> Tuple[Dict[str, Any], Dict[str, str], str]:
-        fields = self._extract_form_fields(pdf_bytes)
-        if fields:
-            normalized_fields, field_map = self._normalize_fields(fields)
+    async def _compile_template(self, pdf_bytes: bytes, *, cache: bool = True) -> CompiledTemplate:
+        """
+        Return the compiled form structure of `pdf_bytes`, parsing it once per content hash.
+
+        Only the shared `_templates` files are cached; per-item sheets from the file share
+        (`cache=False`) are compiled for the one call so they do not evict the templates.
+        """
+        template_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        if not cache:
+            return await asyncio.to_thread(self._build_compiled_template, template_hash, pdf_bytes)
+        compiled = self._template_cache.get(template_hash)
+        if compiled is None:
+            compiled = await asyncio.to_thread(self._build_compiled_template, template_hash, pdf_bytes)
+            self._template_cache.put(compiled)
+        return compiled
+
+    def _build_compiled_template(self, template_hash: str, pdf_bytes: bytes) -> CompiledTemplate:
+        form_fields = self._extract_form_fields(pdf_bytes)
+        form_options = self._extract_form_options(pdf_bytes) if form_fields else {}
+        normalized_fields, field_map = self._normalize_fields(form_fields)
+
+        options_map: Dict[str, list[str]] = {}
+        for raw_key, options in form_options.items():
+            normalized_key = self._normalize_field_key(raw_key)
+            if not normalized_key:
+                continue
+            options_map[normalized_key] = self._clean_options(options)
+
+        writer = None
+        if form_fields:
+            try:
+                writer = IncrementalFormWriter.from_pdf(pdf_bytes, self._normalize_field_key)
+            except Exception as exc:
+                logger.warning("Template cannot be filled incrementally, using full rewrite: %s", exc)
+
+        return CompiledTemplate(
+            template_hash=template_hash,
+            form_fields=form_fields,
+            form_options=form_options,
+            normalized_fields=normalized_fields,
+            field_map=field_map,
+            fill_field_map=self._build_field_map(form_fields),
+            options_map=options_map,
+            writer=writer,
+        )
+
+    def _write_filled_pdf(self, template: CompiledTemplate, pdf_bytes: bytes, mapped_fields: Dict[str, Any]) -> bytes:
+        if template.writer is not None:
+            values = {
+                self._normalize_field_key(raw_key): self._coerce_to_string(value)
+                for raw_key, value in mapped_fields.items()
+            }
+            return template.writer.fill(values)
+
+        with tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as input_tmp, \
+            tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as output_tmp:
+            input_tmp.write(pdf_bytes)
+            input_tmp.flush()
+
+            fillpdfs.write_fillable_pdf(
+                input_tmp.name,
+                output_tmp.name,
+                mapped_fields,
+                flatten=False,
+            )
+
+            output_tmp.seek(0)
+            return output_tmp.read()
+
+    async def _extract_fields_from_pdf(self, *, pdf_bytes: bytes) -> Tuple[Dict[str, Any], Dict[str, str], str]:
+        form_fields = await asyncio.to_thread(self._extract_form_fields, pdf_bytes)
+        if form_fields:
+            normalized_fields, field_map = self._normalize_fields(form_fields)
             if normalized_fields:
                 return normalized_fields, field_map, "form_fields"
 
-        text_fields = self._extract_text_fields(pdf_bytes)
+        text_fields = self._extract_text_fields(await self._extract_text(pdf_bytes, max_pages=5))
         normalized_text_fields, field_map = self._normalize_fields(text_fields)
         return normalized_text_fields, field_map, "text_extraction"
 
     @staticmethod
     def _extract_form_fields(pdf_bytes: bytes) -> Dict[str, Any]:
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as tmp:
-            tmp.write(pdf_bytes)
-            tmp.flush()
-            try:
-                return fillpdfs.get_form_fields(tmp.name) or {}
-            except Exception as exc:
-                logger.warning("Failed to read form fields: %s", exc)
-                return {}
+        try:
+            return fillpdfs.get_form_fields(io.BytesIO(pdf_bytes)) or {}
+        except Exception as exc:
+            logger.warning("Failed to read form fields: %s", exc)
+            return {}
 
     @staticmethod
     def _extract_form_options(pdf_bytes: bytes) -> Dict[str, list[str]]:
         options_by_field: Dict[str, list[str]] = {}
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as tmp:
-            tmp.write(pdf_bytes)
-            tmp.flush()
-            try:
-                pdf = pdfrw.PdfReader(tmp.name)
-            except Exception as exc:
-                logger.warning("Failed to read PDF options: %s", exc)
-                return options_by_field
+        try:
+            pdf = pdfrw.PdfReader(fdata=pdf_bytes)
+        except Exception as exc:
+            logger.warning("Failed to read PDF options: %s", exc)
+            return options_by_field
 
         for page in pdf.pages:
             annotations = page[fillpdfs.ANNOT_KEY]
@@ -329,8 +377,7 @@ class TechnicalSheetService:
                     options_by_field[field_name] = decoded
         return options_by_field
 
-    def _extract_text_fields(self, pdf_bytes: bytes) -> Dict[str, Any]:
-        text = self._extract_text(pdf_bytes, max_pages=5)
+    def _extract_text_fields(self, text: str) -> Dict[str, Any]:
         if not text:
             return {}
 
@@ -347,24 +394,13 @@ class TechnicalSheetService:
         return fields
 
     @staticmethod
-    def _extract_text(pdf_bytes: bytes, *, max_pages: int = 5) -> str:
+    async def _extract_text(pdf_bytes: bytes, *, max_pages: int = 5) -> str:
         try:
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-        except Exception as exc:
+            pages = await pdf_renderer.extract_text(pdf_bytes, max_pages=max_pages)
+        except InvalidPdfError as exc:
             logger.warning("Failed to open PDF for text extraction: %s", exc)
             return ""
-
-        parts: list[str] = []
-        for index, page in enumerate(reader.pages):
-            if index >= max_pages:
-                break
-            try:
-                text = page.extract_text() or ""
-            except Exception:
-                text = ""
-            if text.strip():
-                parts.append(text)
-        return "\n".join(parts)
+        return "\n".join(text for text in pages if text.strip())
 
     def _normalize_fields(self, fields: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
         normalized: Dict[str, Any] = {}
@@ -385,9 +421,13 @@ class TechnicalSheetService:
             return ""
 
         cleaned = key
-        if "\\000" in cleaned:
-            cleaned = cleaned.replace("\\000", "\x00")
-        if "\x00" in cleaned or cleaned.startswith("þÿ"):
+        if "\\" in cleaned:
+            # Raw PDF string escapes (pdfrw keeps "\\000", other writers emit "\\376\\377").
+            cleaned = re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), cleaned)
+        if re.fullmatch(r"(?i)feff(?:[0-9a-f]{4})+", cleaned):
+            # Hex string names (<FEFF...>) as pdfrw reports them.
+            cleaned = bytes.fromhex(cleaned).decode("utf-16", errors="replace")
+        elif "\x00" in cleaned or cleaned.startswith("þÿ"):
             try:
                 cleaned = cleaned.encode("latin-1").decode("utf-16")
             except Exception:
@@ -455,12 +495,13 @@ class TechnicalSheetService:
     def _map_fill_fields(
         self,
         fields: Dict[str, Any],
-        template_fields: Dict[str, Any],
-        field_options: Dict[str, list[str]],
+        template: CompiledTemplate,
     ) -> Tuple[Dict[str, Any], list[Dict[str, Any]]]:
         if not fields:
             return {}, []
-        field_map = self._build_field_map(template_fields)
+        template_fields = template.form_fields
+        field_options = template.form_options
+        field_map = template.fill_field_map
         mapped: Dict[str, Any] = {}
         invalid_options: list[Dict[str, Any]] = []
         for input_key, raw_value in fields.items():
@@ -0,0 +1,301 @@
+"""
+Compiled technical sheet templates and an incremental AcroForm writer.
+
+Reading the field list and options of a fiche technique walks every widget annotation,
+and filling it through fillpdf re-parses and re-serialises the whole document. Templates
+are therefore compiled once per content hash: the extracted fields, options, normalized
+keys and the fill field map are kept in an LRU, together with an `IncrementalFormWriter`
+that appends only the changed field objects (plus a new xref section) to the original
+bytes, so each fill costs roughly the size of its output.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    BooleanObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s*%%EOF\s*$")
+
+
+@dataclass(frozen=True)
+class _Widget:
+    annotation: IndirectObject
+    target: IndirectObject
+    field_type: Optional[str]
+    states: Tuple[str, ...]
+
+
+class IncrementalFormWriter:
+    """Fills AcroForm fields by appending an incremental update to the template bytes.
+
+    Only templates with a classic xref table and indirect widget objects are supported;
+    `from_pdf` returns ``None`` otherwise so callers can fall back to a full rewrite.
+    """
+
+    def __init__(
+        self,
+        *,
+        template: bytes,
+        startxref: int,
+        trailer: DictionaryObject,
+        widgets: Dict[str, List[_Widget]],
+        objects: Dict[int, Tuple[int, DictionaryObject]],
+        need_appearances: Tuple[int, Optional[str]],
+    ) -> None:
+        self._template = template
+        self._startxref = startxref
+        self._trailer = trailer
+        self._widgets = widgets
+        self._objects = objects
+        self._need_appearances = need_appearances
+
+    @property
+    def field_keys(self) -> List[str]:
+        return list(self._widgets)
+
+    @classmethod
+    def from_pdf(cls, pdf_bytes: bytes, key_fn: Callable[[Any], str]) -> Optional["IncrementalFormWriter"]:
+        match = _STARTXREF.search(pdf_bytes[-1024:])
+        if not match:
+            return None
+        startxref = int(match.group(1))
+        if pdf_bytes[startxref : startxref + 4] != b"xref":
+            # Cross-reference streams would need a stream-based update section.
+            return None
+
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        if reader.is_encrypted:
+            return None
+        root_ref = _raw(reader.trailer, "/Root")
+        if not isinstance(root_ref, IndirectObject):
+            return None
+        root = reader.trailer["/Root"]
+        acroform_ref = _raw(root, "/AcroForm")
+        if acroform_ref is None:
+            return None
+
+        objects: Dict[int, Tuple[int, DictionaryObject]] = {}
+
+        def _track(ref: IndirectObject) -> None:
+            if ref.idnum not in objects:
+                objects[ref.idnum] = (ref.generation, ref.get_object())
+
+        if isinstance(acroform_ref, IndirectObject):
+            _track(acroform_ref)
+            need_appearances: Tuple[int, Optional[str]] = (acroform_ref.idnum, None)
+        else:
+            _track(root_ref)
+            need_appearances = (root_ref.idnum, "/AcroForm")
+
+        widgets: Dict[str, List[_Widget]] = {}
+        for page in reader.pages:
+            for annotation_ref in page.get("/Annots") or []:
+                if not isinstance(annotation_ref, IndirectObject):
+                    continue
+                annotation = annotation_ref.get_object()
+                if annotation.get("/Subtype") != "/Widget":
+                    continue
+                target_ref = annotation_ref if "/T" in annotation else _raw(annotation, "/Parent")
+                if not isinstance(target_ref, IndirectObject):
+                    continue
+                target = target_ref.get_object()
+                key = key_fn(target.get("/T"))
+                if not key:
+                    continue
+                field_type = _inherited(annotation, "/FT")
+                states: Tuple[str, ...] = ()
+                if field_type == "/Btn":
+                    appearance = annotation.get("/AP") or {}
+                    states = tuple(str(state) for state in (appearance.get("/N") or {}).keys())
+                _track(annotation_ref)
+                _track(target_ref)
+                widgets.setdefault(key, []).append(
+                    _Widget(annotation_ref, target_ref, str(field_type) if field_type else None, states)
+                )
+
+        trailer = DictionaryObject(
+            {
+                NameObject("/Size"): NumberObject(reader.trailer["/Size"]),
+                NameObject("/Root"): root_ref,
+                NameObject("/Prev"): NumberObject(startxref),
+            }
+        )
+        for name in ("/Info", "/ID"):
+            value = _raw(reader.trailer, name)
+            if value is not None:
+                trailer[NameObject(name)] = value
+
+        return cls(
+            template=pdf_bytes,
+            startxref=startxref,
+            trailer=trailer,
+            widgets=widgets,
+            objects=objects,
+            need_appearances=need_appearances,
+        )
+
+    def fill(self, values: Mapping[str, str]) -> bytes:
+        """Return the template with `values` (keyed by normalized field key) applied."""
+        changed: Dict[int, DictionaryObject] = {}
+
+        def _edit(number: int) -> DictionaryObject:
+            obj = changed.get(number)
+            if obj is None:
+                obj = DictionaryObject(self._objects[number][1])
+                changed[number] = obj
+            return obj
+
+        for key, value in values.items():
+            widgets = self._widgets.get(key, ())
+            state = f"/{value}"
+            # Checkboxes and radio kids: the chosen export state is on for the widgets
+            # that have it and /Off elsewhere; the field value follows.
+            known = [widget for widget in widgets if widget.field_type == "/Btn" and widget.states]
+            field_state = state if not known or any(state in widget.states for widget in known) else "/Off"
+            for widget in widgets:
+                annotation = _edit(widget.annotation.idnum)
+                target = _edit(widget.target.idnum)
+                if widget.field_type == "/Btn":
+                    on = state in widget.states or not widget.states
+                    annotation[NameObject("/AS")] = NameObject(state if on else "/Off")
+                    target[NameObject("/V")] = NameObject(field_state)
+                else:
+                    target[NameObject("/V")] = TextStringObject(value)
+                    # Drop the stale appearance; NeedAppearances makes viewers regenerate it.
+                    annotation.pop(NameObject("/AP"), None)
+
+        if not changed:
+            return self._template
+
+        number, nested = self._need_appearances
+        holder = _edit(number)
+        if nested:
+            holder[NameObject(nested)] = DictionaryObject(holder[nested])
+            holder = holder[nested]
+        holder[NameObject("/NeedAppearances")] = BooleanObject(True)
+
+        out = io.BytesIO()
+        out.write(self._template)
+        if not self._template.endswith(b"\n"):
+            out.write(b"\n")
+        offsets: Dict[int, int] = {}
+        for number in sorted(changed):
+            offsets[number] = out.tell()
+            out.write(f"{number} {self._objects[number][0]} obj\n".encode("ascii"))
+            changed[number].write_to_stream(out)
+            out.write(b"\nendobj\n")
+
+        xref_offset = out.tell()
+        # Start with the free-list head so readers see a zero-indexed section.
+        out.write(b"xref\n0 1\n0000000000 65535 f\r\n")
+        for start, numbers in _subsections(sorted(offsets)):
+            out.write(f"{start} {len(numbers)}\n".encode("ascii"))
+            for number in numbers:
+                out.write(f"{offsets[number]:010d} {self._objects[number][0]:05d} n\r\n".encode("ascii"))
+        out.write(b"trailer\n")
+        self._trailer.write_to_stream(out)
+        out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
+        return out.getvalue()
+
+
+def _raw(node: DictionaryObject, key: str) -> Any:
+    """Entry without resolving indirect references (``None`` when absent)."""
+    return dict.get(node, key)
+
+
+def _inherited(node: DictionaryObject, key: str) -> Any:
+    while node is not None:
+        value = node.get(key)
+        if value is not None:
+            return value
+        node = node.get("/Parent")
+    return None
+
+
+def _subsections(numbers: List[int]) -> List[Tuple[int, List[int]]]:
+    sections: List[Tuple[int, List[int]]] = []
+    for number in numbers:
+        if sections and sections[-1][1][-1] == number - 1:
+            sections[-1][1].append(number)
+        else:
+            sections.append((number, [number]))
+    return sections
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Everything the read, field-suggestion and fill paths derive from one template."""
+
+    template_hash: str
+    form_fields: Dict[str, Any]
+    form_options: Dict[str, List[str]]
+    normalized_fields: Dict[str, Any]
+    field_map: Dict[str, str]
+    fill_field_map: Dict[str, str]
+    options_map: Dict[str, List[str]]
+    writer: Optional[IncrementalFormWriter] = field(default=None, compare=False, repr=False)
+
+
+class CompiledTemplateCache:
+    """LRU of compiled templates keyed by the SHA-256 of the template bytes."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self.max_entries = max_entries or settings.technical_sheet_template_cache_size
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, template_hash: str) -> Optional[CompiledTemplate]:
+        with self._lock:
+            compiled = self._entries.get(template_hash)
+            if compiled is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(template_hash)
+            self._hits += 1
+            return compiled
+
+    def put(self, compiled: CompiledTemplate) -> None:
+        with self._lock:
+            self._entries[compiled.template_hash] = compiled
+            self._entries.move_to_end(compiled.template_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+compiled_template_cache = CompiledTemplateCache()
@@ -8,7 +8,7 @@ and serialization. All models use strict typing and forbid extra fields.
 from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Optional, List, Any, Dict
+from typing import Annotated, Optional, List, Any, Dict
 from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 
 
@@ -132,6 +132,59 @@ class UpdatePOLineQuantityBody(BaseDTO):
     )
 
 
+class BulkPOLineChange(BaseDTO):
+    """One line change inside a bulk PO line update."""
+    
+    po_id: str = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="Purchase Order ID"
+    )
+    line_no: int = Field(
+        ...,
+        ge=1,
+        description="PO line number"
+    )
+    new_date: Optional[date] = Field(
+        None,
+        description="New promise date"
+    )
+    new_price: Optional[Annotated[Decimal, Field(gt=0, decimal_places=2)]] = Field(
+        None,
+        description="New unit price"
+    )
+    new_quantity: Optional[Decimal] = Field(
+        None,
+        gt=0,
+        description="New quantity"
+    )
+    
+    @model_validator(mode="after")
+    def require_change(self):
+        """Ensure the entry changes at least one field."""
+        if self.new_date is None and self.new_price is None and self.new_quantity is None:
+            raise ValueError("At least one of new_date, new_price or new_quantity is required")
+        return self
+
+
+class BulkUpdatePOLinesBody(BaseDTO):
+    """Request body for updating many PO lines at once."""
+    
+    changes: List[BulkPOLineChange] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Line changes to apply"
+    )
+    reason: str = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Business reason applied to every change"
+    )
+
+
 class CreateReceiptBody(BaseDTO):
     """Request body for creating a new receipt."""
     
@@ -302,6 +355,16 @@ class POLineDTO(BaseDTO):
         return self
 
 
+class BulkPOLineResult(BaseDTO):
+    """Outcome of one change of a bulk PO line update."""
+    
+    po_id: str = Field(..., description="Purchase Order ID")
+    line_no: int = Field(..., description="Line number")
+    status: str = Field(..., description="updated or error")
+    line: Optional[POLineDTO] = Field(None, description="Line after the update")
+    error: Optional[Dict[str, Any]] = Field(None, description="Error code, message and context")
+
+
 class PurchaseOrderDTO(BaseDTO):
     """Purchase Order DTO."""
     
@@ -445,6 +508,13 @@ class UpdatePOLineQuantityCommand(PurchaseCommand):
     reason: str
 
 
+class BulkUpdatePOLinesCommand(PurchaseCommand):
+    """Command to update many PO lines."""
+    
+    changes: List[BulkPOLineChange]
+    reason: str
+
+
 class CreateReceiptCommand(PurchaseCommand):
     """Command to create a receipt."""
     
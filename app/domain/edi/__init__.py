@@ -1,5 +1,6 @@
 """EDI domain services."""
 
-from .service import EDIService, EDITransmissionResult
+from .service import EDIBulkTransmissionResult, EDIService, EDITransmissionResult
+from .sftp_outbox import SFTPOutbox, edi_outbox
 
-__all__ = ["EDIService", "EDITransmissionResult"]
+__all__ = ["EDIBulkTransmissionResult", "EDIService", "EDITransmissionResult", "SFTPOutbox", "edi_outbox"]
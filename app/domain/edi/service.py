@@ -2,16 +2,23 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from typing import Optional, Tuple, Iterable
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import logfire
 
 from app.adapters.erp_client import ERPClient
-from app.errors import InvalidPurchaseOrderError, PurchaseOrderNotFoundError
-from migration.edi import build_edi_850_document, get_edi_paths, send_file
+from app.errors import BaseAPIException, InvalidPurchaseOrderError, PurchaseOrderNotFoundError
+from app.settings import settings
+from migration.edi import build_edi_850_document, get_edi_paths
+
+from .sftp_outbox import SFTPOutbox, edi_outbox
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -27,12 +34,28 @@ class EDITransmissionResult:
     message: Optional[str] = None
 
 
+@dataclass
+class EDIBulkTransmissionResult:
+    """Outcome for one purchase order of a bulk EDI 850 send."""
+
+    po_number: str
+    result: Optional[EDITransmissionResult] = None
+    error: Optional[Dict[str, Any]] = None
+
+
 class EDIService:
     """Coordinate generation and transmission of EDI documents."""
 
-    def __init__(self, erp_client: Optional[ERPClient] = None, *, sender_id: str = "GILBERTTECHP"):
+    def __init__(
+        self,
+        erp_client: Optional[ERPClient] = None,
+        *,
+        sender_id: str = "GILBERTTECHP",
+        outbox: Optional[SFTPOutbox] = None,
+    ):
         self.erp_client = erp_client or ERPClient()
         self.sender_id = sender_id
+        self.outbox = outbox or edi_outbox
 
     @staticmethod
     def _filter_and_order_lines(lines: Iterable[dict]) -> list[dict]:
@@ -50,16 +73,34 @@ class EDIService:
         filtered.sort(key=lambda l: l.get("Line_No") or l.get("LineNo") or l.get("LineNumber") or 0)
         return filtered
 
-    async def _fetch_po_data(self, po_number: str):
+    async def _fetch_po_header(self, po_number: str) -> Optional[dict]:
         po_header = await self.erp_client.get_purchase_order_for_edi(po_number)
         if not po_header:
             po_header = await self.erp_client.get_purchase_order(po_number)
-        if not po_header:
-            raise PurchaseOrderNotFoundError(po_number)
+        return po_header
 
+    async def _fetch_po_lines(self, po_number: str) -> list[dict]:
         lines = await self.erp_client.get_purchase_order_lines_for_edi(po_number)
         if not lines:
             lines = await self.erp_client.get_purchase_order_lines(po_number)
+        return lines
+
+    async def _fetch_po_data(
+        self,
+        po_number: str,
+        vendor_tasks: Optional[Dict[str, "asyncio.Task[Optional[dict]]"]] = None,
+    ):
+        """Fetch header, lines and vendor; header and lines are requested concurrently.
+
+        `vendor_tasks` lets a bulk send share one vendor lookup between purchase orders
+        from the same vendor.
+        """
+        po_header, lines = await asyncio.gather(
+            self._fetch_po_header(po_number),
+            self._fetch_po_lines(po_number),
+        )
+        if not po_header:
+            raise PurchaseOrderNotFoundError(po_number)
 
         lines = self._filter_and_order_lines(lines)
         if not lines:
@@ -75,7 +116,14 @@ class EDIService:
                 context={"po_number": po_number},
             )
 
-        vendor_info = await self.erp_client.get_vendor(vendor_code)
+        if vendor_tasks is None:
+            vendor_info = await self.erp_client.get_vendor(vendor_code)
+        else:
+            task = vendor_tasks.get(vendor_code)
+            if task is None:
+                task = asyncio.ensure_future(self.erp_client.get_vendor(vendor_code))
+                vendor_tasks[vendor_code] = task
+            vendor_info = await asyncio.shield(task)
         if not vendor_info:
             raise InvalidPurchaseOrderError(
                 "Unable to retrieve vendor details for EDI document",
@@ -84,8 +132,13 @@ class EDIService:
 
         return po_header, lines, vendor_info
 
-    async def generate_purchase_order_850(self, po_number: str) -> Tuple[str, str]:
-        po_header, lines, vendor_info = await self._fetch_po_data(po_number)
+    async def generate_purchase_order_850(
+        self,
+        po_number: str,
+        *,
+        vendor_tasks: Optional[Dict[str, "asyncio.Task[Optional[dict]]"]] = None,
+    ) -> Tuple[str, str]:
+        po_header, lines, vendor_info = await self._fetch_po_data(po_number, vendor_tasks)
         document = build_edi_850_document(
             po_number,
             po_header,
@@ -98,8 +151,13 @@ class EDIService:
         file_name = f"PO_{po_number}_{timestamp}.edi"
         return document, file_name
 
-    async def send_purchase_order_850(self, po_number: str) -> EDITransmissionResult:
-        document, file_name = await self.generate_purchase_order_850(po_number)
+    async def send_purchase_order_850(
+        self,
+        po_number: str,
+        *,
+        vendor_tasks: Optional[Dict[str, "asyncio.Task[Optional[dict]]"]] = None,
+    ) -> EDITransmissionResult:
+        document, file_name = await self.generate_purchase_order_850(po_number, vendor_tasks=vendor_tasks)
 
         send_dir, _ = get_edi_paths()
         os.makedirs(send_dir, exist_ok=True)
@@ -115,7 +173,7 @@ class EDIService:
             sender_id=self.sender_id,
         )
 
-        send_result = send_file(file_path, remove_local_on_success=False)
+        send_result = await self.outbox.send(file_path, remove_local_on_success=False)
 
         logfire.info(
             "EDI 850 transmission attempted",
@@ -134,3 +192,41 @@ class EDIService:
             remote_path=send_result.remote_path,
             message=send_result.message,
         )
+
+    async def send_purchase_orders_850(
+        self,
+        po_numbers: Sequence[str],
+        *,
+        max_concurrency: Optional[int] = None,
+    ) -> List[EDIBulkTransmissionResult]:
+        """Generate and transmit several 850s, preparing up to `max_concurrency` at once.
+
+        Documents reach the outbox while others are still being prepared, so they are
+        uploaded together over the outbox's shared SFTP session. Failures are reported
+        per purchase order instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.edi_bulk_send_max_concurrency)
+        vendor_tasks: Dict[str, "asyncio.Task[Optional[dict]]"] = {}
+
+        async def _send(po_number: str) -> EDIBulkTransmissionResult:
+            try:
+                async with semaphore:
+                    result = await self.send_purchase_order_850(po_number, vendor_tasks=vendor_tasks)
+            except Exception as exc:
+                return _bulk_error(po_number, exc)
+            return EDIBulkTransmissionResult(po_number=po_number, result=result)
+
+        try:
+            return list(await asyncio.gather(*(_send(po_number) for po_number in dict.fromkeys(po_numbers))))
+        finally:
+            for task in vendor_tasks.values():
+                task.cancel()
+
+
+def _bulk_error(po_number: str, exc: Exception) -> EDIBulkTransmissionResult:
+    if isinstance(exc, BaseAPIException):
+        error = {"code": exc.error_code, "message": exc.detail, "context": exc.context}
+    else:
+        logger.error("Unexpected error sending EDI 850 for purchase order %s", po_number, exc_info=exc)
+        error = {"code": "INTERNAL_ERROR", "message": "Failed to send the EDI 850 for the purchase order"}
+    return EDIBulkTransmissionResult(po_number=po_number, error=error)
@@ -0,0 +1,310 @@
+"""Outbound SFTP queue for EDI documents.
+
+`migration.edi.send_file` opens a new SSH connection, walks the remote directory tree
+and disconnects for every document, and it is synchronous, so calling it from an async
+route blocks the event loop for the whole handshake. The outbox instead owns one
+dedicated worker thread holding a kept-alive SFTP session: callers enqueue files and
+await a future, the worker uploads whatever accumulated in the batch window over the
+same connection, remembers which remote directories already exist, and closes the
+session after a period of inactivity.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import posixpath
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import logfire
+
+from app.settings import settings
+from migration.edi import SFTPSendResult
+from migration.edi import send_recieve
+
+Connector = Callable[[], Tuple[Any, Any]]
+
+
+@dataclass
+class _OutboundFile:
+    local_path: str
+    remote_folder: str
+    remove_local: bool
+    future: "Future[SFTPSendResult]"
+
+
+def _default_connect() -> Tuple[Any, Any]:
+    return send_recieve._connect_sftp(
+        send_recieve.HOST,
+        send_recieve.PORT,
+        send_recieve.USERNAME,
+        send_recieve.PASSWORD,
+    )
+
+
+class _SFTPSession:
+    """One SSH/SFTP connection plus the remote directories known to exist on it."""
+
+    def __init__(self, connect: Connector, keepalive_seconds: int) -> None:
+        self._connect = connect
+        self._keepalive_seconds = keepalive_seconds
+        self._ssh: Any = None
+        self._sftp: Any = None
+        self.known_directories: Set[str] = set()
+
+    @property
+    def is_open(self) -> bool:
+        return self._sftp is not None
+
+    def alive(self) -> bool:
+        if self._ssh is None:
+            return False
+        transport = self._ssh.get_transport()
+        return bool(transport is not None and transport.is_active())
+
+    def client(self) -> Tuple[Any, bool]:
+        """Return the SFTP client and whether a new connection had to be opened."""
+        if self._sftp is not None and self.alive():
+            return self._sftp, False
+        self.close()
+        self._ssh, self._sftp = self._connect()
+        transport = self._ssh.get_transport()
+        if transport is not None and self._keepalive_seconds:
+            transport.set_keepalive(self._keepalive_seconds)
+        return self._sftp, True
+
+    def close(self) -> None:
+        for resource in (self._sftp, self._ssh):
+            if resource is None:
+                continue
+            try:
+                resource.close()
+            except Exception:
+                pass
+        self._ssh = self._sftp = None
+        # Another connection may land on a different server node; re-check directories.
+        self.known_directories.clear()
+
+
+class SFTPOutbox:
+    """Queue of EDI files uploaded in batches over a kept-alive SFTP session."""
+
+    def __init__(
+        self,
+        *,
+        connect: Optional[Connector] = None,
+        remote_folder_path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        batch_window_seconds: Optional[float] = None,
+        idle_timeout_seconds: Optional[float] = None,
+        keepalive_seconds: Optional[int] = None,
+    ) -> None:
+        self._connect = connect or _default_connect
+        self._remote_folder_path = remote_folder_path
+        self.batch_size = batch_size or settings.edi_sftp_batch_size
+        self.batch_window_seconds = (
+            settings.edi_sftp_batch_window_ms / 1000 if batch_window_seconds is None else batch_window_seconds
+        )
+        self.idle_timeout_seconds = (
+            settings.edi_sftp_idle_timeout_seconds if idle_timeout_seconds is None else idle_timeout_seconds
+        )
+        self.keepalive_seconds = settings.edi_sftp_keepalive_seconds if keepalive_seconds is None else keepalive_seconds
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_OutboundFile]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._session_open = False
+        self._counters: Dict[str, int] = {
+            "connections_opened": 0,
+            "batches": 0,
+            "files_sent": 0,
+            "files_failed": 0,
+        }
+
+    def submit(
+        self,
+        local_file_path: str,
+        *,
+        remote_folder_path: Optional[str] = None,
+        remove_local_on_success: bool = False,
+    ) -> "Future[SFTPSendResult]":
+        """Queue `local_file_path` for upload; the future resolves once it was attempted."""
+        remote_folder = remote_folder_path or self._remote_folder_path or send_recieve.REMOTE_FOLDER_SEND
+        item = _OutboundFile(local_file_path, remote_folder, remove_local_on_success, Future())
+        with self._lock:
+            self._ensure_worker()
+            self._queue.put(item)
+        return item.future
+
+    async def send(
+        self,
+        local_file_path: str,
+        *,
+        remote_folder_path: Optional[str] = None,
+        remove_local_on_success: bool = False,
+    ) -> SFTPSendResult:
+        future = self.submit(
+            local_file_path,
+            remote_folder_path=remote_folder_path,
+            remove_local_on_success=remove_local_on_success,
+        )
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "queued": self._queue.qsize(),
+                "worker_running": bool(self._thread and self._thread.is_alive()),
+                "session_open": self._session_open,
+            }
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Upload what is already queued, close the session and stop the worker."""
+        with self._lock:
+            thread, work = self._thread, self._queue
+            self._thread = None
+            self._queue = queue.Queue()
+        if thread is None:
+            return
+        work.put(None)
+        thread.join(timeout)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._queue,),
+            name="edi-sftp-outbox",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, work: "queue.Queue[Optional[_OutboundFile]]") -> None:
+        session = _SFTPSession(self._connect, self.keepalive_seconds)
+        try:
+            while True:
+                try:
+                    item = work.get(timeout=self.idle_timeout_seconds)
+                except queue.Empty:
+                    if session.is_open:
+                        logfire.info("Closing idle EDI SFTP session")
+                        self._close(session)
+                    continue
+                if item is None:
+                    break
+                batch, stop = self._collect_batch(work, item)
+                try:
+                    self._send_batch(session, batch)
+                except Exception as exc:  # pragma: no cover - defensive; keep the worker alive
+                    logfire.error("EDI SFTP batch failed unexpectedly", error=str(exc))
+                    self._close(session)
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_result(SFTPSendResult(False, message=str(exc)))
+                if stop:
+                    break
+        finally:
+            self._close(session)
+            # Anything queued behind the stop sentinel is failed rather than left hanging.
+            while True:
+                try:
+                    leftover = work.get_nowait()
+                except queue.Empty:
+                    break
+                if leftover is not None and leftover.future.set_running_or_notify_cancel():
+                    leftover.future.set_result(SFTPSendResult(False, message="EDI outbox is shutting down"))
+
+    def _collect_batch(
+        self, work: "queue.Queue[Optional[_OutboundFile]]", first: _OutboundFile
+    ) -> Tuple[List[_OutboundFile], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = work.get(timeout=remaining) if remaining > 0 else work.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _send_batch(self, session: _SFTPSession, batch: List[_OutboundFile]) -> None:
+        pending = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+        self._count("batches")
+        with logfire.span("EDI SFTP batch upload", files=len(pending)):
+            reconnected = False
+            while pending:
+                try:
+                    sftp, opened = session.client()
+                except Exception as exc:  # pragma: no cover - network/IO heavy
+                    logfire.error("EDI SFTP connection failed", error=str(exc))
+                    for item in pending:
+                        self._finish(item, SFTPSendResult(False, message=str(exc)))
+                    self._close(session)
+                    return
+                if opened:
+                    self._count("connections_opened")
+                    with self._lock:
+                        self._session_open = True
+
+                item = pending[0]
+                try:
+                    result = self._upload(session, sftp, item)
+                except Exception as exc:
+                    if not session.alive() and not reconnected:
+                        # The kept-alive connection went stale; retry the rest on a fresh one.
+                        logfire.warn("EDI SFTP session dropped; reconnecting", error=str(exc))
+                        reconnected = True
+                        self._close(session)
+                        continue
+                    logfire.error("EDI SFTP transfer failed", file=item.local_path, error=str(exc))
+                    result = SFTPSendResult(False, message=str(exc))
+                self._finish(item, result)
+                pending.pop(0)
+
+    def _upload(self, session: _SFTPSession, sftp: Any, item: _OutboundFile) -> SFTPSendResult:
+        if not os.path.isfile(item.local_path):
+            return SFTPSendResult(False, message=f"Local file does not exist: {item.local_path}")
+
+        remote_path = send_recieve._remote_path_for(item.local_path, item.remote_folder)
+        send_recieve._ensure_remote_directory(sftp, posixpath.dirname(remote_path), session.known_directories)
+        logfire.info("Uploading EDI document", file=item.local_path, remote_path=remote_path)
+        sftp.put(item.local_path, remote_path)
+
+        if item.remove_local:
+            try:
+                os.remove(item.local_path)
+            except OSError as exc:
+                logfire.warn(
+                    "Failed to remove local EDI file after transfer",
+                    file=item.local_path,
+                    error=str(exc),
+                )
+        return SFTPSendResult(True, remote_path=remote_path)
+
+    def _finish(self, item: _OutboundFile, result: SFTPSendResult) -> None:
+        self._count("files_sent" if result.success else "files_failed")
+        item.future.set_result(result)
+
+    def _close(self, session: _SFTPSession) -> None:
+        session.close()
+        with self._lock:
+            self._session_open = False
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+
+edi_outbox = SFTPOutbox()
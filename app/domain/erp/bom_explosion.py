@@ -0,0 +1,369 @@
+"""
+Reusable BOM explosion engine shared by the tariff and production costing services.
+
+Each BOM level is fetched with one batched Business Central query and the component
+items of that level are resolved concurrently; concurrent explosions on one engine
+share in-flight lookups. Flattened sub-assemblies are memoized
+process-wide and dropped whenever the production costing snapshot watermark for BOMs
+moves (or the memo outlives its TTL).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.adapters.erp_client import ERPClient
+from app.errors import DatabaseError, ERPError
+from app.integrations.cedule_production_costing_repository import CeduleProductionCostingRepository
+from app.integrations.sql_executor import CEDULE_DB, run_sql
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BomLine = Dict[str, Any]
+
+
+class BomExplosionCache:
+    """Process-wide memo of raw BOM lines and flattened sub-assemblies."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: Optional[int] = None,
+        watermark_check_seconds: Optional[int] = None,
+    ) -> None:
+        self._ttl = float(
+            settings.bom_explosion_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        )
+        self._check_interval = float(
+            settings.bom_explosion_watermark_check_seconds
+            if watermark_check_seconds is None
+            else watermark_check_seconds
+        )
+        self._raw_lines: Dict[str, List[BomLine]] = {}
+        self._flattened: Dict[str, Tuple[BomLine, ...]] = {}
+        self._loaded_at = time.monotonic()
+        self._watermark: Optional[dt.datetime] = None
+        self._watermark_checked_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    @property
+    def watermark(self) -> Optional[dt.datetime]:
+        return self._watermark
+
+    def invalidate(self) -> None:
+        """Drop every memoized BOM (called when BOM snapshots change)."""
+        self._raw_lines.clear()
+        self._flattened.clear()
+        self._loaded_at = time.monotonic()
+
+    async def refresh(self, repository: Optional[CeduleProductionCostingRepository]) -> None:
+        """Expire the memo on TTL and when the BOM snapshot watermark has moved."""
+        now = time.monotonic()
+        if now - self._loaded_at > self._ttl:
+            self.invalidate()
+
+        if repository is None or not repository.is_configured:
+            return
+        if (
+            self._watermark_checked_at is not None
+            and now - self._watermark_checked_at < self._check_interval
+        ):
+            return
+
+        self._watermark_checked_at = now
+        try:
+            watermark = await run_sql(CEDULE_DB, repository.get_source_last_modified, "bom")
+        except DatabaseError as exc:
+            logger.warning(
+                "Unable to read BOM snapshot watermark; keeping memoized explosions",
+                extra={"error": str(exc)},
+            )
+            return
+
+        if watermark != self._watermark:
+            if self._raw_lines or self._flattened:
+                logger.info(
+                    "BOM snapshot watermark moved; invalidating memoized explosions",
+                    extra={"previous": self._watermark, "current": watermark},
+                )
+            self.invalidate()
+            self._watermark = watermark
+
+    def get_raw_lines(self, bom_no: str) -> Optional[List[BomLine]]:
+        return self._raw_lines.get(bom_no)
+
+    def put_raw_lines(self, bom_no: str, lines: List[BomLine]) -> None:
+        if self.enabled:
+            self._raw_lines[bom_no] = lines
+
+    def get_flattened(self, bom_no: str) -> Optional[Tuple[BomLine, ...]]:
+        return self._flattened.get(bom_no)
+
+    def put_flattened(self, bom_no: str, lines: Tuple[BomLine, ...]) -> None:
+        if self.enabled:
+            self._flattened[bom_no] = lines
+
+
+class BomExplosionEngine:
+    """Explode production BOMs level by level into leaf component lines."""
+
+    def __init__(
+        self,
+        *,
+        erp_client: Optional[ERPClient] = None,
+        cache: Optional[BomExplosionCache] = None,
+        repository: Optional[CeduleProductionCostingRepository] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        self._client = erp_client or ERPClient()
+        self._cache = cache if cache is not None else bom_explosion_cache
+        self._repository = repository if repository is not None else CeduleProductionCostingRepository()
+        self._max_concurrency = max(
+            1, int(max_concurrency or settings.bom_explosion_max_concurrency)
+        )
+        self._items: Dict[str, Optional[BomLine]] = {}
+        self._bom_lines: Dict[str, List[BomLine]] = {}
+        self._flattened: Dict[str, Tuple[BomLine, ...]] = {}
+        # In-flight lookups, so concurrent explosions on one engine share fetches.
+        self._item_tasks: Dict[str, "asyncio.Future[Optional[BomLine]]"] = {}
+        self._bom_tasks: Dict[str, "asyncio.Future[Dict[str, List[BomLine]]]"] = {}
+
+    def prime_item(self, item_no: str, payload: Optional[BomLine]) -> None:
+        """Seed the per-request item cache with a payload the caller already loaded."""
+        if item_no and payload:
+            self._items[item_no] = payload
+
+    async def get_item(self, item_no: str) -> Optional[BomLine]:
+        items = await self.get_items([item_no])
+        return items.get(item_no)
+
+    async def get_items(self, item_nos: Iterable[str]) -> Dict[str, BomLine]:
+        """Resolve item payloads concurrently; unknown items are omitted from the result."""
+        unique_nos = list(dict.fromkeys(no.strip() for no in item_nos if no and no.strip()))
+        pending: Dict[str, "asyncio.Future[Optional[BomLine]]"] = {}
+        missing: List[str] = []
+        for item_no in unique_nos:
+            if item_no in self._items:
+                continue
+            task = self._item_tasks.get(item_no)
+            if task is None:
+                missing.append(item_no)
+            else:
+                pending[item_no] = task
+        if missing:
+            semaphore = asyncio.Semaphore(self._max_concurrency)
+            for item_no in missing:
+                task = asyncio.ensure_future(self._fetch_item(item_no, semaphore))
+                self._item_tasks[item_no] = pending[item_no] = task
+        if pending:
+            try:
+                payloads = await asyncio.gather(*pending.values())
+            finally:
+                for item_no in missing:
+                    self._item_tasks.pop(item_no, None)
+            for item_no, payload in zip(pending, payloads):
+                self._items[item_no] = payload
+        return {no: self._items[no] for no in unique_nos if self._items.get(no)}
+
+    async def _fetch_item(self, item_no: str, semaphore: asyncio.Semaphore) -> Optional[BomLine]:
+        async with semaphore:
+            try:
+                return await self._client.get_item(item_no)
+            except ERPError:
+                raise
+            except Exception as exc:  # pragma: no cover - defensive logging path
+                logger.warning(
+                    "Failed to load item details during BOM explosion",
+                    extra={"item_no": item_no, "error": str(exc)},
+                )
+                return None
+
+    async def get_bom_lines(self, production_bom_no: str) -> List[BomLine]:
+        lines = await self.get_bom_lines_batch([production_bom_no])
+        return lines.get((production_bom_no or "").strip(), [])
+
+    async def get_bom_lines_batch(self, production_bom_nos: Sequence[str]) -> Dict[str, List[BomLine]]:
+        """Return raw component lines for several BOMs using one batched ERP query."""
+        await self._cache.refresh(self._repository)
+        return await self._fetch_bom_lines_batch(production_bom_nos)
+
+    async def _fetch_bom_lines_batch(self, production_bom_nos: Sequence[str]) -> Dict[str, List[BomLine]]:
+        unique_nos = list(dict.fromkeys(no.strip() for no in production_bom_nos if no and no.strip()))
+        result: Dict[str, List[BomLine]] = {}
+        missing: List[str] = []
+        waiting: Dict[str, "asyncio.Future[Dict[str, List[BomLine]]]"] = {}
+        for bom_no in unique_nos:
+            lines = self._bom_lines.get(bom_no)
+            if lines is None:
+                lines = self._cache.get_raw_lines(bom_no)
+            if lines is not None:
+                self._bom_lines[bom_no] = lines
+                result[bom_no] = lines
+            elif bom_no in self._bom_tasks:
+                waiting[bom_no] = self._bom_tasks[bom_no]
+            else:
+                missing.append(bom_no)
+
+        if missing:
+            task = asyncio.ensure_future(self._client.get_bom_component_lines_batch(missing))
+            for bom_no in missing:
+                self._bom_tasks[bom_no] = task
+            try:
+                fetched = await task
+            finally:
+                for bom_no in missing:
+                    self._bom_tasks.pop(bom_no, None)
+            for bom_no in missing:
+                lines = list(fetched.get(bom_no) or [])
+                self._bom_lines[bom_no] = lines
+                self._cache.put_raw_lines(bom_no, lines)
+                result[bom_no] = lines
+        for bom_no, task in waiting.items():
+            lines = list((await task).get(bom_no) or [])
+            self._bom_lines.setdefault(bom_no, lines)
+            result[bom_no] = self._bom_lines[bom_no]
+        return result
+
+    async def explode(self, production_bom_no: str, *, multiplier: float = 1.0) -> List[BomLine]:
+        """Return leaf component lines with `Quantity_per` scaled to the top-level item."""
+        root = (production_bom_no or "").strip()
+        if not root:
+            return []
+
+        await self._cache.refresh(self._repository)
+        flattened = self._lookup_flattened(root)
+        if flattened is None:
+            await self._load_levels(root)
+            flattened, _ = self._flatten(root, set())
+        return _scale_lines(flattened, multiplier)
+
+    async def explode_quantities(
+        self, production_bom_no: str, *, multiplier: float = 1.0
+    ) -> Dict[str, float]:
+        """Return the flattened component → total quantity map for a BOM."""
+        quantities: Dict[str, float] = {}
+        for line in await self.explode(production_bom_no, multiplier=multiplier):
+            item_no = (line.get("No") or "").strip()
+            quantities[item_no] = quantities.get(item_no, 0.0) + _to_float(line.get("Quantity_per"))
+        return quantities
+
+    async def _load_levels(self, root: str) -> None:
+        """Fetch every BOM level below `root` breadth-first, one batched query per level."""
+        seen: Set[str] = {root}
+        frontier = [root]
+        while frontier:
+            lines_by_bom = await self._fetch_bom_lines_batch(frontier)
+            component_nos: List[str] = []
+            for bom_no in frontier:
+                for line in filter_component_lines(lines_by_bom.get(bom_no)):
+                    if _to_float(line.get("Quantity_per")) > 0:
+                        component_nos.append((line.get("No") or "").strip())
+
+            items = await self.get_items(component_nos)
+            next_frontier: List[str] = []
+            for item_no in dict.fromkeys(component_nos):
+                nested = _nested_bom_no(items.get(item_no))
+                if nested and nested not in seen and self._lookup_flattened(nested) is None:
+                    seen.add(nested)
+                    next_frontier.append(nested)
+            frontier = next_frontier
+
+    def _flatten(self, bom_no: str, path: Set[str]) -> Tuple[Tuple[BomLine, ...], bool]:
+        """Flatten an already-loaded BOM; results touched by a cycle are not memoized."""
+        memoized = self._lookup_flattened(bom_no)
+        if memoized is not None:
+            return memoized, True
+        if bom_no in path:
+            logger.warning(
+                "Detected recursive BOM reference; skipping nested expansion",
+                extra={"bom_no": bom_no},
+            )
+            return (), False
+
+        path.add(bom_no)
+        raw_lines = self._bom_lines.get(bom_no) or []
+
+        collected: List[BomLine] = []
+        complete = True
+        for line in filter_component_lines(raw_lines):
+            item_no = (line.get("No") or "").strip()
+            quantity = _to_float(line.get("Quantity_per"))
+            if quantity <= 0:
+                continue
+
+            nested = _nested_bom_no(self._items.get(item_no))
+            if nested:
+                nested_lines, nested_complete = self._flatten(nested, path)
+                complete = complete and nested_complete
+                collected.extend(_scale_lines(nested_lines, quantity))
+            else:
+                line_copy = dict(line)
+                line_copy["Quantity_per"] = quantity
+                collected.append(line_copy)
+
+        path.remove(bom_no)
+        flattened = tuple(collected)
+        if complete:
+            self._flattened[bom_no] = flattened
+            self._cache.put_flattened(bom_no, flattened)
+        return flattened, complete
+
+    def _lookup_flattened(self, bom_no: str) -> Optional[Tuple[BomLine, ...]]:
+        flattened = self._flattened.get(bom_no)
+        if flattened is None:
+            flattened = self._cache.get_flattened(bom_no)
+            if flattened is not None:
+                # Pin the shared result locally so a concurrent invalidation cannot
+                # drop it halfway through this explosion.
+                self._flattened[bom_no] = flattened
+        return flattened
+
+
+def filter_component_lines(raw_lines: Optional[Sequence[BomLine]]) -> List[BomLine]:
+    """Keep only inventory component lines with a valid item number."""
+    filtered: List[BomLine] = []
+    if not raw_lines:
+        return filtered
+    for line in raw_lines:
+        line_type = (line.get("Type") or "").strip().lower()
+        item_no = (line.get("No") or "").strip()
+        if line_type != "item" or not item_no:
+            continue
+        filtered.append(line)
+    return filtered
+
+
+def _nested_bom_no(item_payload: Optional[BomLine]) -> str:
+    if not item_payload:
+        return ""
+    return (item_payload.get("Production_BOM_No") or "").strip()
+
+
+def _scale_lines(lines: Iterable[BomLine], multiplier: float) -> List[BomLine]:
+    scaled: List[BomLine] = []
+    for line in lines:
+        line_copy = dict(line)
+        if multiplier != 1.0:
+            line_copy["Quantity_per"] = _to_float(line.get("Quantity_per")) * multiplier
+        scaled.append(line_copy)
+    return scaled
+
+
+def _to_float(value: Optional[object]) -> float:
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+bom_explosion_cache = BomExplosionCache()
@@ -5,7 +5,7 @@ from __future__ import annotations
 from contextlib import contextmanager
 import base64
 import logging
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
 
 import httpx
 import logfire
@@ -47,6 +47,7 @@ class BusinessCentralODataService:
         filter_field: Optional[str] = None,
         filter_value: Optional[FilterValue] = None,
         top: Optional[int] = None,
+        select: Optional[Sequence[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Retrieve an OData collection from Business Central.
@@ -56,23 +57,12 @@ class BusinessCentralODataService:
             filter_field: Optional field to filter with equality.
             filter_value: Value to compare against using OData eq operator. Supports str, int, float, or bool.
             top: Optional number of records to return (`$top`).
+            select: Optional fields to project server-side (`$select`).
 
         Returns:
             List of dictionaries representing collection entries.
         """
-        params: Dict[str, str] = {}
-
-        if filter_field and filter_value is not None:
-            if isinstance(filter_value, str):
-                sanitized_value = filter_value.replace("'", "''")
-                params["$filter"] = f"{filter_field} eq '{sanitized_value}'"
-            elif isinstance(filter_value, bool):
-                params["$filter"] = f"{filter_field} eq {'true' if filter_value else 'false'}"
-            else:
-                params["$filter"] = f"{filter_field} eq {filter_value}"
-
-        if top is not None:
-            params["$top"] = str(top)
+        params = self._collection_params(filter_field, filter_value, top, select)
 
         url_path = resource.lstrip("/")
 
@@ -194,19 +184,7 @@ class BusinessCentralODataService:
 
         Uses @odata.nextLink when present to continue fetching.
         """
-        params: Dict[str, str] = {}
-
-        if filter_field and filter_value is not None:
-            if isinstance(filter_value, str):
-                sanitized_value = filter_value.replace("'", "''")
-                params["$filter"] = f"{filter_field} eq '{sanitized_value}'"
-            elif isinstance(filter_value, bool):
-                params["$filter"] = f"{filter_field} eq {'true' if filter_value else 'false'}"
-            else:
-                params["$filter"] = f"{filter_field} eq {filter_value}"
-
-        if top is not None:
-            params["$top"] = str(top)
+        params = self._collection_params(filter_field, filter_value, top)
 
         url_path: Optional[str] = resource.lstrip("/")
         next_params: Optional[Dict[str, str]] = params or None
@@ -242,6 +220,78 @@ class BusinessCentralODataService:
 
         return results
 
+    async def iter_collection_pages(
+        self,
+        resource: str,
+        *,
+        filter_field: Optional[str] = None,
+        filter_value: Optional[FilterValue] = None,
+        top: Optional[int] = None,
+        select: Optional[Sequence[str]] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield an OData collection one server page at a time.
+
+        Pages are requested with `odata.maxpagesize` and followed through
+        @odata.nextLink, so callers can stream large collections without holding
+        them in memory.
+        """
+        params = self._collection_params(filter_field, filter_value, top, select)
+        max_page_size = page_size or settings.bc_odata_stream_page_size
+        headers = {"Prefer": f"odata.maxpagesize={max_page_size}"}
+        url_path: Optional[str] = resource.lstrip("/")
+        next_params: Optional[Dict[str, str]] = params or None
+
+        with _maybe_logfire_span(
+            "bc_odata.iter_collection_pages",
+            resource=url_path,
+            filter_field=filter_field,
+            has_filter=bool(filter_value),
+            top=top,
+        ):
+            async with httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                timeout=settings.request_timeout,
+                verify=False,
+            ) as client:
+                while url_path:
+                    response = await client.get(url_path, params=next_params, headers=headers)
+                    response.raise_for_status()
+                    payload = response.json()
+                    values = payload.get("value")
+                    if isinstance(values, list) and values:
+                        yield values
+                    url_path = payload.get("@odata.nextLink") or payload.get("odata.nextLink")
+                    next_params = None
+
+    @staticmethod
+    def _collection_params(
+        filter_field: Optional[str],
+        filter_value: Optional[FilterValue],
+        top: Optional[int],
+        select: Optional[Sequence[str]] = None,
+    ) -> Dict[str, str]:
+        params: Dict[str, str] = {}
+
+        if filter_field and filter_value is not None:
+            if isinstance(filter_value, str):
+                sanitized_value = filter_value.replace("'", "''")
+                params["$filter"] = f"{filter_field} eq '{sanitized_value}'"
+            elif isinstance(filter_value, bool):
+                params["$filter"] = f"{filter_field} eq {'true' if filter_value else 'false'}"
+            else:
+                params["$filter"] = f"{filter_field} eq {filter_value}"
+
+        if top is not None:
+            params["$top"] = str(top)
+
+        if select:
+            params["$select"] = ",".join(select)
+
+        return params
+
     @staticmethod
     def _build_headers() -> Dict[str, str]:
         """Construct authorization headers for Business Central."""
@@ -0,0 +1,604 @@
+"""Materialized Business Central customer directory (customer + division + ship-to + geocode)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from app.domain.erp.business_central_data_service import BusinessCentralODataService
+from app.domain.erp.customer_geocode_cache import customer_geocode_cache
+from app.domain.erp.models import CustomerAddressResponse, CustomerSummaryResponse, GeocodedLocation
+from app.integrations.sqlite_mirror import SQLiteMirrorStore
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SHIP_TO_RESOURCES = (
+    "ShipToAddress",
+    "ShipToAddresses",
+    "Ship_to_Address",
+    "Ship_to_Addresses",
+)
+_DIVISION_FILTERS = (
+    "Table_ID eq 18 and Dimension_Code eq 'Division'",
+    "Table_ID eq 18 and Dimension_Code eq 'DIVISION'",
+    "Dimension_Code eq 'Division'",
+    "Dimension_Code eq 'DIVISION'",
+    "",
+)
+
+
+@dataclass(frozen=True)
+class CustomerDirectoryRefreshResult:
+    full: bool
+    customers_seen: int
+    rows_rebuilt: int
+    rows_deleted: int
+    customer_watermark: Optional[str]
+    ship_to_watermark: Optional[str]
+
+
+def ship_to_code(record: Dict[str, Any]) -> Optional[str]:
+    for key in ("Code", "ShipToCode", "Ship_to_Code", "ShipTo_Code"):
+        value = record.get(key)
+        if value:
+            return str(value)
+    return None
+
+
+def ship_to_name(record: Dict[str, Any]) -> Optional[str]:
+    for key in ("Name", "ShipToName", "Ship_to_Name", "ShipTo_Name"):
+        value = record.get(key)
+        if value:
+            return str(value)
+    return None
+
+
+def ship_to_customer_no(record: Dict[str, Any]) -> Optional[str]:
+    customer_no = (
+        record.get("Customer_No")
+        or record.get("CustomerNo")
+        or record.get("Customer_No_")
+        or record.get("CustomerNumber")
+    )
+    return str(customer_no) if customer_no else None
+
+
+def has_address_fields(address: str) -> bool:
+    return bool(address and address.strip())
+
+
+def _dimension_code(record: Dict[str, Any]) -> str:
+    for key in ("Dimension_Code", "DimensionCode"):
+        value = record.get(key)
+        if value:
+            return str(value).strip()
+    return ""
+
+
+def _dimension_value(record: Dict[str, Any]) -> Optional[str]:
+    for key in ("Dimension_Value_Code", "DimensionValueCode", "Dimension_Value", "DimensionValue"):
+        value = record.get(key)
+        if value:
+            return str(value).strip()
+    return None
+
+
+def _dimension_table_id(record: Dict[str, Any]) -> Optional[int]:
+    for key in ("Table_ID", "TableID"):
+        value = record.get(key)
+        if value is None:
+            continue
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _modified_since(resource: str, watermark: Optional[str]) -> str:
+    if not watermark:
+        return resource
+    return resource + "?%24filter=" + quote(f"SystemModifiedAt gt {watermark}", safe="'")
+
+
+async def fetch_ship_to_map(
+    customer_nos: Optional[set[str]],
+    service: BusinessCentralODataService,
+    *,
+    modified_since: Optional[str] = None,
+    strict: bool = False,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch ShipToAddress entries once and group them by customer number.
+
+    `customer_nos=None` keeps every customer; `modified_since` limits the read to
+    entries changed after that SystemModifiedAt value. With `strict=True` a failed
+    lookup raises instead of returning an empty map, so callers that persist the
+    result cannot mistake an outage for "no ship-to addresses".
+    """
+    ship_to_records: List[Dict[str, Any]] = []
+    last_error: Optional[httpx.HTTPStatusError] = None
+    succeeded = False
+    for resource in _SHIP_TO_RESOURCES:
+        try:
+            ship_to_records = await service.fetch_collection_paged(_modified_since(resource, modified_since))
+            succeeded = True
+            if ship_to_records:
+                break
+        except httpx.HTTPStatusError as exc:
+            last_error = exc
+            continue
+        except httpx.RequestError:
+            if strict:
+                raise
+            return {}
+    if strict and not succeeded and last_error is not None:
+        raise last_error
+
+    ship_to_map: Dict[str, List[Dict[str, Any]]] = {}
+    for ship_to in ship_to_records:
+        customer_no = ship_to_customer_no(ship_to)
+        if not customer_no:
+            continue
+        if customer_nos is not None and customer_no not in customer_nos:
+            continue
+        ship_to_map.setdefault(customer_no, []).append(ship_to)
+    return ship_to_map
+
+
+async def fetch_customer_division_map(
+    customer_nos: Optional[set[str]],
+    service: BusinessCentralODataService,
+    *,
+    strict: bool = False,
+) -> Dict[str, str]:
+    """
+    Fetch customer division values from DefaultDimensions (`None` keeps every customer).
+
+    With `strict=True` a failed lookup raises instead of returning an empty map.
+    """
+    if customer_nos is not None and not customer_nos:
+        return {}
+
+    last_error: Optional[httpx.HTTPStatusError] = None
+
+    for filter_expr in _DIVISION_FILTERS:
+        if filter_expr:
+            encoded_filter = quote(filter_expr, safe="'")
+            resource = f"DefaultDimensions?%24filter={encoded_filter}"
+        else:
+            resource = "DefaultDimensions"
+        try:
+            rows = await service.fetch_collection_paged(resource)
+        except httpx.HTTPStatusError as exc:
+            status_code = exc.response.status_code if exc.response else None
+            if status_code in {400, 404}:
+                last_error = exc
+                continue
+            logger.warning(
+                "DefaultDimensions lookup failed",
+                extra={"status_code": status_code, "resource": resource},
+            )
+            if strict:
+                raise
+            return {}
+        except httpx.RequestError as exc:
+            logger.warning(
+                "DefaultDimensions lookup unavailable",
+                extra={"error": str(exc)},
+            )
+            if strict:
+                raise
+            return {}
+
+        division_map: Dict[str, str] = {}
+        for row in rows:
+            customer_no = row.get("No")
+            if not customer_no:
+                continue
+            customer_no = str(customer_no)
+            if customer_nos is not None and customer_no not in customer_nos:
+                continue
+            table_id = _dimension_table_id(row)
+            if table_id is not None and table_id != 18:
+                continue
+            if _dimension_code(row).lower() != "division":
+                continue
+            division_value = _dimension_value(row)
+            if not division_value:
+                continue
+            division_map.setdefault(customer_no, division_value)
+
+        if division_map or not filter_expr:
+            return division_map
+
+    if strict and last_error is not None:
+        raise last_error
+    return {}
+
+
+def _country(record: Dict[str, Any]) -> Optional[str]:
+    return record.get("Country_Region_Code") or record.get("CountryRegionCode") or record.get("Country")
+
+
+def _cached_geocode(customer_no: str, address: str, misses: List[Tuple[str, str]]) -> Optional[GeocodedLocation]:
+    if not has_address_fields(address):
+        return GeocodedLocation(status="MISSING_ADDRESS")
+    geocode = customer_geocode_cache.get_cached(customer_no, address)
+    if geocode is None:
+        misses.append((customer_no, address))
+    return geocode
+
+
+def build_customer_summary(
+    record: Dict[str, Any],
+    division: Optional[str],
+    ship_tos: Sequence[Dict[str, Any]],
+) -> Tuple[CustomerSummaryResponse, List[Tuple[str, str]]]:
+    """
+    Build the directory row for one customer from cached geocodes only.
+
+    Returns the summary and the (customer_no, address) pairs that still need geocoding.
+    """
+    customer_no = str(record.get("No") or "")
+    misses: List[Tuple[str, str]] = []
+    geocode = _cached_geocode(customer_no, customer_geocode_cache.build_address(record), misses)
+    summary = CustomerSummaryResponse(
+        customer_no=customer_no,
+        name=str(record.get("Name") or ""),
+        division=division,
+        city=record.get("City"),
+        postal_code=record.get("Post_Code") or record.get("PostCode"),
+        address_1=record.get("Address"),
+        address_2=record.get("Address_2") or record.get("Address2"),
+        address_3=record.get("Address_3") or record.get("Address3"),
+        address_4=record.get("Address_4") or record.get("Address4"),
+        county=record.get("County"),
+        country=_country(record),
+        geocode=geocode,
+        ship_to_addresses=[],
+    )
+    for ship_to in ship_tos:
+        summary.ship_to_addresses.append(
+            CustomerAddressResponse(
+                source="ship_to",
+                ship_to_code=ship_to_code(ship_to),
+                name=ship_to_name(ship_to),
+                address_1=ship_to.get("Address"),
+                address_2=ship_to.get("Address_2") or ship_to.get("Address2"),
+                address_3=ship_to.get("Address_3") or ship_to.get("Address3"),
+                address_4=ship_to.get("Address_4") or ship_to.get("Address4"),
+                city=ship_to.get("City"),
+                county=ship_to.get("County"),
+                postal_code=ship_to.get("Post_Code") or ship_to.get("PostCode"),
+                country=_country(ship_to),
+                geocode=_cached_geocode(
+                    customer_no, customer_geocode_cache.build_address_from_ship_to(ship_to), misses
+                ),
+            )
+        )
+    if not ship_tos:
+        summary.ship_to_addresses.append(
+            CustomerAddressResponse(
+                source="customer",
+                name=summary.name,
+                address_1=summary.address_1,
+                address_2=summary.address_2,
+                address_3=summary.address_3,
+                address_4=summary.address_4,
+                city=summary.city,
+                county=summary.county,
+                postal_code=summary.postal_code,
+                country=summary.country,
+                geocode=geocode,
+            )
+        )
+    return summary, misses
+
+
+class CustomerDirectory(SQLiteMirrorStore):
+    """
+    SQLite materialization of the customer map directory.
+
+    Each customer is stored with its raw record, ship-to addresses, division and the
+    prebuilt `CustomerSummaryResponse`, so the directory endpoint pages and projects
+    local rows instead of joining Customers, DefaultDimensions, ship-to addresses and
+    the geocode cache on every request. `refresh` reads customers and ship-tos changed
+    since their own SystemModifiedAt watermarks; a periodic full refresh drops deleted
+    customers and ship-to addresses. A failed Business Central lookup aborts the
+    refresh before anything is written.
+    """
+
+    _label = "customer directory"
+    _state_table = "bc_customer_directory_state"
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self._refresh_lock = asyncio.Lock()
+        self._background_refresh: Optional[asyncio.Task] = None
+        super().__init__(db_path or settings.bc_customer_directory_db_path)
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bc_customer_directory (
+                    customer_no TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    name_search TEXT NOT NULL,
+                    division TEXT,
+                    record_json TEXT NOT NULL,
+                    ship_tos_json TEXT NOT NULL,
+                    summary_json TEXT NOT NULL,
+                    has_geocode INTEGER NOT NULL DEFAULT 0,
+                    modified_at TEXT
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_bc_customer_directory_name "
+                "ON bc_customer_directory (name_search)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_bc_customer_directory_division "
+                "ON bc_customer_directory (division)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_bc_customer_directory_geocode "
+                "ON bc_customer_directory (has_geocode)"
+            )
+            self._create_state_table(conn)
+            conn.commit()
+
+    def page(
+        self,
+        *,
+        page: int = 1,
+        per_page: int = 100,
+        division: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return (total, summaries) for one page ordered by customer name."""
+        if not self._enabled:
+            return 0, []
+        clauses: List[str] = []
+        params: List[Any] = []
+        if division:
+            clauses.append("division = ?")
+            params.append(division)
+        if search:
+            clauses.append("(name_search LIKE ? OR customer_no LIKE ?)")
+            term = search.strip().lower()
+            params.extend([f"%{term}%", f"{search.strip()}%"])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            (total,) = conn.execute(f"SELECT COUNT(*) FROM bc_customer_directory {where}", params).fetchone()
+            rows = conn.execute(
+                f"""
+                SELECT summary_json FROM bc_customer_directory {where}
+                ORDER BY name_search, customer_no
+                LIMIT ? OFFSET ?
+                """,
+                [*params, int(per_page), max(int(page) - 1, 0) * int(per_page)],
+            ).fetchall()
+        return int(total), [json.loads(summary_json) for (summary_json,) in rows]
+
+    def status(self) -> Dict[str, Any]:
+        if not self._enabled:
+            return {"configured": False}
+        with self._connect() as conn:
+            (count, without_geocode) = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(1 - has_geocode), 0) FROM bc_customer_directory"
+            ).fetchone()
+            state = self._all_state(conn)
+        return {
+            "configured": True,
+            "customer_count": int(count),
+            "customers_missing_geocode": int(without_geocode),
+            "customer_watermark": state.get("customer_watermark") or state.get("watermark"),
+            "ship_to_watermark": state.get("ship_to_watermark") or state.get("watermark"),
+            "last_refreshed_at": state.get("last_refreshed_at"),
+            "last_full_refresh_at": state.get("last_full_refresh_at"),
+        }
+
+    @property
+    def is_seeded(self) -> bool:
+        return self._get_state("last_refreshed_at") is not None
+
+    def refresh_in_background_if_cold(self, service: Optional[BusinessCentralODataService] = None) -> bool:
+        """Start one background refresh when the directory was never built; returns whether one runs."""
+        if not self._enabled or self.is_seeded:
+            return False
+        if self._background_refresh is None or self._background_refresh.done():
+            self._background_refresh = asyncio.create_task(
+                _refresh_logged(self, service or BusinessCentralODataService())
+            )
+        return True
+
+    async def refresh(
+        self, service: BusinessCentralODataService, *, full: Optional[bool] = None
+    ) -> CustomerDirectoryRefreshResult:
+        """
+        Bring the directory up to date with Business Central.
+
+        `full=None` runs a full rebuild when none has happened within
+        `bc_customer_directory_full_refresh_hours`, otherwise an incremental one.
+        """
+        if not self._enabled:
+            raise ValueError("Customer directory storage not configured")
+        async with self._refresh_lock:
+            if full is None:
+                full = self._full_refresh_due(settings.bc_customer_directory_full_refresh_hours)
+            # Customers and ship-tos advance independently: a newer customer change must
+            # not skip ship-to changes that are older but not read yet.
+            legacy = None if full else self._get_state("watermark")
+            customer_watermark = None if full else (self._get_state("customer_watermark") or legacy)
+            ship_to_watermark = None if full else (self._get_state("ship_to_watermark") or legacy)
+
+            # Every lookup is strict: an outage raises here, before anything is written,
+            # instead of reading as "no divisions" or "no ship-to addresses".
+            customers: Dict[str, Dict[str, Any]] = {}
+            async for page in service.iter_collection_pages(_modified_since("Customers", customer_watermark)):
+                for record in page:
+                    if record.get("No"):
+                        customers[str(record["No"])] = record
+            ship_to_map, division_map = await asyncio.gather(
+                fetch_ship_to_map(None, service, modified_since=ship_to_watermark, strict=True),
+                fetch_customer_division_map(None, service, strict=True),
+            )
+
+            stored = self._load_rows()
+            touched = set(customers) | {no for no in ship_to_map if no in stored or no in customers}
+            touched |= {no for no, row in stored.items() if row["division"] != division_map.get(no)}
+            # Geocodes land in the cache asynchronously; pick them up on the next pass.
+            touched |= {no for no, row in stored.items() if not row["has_geocode"]}
+
+            rows: List[Tuple[Any, ...]] = []
+            misses: List[Tuple[str, str]] = []
+            for customer_no in touched:
+                record = customers.get(customer_no) or (stored.get(customer_no) or {}).get("record")
+                if record is None:
+                    continue
+                if full:
+                    ship_tos = ship_to_map.get(customer_no, [])
+                else:
+                    ship_tos = _merge_ship_tos(
+                        stored.get(customer_no, {}).get("ship_tos", []), ship_to_map.get(customer_no, [])
+                    )
+                division = division_map.get(customer_no)
+                summary, row_misses = build_customer_summary(record, division, ship_tos)
+                misses.extend(row_misses)
+                rows.append(
+                    (
+                        customer_no,
+                        summary.name,
+                        summary.name.lower(),
+                        division,
+                        json.dumps(record, default=str),
+                        json.dumps(ship_tos, default=str),
+                        summary.model_dump_json(),
+                        0 if row_misses else 1,
+                        record.get("SystemModifiedAt"),
+                    )
+                )
+
+            deleted = [no for no in stored if no not in customers] if full else []
+            self._write_rows(rows, deleted)
+
+            new_customer_watermark = _max_modified(customer_watermark, customers.values())
+            new_ship_to_watermark = _max_modified(
+                ship_to_watermark, (ship_to for ship_tos in ship_to_map.values() for ship_to in ship_tos)
+            )
+            now = datetime.now(timezone.utc).isoformat()
+            if new_customer_watermark:
+                self._set_state("customer_watermark", new_customer_watermark)
+            if new_ship_to_watermark:
+                self._set_state("ship_to_watermark", new_ship_to_watermark)
+            self._set_state("last_refreshed_at", now)
+            if full:
+                self._set_state("last_full_refresh_at", now)
+
+        for customer_no, address in dict.fromkeys(misses):
+            await customer_geocode_cache.schedule_refresh(customer_no, address)
+
+        logger.info(
+            "Customer directory refreshed",
+            extra={
+                "full": full,
+                "customers_seen": len(customers),
+                "rows_rebuilt": len(rows),
+                "rows_deleted": len(deleted),
+            },
+        )
+        return CustomerDirectoryRefreshResult(
+            full=full,
+            customers_seen=len(customers),
+            rows_rebuilt=len(rows),
+            rows_deleted=len(deleted),
+            customer_watermark=new_customer_watermark,
+            ship_to_watermark=new_ship_to_watermark,
+        )
+
+    def _load_rows(self) -> Dict[str, Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT customer_no, division, record_json, ship_tos_json, has_geocode FROM bc_customer_directory"
+            ).fetchall()
+        return {
+            customer_no: {
+                "division": division,
+                "record": json.loads(record_json),
+                "ship_tos": json.loads(ship_tos_json),
+                "has_geocode": bool(has_geocode),
+            }
+            for customer_no, division, record_json, ship_tos_json, has_geocode in rows
+        }
+
+    def _write_rows(self, rows: Iterable[Tuple[Any, ...]], deleted: Iterable[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO bc_customer_directory
+                    (customer_no, name, name_search, division, record_json, ship_tos_json,
+                     summary_json, has_geocode, modified_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(customer_no) DO UPDATE SET
+                    name = excluded.name,
+                    name_search = excluded.name_search,
+                    division = excluded.division,
+                    record_json = excluded.record_json,
+                    ship_tos_json = excluded.ship_tos_json,
+                    summary_json = excluded.summary_json,
+                    has_geocode = excluded.has_geocode,
+                    modified_at = excluded.modified_at
+                """,
+                rows,
+            )
+            conn.executemany(
+                "DELETE FROM bc_customer_directory WHERE customer_no = ?",
+                [(customer_no,) for customer_no in deleted],
+            )
+            conn.commit()
+
+
+def _max_modified(watermark: Optional[str], records: Iterable[Dict[str, Any]]) -> Optional[str]:
+    return max(
+        [watermark or ""] + [str(record["SystemModifiedAt"]) for record in records if record.get("SystemModifiedAt")]
+    ) or None
+
+
+def _merge_ship_tos(
+    existing: Sequence[Dict[str, Any]], changed: Sequence[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Overlay changed ship-to entries onto the stored ones, matching by code."""
+    merged = {ship_to_code(ship_to) or f"#{index}": ship_to for index, ship_to in enumerate(existing)}
+    for index, ship_to in enumerate(changed):
+        merged[ship_to_code(ship_to) or f"#new{index}"] = ship_to
+    return list(merged.values())
+
+
+async def _refresh_logged(directory: CustomerDirectory, service: BusinessCentralODataService) -> None:
+    try:
+        await directory.refresh(service)
+    except (httpx.HTTPError, ValueError) as exc:
+        logger.warning("Customer directory refresh failed", extra={"error": str(exc)})
+    except Exception:
+        logger.exception("Customer directory refresh failed unexpectedly")
+
+
+async def refresh_customer_directory() -> None:
+    """Scheduled refresh of the customer directory (also seeds it at startup)."""
+    if not customer_directory.is_configured:
+        logger.warning("Customer directory not configured; skipping refresh")
+        return
+    await _refresh_logged(customer_directory, BusinessCentralODataService())
+
+
+customer_directory = CustomerDirectory()
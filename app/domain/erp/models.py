@@ -284,6 +284,25 @@ class TariffCalculationResponse(BaseModel):
     report: Optional[str] = None
 
 
+class TariffBatchRequest(BaseModel):
+    """Items to run through the tariff calculator in one batch."""
+
+    item_ids: List[str] = Field(..., min_length=1, max_length=1000, description="Finished-good item numbers")
+    include_details: bool = Field(
+        False,
+        description="Include the detailed materials table and formatted report for each item.",
+    )
+
+
+class TariffBatchItemResult(BaseModel):
+    """Per-item outcome of a batch tariff calculation (one NDJSON line)."""
+
+    item_id: str
+    status: str = Field(..., description="ok|error")
+    result: Optional[TariffCalculationResponse] = None
+    error: Optional[Dict[str, Any]] = None
+
+
 class ProductionItemInfo(BaseModel):
     """Minimal production-facing item fields (routing/BOM links)."""
 
@@ -369,6 +388,13 @@ class ProductionRoutingCostResponse(BaseModel):
     total_setup_cost: Decimal = Field(default=Decimal("0"), description="Sum of setup costs across lines")
     total_run_cost: Decimal = Field(default=Decimal("0"), description="Sum of run costs across lines")
     total_cost: Decimal = Field(default=Decimal("0"), description="Total routing cost")
+    source: str = Field(
+        default="erp",
+        description="Where routing lines were read from: snapshot (Cedule costing snapshot) or erp",
+    )
+    snapshot_scan_id: Optional[str] = Field(
+        None, description="Costing snapshot scan that provided the routing lines when source=snapshot"
+    )
 
     class Config:
         json_encoders = {Decimal: lambda v: float(v) if v is not None else None}
@@ -424,6 +450,28 @@ class PostedSalesInvoiceCommentCreate(BaseModel):
     model_config = ConfigDict(extra="forbid", populate_by_name=True)
 
 
+class PostedSalesInvoiceTrackingBatchRequest(BaseModel):
+    """Request body for resolving many carrier tracking numbers at once."""
+
+    tracking_numbers: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=5000,
+        description="Carrier tracking numbers (Package_Tracking_No)",
+    )
+    transport_line_no: str = Field(
+        default="41800",
+        min_length=1,
+        description="Line No to extract transport charge from posted invoice lines",
+    )
+    live_fallback: bool = Field(
+        default=False,
+        description="Query Business Central directly for tracking numbers missing from the index",
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
 class BusinessCentralRecordCreate(BaseModel):
     """Request body for creating a Business Central record."""
 
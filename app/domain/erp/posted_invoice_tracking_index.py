@@ -0,0 +1,298 @@
+"""Local index of package tracking numbers to posted sales invoices."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from app.domain.erp.business_central_data_service import BusinessCentralODataService
+from app.integrations.sqlite_mirror import SQLiteMirrorStore
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_HEADER_RESOURCES = ("PostedSalesInvoices", "PostedSalesInvoiceHeaders")
+_LINE_DOCUMENT_FIELDS = ("Document_No", "DocumentNo")
+_TRACKING_FIELDS = ("Package_Tracking_No", "PackageTrackingNo", "Package_Tracking_No_")
+_LINES_PER_REQUEST = 20
+_LINE_FETCH_CONCURRENCY = 4
+_LOOKUP_CHUNK = 500
+
+IndexedInvoice = Tuple[Dict[str, Any], List[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class TrackingIndexSyncResult:
+    invoices_seen: int
+    invoices_indexed: int
+    watermark: Optional[str]
+
+
+def _tracking_no(header: Dict[str, Any]) -> Optional[str]:
+    for key in _TRACKING_FIELDS:
+        value = header.get(key)
+        if value and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def _odata_string(value: str) -> str:
+    escaped = value.replace("'", "''")
+    return f"'{escaped}'"
+
+
+def _invoice_no(record: Dict[str, Any]) -> Optional[str]:
+    for key in ("No", "Document_No", "DocumentNo"):
+        value = record.get(key)
+        if value:
+            return str(value)
+    return None
+
+
+class PostedInvoiceTrackingIndex(SQLiteMirrorStore):
+    """
+    SQLite index of Package_Tracking_No -> posted sales invoice header and lines.
+
+    `sync` pulls invoices modified since the stored SystemModifiedAt watermark, so
+    carrier-statement reconciliation resolves hundreds of tracking numbers with local
+    lookups instead of several OData calls per shipment. The index is seeded at startup
+    and kept current by the scheduled sync; request paths only ever start a background
+    sync, they never wait on one.
+    """
+
+    _label = "tracking index"
+    _state_table = "bc_tracking_index_state"
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self._sync_lock = asyncio.Lock()
+        self._background_sync: Optional[asyncio.Task] = None
+        super().__init__(db_path or settings.bc_tracking_index_db_path)
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bc_tracking_invoices (
+                    invoice_no TEXT PRIMARY KEY,
+                    tracking_no TEXT NOT NULL,
+                    header_json TEXT NOT NULL,
+                    lines_json TEXT NOT NULL,
+                    modified_at TEXT
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_bc_tracking_invoices_tracking_no "
+                "ON bc_tracking_invoices (tracking_no)"
+            )
+            self._create_state_table(conn)
+            conn.commit()
+
+    def lookup(self, tracking_numbers: Iterable[str]) -> Dict[str, List[IndexedInvoice]]:
+        """Map each known tracking number to its indexed (header, lines) pairs."""
+        if not self._enabled:
+            return {}
+        keys = list(dict.fromkeys(number for number in tracking_numbers if number))
+        found: Dict[str, List[IndexedInvoice]] = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start : start + _LOOKUP_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"""
+                    SELECT tracking_no, header_json, lines_json
+                    FROM bc_tracking_invoices
+                    WHERE tracking_no IN ({placeholders})
+                    ORDER BY tracking_no, invoice_no
+                    """,
+                    chunk,
+                ).fetchall()
+                for tracking_no, header_json, lines_json in rows:
+                    found.setdefault(tracking_no, []).append((json.loads(header_json), json.loads(lines_json)))
+        return found
+
+    def status(self) -> Dict[str, Any]:
+        if not self._enabled:
+            return {"configured": False}
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM bc_tracking_invoices").fetchone()
+            state = self._all_state(conn)
+        return {
+            "configured": True,
+            "invoice_count": int(count),
+            "watermark": state.get("watermark"),
+            "last_synced_at": state.get("last_synced_at"),
+        }
+
+    def seconds_since_sync(self) -> Optional[float]:
+        return self._seconds_since_state("last_synced_at")
+
+    async def sync(self, service: BusinessCentralODataService) -> TrackingIndexSyncResult:
+        """Index posted sales invoices modified since the last sync (all of them on the first run)."""
+        if not self._enabled:
+            raise ValueError("Tracking index storage not configured")
+        async with self._sync_lock:
+            return await self._sync_locked(service)
+
+    async def sync_if_stale(
+        self, service: BusinessCentralODataService, max_age_seconds: Optional[float] = None
+    ) -> Optional[TrackingIndexSyncResult]:
+        if not self._enabled:
+            raise ValueError("Tracking index storage not configured")
+        if not self.is_stale(max_age_seconds):
+            return None
+        async with self._sync_lock:
+            # Callers that queued behind a running sync find the index fresh now.
+            if not self.is_stale(max_age_seconds):
+                return None
+            return await self._sync_locked(service)
+
+    def is_stale(self, max_age_seconds: Optional[float] = None) -> bool:
+        max_age = settings.bc_tracking_index_max_staleness_seconds if max_age_seconds is None else max_age_seconds
+        age = self.seconds_since_sync()
+        return age is None or age > max_age
+
+    def sync_in_background_if_stale(self) -> bool:
+        """Start one background sync when the index is stale; returns whether one was started."""
+        if not self._enabled or (self._background_sync is not None and not self._background_sync.done()):
+            return False
+        if not self.is_stale():
+            return False
+        self._background_sync = asyncio.create_task(_sync_logged(self))
+        return True
+
+    async def _sync_locked(self, service: BusinessCentralODataService) -> TrackingIndexSyncResult:
+        watermark = self._get_state("watermark")
+        seen = indexed = 0
+        for position, resource in enumerate(_HEADER_RESOURCES):
+            try:
+                async for page in service.iter_collection_pages(self._modified_since(resource, watermark)):
+                    seen += len(page)
+                    indexed += await self._index_page(service, page)
+                    watermark = max(
+                        [watermark or ""]
+                        + [str(row["SystemModifiedAt"]) for row in page if row.get("SystemModifiedAt")]
+                    ) or None
+                    if watermark:
+                        self._set_state("watermark", watermark)
+            except httpx.HTTPStatusError as exc:
+                status_code = exc.response.status_code if exc.response else None
+                # Older tenants only publish the headers page; fall through to it.
+                if seen == 0 and status_code in {400, 404} and position + 1 < len(_HEADER_RESOURCES):
+                    continue
+                raise
+            break
+        self._set_state("last_synced_at", datetime.now(timezone.utc).isoformat())
+        logger.info(
+            "Posted invoice tracking index synced",
+            extra={"invoices_seen": seen, "invoices_indexed": indexed, "watermark": watermark},
+        )
+        return TrackingIndexSyncResult(invoices_seen=seen, invoices_indexed=indexed, watermark=watermark)
+
+    @staticmethod
+    def _modified_since(resource: str, watermark: Optional[str]) -> str:
+        query = "%24orderby=SystemModifiedAt%20asc"
+        if watermark:
+            query = f"%24filter={quote(f'SystemModifiedAt gt {watermark}')}&{query}"
+        return f"{resource}?{query}"
+
+    async def _index_page(self, service: BusinessCentralODataService, page: Sequence[Dict[str, Any]]) -> int:
+        tracked: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        untracked: List[str] = []
+        for header in page:
+            invoice_no = _invoice_no(header)
+            if not invoice_no:
+                continue
+            tracking_no = _tracking_no(header)
+            if tracking_no:
+                tracked[invoice_no] = (tracking_no, header)
+            else:
+                untracked.append(invoice_no)
+
+        lines_by_invoice = await self._fetch_lines(service, list(tracked))
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO bc_tracking_invoices
+                    (invoice_no, tracking_no, header_json, lines_json, modified_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(invoice_no) DO UPDATE SET
+                    tracking_no = excluded.tracking_no,
+                    header_json = excluded.header_json,
+                    lines_json = excluded.lines_json,
+                    modified_at = excluded.modified_at
+                """,
+                [
+                    (
+                        invoice_no,
+                        tracking_no,
+                        json.dumps(header, default=str),
+                        json.dumps(lines_by_invoice.get(invoice_no, []), default=str),
+                        header.get("SystemModifiedAt"),
+                    )
+                    for invoice_no, (tracking_no, header) in tracked.items()
+                ],
+            )
+            # A cleared tracking number must stop resolving to the invoice.
+            conn.executemany(
+                "DELETE FROM bc_tracking_invoices WHERE invoice_no = ?",
+                [(invoice_no,) for invoice_no in untracked],
+            )
+            conn.commit()
+        return len(tracked)
+
+    async def _fetch_lines(
+        self, service: BusinessCentralODataService, invoice_nos: List[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch lines for many invoices with `or`-joined filters, a few requests at a time."""
+        semaphore = asyncio.Semaphore(_LINE_FETCH_CONCURRENCY)
+
+        async def _chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                for position, field in enumerate(_LINE_DOCUMENT_FIELDS):
+                    expression = " or ".join(f"{field} eq {_odata_string(invoice_no)}" for invoice_no in chunk)
+                    resource = "PostedSalesInvoiceLines?%24filter=" + quote(expression, safe="'")
+                    try:
+                        return await service.fetch_collection_paged(resource)
+                    except httpx.HTTPStatusError as exc:
+                        status_code = exc.response.status_code if exc.response else None
+                        if status_code in {400, 404} and position + 1 < len(_LINE_DOCUMENT_FIELDS):
+                            continue
+                        raise
+                return []
+
+        chunks = [invoice_nos[i : i + _LINES_PER_REQUEST] for i in range(0, len(invoice_nos), _LINES_PER_REQUEST)]
+        lines_by_invoice: Dict[str, List[Dict[str, Any]]] = {}
+        for lines in await asyncio.gather(*(_chunk(chunk) for chunk in chunks)):
+            for line in lines:
+                document_no = line.get("Document_No") or line.get("DocumentNo")
+                if document_no:
+                    lines_by_invoice.setdefault(str(document_no), []).append(line)
+        return lines_by_invoice
+
+
+async def _sync_logged(index: PostedInvoiceTrackingIndex) -> None:
+    try:
+        await index.sync(BusinessCentralODataService())
+    except (httpx.HTTPError, ValueError) as exc:
+        logger.warning("Posted invoice tracking index sync failed", extra={"error": str(exc)})
+    except Exception:
+        logger.exception("Posted invoice tracking index sync failed unexpectedly")
+
+
+async def sync_posted_invoice_tracking_index() -> None:
+    """Scheduled incremental sync of the tracking index (also seeds it at startup)."""
+    if not posted_invoice_tracking_index.is_configured:
+        logger.warning("Posted invoice tracking index not configured; skipping sync")
+        return
+    await _sync_logged(posted_invoice_tracking_index)
+
+
+posted_invoice_tracking_index = PostedInvoiceTrackingIndex()
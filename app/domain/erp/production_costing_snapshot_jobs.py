@@ -3,12 +3,15 @@ from __future__ import annotations
 import logging
 
 from app.domain.erp.production_costing_snapshot_service import ProductionCostingSnapshotService
+from app.domain.erp.work_center_rates import work_center_rate_table
 
 logger = logging.getLogger(__name__)
 
 
 async def refresh_production_costing_snapshot() -> None:
-    """Daily delta refresh for production costing snapshots."""
+    """Daily delta refresh for production costing snapshots and the work center rate table."""
+    await refresh_work_center_rates()
+
     service = ProductionCostingSnapshotService()
     if not service.is_configured:
         logger.warning("Cedule database not configured; skipping production costing snapshot refresh")
@@ -32,3 +35,14 @@ async def refresh_production_costing_snapshot() -> None:
             "Failed to refresh production costing snapshots",
             extra={"error": str(exc)},
         )
+
+
+async def refresh_work_center_rates() -> None:
+    """Reload the in-memory work center rates used by routing cost lookups."""
+    try:
+        await work_center_rate_table.refresh()
+    except Exception as exc:
+        logger.warning(
+            "Failed to refresh work center rate table",
+            extra={"error": str(exc)},
+        )
@@ -10,6 +10,7 @@ from typing import Any, Dict, Iterable, Optional
 from uuid import UUID
 
 from app.adapters.erp_client import ERPClient
+from app.domain.erp.bom_explosion import bom_explosion_cache
 from app.domain.erp.models import (
     ProductionCostingGroupedItemResponse,
     ProductionCostingScanResponse,
@@ -17,6 +18,7 @@ from app.domain.erp.models import (
 )
 from app.errors import DatabaseError
 from app.integrations.cedule_production_costing_repository import CeduleProductionCostingRepository
+from app.integrations.sql_executor import CEDULE_DB, run_sql
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -35,6 +37,8 @@ class ProductionCostingSnapshotService:
         self._repository = repository or CeduleProductionCostingRepository()
         self._insert_batch_size = max(50, int(getattr(settings, "production_costing_insert_batch_size", 500)))
         self._max_concurrency = max(1, int(getattr(settings, "production_costing_sync_max_concurrency", 6)))
+        self._bulk_load_enabled = bool(getattr(settings, "production_costing_bulk_load_enabled", True))
+        self._bulk_chunk_size = max(500, int(getattr(settings, "production_costing_bulk_chunk_size", 5000)))
 
     @property
     def is_configured(self) -> bool:
@@ -49,7 +53,7 @@ class ProductionCostingSnapshotService:
         if not self._repository.is_configured:
             raise DatabaseError("Cedule database not configured")
 
-        await asyncio.to_thread(self._repository.ensure_schema)
+        await run_sql(CEDULE_DB, self._repository.ensure_schema)
 
         scan_mode = "full" if full_refresh else "delta"
         since_routing: Optional[dt.datetime] = None
@@ -58,8 +62,8 @@ class ProductionCostingSnapshotService:
         bom_bootstrap = full_refresh
 
         if not full_refresh:
-            since_routing = await asyncio.to_thread(self._repository.get_source_last_modified, "routing")
-            since_bom = await asyncio.to_thread(self._repository.get_source_last_modified, "bom")
+            since_routing = await run_sql(CEDULE_DB, self._repository.get_source_last_modified, "routing")
+            since_bom = await run_sql(CEDULE_DB, self._repository.get_source_last_modified, "bom")
             routing_bootstrap = since_routing is None
             bom_bootstrap = since_bom is None
 
@@ -102,7 +106,8 @@ class ProductionCostingSnapshotService:
                 until_modified_at=_max_datetime([since_routing, since_bom]),
             )
 
-        scan_id = await asyncio.to_thread(
+        scan_id = await run_sql(
+            CEDULE_DB,
             self._repository.create_scan,
             scan_mode=scan_mode,
             trigger_source=trigger_source,
@@ -145,14 +150,16 @@ class ProductionCostingSnapshotService:
                 )
 
             if latest_routing_modified:
-                await asyncio.to_thread(
+                await run_sql(
+                    CEDULE_DB,
                     self._repository.upsert_source_state,
                     source_type="routing",
                     last_successful_modified_at=latest_routing_modified,
                     last_scan_id=scan_id,
                 )
             if latest_bom_modified:
-                await asyncio.to_thread(
+                await run_sql(
+                    CEDULE_DB,
                     self._repository.upsert_source_state,
                     source_type="bom",
                     last_successful_modified_at=latest_bom_modified,
@@ -161,7 +168,8 @@ class ProductionCostingSnapshotService:
 
             until_modified_at = _max_datetime([latest_routing_modified, latest_bom_modified])
 
-            await asyncio.to_thread(
+            await run_sql(
+                CEDULE_DB,
                 self._repository.complete_scan,
                 scan_id=scan_id,
                 status="success",
@@ -172,8 +180,11 @@ class ProductionCostingSnapshotService:
                 bom_lines_count=bom_lines_count,
                 error_message=None,
             )
+            if has_bom_changes:
+                bom_explosion_cache.invalidate()
         except Exception as exc:
-            await asyncio.to_thread(
+            await run_sql(
+                CEDULE_DB,
                 self._repository.complete_scan,
                 scan_id=scan_id,
                 status="failed",
@@ -186,7 +197,7 @@ class ProductionCostingSnapshotService:
             )
             raise
 
-        row = await asyncio.to_thread(self._repository.get_scan, scan_id)
+        row = await run_sql(CEDULE_DB, self._repository.get_scan, scan_id)
         if not row:
             raise DatabaseError("Costing scan completed but result could not be loaded")
         return _scan_row_to_response(row)
@@ -201,10 +212,11 @@ class ProductionCostingSnapshotService:
         if not self._repository.is_configured:
             raise DatabaseError("Cedule database not configured")
 
-        await asyncio.to_thread(self._repository.ensure_schema)
+        await run_sql(CEDULE_DB, self._repository.ensure_schema)
 
         base_item_no = _base_item_no(item_no)
-        rows = await asyncio.to_thread(
+        rows = await run_sql(
+            CEDULE_DB,
             self._repository.list_item_snapshot_rows,
             base_item_no=base_item_no,
             latest_only=latest_only,
@@ -261,6 +273,50 @@ class ProductionCostingSnapshotService:
             bom_versions=bom_versions,
         )
 
+    async def get_latest_source_snapshot(
+        self,
+        *,
+        source_type: str,
+        source_no: str,
+    ) -> Optional[ProductionCostingSourceSnapshot]:
+        """Return the latest successful snapshot (with lines) for one routing/BOM number."""
+        if not self._repository.is_configured:
+            return None
+
+        normalized_no = (source_no or "").strip()
+        if not normalized_no:
+            return None
+
+        await run_sql(CEDULE_DB, self._repository.ensure_schema)
+        rows = await run_sql(
+            CEDULE_DB,
+            self._repository.list_source_snapshot_rows,
+            source_type=source_type,
+            source_no=normalized_no,
+            base_item_no=_base_item_no(normalized_no),
+        )
+        if not rows:
+            return None
+
+        first = rows[0]
+        lines = [
+            payload
+            for payload in (_safe_load_json(row.get("row_json")) for row in rows)
+            if payload is not None
+        ]
+        return ProductionCostingSourceSnapshot(
+            source_type=source_type,
+            source_no=normalized_no,
+            base_item_no=_base_item_no(normalized_no),
+            revision=_extract_revision(normalized_no),
+            scan_id=str(first.get("scan_id") or ""),
+            scan_started_at=_to_utc_naive(first.get("scan_started_at")),
+            scan_finished_at=_to_utc_naive(first.get("scan_finished_at")),
+            header_last_modified_at=_to_utc_naive(first.get("header_last_modified_at")),
+            line_count=len(rows),
+            lines=lines,
+        )
+
     def _map_header_modified_by_no(
         self,
         rows: Iterable[Dict[str, Any]],
@@ -292,15 +348,25 @@ class ProductionCostingSnapshotService:
         ]
 
         persisted = 0
+        buffer: list[dict[str, Any]] = []
         for task in asyncio.as_completed(tasks):
             source_no, header_last_modified_at, lines = await task
-            persisted += await self._persist_source_lines(
-                scan_id=scan_id,
-                source_type=source_type,
-                source_no=source_no,
-                header_last_modified_at=header_last_modified_at,
-                lines=lines,
+            buffer.extend(
+                _snapshot_row(
+                    line,
+                    scan_id=scan_id,
+                    source_type=source_type,
+                    source_no=source_no,
+                    header_last_modified_at=header_last_modified_at or _extract_last_modified(line),
+                )
+                for line in lines
             )
+            if len(buffer) >= self._flush_size:
+                persisted += await self._write_rows(buffer)
+                buffer = []
+
+        if buffer:
+            persisted += await self._write_rows(buffer)
         return persisted
 
     async def _fetch_lines_for_source(
@@ -333,51 +399,43 @@ class ProductionCostingSnapshotService:
             if not source_no:
                 continue
 
-            row = {
-                "scan_id": str(scan_id),
-                "source_type": source_type,
-                "source_no": source_no,
-                "source_base_item_no": _base_item_no(source_no),
-                "header_last_modified_at": header_modified_by_no.get(source_no) or _extract_last_modified(line),
-                "line_key": _line_key(line, source_type=source_type),
-                "row_json": json.dumps(line, ensure_ascii=True, default=str, separators=(",", ":")),
-            }
-            batch.append(row)
-
-            if len(batch) >= self._insert_batch_size:
-                persisted += await asyncio.to_thread(self._repository.insert_line_snapshots, batch)
+            batch.append(
+                _snapshot_row(
+                    line,
+                    scan_id=scan_id,
+                    source_type=source_type,
+                    source_no=source_no,
+                    header_last_modified_at=(
+                        header_modified_by_no.get(source_no) or _extract_last_modified(line)
+                    ),
+                )
+            )
+
+            if len(batch) >= self._flush_size:
+                persisted += await self._write_rows(batch)
                 batch = []
 
         if batch:
-            persisted += await asyncio.to_thread(self._repository.insert_line_snapshots, batch)
+            persisted += await self._write_rows(batch)
 
         return persisted
 
-    async def _persist_source_lines(
-        self,
-        *,
-        scan_id: UUID,
-        source_type: str,
-        source_no: str,
-        header_last_modified_at: Optional[dt.datetime],
-        lines: list[dict[str, Any]],
-    ) -> int:
-        if not lines:
-            return 0
+    @property
+    def _flush_size(self) -> int:
+        return self._bulk_chunk_size if self._bulk_load_enabled else self._insert_batch_size
 
-        batch = [
-            {
-                "scan_id": str(scan_id),
-                "source_type": source_type,
-                "source_no": source_no,
-                "source_base_item_no": _base_item_no(source_no),
-                "header_last_modified_at": header_last_modified_at or _extract_last_modified(line),
-                "line_key": _line_key(line, source_type=source_type),
-                "row_json": json.dumps(line, ensure_ascii=True, default=str, separators=(",", ":")),
-            }
-            for line in lines
-        ]
-        return await asyncio.to_thread(self._repository.insert_line_snapshots, batch)
+    async def _write_rows(self, rows: list[dict[str, Any]]) -> int:
+        """Persist snapshot rows through the bulk loader (or plain batched inserts)."""
+        if not rows:
+            return 0
+        if self._bulk_load_enabled:
+            return await run_sql(
+                CEDULE_DB,
+                self._repository.bulk_insert_line_snapshots,
+                rows,
+                chunk_size=self._bulk_chunk_size,
+            )
+        return await run_sql(CEDULE_DB, self._repository.insert_line_snapshots, rows)
 
     @staticmethod
     def _extract_source_no(row: Dict[str, Any], *, source_type: str, from_header: bool) -> str:
@@ -400,6 +458,25 @@ class ProductionCostingSnapshotService:
         return ""
 
 
+def _snapshot_row(
+    line: Dict[str, Any],
+    *,
+    scan_id: UUID,
+    source_type: str,
+    source_no: str,
+    header_last_modified_at: Optional[dt.datetime],
+) -> dict[str, Any]:
+    return {
+        "scan_id": str(scan_id),
+        "source_type": source_type,
+        "source_no": source_no,
+        "source_base_item_no": _base_item_no(source_no),
+        "header_last_modified_at": header_last_modified_at,
+        "line_key": _line_key(line, source_type=source_type),
+        "row_json": json.dumps(line, ensure_ascii=True, default=str, separators=(",", ":")),
+    }
+
+
 def _scan_row_to_response(row: Dict[str, Any]) -> ProductionCostingScanResponse:
     routing_lines = int(row.get("routing_lines_count") or 0)
     bom_lines = int(row.get("bom_lines_count") or 0)
@@ -4,12 +4,14 @@ Production-focused service for retrieving BOM cost shares and routing costs.
 
 from __future__ import annotations
 
+import logging
 from decimal import Decimal, InvalidOperation
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import logfire
 
 from app.adapters.erp_client import ERPClient
+from app.domain.erp.bom_explosion import BomExplosionEngine, filter_component_lines
 from app.domain.erp.models import (
     ProductionBomCostShareLine,
     ProductionBomCostShareResponse,
@@ -17,7 +19,15 @@ from app.domain.erp.models import (
     ProductionRoutingCostResponse,
     ProductionRoutingLineCost,
 )
-from app.errors import ERPError, ERPNotFound
+from app.domain.erp.production_costing_snapshot_service import ProductionCostingSnapshotService
+from app.domain.erp.work_center_rates import (
+    WorkCenterRateTable,
+    work_center_rate_per_minute,
+    work_center_rate_table,
+)
+from app.errors import DatabaseError, ERPError, ERPNotFound
+
+logger = logging.getLogger(__name__)
 
 
 def _to_decimal(value) -> Decimal:
@@ -30,10 +40,21 @@ def _to_decimal(value) -> Decimal:
 class ProductionService:
     """Service orchestrating Business Central production data retrieval."""
 
-    def __init__(self, *, erp_client: Optional[ERPClient] = None) -> None:
+    def __init__(
+        self,
+        *,
+        erp_client: Optional[ERPClient] = None,
+        bom_engine: Optional[BomExplosionEngine] = None,
+        costing_snapshot_service: Optional[ProductionCostingSnapshotService] = None,
+        rate_table: Optional[WorkCenterRateTable] = None,
+    ) -> None:
         self._client = erp_client or ERPClient()
+        self._bom_engine = bom_engine or BomExplosionEngine(erp_client=self._client)
+        self._snapshot_service = costing_snapshot_service or ProductionCostingSnapshotService(
+            erp_client=self._client
+        )
+        self._rate_table = rate_table if rate_table is not None else work_center_rate_table
         self._work_center_cache: Dict[str, Dict[str, object]] = {}
-        self._item_cache: Dict[str, Dict[str, object]] = {}
 
     async def get_item_info(self, item_no: str) -> ProductionItemInfo:
         """Return minimal production-facing item info (routing + BOM)."""
@@ -98,17 +119,16 @@ class ProductionService:
         self, production_bom_no: str
     ) -> List[ProductionBomCostShareLine]:
         """Fallback: derive material costs from BOM component lines."""
-        raw_lines = await self._client.get_bom_component_lines(production_bom_no)
+        raw_lines = await self._bom_engine.get_bom_lines(production_bom_no)
+        component_lines = filter_component_lines(raw_lines)
+        items = await self._bom_engine.get_items(
+            (raw.get("No") or "").strip() for raw in component_lines
+        )
         mapped: List[ProductionBomCostShareLine] = []
-        for raw in raw_lines or []:
-            line_type = (raw.get("Type") or "").strip().lower()
-            if line_type != "item":
-                continue
+        for raw in component_lines:
             item_no = (raw.get("No") or "").strip()
-            if not item_no:
-                continue
             qty = _to_decimal(raw.get("Quantity_per"))
-            item_payload = await self._get_item_cached(item_no)
+            item_payload = items.get(item_no)
             unit_cost = _to_decimal(item_payload.get("Unit_Cost")) if item_payload else Decimal("0")
             total_cost = (unit_cost * qty).quantize(Decimal("0.0001"))
 
@@ -138,6 +158,9 @@ class ProductionService:
     async def get_routing_costs(self, item_no: str) -> ProductionRoutingCostResponse:
         """
         Retrieve routing lines for an item and cost them using work center rates.
+
+        Routing lines come from the latest Cedule costing snapshot when available and
+        from Business Central otherwise.
         """
         item_info = await self.get_item_info(item_no)
         routing_no = item_info.routing_no
@@ -147,7 +170,7 @@ class ProductionService:
                 context={"item_no": item_no},
             )
 
-        raw_lines = await self._client.get_bom_routing_lines(routing_no)
+        raw_lines, snapshot_scan_id = await self._load_routing_lines(routing_no)
         if not raw_lines:
             raise ERPError(
                 "No routing lines returned for routing",
@@ -230,34 +253,50 @@ class ProductionService:
             total_setup_cost=total_setup,
             total_run_cost=total_run,
             total_cost=total_setup + total_run,
+            source="snapshot" if snapshot_scan_id else "erp",
+            snapshot_scan_id=snapshot_scan_id,
         )
 
+    async def _load_routing_lines(self, routing_no: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return routing lines and the snapshot scan id (None when read from Business Central)."""
+        try:
+            snapshot = await self._snapshot_service.get_latest_source_snapshot(
+                source_type="routing",
+                source_no=routing_no,
+            )
+        except DatabaseError as exc:
+            logger.warning(
+                "Costing snapshot lookup failed; falling back to Business Central routing lines",
+                extra={"routing_no": routing_no, "error": str(exc)},
+            )
+            snapshot = None
+
+        if snapshot and snapshot.lines:
+            return snapshot.lines, snapshot.scan_id
+        return await self._client.get_bom_routing_lines(routing_no), None
+
     async def _load_work_center_rates(self, work_center_nos: Iterable[str]) -> Dict[str, Decimal]:
         """Return per-minute cost rates for the provided work centers."""
-        rates: Dict[str, Decimal] = {}
-        for wc_no in work_center_nos:
-            if not wc_no:
-                continue
+        if not self._rate_table.is_loaded:
+            try:
+                await self._rate_table.refresh(self._client)
+            except ERPError as exc:
+                logger.warning(
+                    "Work center rate table refresh failed; using per-work-center lookups",
+                    extra={"error": str(exc)},
+                )
+
+        known, missing = self._rate_table.lookup(work_center_nos)
+        rates: Dict[str, Decimal] = {wc_no: rate for wc_no, rate in known.items() if rate > 0}
+        for wc_no in missing:
             if wc_no in self._work_center_cache:
                 record = self._work_center_cache[wc_no]
             else:
                 record = await self._client.get_work_center(wc_no)
                 if record:
                     self._work_center_cache[wc_no] = record
-            if not record:
-                continue
-            unit_cost = _to_decimal(record.get("Unit_Cost"))
-            if unit_cost <= 0:
-                continue
-            # Business Central Work Center Unit Cost is typically per hour; convert to per-minute.
-            rate_per_minute = (unit_cost / Decimal("60")).quantize(Decimal("0.0001"))
-            rates[wc_no] = rate_per_minute
+                    self._rate_table.remember(wc_no, record)
+            rate_per_minute = work_center_rate_per_minute(record)
+            if rate_per_minute > 0:
+                rates[wc_no] = rate_per_minute
         return rates
-
-    async def _get_item_cached(self, item_no: str) -> Dict[str, object]:
-        if item_no in self._item_cache:
-            return self._item_cache[item_no]
-        payload = await self._client.get_item(item_no)
-        if payload:
-            self._item_cache[item_no] = payload
-        return payload or {}
@@ -4,10 +4,10 @@ High-level service that wires Business Central BOM data into the tariff calculat
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Dict, Iterable, List, Optional, Sequence, Set
-
-from fastapi.concurrency import run_in_threadpool
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set
 
 from migration.tariff_calculator_lib import (
     BOMLine,
@@ -18,20 +18,34 @@ from migration.tariff_calculator_lib import (
 )
 
 from app.adapters.erp_client import ERPClient
+from app.domain.erp.bom_explosion import BomExplosionEngine
 from app.domain.erp.models import (
+    TariffBatchItemResult,
     TariffCalculationResponse,
     TariffMaterialResponse,
     TariffSummaryResponse,
 )
-from app.errors import ERPError, ERPNotFound, DatabaseError
+from app.errors import BaseAPIException, ERPError, ERPNotFound, DatabaseError
 from app.integrations.cedule_repository import (
     MillTestCertificate,
     MillTestCertificateRepository,
 )
+from app.integrations.sql_executor import CEDULE_DB, run_sql
+from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class _PreparedItem:
+    """An item whose production BOM has been exploded to leaf component lines."""
+
+    item_id: str
+    production_bom_no: str
+    flattened_lines: List[Dict[str, object]]
+    component_numbers: List[str]
+
+
 class TariffCalculationService:
     """Fetch BOM data, run the tariff calculator, and format the API payload."""
 
@@ -40,19 +54,105 @@ class TariffCalculationService:
         *,
         erp_client: Optional[ERPClient] = None,
         certificate_repo: Optional[MillTestCertificateRepository] = None,
+        bom_engine: Optional[BomExplosionEngine] = None,
     ) -> None:
         self._erp_client = erp_client or ERPClient()
         self._certificate_repo = certificate_repo or MillTestCertificateRepository()
-        self._item_cache: Dict[str, Dict[str, object]] = {}
-        self._bom_cache: Dict[str, List[Dict[str, object]]] = {}
+        self._bom_engine = bom_engine or BomExplosionEngine(erp_client=self._erp_client)
 
     async def calculate(self, item_id: str) -> TariffCalculationResponse:
         """Run the tariff calculator for the provided item."""
         item = await self._erp_client.get_item(item_id)
         if not item:
             raise ERPNotFound("Item", item_id)
-        self._item_cache[item_id] = item
+        self._bom_engine.prime_item(item_id, item)
 
+        prepared = await self._prepare(item_id, item)
+        component_items = await self._load_components([prepared])
+        certificates = await self._fetch_certificates(prepared.component_numbers + [item_id])
+        return self._calculate_prepared(prepared, component_items, certificates)
+
+    async def calculate_batch(
+        self,
+        item_ids: Sequence[str],
+        *,
+        chunk_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> AsyncIterator[TariffBatchItemResult]:
+        """
+        Yield one result per item, chunk by chunk, in request order.
+
+        Each chunk explodes its BOMs concurrently on the shared engine (so common
+        sub-assemblies and component items are fetched once), then resolves every mill
+        test certificate the chunk still needs with a single batched query. Failures are
+        reported per item and do not stop the batch; when a chunk-wide fetch fails, the
+        chunk is retried item by item so one bad item or component does not fail the rest.
+        """
+        unique_ids = list(dict.fromkeys(item_id.strip() for item_id in item_ids if item_id and item_id.strip()))
+        chunk_size = max(1, int(chunk_size or settings.tariff_batch_chunk_size))
+        semaphore = asyncio.Semaphore(max(1, int(max_concurrency or settings.tariff_batch_max_concurrency)))
+        certificates: Dict[str, MillTestCertificate] = {}
+        certificate_parts: Set[str] = set()
+
+        async def _prepare_one(item_id: str, item: Optional[Dict[str, object]]) -> _PreparedItem:
+            if not item:
+                raise ERPNotFound("Item", item_id)
+            async with semaphore:
+                return await self._prepare(item_id, item)
+
+        async def _run_chunk(chunk_ids: List[str]) -> List[TariffBatchItemResult]:
+            top_items = await self._bom_engine.get_items(chunk_ids)
+            outcomes = await asyncio.gather(
+                *(_prepare_one(item_id, top_items.get(item_id)) for item_id in chunk_ids),
+                return_exceptions=True,
+            )
+            prepared = [outcome for outcome in outcomes if isinstance(outcome, _PreparedItem)]
+            component_items = await self._load_components(prepared)
+
+            needed = {part for entry in prepared for part in entry.component_numbers}
+            needed.update(entry.item_id for entry in prepared)
+            needed -= certificate_parts
+            certificates.update(await self._fetch_certificates(needed))
+            certificate_parts.update(needed)
+
+            results: List[TariffBatchItemResult] = []
+            for item_id, outcome in zip(chunk_ids, outcomes):
+                if isinstance(outcome, BaseException):
+                    results.append(_batch_error(item_id, outcome))
+                    continue
+                try:
+                    response = self._calculate_prepared(outcome, component_items, certificates)
+                except Exception as exc:
+                    results.append(_batch_error(item_id, exc))
+                else:
+                    results.append(TariffBatchItemResult(item_id=item_id, status="ok", result=response))
+            return results
+
+        for start in range(0, len(unique_ids), chunk_size):
+            chunk_ids = unique_ids[start : start + chunk_size]
+            try:
+                results = await _run_chunk(chunk_ids)
+            except Exception as exc:
+                if len(chunk_ids) == 1:
+                    yield _batch_error(chunk_ids[0], exc)
+                    continue
+                # A chunk-wide fetch failed: retry the chunk's items one at a time so
+                # only the item behind the failure reports it.
+                logger.warning(
+                    "Tariff batch chunk failed; retrying its items one at a time",
+                    extra={"item_count": len(chunk_ids), "error": str(exc)},
+                )
+                results = []
+                for item_id in chunk_ids:
+                    try:
+                        results.extend(await _run_chunk([item_id]))
+                    except Exception as item_exc:
+                        results.append(_batch_error(item_id, item_exc))
+            for result in results:
+                yield result
+
+    async def _prepare(self, item_id: str, item: Dict[str, object]) -> _PreparedItem:
+        """Explode the item's production BOM into leaf component lines."""
         production_bom_no = (item.get("Production_BOM_No") or "").strip()
         if not production_bom_no:
             raise ERPError(
@@ -60,7 +160,7 @@ class TariffCalculationService:
                 context={"item_id": item_id},
             )
 
-        flattened_lines = await self._expand_bom(production_bom_no, 1.0, set())
+        flattened_lines = await self._bom_engine.explode(production_bom_no)
         if not flattened_lines:
             raise ERPError(
                 "No BOM component lines were returned from Business Central",
@@ -70,19 +170,36 @@ class TariffCalculationService:
         component_numbers = sorted(
             {(line.get("No") or "").strip() for line in flattened_lines if line.get("No")}
         )
-        component_items: Dict[str, Dict[str, object]] = {}
-        for item_no in component_numbers:
-            component_items[item_no] = await self._get_item_cached(item_no) or {}
+        return _PreparedItem(
+            item_id=item_id,
+            production_bom_no=production_bom_no,
+            flattened_lines=flattened_lines,
+            component_numbers=component_numbers,
+        )
 
-        bom_lines = self._build_bom_lines(flattened_lines, component_items)
+    async def _load_components(self, prepared: Sequence[_PreparedItem]) -> Dict[str, Dict[str, object]]:
+        """Resolve the component items of every prepared BOM with one concurrent fetch."""
+        component_numbers = sorted({part for entry in prepared for part in entry.component_numbers})
+        fetched_items = await self._bom_engine.get_items(component_numbers)
+        return {item_no: fetched_items.get(item_no) or {} for item_no in component_numbers}
+
+    def _calculate_prepared(
+        self,
+        prepared: _PreparedItem,
+        component_items: Dict[str, Dict[str, object]],
+        certificates: Dict[str, MillTestCertificate],
+    ) -> TariffCalculationResponse:
+        item_id = prepared.item_id
+        bom_lines = self._build_bom_lines(prepared.flattened_lines, component_items)
         if not bom_lines:
             raise ERPError(
                 "No BOM entries were eligible for tariff calculation",
-                context={"item_id": item_id, "bom_no": production_bom_no},
+                context={"item_id": item_id, "bom_no": prepared.production_bom_no},
             )
 
-        cost_map = self._build_cost_map(component_items)
-        certificates = await self._fetch_certificates(component_numbers + [item_id])
+        cost_map = self._build_cost_map(
+            {part: component_items.get(part) or {} for part in prepared.component_numbers}
+        )
         country_map = {
             part: CountryInfo(
                 melt_and_pour=cert.country_of_melt_and_pour,
@@ -107,93 +224,11 @@ class TariffCalculationService:
         parent_certificate = certificates.get(item_id)
         return self._build_response(
             item_id=item_id,
-            production_bom_no=production_bom_no,
+            production_bom_no=prepared.production_bom_no,
             result=result,
             parent_certificate=parent_certificate,
         )
 
-    async def _expand_bom(
-        self,
-        production_bom_no: str,
-        multiplier: float,
-        visited: Set[str],
-    ) -> List[Dict[str, object]]:
-        """Recursively expand nested BOMs into leaf component lines."""
-        if production_bom_no in visited:
-            logger.warning(
-                "Detected recursive BOM reference; skipping nested expansion",
-                extra={"bom_no": production_bom_no},
-            )
-            return []
-
-        visited.add(production_bom_no)
-        raw_lines = await self._get_bom_lines_cached(production_bom_no)
-        component_lines = self._filter_component_lines(raw_lines)
-        collected: List[Dict[str, object]] = []
-
-        for line in component_lines:
-            item_no = (line.get("No") or "").strip()
-            if not item_no:
-                continue
-
-            quantity = _to_float(line.get("Quantity_per")) * multiplier
-            if quantity <= 0:
-                continue
-
-            line_copy = dict(line)
-            line_copy["Quantity_per"] = quantity
-
-            item_payload = await self._get_item_cached(item_no)
-            nested_bom = (
-                (item_payload.get("Production_BOM_No") or "").strip() if item_payload else ""
-            )
-
-            if nested_bom:
-                collected.extend(await self._expand_bom(nested_bom, quantity, visited))
-            else:
-                collected.append(line_copy)
-
-        visited.remove(production_bom_no)
-        return collected
-
-    async def _get_bom_lines_cached(self, bom_no: str) -> List[Dict[str, object]]:
-        if bom_no in self._bom_cache:
-            return self._bom_cache[bom_no]
-        lines = await self._erp_client.get_bom_component_lines(bom_no)
-        self._bom_cache[bom_no] = lines
-        return lines
-
-    @staticmethod
-    def _filter_component_lines(raw_lines: Optional[List[Dict[str, object]]]) -> List[Dict[str, object]]:
-        """Keep only inventory component lines with a valid item number."""
-        filtered: List[Dict[str, object]] = []
-        if not raw_lines:
-            return filtered
-        for line in raw_lines:
-            line_type = (line.get("Type") or "").strip().lower()
-            item_no = (line.get("No") or "").strip()
-            if line_type != "item" or not item_no:
-                continue
-            filtered.append(line)
-        return filtered
-
-    async def _get_item_cached(self, item_no: str) -> Optional[Dict[str, object]]:
-        if item_no in self._item_cache:
-            return self._item_cache[item_no]
-        try:
-            item = await self._erp_client.get_item(item_no)
-        except ERPError:
-            raise
-        except Exception as exc:  # pragma: no cover - defensive logging path
-            logger.warning(
-                "Failed to load item details during tariff calculation",
-                extra={"item_no": item_no, "error": str(exc)},
-            )
-            item = None
-        if item:
-            self._item_cache[item_no] = item
-        return item
-
     def _build_bom_lines(
         self,
         component_lines: Sequence[Dict[str, object]],
@@ -235,28 +270,21 @@ class TariffCalculationService:
         return cost_map
 
     async def _fetch_certificates(self, part_numbers: Iterable[str]) -> Dict[str, MillTestCertificate]:
-        """Load mill test certificate data (if configured)."""
-        certificates: Dict[str, MillTestCertificate] = {}
+        """Load mill test certificate data (if configured) with one batched query."""
         if not self._certificate_repo or not self._certificate_repo.is_configured:
-            return certificates
+            return {}
 
         unique_parts = sorted({part for part in part_numbers if part})
-        for part in unique_parts:
-            try:
-                certificate = await run_in_threadpool(
-                    self._certificate_repo.get_latest_certificate,
-                    part,
-                )
-            except DatabaseError as exc:
-                logger.warning(
-                    "Cedule mill test lookup failed; continuing without melt/pour data",
-                    extra={"error": str(exc)},
-                )
-                break
-            else:
-                if certificate:
-                    certificates[part] = certificate
-        return certificates
+        if not unique_parts:
+            return {}
+        try:
+            return await run_sql(CEDULE_DB, self._certificate_repo.get_latest_certificates, unique_parts)
+        except DatabaseError as exc:
+            logger.warning(
+                "Cedule mill test lookup failed; continuing without melt/pour data",
+                extra={"error": str(exc)},
+            )
+            return {}
 
     def _build_response(
         self,
@@ -328,3 +356,12 @@ def _to_float(value: Optional[object]) -> float:
         return float(value)
     except (TypeError, ValueError):
         return 0.0
+
+
+def _batch_error(item_id: str, exc: BaseException) -> TariffBatchItemResult:
+    if isinstance(exc, BaseAPIException):
+        error = {"code": exc.error_code, "message": exc.detail, "context": exc.context}
+    else:
+        logger.error("Unexpected error calculating tariff for item %s", item_id, exc_info=exc)
+        error = {"code": "INTERNAL_ERROR", "message": "Failed to calculate tariff for the requested item"}
+    return TariffBatchItemResult(item_id=item_id, status="error", error=error)
@@ -0,0 +1,95 @@
+"""
+In-memory work center rate table used by production routing costing.
+
+The table is reloaded from Business Central on the production costing scan schedule so
+routing cost lookups only fall back to per-work-center ERP calls for unknown centers.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.adapters.erp_client import ERPClient
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def work_center_rate_per_minute(record: Optional[Dict[str, Any]]) -> Decimal:
+    """Convert a BC work center hourly Unit_Cost into a per-minute rate."""
+    if not record:
+        return Decimal("0")
+    try:
+        unit_cost = Decimal(str(record.get("Unit_Cost") or "0"))
+    except (InvalidOperation, ValueError, TypeError):
+        return Decimal("0")
+    if unit_cost <= 0:
+        return Decimal("0")
+    # Business Central Work Center Unit Cost is typically per hour; convert to per-minute.
+    return (unit_cost / Decimal("60")).quantize(Decimal("0.0001"))
+
+
+class WorkCenterRateTable:
+    """Per-minute work center rates keyed by work center number."""
+
+    def __init__(self, *, max_age_seconds: Optional[float] = None) -> None:
+        self._max_age = float(
+            max_age_seconds
+            if max_age_seconds is not None
+            else settings.production_costing_rate_table_max_age_hours * 3600
+        )
+        self._rates: Dict[str, Decimal] = {}
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at <= self._max_age
+
+    def __len__(self) -> int:
+        return len(self._rates)
+
+    def lookup(self, work_center_nos: Iterable[str]) -> Tuple[Dict[str, Decimal], List[str]]:
+        """Split work centers into known rates and numbers missing from the table."""
+        known: Dict[str, Decimal] = {}
+        missing: List[str] = []
+        loaded = self.is_loaded
+        for wc_no in work_center_nos:
+            if not wc_no:
+                continue
+            rate = self._rates.get(wc_no) if loaded else None
+            if rate is None:
+                missing.append(wc_no)
+            else:
+                known[wc_no] = rate
+        return known, missing
+
+    def remember(self, work_center_no: str, record: Optional[Dict[str, Any]]) -> None:
+        """Record a rate resolved through the per-work-center ERP fallback."""
+        if work_center_no and record and self.is_loaded:
+            self._rates[work_center_no] = work_center_rate_per_minute(record)
+
+    def replace(self, records: Iterable[Dict[str, Any]]) -> int:
+        rates: Dict[str, Decimal] = {}
+        for record in records:
+            wc_no = str(record.get("No") or "").strip()
+            if wc_no:
+                rates[wc_no] = work_center_rate_per_minute(record)
+        self._rates = rates
+        self._loaded_at = time.monotonic()
+        return len(rates)
+
+    async def refresh(self, erp_client: Optional[ERPClient] = None) -> int:
+        """Reload every work center rate from Business Central."""
+        client = erp_client or ERPClient()
+        records = await client.get_work_centers()
+        count = self.replace(records)
+        logger.info("Work center rate table refreshed", extra={"work_centers": count})
+        return count
+
+
+work_center_rate_table = WorkCenterRateTable()
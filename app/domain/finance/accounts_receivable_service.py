@@ -13,12 +13,18 @@ from app.domain.finance.models import (
     AccountsReceivablePaymentStats,
     AccountsReceivableCacheStatus,
 )
-from app.integrations.ar_open_invoices_cache_repository import ArOpenInvoicesCacheRepository
+from app.integrations.ar_open_invoices_cache_repository import (
+    ArOpenInvoicesCacheRepository,
+    invoice_cache_key,
+)
 from app.integrations.ar_payment_stats_repository import ArPaymentStatsRepository
 
 logger = logging.getLogger(__name__)
 from app.ports import ERPClientProtocol
 
+# Internal/placeholder customers excluded from AR screens.
+_IGNORED_CUSTOMER_PREFIX = "ZZ"
+
 
 class AccountsReceivableService:
     def __init__(
@@ -54,25 +60,64 @@ class AccountsReceivableService:
         invoices = [self._map_invoice(record) for record in records]
         return [inv for inv in invoices if not self._is_ignored_customer(inv.customer_no)]
 
-    def get_cached_open_invoices(self, cache_key: str) -> Optional[List[AccountsReceivableInvoice]]:
+    def get_cached_open_invoices(
+        self,
+        cache_key: str,
+        *,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        customer_no: Optional[str] = None,
+        invoice_no: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Optional[List[AccountsReceivableInvoice]]:
+        """Cached invoices matching the filters, ordered by due date; None when not initialized."""
         if not self._cache_repo or not self._cache_repo.is_configured:
             return None
-        cached = self._cache_repo.get_cache(cache_key)
-        if not cached:
+        payload = self._cache_repo.query_rows(
+            cache_key,
+            due_from=due_from,
+            due_to=due_to,
+            customer_no=customer_no,
+            invoice_no=invoice_no,
+            exclude_customer_prefix=_IGNORED_CUSTOMER_PREFIX,
+            limit=limit,
+            offset=offset,
+        )
+        if payload is None:
             return None
-        _, payload = cached
         return [AccountsReceivableInvoice(**item) for item in payload]
 
+    def count_cached_open_invoices(
+        self,
+        cache_key: str,
+        *,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        customer_no: Optional[str] = None,
+        invoice_no: Optional[str] = None,
+    ) -> Optional[int]:
+        if not self._cache_repo or not self._cache_repo.is_configured:
+            return None
+        return self._cache_repo.count_rows(
+            cache_key,
+            due_from=due_from,
+            due_to=due_to,
+            customer_no=customer_no,
+            invoice_no=invoice_no,
+            exclude_customer_prefix=_IGNORED_CUSTOMER_PREFIX,
+        )
+
     def get_cache_status(self, cache_key: str) -> Optional[AccountsReceivableCacheStatus]:
         if not self._cache_repo or not self._cache_repo.is_configured:
             return None
-        cached = self._cache_repo.get_cache(cache_key)
+        cached = self._cache_repo.get_status(cache_key)
         if not cached:
             return None
-        updated_at, payload = cached
+        updated_at, invoice_count = cached
         return AccountsReceivableCacheStatus(
             cache_key=cache_key,
-            invoice_count=len(payload),
+            invoice_count=invoice_count,
             updated_at=updated_at,
         )
 
@@ -86,6 +131,11 @@ class AccountsReceivableService:
         invoice_no: Optional[str] = None,
         replace: bool = False,
     ) -> AccountsReceivableCacheStatus:
+        """
+        Reload open invoices from the ERP into the cache. Without `replace` the fetched
+        invoices are upserted row by row, so a one-customer or one-invoice refresh only
+        touches those rows.
+        """
         if not self._cache_repo or not self._cache_repo.is_configured:
             raise ValueError("Cache repository not configured")
         invoices = await self.list_open_invoices(
@@ -94,25 +144,20 @@ class AccountsReceivableService:
             customer_no=customer_no,
             invoice_no=invoice_no,
         )
-        payload = [inv.model_dump(mode="json") for inv in invoices]
-        if not replace:
-            cached = self._cache_repo.get_cache(cache_key)
-            if cached:
-                _, existing_payload = cached
-                merged: Dict[str, dict] = {}
-                for item in existing_payload:
-                    cache_key_value = self._cache_invoice_key(item)
-                    if cache_key_value:
-                        merged[cache_key_value] = item
-                for item in payload:
-                    cache_key_value = self._cache_invoice_key(item)
-                    if cache_key_value:
-                        merged[cache_key_value] = item
-                payload = list(merged.values())
-        updated_at = self._cache_repo.upsert_cache(cache_key, payload)
+        rows = []
+        for inv in invoices:
+            item = inv.model_dump(mode="json")
+            key = invoice_cache_key(item)
+            if key:
+                rows.append((key, item))
+        if replace:
+            updated_at = self._cache_repo.replace_rows(cache_key, rows)
+        else:
+            updated_at = self._cache_repo.upsert_rows(cache_key, rows)
+        status = self._cache_repo.get_status(cache_key)
         return AccountsReceivableCacheStatus(
             cache_key=cache_key,
-            invoice_count=len(payload),
+            invoice_count=status[1] if status else len(rows),
             updated_at=updated_at,
         )
 
@@ -194,7 +239,7 @@ class AccountsReceivableService:
     def _is_ignored_customer(customer_no: Optional[str]) -> bool:
         if not customer_no:
             return False
-        return str(customer_no).upper().startswith("ZZ")
+        return str(customer_no).upper().startswith(_IGNORED_CUSTOMER_PREFIX)
 
     def _merge_fallback_delay_stats(
         self,
@@ -324,24 +369,6 @@ class AccountsReceivableService:
                 return None
         return None
 
-    @staticmethod
-    def _cache_invoice_key(payload_item: Dict[str, object]) -> Optional[str]:
-        entry_no = payload_item.get("entry_no")
-        if entry_no not in (None, ""):
-            return f"entry:{entry_no}"
-
-        invoice_no = str(payload_item.get("invoice_no") or "").strip()
-        if not invoice_no:
-            return None
-
-        customer_no = str(payload_item.get("customer_no") or "").strip()
-        document_type = str(payload_item.get("document_type") or "").strip()
-        due_date = str(payload_item.get("due_date") or "").strip()
-        posting_date = str(payload_item.get("posting_date") or "").strip()
-        return "|".join(
-            [invoice_no, customer_no, document_type, due_date, posting_date]
-        )
-
     def _map_invoice(self, record: Dict[str, object]) -> AccountsReceivableInvoice:
         document_no = (
             record.get("Document_No")
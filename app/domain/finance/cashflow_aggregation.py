@@ -0,0 +1,158 @@
+"""
+Columnar aggregation of cashflow events into daily flows.
+
+Events are buffered as parallel arrays (day ordinal, fixed-point amount, currency,
+direction) and summed per day/currency with numpy in one pass. `CashflowEntry` models
+are only materialized when the caller asks for entry detail.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.domain.finance.models import (
+    CashflowEntry,
+    CashflowSource,
+    CurrencyCode,
+    DailyCashflow,
+    TransactionType,
+)
+
+# Amounts are stored as integer ten-thousandths of a currency unit.
+AMOUNT_SCALE = 10_000
+_DECIMAL_SCALE = Decimal(AMOUNT_SCALE)
+
+_CURRENCIES: Tuple[CurrencyCode, ...] = tuple(CurrencyCode)
+_CURRENCY_INDEX = {currency: index for index, currency in enumerate(_CURRENCIES)}
+_SOURCES: Tuple[CashflowSource, ...] = tuple(CashflowSource)
+_SOURCE_INDEX = {source: index for index, source in enumerate(_SOURCES)}
+
+
+def to_fixed(amount: Any) -> int:
+    """Convert an ERP amount (Decimal, number or numeric string) to fixed-point units."""
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount or 0))
+    return int((amount * _DECIMAL_SCALE).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_fixed(units: int) -> Decimal:
+    return Decimal(int(units)) / _DECIMAL_SCALE
+
+
+class CashflowColumns:
+    """Append-only columnar buffer of cashflow events."""
+
+    def __init__(self, *, keep_entries: bool = True) -> None:
+        self.keep_entries = keep_entries
+        self._days = array("q")
+        self._amounts = array("q")
+        self._currencies = array("b")
+        self._directions = array("b")
+        self._sources = array("b")
+        self._details: List[Tuple[str, Optional[str]]] = []
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def append(
+        self,
+        *,
+        day: date,
+        amount: Any,
+        currency: CurrencyCode,
+        transaction_type: TransactionType,
+        source: CashflowSource,
+        description: str,
+        reference_id: Optional[str] = None,
+    ) -> None:
+        self._days.append(day.toordinal())
+        self._amounts.append(to_fixed(amount))
+        self._currencies.append(_CURRENCY_INDEX[currency])
+        self._directions.append(1 if transaction_type == TransactionType.DEPOSIT else -1)
+        self._sources.append(_SOURCE_INDEX[source])
+        if self.keep_entries:
+            self._details.append((description, reference_id))
+
+    def append_entry(self, entry: CashflowEntry) -> None:
+        self.append(
+            day=entry.date,
+            amount=entry.amount,
+            currency=entry.currency,
+            transaction_type=entry.transaction_type,
+            source=entry.source,
+            description=entry.description,
+            reference_id=entry.reference_id,
+        )
+
+    def aggregate(
+        self,
+        start_date: date,
+        end_date: date,
+        currency_filter: Optional[CurrencyCode] = None,
+    ) -> List[DailyCashflow]:
+        """Sum events per day and currency over [start_date, end_date]."""
+        day_count = (end_date - start_date).days + 1
+        currency_count = len(_CURRENCIES)
+        slots = day_count * currency_count
+
+        offsets = np.frombuffer(self._days, dtype=np.int64) - start_date.toordinal()
+        currencies = np.frombuffer(self._currencies, dtype=np.int8).astype(np.int64)
+        directions = np.frombuffer(self._directions, dtype=np.int8)
+        amounts = np.frombuffer(self._amounts, dtype=np.int64)
+
+        mask = (offsets >= 0) & (offsets < day_count)
+        if currency_filter is not None:
+            mask &= currencies == _CURRENCY_INDEX[currency_filter]
+        slot_of = offsets * currency_count + currencies
+
+        deposits = np.zeros(slots, dtype=np.int64)
+        payments = np.zeros(slots, dtype=np.int64)
+        deposit_mask = mask & (directions > 0)
+        payment_mask = mask & (directions < 0)
+        np.add.at(deposits, slot_of[deposit_mask], amounts[deposit_mask])
+        np.add.at(payments, slot_of[payment_mask], amounts[payment_mask])
+
+        entries_by_slot: dict[int, List[CashflowEntry]] = {}
+        if self.keep_entries:
+            for index in np.flatnonzero(mask).tolist():
+                entries_by_slot.setdefault(int(slot_of[index]), []).append(self._entry(index))
+
+        flows: List[DailyCashflow] = []
+        for offset in range(day_count):
+            day = start_date + timedelta(days=offset)
+            for currency_index, currency in enumerate(_CURRENCIES):
+                if currency_filter is not None and currency != currency_filter:
+                    continue
+                slot = offset * currency_count + currency_index
+                deposit = int(deposits[slot])
+                payment = int(payments[slot])
+                flows.append(
+                    DailyCashflow(
+                        date=day,
+                        currency=currency,
+                        total_deposit=from_fixed(deposit),
+                        total_payment=from_fixed(payment),
+                        net_flow=from_fixed(deposit - payment),
+                        entries=entries_by_slot.get(slot, []),
+                    )
+                )
+        return flows
+
+    def _entry(self, index: int) -> CashflowEntry:
+        description, reference_id = self._details[index]
+        return CashflowEntry(
+            date=date.fromordinal(self._days[index]),
+            amount=from_fixed(self._amounts[index]),
+            currency=_CURRENCIES[self._currencies[index]],
+            transaction_type=(
+                TransactionType.DEPOSIT if self._directions[index] > 0 else TransactionType.PAYMENT
+            ),
+            description=description,
+            source=_SOURCES[self._sources[index]],
+            reference_id=reference_id,
+        )
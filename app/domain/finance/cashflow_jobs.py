@@ -41,6 +41,7 @@ async def refresh_cashflow_projection_default_window() -> None:
         )
         cutoff_date = (today - timedelta(days=settings.cashflow_projection_cache_retention_days)).isoformat()
         cashflow_projection_cache.prune_before(cutoff_date)
+        cashflow_projection_cache.prune_source_partitions_before(cutoff_date)
     except Exception as exc:
         logger.warning(
             "Failed to refresh cashflow projection default cache",
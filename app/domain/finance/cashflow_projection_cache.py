@@ -5,7 +5,7 @@ import logging
 import os
 import sqlite3
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.settings import settings
 
@@ -13,7 +13,12 @@ logger = logging.getLogger(__name__)
 
 
 class CashflowProjectionCache:
-    """SQLite-backed daily cache for finance cashflow projections."""
+    """
+    SQLite-backed daily cache for finance cashflow projections.
+
+    The same store keeps the raw ERP rows behind a projection partitioned by source and
+    calendar month, so a projection miss only refetches months that may still change.
+    """
 
     def __init__(self, db_path: Optional[str] = None) -> None:
         self._db_path = db_path or settings.cashflow_projection_cache_db_path
@@ -59,6 +64,17 @@ class CashflowProjectionCache:
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS finance_cashflow_source_partitions (
+                    source TEXT NOT NULL,
+                    month_start TEXT NOT NULL,
+                    payload_json TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    PRIMARY KEY (source, month_start)
+                )
+                """
+            )
             conn.commit()
 
     def get_snapshot(
@@ -176,5 +192,71 @@ class CashflowProjectionCache:
             )
             conn.commit()
 
+    def get_source_partition(
+        self,
+        *,
+        source: str,
+        month_start: str,
+    ) -> Optional[Tuple[List[Dict[str, Any]], datetime]]:
+        """Return the cached raw rows of one source month and when they were fetched."""
+        if not self._enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT payload_json, fetched_at
+                FROM finance_cashflow_source_partitions
+                WHERE source = ?
+                  AND month_start = ?
+                """,
+                (source, month_start),
+            ).fetchone()
+        if not row or not row[0]:
+            return None
+        try:
+            payload = json.loads(row[0])
+            fetched_at = datetime.fromisoformat(row[1])
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return None
+        if not isinstance(payload, list):
+            return None
+        return payload, fetched_at
+
+    def upsert_source_partition(
+        self,
+        *,
+        source: str,
+        month_start: str,
+        rows: List[Dict[str, Any]],
+    ) -> datetime:
+        if not self._enabled:
+            raise ValueError("Cashflow projection cache storage not configured")
+        fetched_at = datetime.utcnow()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO finance_cashflow_source_partitions (
+                    source, month_start, payload_json, fetched_at
+                )
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(source, month_start) DO UPDATE SET
+                    payload_json = excluded.payload_json,
+                    fetched_at = excluded.fetched_at
+                """,
+                (source, month_start, json.dumps(rows, default=str), fetched_at.isoformat()),
+            )
+            conn.commit()
+        return fetched_at
+
+    def prune_source_partitions_before(self, fetched_before: str) -> None:
+        if not self._enabled:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM finance_cashflow_source_partitions WHERE fetched_at < ?",
+                (fetched_before,),
+            )
+            conn.commit()
+
 
 cashflow_projection_cache = CashflowProjectionCache()
@@ -4,20 +4,63 @@ from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import List, Dict, Optional, Any
 import asyncio
+from functools import lru_cache
 from dateutil.relativedelta import relativedelta
 from app.errors import ERPError
 from app.integrations.bc_continia_repository import BusinessCentralContiniaRepository
 
 from app.adapters.erp_client import ERPClient
+from app.domain.finance.cashflow_aggregation import CashflowColumns
+from app.domain.finance.cashflow_projection_cache import CashflowProjectionCache, cashflow_projection_cache
 from app.integrations.finance_repository import FinanceRepository
+from app.integrations.sql_executor import BC_SQL_DB, CEDULE_DB, run_sql
+from app.settings import settings
 from app.domain.finance.models import (
-    CashflowEntry, CashflowProjection, DailyCashflow, 
+    CashflowEntry, CashflowProjection,
     TransactionType, CurrencyCode, CashflowSource,
     ManualEntry, ManualEntryCreate, ManualEntryUpdate, RecurrenceFrequency
 )
 
 logger = logging.getLogger(__name__)
 
+# CDC Document Value codes read from Continia documents in the projection.
+_CONTINIA_VALUE_CODES = ("DOCDATE", "POSTINGDATE", "DUEDATE", "AMOUNTINCLVAT", "CURRCODE")
+
+# Partitioned ERP sources: name -> (ERPClient fetcher, date field the fetcher filters on).
+_CASHFLOW_SOURCES: Dict[str, tuple[str, str]] = {
+    "posted_sales_invoices": ("get_posted_sales_invoices", "Due_Date"),
+    "posted_purchase_invoices": ("get_posted_purchase_invoices", "Due_Date"),
+    "open_purchase_invoices": ("get_open_purchase_invoices", "Due_Date"),
+    "job_planning_lines": ("get_job_planning_lines", "Planning_Date"),
+    "open_po_lines": ("get_open_po_lines", "Expected_Receipt_Date"),
+}
+
+@lru_cache(maxsize=64)
+def _lookup_currency(code: str) -> Optional[CurrencyCode]:
+    try:
+        return CurrencyCode(code)
+    except ValueError:
+        return None
+
+
+def _currency_for_code(code: str) -> CurrencyCode:
+    code = code.upper().strip()
+    currency = _lookup_currency(code)
+    if currency is None:
+        # Logged on every lookup (not inside the cache) so each bad row stays visible.
+        logger.warning(f"Unknown currency code {code}, defaulting to CAD")
+        return CurrencyCode.CAD
+    return currency
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso_day(value: str) -> Optional[date]:
+    """Parse the date part of an ISO string; ERP rows repeat the same few dates a lot."""
+    try:
+        return datetime.fromisoformat(value.split('T')[0]).date()
+    except Exception:
+        return None
+
 class PaymentTermCalculator:
     """Helper to calculate due dates based on BC payment terms formulas."""
     
@@ -106,16 +149,19 @@ class CashflowService:
         erp_client: ERPClient,
         repository: FinanceRepository,
         continia_repository: Optional[BusinessCentralContiniaRepository] = None,
+        partition_cache: Optional[CashflowProjectionCache] = None,
     ):
         self.erp = erp_client
         self.repo = repository
         self.continia_repo = continia_repository or BusinessCentralContiniaRepository()
+        self.partition_cache = partition_cache or cashflow_projection_cache
 
     async def get_projection(
         self, 
         start_date: date, 
         end_date: date, 
-        currency_filter: Optional[CurrencyCode] = None
+        currency_filter: Optional[CurrencyCode] = None,
+        include_entries: bool = True,
     ) -> CashflowProjection:
         if start_date > end_date:
             raise ERPError("Invalid date range: start_date must be <= end_date")
@@ -128,7 +174,7 @@ class CashflowService:
             self.erp.get_payment_terms_definitions(),
             self.erp.get_continia_invoices(),
         )
-        manual_entries = await asyncio.to_thread(self.repo.get_all_entries)
+        manual_entries = await run_sql(CEDULE_DB, self.repo.get_all_entries)
 
         # Continia SQL is mandatory (fail-closed) for amounts.
         if not self.continia_repo.is_configured:
@@ -149,15 +195,18 @@ class CashflowService:
         fetch_start = start_date - timedelta(days=lookback_days)
 
         # Fetch Continia documents by DUEDATE directly (no lookback).
-        continia_docs = await asyncio.to_thread(
+        continia_docs = await run_sql(
+            BC_SQL_DB,
             self.continia_repo.list_purchase_documents_by_due_date,
             due_from=start_date,
             due_to=end_date,
         )
         continia_doc_nos = [d.document_no for d in continia_docs]
-        continia_values_by_doc = await asyncio.to_thread(
+        continia_values_by_doc = await run_sql(
+            BC_SQL_DB,
             self.continia_repo.get_document_values_batch,
             continia_doc_nos,
+            codes=_CONTINIA_VALUE_CODES,
         )
 
         # We do two sets of month-ranges:
@@ -170,16 +219,16 @@ class CashflowService:
         async def fetch_month_posted(m_start: date, m_end: date):
             async with semaphore:
                 return await asyncio.gather(
-                    self.erp.get_posted_sales_invoices(m_start, m_end),
-                    self.erp.get_posted_purchase_invoices(m_start, m_end),
-                    self.erp.get_open_purchase_invoices(m_start, m_end),
+                    self._load_source_month("posted_sales_invoices", m_start, m_end),
+                    self._load_source_month("posted_purchase_invoices", m_start, m_end),
+                    self._load_source_month("open_purchase_invoices", m_start, m_end),
                 )
 
         async def fetch_month_base(m_start: date, m_end: date):
             async with semaphore:
                 return await asyncio.gather(
-                    self.erp.get_job_planning_lines(m_start, m_end),
-                    self.erp.get_open_po_lines(m_start, m_end),
+                    self._load_source_month("job_planning_lines", m_start, m_end),
+                    self._load_source_month("open_po_lines", m_start, m_end),
                 )
 
         posted_results = await asyncio.gather(
@@ -207,7 +256,7 @@ class CashflowService:
         # New: Vendor Currency Map for open POs that don't have currency on line
         vendor_currencies = {v['No']: v.get('Currency_Code') for v in vendors}
 
-        all_entries: List[CashflowEntry] = []
+        columns = CashflowColumns(keep_entries=include_entries)
 
         # 3. Process ERP Sales Invoices
         # Build ref->amount index for de-duplication with jobs (Your_Reference not exposed in OData here,
@@ -242,15 +291,15 @@ class CashflowService:
                 except Exception:
                     pass
             
-            all_entries.append(CashflowEntry(
-                date=doc_date,
+            columns.append(
+                day=doc_date,
                 amount=amount,
                 currency=curr,
                 transaction_type=TransactionType.DEPOSIT,
                 description=f"Posted Invoice {inv.get('No')}",
                 source=CashflowSource.ERP_SALES,
                 reference_id=inv.get('No')
-            ))
+            )
 
         # 4. Process Job Planning Lines
         job_cache: Dict[str, Dict[str, Any]] = {}
@@ -290,15 +339,15 @@ class CashflowService:
                 if any((c.quantize(Decimal("0.01")) if hasattr(c, "quantize") else c) == amt2 for c in candidates):
                     continue
 
-            all_entries.append(CashflowEntry(
-                date=due_date,
+            columns.append(
+                day=due_date,
                 amount=amount,
                 currency=curr,
                 transaction_type=TransactionType.DEPOSIT,
                 description=f"Job Project {job_no}",
                 source=CashflowSource.ERP_JOB,
                 reference_id=job.get('Document_No') or job_no
-            ))
+            )
 
         # 5. Process Posted Purchase Invoices
         for pinv in posted_purchase_invoices:
@@ -310,15 +359,15 @@ class CashflowService:
             amount = Decimal(str(pinv.get('Remaining_Amount') or pinv.get('Amount_Including_VAT') or 0))
             curr = self._map_currency(pinv.get('Currency_Code'))
 
-            all_entries.append(CashflowEntry(
-                date=doc_date,
+            columns.append(
+                day=doc_date,
                 amount=amount,
                 currency=curr,
                 transaction_type=TransactionType.PAYMENT,
                 description=f"Posted Purchase Inv {pinv.get('No')}",
                 source=CashflowSource.ERP_PURCHASE,
                 reference_id=pinv.get('No')
-            ))
+            )
 
         # 6. Process Open Purchase Invoices (kept separate from Continia)
         for opinv in open_purchase_invoices:
@@ -337,15 +386,15 @@ class CashflowService:
             amount = Decimal(str(opinv.get('Amount_Including_VAT') or opinv.get('Amount') or 0))
             curr = self._map_currency(opinv.get('Currency_Code'))
 
-            all_entries.append(CashflowEntry(
-                date=due_date,
+            columns.append(
+                day=due_date,
                 amount=amount,
                 currency=curr,
                 transaction_type=TransactionType.PAYMENT,
                 description=f"Open Purchase Inv {opinv.get('No')}",
                 source=CashflowSource.ERP_PURCHASE,
                 reference_id=opinv.get('No')
-            ))
+            )
 
         # 7. Continia endpoint is still mandatory (availability/consistency check),
         # but its payload does not expose amounts in this environment. Amounts are
@@ -390,16 +439,14 @@ class CashflowService:
             # Prefer currency from CDC values when present, else vendor currency, else CAD.
             cdc_currency = values.text_values.get("CURRCODE") if values else None
             curr = self._map_currency(cdc_currency or vendor_currencies.get(doc.vendor_code or ""))
-            all_entries.append(
-                CashflowEntry(
-                    date=due_date,
-                    amount=amount_incl,
-                    currency=curr,
-                    transaction_type=TransactionType.PAYMENT,
-                    description=f"Continia Inv {doc.document_no}",
-                    source=CashflowSource.ERP_PURCHASE,
-                    reference_id=doc.document_no,
-                )
+            columns.append(
+                day=due_date,
+                amount=amount_incl,
+                currency=curr,
+                transaction_type=TransactionType.PAYMENT,
+                description=f"Continia Inv {doc.document_no}",
+                source=CashflowSource.ERP_PURCHASE,
+                reference_id=doc.document_no,
             )
 
         # 8. Process Open Purchase Order Lines (To be received)
@@ -437,78 +484,85 @@ class CashflowService:
             
             curr = self._map_currency(curr_code)
             
-            all_entries.append(CashflowEntry(
-                date=due_date,
+            columns.append(
+                day=due_date,
                 amount=amount,
                 currency=curr,
                 transaction_type=TransactionType.PAYMENT,
                 description=f"PO {line.get('Document_No')} Line {line.get('Line_No')}",
                 source=CashflowSource.ERP_PURCHASE,
                 reference_id=f"{line.get('Document_No')}-{line.get('Line_No')}"
-            ))
+            )
 
         # 9. Process Manual Entries
         for entry in manual_entries:
             if entry.is_periodic:
                 # Expand periodic
-                expanded = self._expand_periodic_entry(entry, start_date, end_date)
-                all_entries.extend(expanded)
+                for expanded in self._expand_periodic_entry(entry, start_date, end_date):
+                    columns.append_entry(expanded)
             else:
                 if entry.transaction_date and start_date <= entry.transaction_date <= end_date:
-                    all_entries.append(self._map_manual_to_cashflow(entry, entry.transaction_date))
-
-        # 10. Filter and Aggregate
-        filtered_entries = [
-            e for e in all_entries 
-            if start_date <= e.date <= end_date 
-            and (not currency_filter or e.currency == currency_filter)
-        ]
-        
-        # Group by date
-        daily_map: Dict[date, Dict[CurrencyCode, DailyCashflow]] = {}
-        
-        # Initialize range
-        delta = end_date - start_date
-        for i in range(delta.days + 1):
-            d = start_date + timedelta(days=i)
-            daily_map[d] = {}
-            for c in CurrencyCode:
-                daily_map[d][c] = DailyCashflow(date=d, currency=c)
-
-        for e in filtered_entries:
-            d_flow = daily_map.get(e.date)
-            if not d_flow:
-                # Should be covered by init unless date parsing went out of bounds
-                continue
-                
-            flow_entry = d_flow.get(e.currency)
-            if not flow_entry:
-                flow_entry = DailyCashflow(date=e.date, currency=e.currency)
-                d_flow[e.currency] = flow_entry
-                
-            if e.transaction_type == TransactionType.DEPOSIT:
-                flow_entry.total_deposit += e.amount
-                flow_entry.net_flow += e.amount
-            else:
-                flow_entry.total_payment += e.amount
-                flow_entry.net_flow -= e.amount
-            
-            flow_entry.entries.append(e)
-
-        # Flatten
-        final_flows = []
-        for d in sorted(daily_map.keys()):
-            for c in CurrencyCode:
-                if currency_filter and c != currency_filter:
-                    continue
-                final_flows.append(daily_map[d][c])
+                    columns.append_entry(self._map_manual_to_cashflow(entry, entry.transaction_date))
 
+        # 10. Filter and aggregate per day/currency (entries only materialized on request)
         return CashflowProjection(
             start_date=start_date,
             end_date=end_date,
-            daily_flows=final_flows
+            daily_flows=columns.aggregate(start_date, end_date, currency_filter),
         )
 
+    async def _load_source_month(self, source: str, m_start: date, m_end: date) -> List[Dict[str, Any]]:
+        """
+        Return the ERP rows of one source for a range inside a single calendar month.
+
+        Whole months are fetched and cached as partitions; closed months stay pinned for
+        `cashflow_closed_month_partition_ttl_hours`, the current and future months are
+        refetched once older than `cashflow_open_month_partition_ttl_seconds`.
+        """
+        fetcher_name, date_field = _CASHFLOW_SOURCES[source]
+        fetch = getattr(self.erp, fetcher_name)
+        if not self.partition_cache.is_configured:
+            return await fetch(m_start, m_end)
+
+        month_start = m_start.replace(day=1)
+        month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
+        cached = await asyncio.to_thread(
+            self.partition_cache.get_source_partition,
+            source=source,
+            month_start=month_start.isoformat(),
+        )
+        if cached and self._partition_is_fresh(month_end, cached[1]):
+            rows = cached[0]
+        else:
+            rows = await fetch(month_start, month_end)
+            try:
+                await asyncio.to_thread(
+                    self.partition_cache.upsert_source_partition,
+                    source=source,
+                    month_start=month_start.isoformat(),
+                    rows=rows,
+                )
+            except Exception as exc:
+                logger.warning(
+                    "Failed to cache cashflow source partition",
+                    extra={"source": source, "month_start": month_start.isoformat(), "error": str(exc)},
+                )
+
+        if m_start == month_start and m_end == month_end:
+            return rows
+        # Mirror the server-side date filter of the fetcher for partial months.
+        return [
+            row for row in rows
+            if (row_date := self._parse_date(row.get(date_field))) and m_start <= row_date <= m_end
+        ]
+
+    @staticmethod
+    def _partition_is_fresh(month_end: date, fetched_at: datetime) -> bool:
+        age = datetime.utcnow() - fetched_at
+        if month_end < date.today().replace(day=1):
+            return age <= timedelta(hours=settings.cashflow_closed_month_partition_ttl_hours)
+        return age <= timedelta(seconds=settings.cashflow_open_month_partition_ttl_seconds)
+
     # CRUD for Manual Entries
     def create_entry(self, entry: ManualEntryCreate) -> ManualEntry:
         return self.repo.create_entry(entry)
@@ -523,22 +577,14 @@ class CashflowService:
     def _map_currency(self, code: Optional[str]) -> CurrencyCode:
         if not code or code.strip() == "":
             return CurrencyCode.CAD
-        code = code.upper().strip()
-        try:
-            return CurrencyCode(code)
-        except ValueError:
-            logger.warning(f"Unknown currency code {code}, defaulting to CAD")
-            return CurrencyCode.CAD
+        return _currency_for_code(code)
 
     def _parse_date(self, date_val: Any) -> Optional[date]:
         if not date_val:
             return None
         if isinstance(date_val, date):
             return date_val
-        try:
-            return datetime.fromisoformat(str(date_val).split('T')[0]).date()
-        except Exception:
-            return None
+        return _parse_iso_day(str(date_val))
 
     def _map_manual_to_cashflow(self, entry: ManualEntry, date_val: date) -> CashflowEntry:
         return CashflowEntry(
@@ -13,6 +13,7 @@ from app.domain.kpi.models import (
 )
 from app.domain.kpi.payables_invoice_stats_cache import payables_invoice_stats_cache
 from app.integrations.bc_continia_repository import BusinessCentralContiniaRepository
+from app.integrations.sql_executor import BC_SQL_DB, run_sql
 from app.settings import settings
 
 
@@ -139,9 +140,11 @@ class PayablesInvoiceStatsService:
         doc_nos = [doc_no for doc_no in (self._invoice_no(row) for row in continia_rows) if doc_no]
         if not doc_nos:
             return {}
-        values_map = await asyncio.to_thread(
+        values_map = await run_sql(
+            BC_SQL_DB,
             self._continia_repo.get_document_values_batch,
             doc_nos,
+            codes=("AMOUNTINCLVAT",),
         )
         return {
             doc_no: values.decimal_values.get("AMOUNTINCLVAT", Decimal("0"))
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import datetime as dt
 from decimal import Decimal
 from typing import Any, Dict, Iterable, Literal, Optional
@@ -13,6 +12,7 @@ from app.domain.kpi.models import (
 )
 from app.domain.kpi.purchasing_stats_cache import purchasing_stats_cache
 from app.integrations.cedule_purchasing_kpi_repository import CedulePurchasingKpiRepository
+from app.integrations.sql_executor import CEDULE_DB, run_sql
 from app.settings import settings
 
 PurchasingPeriod = Literal["day", "week", "month"]
@@ -161,7 +161,8 @@ class PurchasingStatsService:
 
         action_categories: list[PurchasingActionCategoryStats] = []
         if self._cedule_repository.is_configured:
-            action_rows = await asyncio.to_thread(
+            action_rows = await run_sql(
+                CEDULE_DB,
                 self._cedule_repository.list_action_counts_by_category,
                 start_date=start_date,
                 end_date=end_date,
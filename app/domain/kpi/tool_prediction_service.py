@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import asyncio
 import datetime as dt
-from typing import Any, Optional
+import logging
+import time
+from typing import Any, Awaitable, Optional, TypeVar
 
 from app.adapters.tool_prediction_client import ToolPredictionClient
 from app.domain.kpi.models import (
@@ -10,11 +12,18 @@ from app.domain.kpi.models import (
     ToolShortagePredictionSnapshotResponse,
 )
 from app.domain.tooling.future_needs_service import FutureToolingNeedService
+from app.domain.tooling.models import FutureToolingNeedResponse
+from app.domain.tooling.nc_program_source import ProgramToolsCache
 from app.domain.tooling.usage_history_service import ToolingUsageHistoryService
 from app.integrations.tool_prediction_feature_repository import ToolPredictionFeatureRepository
 from app.integrations.tool_prediction_repository import ToolPredictionSnapshotRepository
+from app.integrations.sql_executor import CEDULE_DB, TOOL_PREDICTION_DB, run_sql
 from app.settings import settings
 
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
 
 def parse_tool_prediction_date(value: Optional[str]) -> dt.date:
     if value is None:
@@ -70,11 +79,18 @@ class ToolPredictionKpiService:
         snapshot_repository: ToolPredictionSnapshotRepository | None = None,
         predictor_client: ToolPredictionClient | None = None,
     ) -> None:
-        self._future_needs_service = future_needs_service or FutureToolingNeedService()
-        self._usage_history_service = usage_history_service or ToolingUsageHistoryService()
+        # Future needs and usage history resolve largely the same NC programs; share the lookups.
+        self._program_tools_cache = ProgramToolsCache()
+        self._future_needs_service = future_needs_service or FutureToolingNeedService(
+            program_tools_cache=self._program_tools_cache
+        )
+        self._usage_history_service = usage_history_service or ToolingUsageHistoryService(
+            program_tools_cache=self._program_tools_cache
+        )
         self._feature_repository = feature_repository or ToolPredictionFeatureRepository()
         self._snapshot_repository = snapshot_repository or ToolPredictionSnapshotRepository()
         self._predictor_client = predictor_client or ToolPredictionClient()
+        self.last_refresh_timings: dict[str, dict[str, float]] = {}
 
     @property
     def is_configured(self) -> bool:
@@ -93,44 +109,119 @@ class ToolPredictionKpiService:
         generated_at = dt.datetime.now(dt.timezone.utc)
         targets = parse_tool_prediction_targets(settings.tool_prediction_targets)
 
-        total_rows = 0
-        for work_center_no, machine_center in targets:
-            base_rows = await self._build_feature_rows(
-                work_center_no=work_center_no,
-                machine_center=machine_center,
-                refresh_sources=refresh_sources,
+        semaphore = asyncio.Semaphore(settings.tool_prediction_refresh_concurrency)
+        shared_future_needs: dict[str, asyncio.Task[FutureToolingNeedResponse]] = {}
+        timings: dict[str, dict[str, float]] = {f"{wc}:{mc}": {} for wc, mc in targets}
+
+        async def _refresh(work_center_no: str, machine_center: str) -> int:
+            async with semaphore:
+                return await self._refresh_target(
+                    work_center_no=work_center_no,
+                    machine_center=machine_center,
+                    snapshot_date=snapshot_date,
+                    generated_at=generated_at,
+                    refresh_sources=refresh_sources,
+                    stage_timings=timings[f"{work_center_no}:{machine_center}"],
+                    shared_future_needs=shared_future_needs,
+                )
+
+        started = time.perf_counter()
+        try:
+            # Let every target finish (or fail) before surfacing an error, so no pipeline
+            # is still writing its snapshot after the caller has seen the failure.
+            outcomes = await asyncio.gather(
+                *(_refresh(wc, mc) for wc, mc in targets), return_exceptions=True
             )
-            payload_rows = [_build_prediction_payload(row) for row in base_rows]
-            predictions = await self._predictor_client.predict_rows(
+        finally:
+            self.last_refresh_timings = timings
+        failures = [
+            (target, outcome) for target, outcome in zip(targets, outcomes) if isinstance(outcome, BaseException)
+        ]
+        if failures:
+            for (work_center_no, machine_center), exc in failures:
+                logger.warning(
+                    "Tool prediction target refresh failed",
+                    extra={
+                        "work_center_no": work_center_no,
+                        "machine_center": machine_center,
+                        "error": str(exc),
+                    },
+                )
+            raise failures[0][1]
+        written = list(outcomes)
+        logger.info(
+            "Tool prediction snapshot refreshed",
+            extra={
+                "snapshot_date": snapshot_date.isoformat(),
+                "targets": len(targets),
+                "rows": sum(written),
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+                "stage_timings": timings,
+                "program_cache_hits": self._program_tools_cache.hits,
+                "program_cache_misses": self._program_tools_cache.misses,
+            },
+        )
+        return sum(written)
+
+    async def _refresh_target(
+        self,
+        *,
+        work_center_no: str,
+        machine_center: str,
+        snapshot_date: dt.date,
+        generated_at: dt.datetime,
+        refresh_sources: bool,
+        stage_timings: dict[str, float],
+        shared_future_needs: dict[str, asyncio.Task[FutureToolingNeedResponse]],
+    ) -> int:
+        """Features, predictions and snapshot write for one (work center, machine center) pair."""
+        started = time.perf_counter()
+        base_rows = await self._build_feature_rows(
+            work_center_no=work_center_no,
+            machine_center=machine_center,
+            refresh_sources=refresh_sources,
+            stage_timings=stage_timings,
+            shared_future_needs=shared_future_needs,
+        )
+        payload_rows = [_build_prediction_payload(row) for row in base_rows]
+        predictions = await _timed(
+            stage_timings,
+            "predict",
+            self._predictor_client.predict_rows(
                 machine_center=machine_center,
                 rows=payload_rows,
-            )
+            ),
+        )
 
-            rows_to_store: list[dict[str, Any]] = []
-            for row in base_rows:
-                tool_id = str(row.get("tool_id") or "").strip().upper()
-                predicted = predictions.get(tool_id, {})
-                rows_to_store.append(
-                    {
-                        **row,
-                        "shortage_probability": _safe_probability(predicted.get("shortage_probability")),
-                        "shortage_label": _clean_text(predicted.get("shortage_label")),
-                        "prediction_payload_json": _build_prediction_payload(row),
-                        "predictor_response_json": predicted.get("raw"),
-                    }
-                )
+        rows_to_store: list[dict[str, Any]] = []
+        for row, payload in zip(base_rows, payload_rows):
+            tool_id = str(row.get("tool_id") or "").strip().upper()
+            predicted = predictions.get(tool_id, {})
+            rows_to_store.append(
+                {
+                    **row,
+                    "shortage_probability": _safe_probability(predicted.get("shortage_probability")),
+                    "shortage_label": _clean_text(predicted.get("shortage_label")),
+                    "prediction_payload_json": payload,
+                    "predictor_response_json": predicted.get("raw"),
+                }
+            )
 
-            written = await asyncio.to_thread(
+        written = await _timed(
+            stage_timings,
+            "write",
+            run_sql(
+                TOOL_PREDICTION_DB,
                 self._snapshot_repository.upsert_snapshot_rows,
                 snapshot_date=snapshot_date.isoformat(),
                 machine_center=machine_center,
                 work_center_no=work_center_no,
                 generated_at=generated_at,
                 rows=rows_to_store,
-            )
-            total_rows += written
-
-        return total_rows
+            ),
+        )
+        stage_timings["total"] = round(time.perf_counter() - started, 4)
+        return written
 
     async def get_latest_snapshot(
         self,
@@ -138,7 +229,8 @@ class ToolPredictionKpiService:
         machine_center: Optional[str] = None,
         limit: int = 200,
     ) -> ToolShortagePredictionSnapshotResponse:
-        latest_snapshot = await asyncio.to_thread(
+        latest_snapshot = await run_sql(
+            TOOL_PREDICTION_DB,
             self._snapshot_repository.get_latest_snapshot_date,
             machine_center=_clean_machine_center(machine_center),
         )
@@ -163,7 +255,8 @@ class ToolPredictionKpiService:
         machine_center: Optional[str] = None,
         limit: int = 200,
     ) -> ToolShortagePredictionSnapshotResponse:
-        rows = await asyncio.to_thread(
+        rows = await run_sql(
+            TOOL_PREDICTION_DB,
             self._snapshot_repository.list_snapshot_rows,
             snapshot_date=snapshot_date.isoformat(),
             machine_center=_clean_machine_center(machine_center),
@@ -184,16 +277,64 @@ class ToolPredictionKpiService:
         work_center_no: str,
         machine_center: str,
         refresh_sources: bool,
+        stage_timings: Optional[dict[str, float]] = None,
+        shared_future_needs: Optional[dict[str, asyncio.Task[FutureToolingNeedResponse]]] = None,
     ) -> list[dict[str, Any]]:
-        future_needs = await self._future_needs_service.get_future_needs(
-            work_center_no=work_center_no,
-            refresh=refresh_sources,
-        )
-        usage_history = await self._usage_history_service.get_usage_history(
-            work_center_no=work_center_no,
-            machine_center=machine_center,
-            months=3,
-            refresh=refresh_sources,
+        timings = stage_timings if stage_timings is not None else {}
+        # Targets sharing a work center share its future-needs build.
+        shared = shared_future_needs if shared_future_needs is not None else {}
+        future_needs_task = shared.get(work_center_no)
+        if future_needs_task is None:
+            future_needs_task = asyncio.ensure_future(
+                self._future_needs_service.get_future_needs(
+                    work_center_no=work_center_no,
+                    refresh=refresh_sources,
+                )
+            )
+            shared[work_center_no] = future_needs_task
+
+        now_utc = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        future_needs, usage_history, inventory_by_tool, usage_by_tool, wear_by_tool = await asyncio.gather(
+            _timed(timings, "future_needs", asyncio.shield(future_needs_task)),
+            _timed(
+                timings,
+                "usage_history",
+                self._usage_history_service.get_usage_history(
+                    work_center_no=work_center_no,
+                    machine_center=machine_center,
+                    months=3,
+                    refresh=refresh_sources,
+                ),
+            ),
+            _timed(
+                timings,
+                "inventory_metrics",
+                run_sql(
+                    CEDULE_DB,
+                    self._feature_repository.list_inventory_metrics,
+                    machine_center=machine_center,
+                ),
+            ),
+            _timed(
+                timings,
+                "usage_metrics",
+                run_sql(
+                    CEDULE_DB,
+                    self._feature_repository.list_usage_metrics,
+                    machine_center=machine_center,
+                    t0=now_utc,
+                ),
+            ),
+            _timed(
+                timings,
+                "wear_metrics",
+                run_sql(
+                    CEDULE_DB,
+                    self._feature_repository.list_wear_metrics,
+                    machine_center=machine_center,
+                    t0=now_utc,
+                ),
+            ),
         )
 
         usage_minutes_90d: dict[str, float] = {}
@@ -203,24 +344,6 @@ class ToolPredictionKpiService:
                 continue
             usage_minutes_90d[tool_id] = max(float(summary.total_estimated_use_time_seconds) / 60.0, 0.0)
 
-        now_utc = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
-        inventory_by_tool, usage_by_tool, wear_by_tool = await asyncio.gather(
-            asyncio.to_thread(
-                self._feature_repository.list_inventory_metrics,
-                machine_center=machine_center,
-            ),
-            asyncio.to_thread(
-                self._feature_repository.list_usage_metrics,
-                machine_center=machine_center,
-                t0=now_utc,
-            ),
-            asyncio.to_thread(
-                self._feature_repository.list_wear_metrics,
-                machine_center=machine_center,
-                t0=now_utc,
-            ),
-        )
-
         rows: list[dict[str, Any]] = []
         for summary in future_needs.tools_summary:
             tool_id = _clean_tool_id(summary.tool_id)
@@ -276,6 +399,14 @@ class ToolPredictionKpiService:
         return rows
 
 
+async def _timed(timings: dict[str, float], stage: str, awaitable: Awaitable[_T]) -> _T:
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round(time.perf_counter() - started, 4)
+
+
 def _build_prediction_payload(row: dict[str, Any]) -> dict[str, Any]:
     return {
         "tool_id": row.get("tool_id"),
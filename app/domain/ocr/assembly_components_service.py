@@ -7,14 +7,14 @@ from __future__ import annotations
 from app.domain.documents.file_share_service import FileShareService
 from app.domain.ocr.assembly_bom_extractor import AssemblyBOMExtractor
 from app.domain.ocr.assembly_models import AssemblyComponentsResponse, AssemblyComponent, PdfPosition
-from app.domain.ocr.bubble_locator import BubbleLocator
+from app.domain.documents.pdf_rendering import pdf_renderer
+from app.domain.ocr.bubble_locator import locate_labels
 
 
 class AssemblyComponentsService:
     def __init__(self, *, file_share_service: FileShareService):
         self._file_share_service = file_share_service
         self._extractor = AssemblyBOMExtractor()
-        self._bubble_locator = BubbleLocator()
 
     async def extract_components_for_item(
         self,
@@ -33,9 +33,16 @@ class AssemblyComponentsService:
         parsed = self._extractor.extract_components_from_pdf(pdf_bytes, root_item_no=item_no)
 
         positions: dict[str, PdfPosition] = {}
-        if include_pdf_position:
+        if include_pdf_position and parsed:
+            # One document parse for every bubble label, off the event loop.
+            locations = await pdf_renderer.run(
+                locate_labels,
+                pdf_bytes,
+                [c.position for c in parsed],
+                prefer_drawing_pages=True,
+            )
             for c in parsed:
-                loc = self._bubble_locator.locate_label(pdf_bytes, label=c.position, prefer_drawing_pages=True)
+                loc = locations.get((c.position or "").strip())
                 if loc is None:
                     continue
                 positions[c.position] = PdfPosition(page=loc.page, top=loc.top, left=loc.left)
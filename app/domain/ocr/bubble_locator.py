@@ -8,7 +8,7 @@ and returns a best-effort page/top/left. It does NOT attempt to detect the circl
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 import fitz  # PyMuPDF
 
@@ -30,65 +30,107 @@ class BubbleLocator:
         prefer_drawing_pages: bool = True,
         max_pages: int | None = None,
     ) -> Optional[BubbleLocation]:
-        label = (label or "").strip()
-        if not label:
-            return None
-
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        try:
-            # First pass: explicitly prefer a specific page (default: 1) since exploded views
-            # are typically on the first page for assembly drawings.
-            if preferred_page is not None and doc.page_count > 0:
-                idx = preferred_page - 1
-                if 0 <= idx < doc.page_count:
-                    page = doc[idx]
-                    rects = page.search_for(label)
-                    if rects:
-                        r = sorted(rects, key=lambda rr: (rr.width * rr.height, rr.y0, rr.x0))[0]
-                        return BubbleLocation(page=preferred_page, left=int(round(r.x0)), top=int(round(r.y0)))
-
-            page_indices = list(range(doc.page_count))
-            if max_pages is not None:
-                page_indices = page_indices[:max_pages]
-
-            # Heuristic: exploded-view pages usually have little text, while BOM tables have lots.
-            if prefer_drawing_pages:
-                scored = []
-                for i in page_indices:
-                    t = (doc[i].get_text("text") or "")
-                    scored.append((len(t), i))
-                scored.sort(key=lambda x: x[0])
-                page_indices = [i for _, i in scored]
-
-            # best tuple uses only primitive types to avoid Rect comparisons
-            best: tuple[float, int, float, float, fitz.Rect] | None = None  # (area, page_idx, y0, x0, rect)
-            for i in page_indices:
-                page = doc[i]
-                rects = page.search_for(label)
-                if not rects:
-                    continue
-                for r in rects:
-                    area = r.width * r.height
-                    candidate = (area, i, r.y0, r.x0, r)
-                    if best is None or candidate[:4] < best[:4]:
-                        best = candidate
-
-            if best is None and prefer_drawing_pages:
-                # Fallback: scan all pages in order.
-                for i in (list(range(doc.page_count)) if max_pages is None else list(range(min(doc.page_count, max_pages)))):
-                    page = doc[i]
-                    rects = page.search_for(label)
-                    if not rects:
-                        continue
-                    r = sorted(rects, key=lambda rr: rr.width * rr.height)[0]
-                    return BubbleLocation(page=i + 1, left=int(round(r.x0)), top=int(round(r.y0)))
-
-            if best is None:
-                return None
-
-            _, page_idx, _, _, rect = best
-            return BubbleLocation(page=page_idx + 1, left=int(round(rect.x0)), top=int(round(rect.y0)))
-        finally:
-            doc.close()
-
-
+        return locate_labels(
+            pdf_bytes,
+            [label],
+            preferred_page=preferred_page,
+            prefer_drawing_pages=prefer_drawing_pages,
+            max_pages=max_pages,
+        ).get((label or "").strip())
+
+
+def locate_labels(
+    pdf_bytes: bytes,
+    labels: Iterable[str],
+    *,
+    preferred_page: int | None = 1,
+    prefer_drawing_pages: bool = True,
+    max_pages: int | None = None,
+) -> Dict[str, BubbleLocation]:
+    """Locate several labels with one parse of the document; missing labels are omitted.
+
+    Module-level (rather than a method) so it can run on the shared PDF render pool.
+    """
+    wanted = [label for label in dict.fromkeys((label or "").strip() for label in labels) if label]
+    if not wanted:
+        return {}
+
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        page_indices = list(range(doc.page_count))
+        if max_pages is not None:
+            page_indices = page_indices[:max_pages]
+
+        # Heuristic: exploded-view pages usually have little text, while BOM tables have lots.
+        # Scored once per document instead of once per label.
+        ordered_indices = page_indices
+        if prefer_drawing_pages:
+            scored = [(len(doc[i].get_text("text") or ""), i) for i in page_indices]
+            scored.sort(key=lambda x: x[0])
+            ordered_indices = [i for _, i in scored]
+
+        locations: Dict[str, BubbleLocation] = {}
+        for label in wanted:
+            location = _locate_in_document(
+                doc,
+                label,
+                preferred_page=preferred_page,
+                prefer_drawing_pages=prefer_drawing_pages,
+                ordered_indices=ordered_indices,
+                page_indices=page_indices,
+            )
+            if location is not None:
+                locations[label] = location
+        return locations
+    finally:
+        doc.close()
+
+
+def _locate_in_document(
+    doc: "fitz.Document",
+    label: str,
+    *,
+    preferred_page: int | None,
+    prefer_drawing_pages: bool,
+    ordered_indices: list[int],
+    page_indices: list[int],
+) -> Optional[BubbleLocation]:
+    # First pass: explicitly prefer a specific page (default: 1) since exploded views
+    # are typically on the first page for assembly drawings.
+    if preferred_page is not None and doc.page_count > 0:
+        idx = preferred_page - 1
+        if 0 <= idx < doc.page_count:
+            page = doc[idx]
+            rects = page.search_for(label)
+            if rects:
+                r = sorted(rects, key=lambda rr: (rr.width * rr.height, rr.y0, rr.x0))[0]
+                return BubbleLocation(page=preferred_page, left=int(round(r.x0)), top=int(round(r.y0)))
+
+    # best tuple uses only primitive types to avoid Rect comparisons
+    best: tuple[float, int, float, float, fitz.Rect] | None = None  # (area, page_idx, y0, x0, rect)
+    for i in ordered_indices:
+        page = doc[i]
+        rects = page.search_for(label)
+        if not rects:
+            continue
+        for r in rects:
+            area = r.width * r.height
+            candidate = (area, i, r.y0, r.x0, r)
+            if best is None or candidate[:4] < best[:4]:
+                best = candidate
+
+    if best is None and prefer_drawing_pages:
+        # Fallback: scan all pages in order.
+        for i in page_indices:
+            page = doc[i]
+            rects = page.search_for(label)
+            if not rects:
+                continue
+            r = sorted(rects, key=lambda rr: rr.width * rr.height)[0]
+            return BubbleLocation(page=i + 1, left=int(round(r.x0)), top=int(round(r.y0)))
+
+    if best is None:
+        return None
+
+    _, page_idx, _, _, rect = best
+    return BubbleLocation(page=page_idx + 1, left=int(round(rect.x0)), top=int(round(rect.y0)))
@@ -15,6 +15,7 @@ import logfire
 from pydantic import BaseModel
 
 from app.ports import OCRClientProtocol
+from app.domain.documents.pdf_rendering import pdf_renderer
 from app.domain.ocr.models import (
     OCRExtractionResponse,
     CarrierAccountStatementExtraction,
@@ -1013,7 +1014,7 @@ class OCRService:
         return out.getvalue()
 
     @staticmethod
-    def _extract_pdf_text_chunks(
+    async def _extract_pdf_text_chunks(
         file_content: bytes,
         *,
         max_pages: int = 60,
@@ -1023,15 +1024,14 @@ class OCRService:
         if chunk_pages <= 0:
             chunk_pages = 1
 
-        reader = PdfReader(io.BytesIO(file_content))
-        total_pages = min(len(reader.pages), max_pages)
+        pages = await pdf_renderer.extract_text(file_content, max_pages=max_pages)
+        total_pages = len(pages)
         chunks: list[tuple[int, int, str]] = []
         current_parts: list[str] = []
         chunk_start_page = 1
 
-        for page_index in range(total_pages):
+        for page_index, extracted in enumerate(pages):
             page_number = page_index + 1
-            extracted = reader.pages[page_index].extract_text() or ""
             if extracted.strip():
                 current_parts.append(f"[Page {page_number}]\n{extracted.strip()}")
 
@@ -5,9 +5,10 @@ This module implements the core business rules for purchasing operations,
 including PO line updates, receipts, returns, and related workflows.
 """
 
+import asyncio
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 import logging
 
@@ -20,9 +21,13 @@ from app.audit import (
     get_idempotency_record,
     save_idempotency_record,
     write_audit_log,
+    write_audit_logs,
     AuditContext
 )
 from app.domain.dtos import (
+    BulkPOLineChange,
+    BulkPOLineResult,
+    BulkUpdatePOLinesCommand,
     POLineDTO,
     UpdatePOLineDateCommand,
     UpdatePOLinePriceCommand,
@@ -34,7 +39,7 @@ from app.domain.dtos import (
     ReturnLineDTO,
     PurchaseOrderDTO
 )
-from app.errors import ValidationException, ERPError
+from app.errors import BaseAPIException, ValidationException, ERPConflict, ERPError, ERPNotFound
 
 
 class PurchasingService:
@@ -582,6 +587,128 @@ class PurchasingService:
                 context={"po_id": po_id, "line_no": line_no, "new_quantity": str(new_quantity)}
             )
     
+    async def update_polines_bulk(
+        self,
+        command: BulkUpdatePOLinesCommand,
+        db_session: Session,
+        max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[BulkPOLineResult]:
+        """
+        Apply many PO line changes, yielding one result per change as it completes.
+        
+        Business Rules:
+        1. Same per-field rules as the single-line date/price/quantity updates
+        2. A line may appear only once per request
+        3. A line modified in the ERP after it was read fails with a conflict (ETag)
+        
+        All affected lines are read with one filtered query per handful of purchase
+        orders and validated in memory. Valid changes are PATCHed concurrently, at most
+        `max_concurrency` at a time, and each applied change is audited as soon as its
+        PATCH succeeds. If the consumer stops early, changes not yet sent are skipped
+        while PATCHes already in flight are allowed to finish (and audited).
+        
+        Args:
+            command: Bulk update command
+            db_session: Database session for audit
+            max_concurrency: Override for settings.po_bulk_update_max_concurrency
+        
+        Yields:
+            Per-change results (validation failures first, then PATCH outcomes)
+        """
+        from app.settings import settings
+        
+        applied = 0
+        tasks: List["asyncio.Future[BulkPOLineResult]"] = []
+        stopped = asyncio.Event()
+        try:
+            rows = await self.erp.get_polines_for_documents(
+                [change.po_id for change in command.changes]
+            )
+            lines_by_key = {
+                (str(row.get("Document_No")), int(row.get("Line_No") or 0)): row
+                for row in rows
+            }
+            
+            planned: List[Tuple[BulkPOLineChange, Dict[str, Any], Dict[str, Any]]] = []
+            seen = set()
+            for change in command.changes:
+                key = (change.po_id, change.line_no)
+                if key in seen:
+                    yield _bulk_line_error(change, ValidationException(
+                        "PO line appears more than once in the request",
+                        field="changes",
+                        context={"po_id": change.po_id, "line_no": change.line_no}
+                    ))
+                    continue
+                seen.add(key)
+                
+                row = lines_by_key.get(key)
+                if row is None:
+                    yield _bulk_line_error(change, ERPNotFound("Purchase Order Line", f"{change.po_id}/{change.line_no}"))
+                    continue
+                
+                current = _normalize_erp_poline(row)
+                try:
+                    self._validate_bulk_change(current, change)
+                except ValidationException as exc:
+                    yield _bulk_line_error(change, exc)
+                    continue
+                planned.append((change, row, current))
+            
+            semaphore = asyncio.Semaphore(max_concurrency or settings.po_bulk_update_max_concurrency)
+            
+            async def _apply(change: BulkPOLineChange, row: Dict[str, Any], current: Dict[str, Any]) -> BulkPOLineResult:
+                nonlocal applied
+                updates = _bulk_erp_updates(change)
+                try:
+                    system_id = row.get("SystemId")
+                    if not system_id:
+                        raise ERPError(f"No SystemId found for PO line {change.po_id}/{change.line_no}")
+                    etag = row.get("@odata.etag")
+                    if not etag:
+                        raise ERPConflict(f"No ETag found for PO line {change.po_id}/{change.line_no}")
+                    async with semaphore:
+                        if stopped.is_set():
+                            raise ERPError(f"Bulk update stopped before PO line {change.po_id}/{change.line_no} was sent")
+                        patched = await self.erp.patch_poline(system_id, updates, etag)
+                except Exception as exc:
+                    return _bulk_line_error(change, exc)
+                
+                applied += 1
+                try:
+                    write_audit_logs(db_session, _bulk_audit_entries(command, change, current))
+                except Exception:
+                    logger.exception(f"Failed to audit bulk update of PO line {change.po_id}/{change.line_no}")
+                updated = _normalize_erp_poline({**row, **updates, **patched})
+                line = self._map_to_poline_dto(updated) if updated.get("promise_date") else None
+                return BulkPOLineResult(po_id=change.po_id, line_no=change.line_no, status="updated", line=line)
+            
+            tasks = [asyncio.ensure_future(_apply(*entry)) for entry in planned]
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            if pending:
+                # The stream was abandoned: lines still queued are never sent, but PATCHes
+                # already in flight run to completion and audit themselves.
+                stopped.set()
+                _abandoned_bulk_patches.update(pending)
+                for task in pending:
+                    task.add_done_callback(_abandoned_bulk_patches.discard)
+                await asyncio.shield(asyncio.gather(*pending))
+            logger.info(
+                f"Bulk PO line update finished: requested={len(command.changes)}, applied={applied}"
+            )
+    
+    def _validate_bulk_change(self, current: Dict[str, Any], change: BulkPOLineChange) -> None:
+        """Run the single-line business rules for every field the change touches."""
+        if change.new_date is not None:
+            self._validate_date_update(current, change.new_date, change.po_id, change.line_no)
+        if change.new_price is not None:
+            self._validate_price_update(current, change.new_price, change.po_id, change.line_no)
+        if change.new_quantity is not None:
+            self._validate_quantity_update(current, change.new_quantity, change.po_id, change.line_no)
+    
     async def create_receipt(
         self,
         command: CreateReceiptCommand,
@@ -634,7 +761,8 @@ class PurchasingService:
                 db_session,
                 "Receipt.Created",
                 command.actor,
-                command.trace_id
+                command.trace_id,
+                durable=True
             ) as audit:
                 
                 audit.set_entity(po_id=command.po_id)
@@ -832,7 +960,8 @@ class PurchasingService:
                 db_session,
                 "Return.Created",
                 command.actor,
-                command.trace_id
+                command.trace_id,
+                durable=True
             ) as audit:
                 receipt_lines = await self.erp.get_posted_purchase_receipt_lines(command.receipt_id)
                 if not receipt_lines:
@@ -1006,3 +1135,108 @@ class PurchasingService:
                     "received": str(received_quantity)
                 }
             )
+
+
+# PATCHes still in flight when a bulk update stream was abandoned; kept referenced
+# until they finish so their outcome is audited.
+_abandoned_bulk_patches: Set["asyncio.Future[BulkPOLineResult]"] = set()
+
+_BULK_AUDIT_FIELDS = (
+    ("new_date", "POLine.PromiseDateChanged", "promise_date"),
+    ("new_price", "POLine.PriceChanged", "unit_price"),
+    ("new_quantity", "POLine.QuantityChanged", "quantity"),
+)
+
+
+def _bc_date(value: Any) -> Optional[str]:
+    """ISO date from a Business Central date field (its empty date is 0001-01-01)."""
+    if not value:
+        return None
+    text_value = str(value)[:10]
+    if text_value == "0001-01-01":
+        return None
+    try:
+        return date.fromisoformat(text_value).isoformat()
+    except ValueError:
+        return None
+
+
+def _normalize_erp_poline(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a raw Gilbert_PurchaseOrderLines record to the shape the validators expect."""
+    quantity = Decimal(str(row.get("Quantity") or 0))
+    received = Decimal(str(row.get("Quantity_Received") or 0))
+    invoiced = Decimal(str(row.get("Quantity_Invoiced") or 0))
+    if quantity > 0 and invoiced >= quantity:
+        status = "invoiced"
+    elif quantity > 0 and received >= quantity:
+        status = "received"
+    elif received > 0:
+        status = "partially_received"
+    else:
+        status = "open"
+    
+    normalized: Dict[str, Any] = {
+        "po_id": str(row.get("Document_No") or ""),
+        "line_no": int(row.get("Line_No") or 0),
+        "item_no": str(row.get("No") or ""),
+        "description": str(row.get("Description") or ""),
+        "quantity": quantity,
+        "unit_of_measure": row.get("Unit_of_Measure_Code") or "EA",
+        "unit_price": Decimal(str(row.get("Direct_Unit_Cost") or 0)),
+        "line_amount": Decimal(str(row.get("Line_Amount") or 0)),
+        "promise_date": _bc_date(row.get("Promised_Receipt_Date")) or _bc_date(row.get("Expected_Receipt_Date")),
+        "requested_date": _bc_date(row.get("Requested_Receipt_Date")),
+        "quantity_received": received,
+        "quantity_invoiced": invoiced,
+        "status": status,
+        "location_code": row.get("Location_Code"),
+    }
+    order_date = _bc_date(row.get("Order_Date"))
+    if order_date:
+        normalized["order_date"] = order_date
+    return normalized
+
+
+def _bulk_erp_updates(change: BulkPOLineChange) -> Dict[str, Any]:
+    updates: Dict[str, Any] = {}
+    if change.new_date is not None:
+        updates["Promised_Receipt_Date"] = change.new_date.isoformat()
+    if change.new_price is not None:
+        updates["Direct_Unit_Cost"] = float(change.new_price)
+    if change.new_quantity is not None:
+        updates["Quantity"] = float(change.new_quantity)
+    return updates
+
+
+def _bulk_audit_entries(
+    command: BulkUpdatePOLinesCommand,
+    change: BulkPOLineChange,
+    current: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """One audit entry per changed field, named like the single-line updates."""
+    entries = []
+    for attribute, action, field in _BULK_AUDIT_FIELDS:
+        new_value = getattr(change, attribute)
+        if new_value is None:
+            continue
+        entries.append({
+            "action": action,
+            "actor": command.actor,
+            "trace_id": command.trace_id,
+            "po_id": change.po_id,
+            "line_no": change.line_no,
+            "previous": {field: str(current.get(field)) if current.get(field) is not None else None},
+            "next": {field: str(new_value)},
+            "reason": command.reason,
+            "bulk": True,
+        })
+    return entries
+
+
+def _bulk_line_error(change: BulkPOLineChange, exc: Exception) -> BulkPOLineResult:
+    if isinstance(exc, BaseAPIException):
+        error = {"code": exc.error_code, "message": exc.detail, "context": exc.context}
+    else:
+        logger.error(f"Unexpected error updating PO line {change.po_id}/{change.line_no}", exc_info=exc)
+        error = {"code": "INTERNAL_ERROR", "message": "Failed to update the PO line"}
+    return BulkPOLineResult(po_id=change.po_id, line_no=change.line_no, status="error", error=error)
@@ -0,0 +1 @@
+"""Local search index and typeahead."""
@@ -0,0 +1,504 @@
+"""Local trigram search index behind the unified typeahead endpoint."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from app.domain.crm.mirror import CRMMirror, crm_mirror
+from app.domain.erp.business_central_data_service import BusinessCentralODataService
+from app.domain.search.models import SearchHit
+from app.errors import DatabaseError
+from app.integrations.cedule_ventes_sous_traitance_repository import CeduleVentesSousTraitanceRepository
+from app.integrations.sql_executor import CEDULE_DB, run_sql
+from app.integrations.sqlite_mirror import SQLiteMirrorStore
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Trigram MATCH needs three characters; shorter tokens are applied as LIKE filters.
+_TRIGRAM = 3
+# Text matches ranked per query; prefix matches are always considered on top of these.
+_CANDIDATES = 200
+
+
+@dataclass(frozen=True)
+class SearchDocument:
+    entity_type: str
+    entity_id: str
+    code: Optional[str]
+    title: str
+    subtitle: Optional[str] = None
+    body: str = ""
+
+
+@dataclass(frozen=True)
+class SearchSourceBatch:
+    documents: List[SearchDocument]
+    watermark: Optional[str]
+    complete: bool
+
+
+@dataclass(frozen=True)
+class SearchIndexRefreshResult:
+    full: bool
+    documents_upserted: int
+    documents_deleted: int
+    sources_failed: List[str]
+
+
+class SearchSource(Protocol):
+    entity_type: str
+
+    async def fetch(self, watermark: Optional[str]) -> SearchSourceBatch:
+        """Return documents changed since `watermark`; `complete` marks a full listing."""
+
+
+def normalize(value: Any) -> str:
+    """Lowercase and strip diacritics so 'Québec' and 'quebec' index the same."""
+    decomposed = unicodedata.normalize("NFKD", str(value or ""))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower().strip()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _join(*parts: Any) -> str:
+    return " ".join(str(part) for part in parts if part)
+
+
+class BusinessCentralSearchSource:
+    """Business Central collection read incrementally by SystemModifiedAt."""
+
+    def __init__(
+        self,
+        entity_type: str,
+        resource: str,
+        *,
+        title_field: str,
+        subtitle_fields: Sequence[str] = (),
+        body_fields: Sequence[str] = (),
+        service: Optional[BusinessCentralODataService] = None,
+    ) -> None:
+        self.entity_type = entity_type
+        self._resource = resource
+        self._title_field = title_field
+        self._subtitle_fields = tuple(subtitle_fields)
+        self._body_fields = tuple(body_fields)
+        self._service = service
+
+    def _path(self, watermark: Optional[str]) -> str:
+        fields = ["No", self._title_field, *self._subtitle_fields, *self._body_fields, "SystemModifiedAt"]
+        query = ["%24select=" + ",".join(dict.fromkeys(fields))]
+        if watermark:
+            query.append("%24filter=" + quote(f"SystemModifiedAt gt {watermark}", safe="'"))
+        return f"{self._resource}?{'&'.join(query)}"
+
+    async def fetch(self, watermark: Optional[str]) -> SearchSourceBatch:
+        service = self._service or BusinessCentralODataService()
+        documents: List[SearchDocument] = []
+        latest = watermark or ""
+        async for page in service.iter_collection_pages(self._path(watermark)):
+            for record in page:
+                number = record.get("No")
+                if not number:
+                    continue
+                documents.append(
+                    SearchDocument(
+                        entity_type=self.entity_type,
+                        entity_id=str(number),
+                        code=str(number),
+                        title=str(record.get(self._title_field) or number),
+                        subtitle=_join(*(record.get(field) for field in self._subtitle_fields)) or None,
+                        body=_join(*(record.get(field) for field in self._body_fields)),
+                    )
+                )
+                latest = max(latest, str(record.get("SystemModifiedAt") or ""))
+        return SearchSourceBatch(documents, latest or None, complete=watermark is None)
+
+
+class CRMAccountSearchSource:
+    """CRM accounts read from the local Dynamics mirror."""
+
+    entity_type = "crm_account"
+
+    def __init__(self, mirror: Optional[CRMMirror] = None) -> None:
+        self._mirror = mirror if mirror is not None else crm_mirror
+
+    async def fetch(self, watermark: Optional[str]) -> SearchSourceBatch:
+        records = await asyncio.to_thread(self._mirror.accounts_modified_since, watermark)
+        documents = [
+            SearchDocument(
+                entity_type=self.entity_type,
+                entity_id=str(record["accountid"]),
+                code=record.get("accountnumber"),
+                title=str(record.get("name") or record["accountid"]),
+                subtitle=_join(record.get("address1_city"), record.get("address1_country")) or None,
+                body=_join(record.get("emailaddress1"), record.get("telephone1")),
+            )
+            for record in records
+            if record.get("accountid")
+        ]
+        latest = max([watermark or ""] + [str(record.get("modifiedon") or "") for record in records])
+        return SearchSourceBatch(documents, latest or None, complete=watermark is None)
+
+
+class SubcontractingCustomerSearchSource:
+    """Cedule subcontracting customers; the table has no modification stamp, so it is re-read whole."""
+
+    entity_type = "subcontracting_customer"
+
+    def __init__(self, repository: Optional[CeduleVentesSousTraitanceRepository] = None) -> None:
+        self._repository = repository
+
+    async def fetch(self, watermark: Optional[str]) -> SearchSourceBatch:
+        repository = self._repository or CeduleVentesSousTraitanceRepository()
+        # The whole table, not the capped UI listing: `complete=True` lets the index drop
+        # every customer missing from this batch.
+        customers = await run_sql(CEDULE_DB, repository.list_all_customers)
+        documents = [
+            SearchDocument(
+                entity_type=self.entity_type,
+                entity_id=str(customer.customer_id),
+                code=None,
+                title=customer.name,
+                subtitle=customer.contact_name,
+                body=_join(customer.email, customer.phone),
+            )
+            for customer in customers
+        ]
+        return SearchSourceBatch(documents, None, complete=True)
+
+
+def default_sources() -> List[SearchSource]:
+    sources: List[SearchSource] = []
+    if settings.erp_base_url:
+        sources.extend(
+            [
+                BusinessCentralSearchSource(
+                    "item", "Items", title_field="Description", body_fields=("Vendor_Item_No",)
+                ),
+                BusinessCentralSearchSource("customer", "Customers", title_field="Name", subtitle_fields=("City",)),
+                BusinessCentralSearchSource("vendor", "Vendors", title_field="Name", subtitle_fields=("City",)),
+            ]
+        )
+    if crm_mirror.is_ready:
+        sources.append(CRMAccountSearchSource())
+    if CeduleVentesSousTraitanceRepository().is_configured:
+        sources.append(SubcontractingCustomerSearchSource())
+    return sources
+
+
+class SearchIndex(SQLiteMirrorStore):
+    """
+    SQLite FTS5 trigram index over entity numbers, names and descriptions.
+
+    Typeahead queries run against this local index instead of pushing
+    `contains`/`LIKE '%x%'` filters to Business Central, Dataverse or Cedule on every
+    keystroke. Each source is refreshed incrementally from its own watermark; sources
+    without one (and every source on a periodic full refresh) are re-read whole and
+    rows that disappeared are dropped. When the SQLite build lacks the trigram
+    tokenizer, queries fall back to LIKE scans of the same normalized local columns.
+    """
+
+    _label = "search index"
+    _state_table = "search_index_state"
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self._fts = True
+        self._refresh_lock = asyncio.Lock()
+        super().__init__(db_path or settings.search_index_db_path)
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_documents (
+                    id INTEGER PRIMARY KEY,
+                    entity_type TEXT NOT NULL,
+                    entity_id TEXT NOT NULL,
+                    code TEXT,
+                    title TEXT NOT NULL,
+                    subtitle TEXT,
+                    code_search TEXT NOT NULL COLLATE NOCASE,
+                    title_search TEXT NOT NULL COLLATE NOCASE,
+                    body_search TEXT NOT NULL,
+                    UNIQUE (entity_type, entity_id)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_search_documents_code ON search_documents (code_search)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_search_documents_title ON search_documents (title_search)")
+            self._create_state_table(conn)
+            try:
+                conn.execute(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                        code_search, title_search, body_search,
+                        content='search_documents', content_rowid='id', tokenize='trigram'
+                    )
+                    """
+                )
+            except sqlite3.OperationalError as exc:
+                logger.warning("SQLite trigram tokenizer unavailable; search falls back to LIKE: %s", exc)
+                self._fts = False
+            if self._fts:
+                conn.executescript(
+                    """
+                    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+                        INSERT INTO search_fts (rowid, code_search, title_search, body_search)
+                        VALUES (new.id, new.code_search, new.title_search, new.body_search);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+                        INSERT INTO search_fts (search_fts, rowid, code_search, title_search, body_search)
+                        VALUES ('delete', old.id, old.code_search, old.title_search, old.body_search);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+                        INSERT INTO search_fts (search_fts, rowid, code_search, title_search, body_search)
+                        VALUES ('delete', old.id, old.code_search, old.title_search, old.body_search);
+                        INSERT INTO search_fts (rowid, code_search, title_search, body_search)
+                        VALUES (new.id, new.code_search, new.title_search, new.body_search);
+                    END;
+                    """
+                )
+            conn.commit()
+
+    def search(
+        self,
+        query: str,
+        *,
+        entity_types: Optional[Sequence[str]] = None,
+        limit: int = 20,
+    ) -> List[SearchHit]:
+        """
+        Rank matches: exact code, code prefix, title prefix, number/name containing the
+        text, then description-only matches; bm25 orders hits within a tier.
+
+        Tokens are ANDed; each must appear in the number, name or description. Ranking
+        only considers the first `_CANDIDATES` text matches (plus every prefix match),
+        which keeps very common terms as fast as rare ones.
+        """
+        if not self._enabled:
+            return []
+        term = normalize(query)
+        tokens = term.split()
+        if not tokens:
+            return []
+
+        prefix = _escape_like(term) + "%"
+        long_tokens = [token for token in tokens if len(token) >= _TRIGRAM]
+        use_fts = self._fts and bool(long_tokens)
+        like_tokens = [token for token in tokens if token not in long_tokens] if use_fts else tokens
+        if len(tokens) == 1 and len(tokens[0]) < _TRIGRAM:
+            # One or two characters: prefix matches only, served by the NOCASE indexes.
+            like_tokens = []
+
+        filters: List[str] = []
+        filter_params: List[Any] = []
+        for token in like_tokens:
+            filters.append("(d.code_search || ' ' || d.title_search || ' ' || d.body_search) LIKE ? ESCAPE '\\'")
+            filter_params.append(f"%{_escape_like(token)}%")
+        if entity_types:
+            filters.append(f"d.entity_type IN ({', '.join('?' for _ in entity_types)})")
+            filter_params.extend(entity_types)
+        extra = "".join(f" AND {clause}" for clause in filters)
+
+        params: List[Any] = []
+        candidates = [
+            f"""
+            SELECT d.id AS id, 0.0 AS score FROM search_documents d
+            WHERE (d.code_search LIKE ? ESCAPE '\\' OR d.title_search LIKE ? ESCAPE '\\'){extra}
+            LIMIT ?
+            """
+        ]
+        params.extend([prefix, prefix, *filter_params, _CANDIDATES])
+        if use_fts:
+            candidates.append(
+                f"""
+                SELECT d.id AS id, bm25(search_fts, 10.0, 5.0, 1.0) AS score
+                FROM search_fts JOIN search_documents d ON d.id = search_fts.rowid
+                WHERE search_fts MATCH ?{extra}
+                LIMIT ?
+                """
+            )
+            params.append(" AND ".join('"' + token.replace('"', '""') + '"' for token in long_tokens))
+            params.extend([*filter_params, _CANDIDATES])
+        elif like_tokens:
+            candidates.append(
+                f"SELECT d.id AS id, 0.0 AS score FROM search_documents d WHERE 1 = 1{extra} LIMIT ?"
+            )
+            params.extend([*filter_params, _CANDIDATES])
+        params.extend([term, prefix, prefix, term, int(limit)])
+
+        sql = f"""
+            WITH candidates AS (
+                {" UNION ALL ".join(f"SELECT * FROM ({candidate})" for candidate in candidates)}
+            )
+            SELECT d.entity_type, d.entity_id, d.code, d.title, d.subtitle,
+                   CASE
+                       WHEN d.code_search = ? THEN 0
+                       WHEN d.code_search LIKE ? ESCAPE '\\' THEN 1
+                       WHEN d.title_search LIKE ? ESCAPE '\\' THEN 2
+                       WHEN instr(d.code_search || ' ' || d.title_search, ?) > 0 THEN 3
+                       ELSE 4
+                   END AS tier,
+                   MIN(c.score) AS score
+            FROM candidates c JOIN search_documents d ON d.id = c.id
+            GROUP BY d.id
+            ORDER BY tier, score, d.title_search
+            LIMIT ?
+        """
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            SearchHit(
+                entity_type=entity_type,
+                entity_id=entity_id,
+                code=code,
+                title=title,
+                subtitle=subtitle,
+                # bm25 is negative and lower is better; squash it into (0, 1] inside the tier.
+                rank=round(tier + (1.0 / (1.0 + abs(score)) if score else 0.0), 4),
+            )
+            for entity_type, entity_id, code, title, subtitle, tier, score in rows
+        ]
+
+    def status(self) -> Dict[str, Any]:
+        if not self._enabled:
+            return {"configured": False}
+        with self._connect() as conn:
+            counts = dict(
+                conn.execute("SELECT entity_type, COUNT(*) FROM search_documents GROUP BY entity_type").fetchall()
+            )
+            state = self._all_state(conn)
+        return {
+            "configured": True,
+            "trigram": self._fts,
+            "counts": counts,
+            "last_refreshed_at": state.get("last_refreshed_at"),
+            "last_full_refresh_at": state.get("last_full_refresh_at"),
+        }
+
+    async def refresh(
+        self, sources: Sequence[SearchSource], *, full: Optional[bool] = None
+    ) -> SearchIndexRefreshResult:
+        """
+        Pull changed documents from every source concurrently and apply them.
+
+        `full=None` runs a full refresh when none has happened within
+        `search_index_full_refresh_hours`. A failing source is logged and skipped;
+        its watermark is left untouched so the next pass retries it.
+        """
+        if not self._enabled:
+            raise ValueError("Search index storage not configured")
+        async with self._refresh_lock:
+            if full is None:
+                full = self._full_refresh_due(settings.search_index_full_refresh_hours)
+            watermarks = {
+                source.entity_type: None if full else self._get_state(f"{source.entity_type}_watermark")
+                for source in sources
+            }
+            results = await asyncio.gather(
+                *(source.fetch(watermarks[source.entity_type]) for source in sources),
+                return_exceptions=True,
+            )
+
+            batches: Dict[str, SearchSourceBatch] = {}
+            failed: List[str] = []
+            for source, result in zip(sources, results):
+                if isinstance(result, (httpx.HTTPError, DatabaseError, ValueError)):
+                    logger.warning(
+                        "Search index source failed",
+                        extra={"entity_type": source.entity_type, "error": str(result)},
+                    )
+                    failed.append(source.entity_type)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    batches[source.entity_type] = result
+
+            upserted, deleted = await asyncio.to_thread(self._apply, batches)
+
+            now = datetime.now(timezone.utc).isoformat()
+            for entity_type, batch in batches.items():
+                if batch.watermark:
+                    self._set_state(f"{entity_type}_watermark", batch.watermark)
+            self._set_state("last_refreshed_at", now)
+            if full and not failed:
+                self._set_state("last_full_refresh_at", now)
+
+        logger.info(
+            "Search index refreshed",
+            extra={"full": full, "upserted": upserted, "deleted": deleted, "failed": failed},
+        )
+        return SearchIndexRefreshResult(
+            full=full, documents_upserted=upserted, documents_deleted=deleted, sources_failed=failed
+        )
+
+    def _apply(self, batches: Dict[str, SearchSourceBatch]) -> Tuple[int, int]:
+        upserted = deleted = 0
+        with self._connect() as conn:
+            for entity_type, batch in batches.items():
+                rows = [_document_row(document) for document in batch.documents]
+                conn.executemany(
+                    """
+                    INSERT INTO search_documents
+                        (entity_type, entity_id, code, title, subtitle, code_search, title_search, body_search)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(entity_type, entity_id) DO UPDATE SET
+                        code = excluded.code,
+                        title = excluded.title,
+                        subtitle = excluded.subtitle,
+                        code_search = excluded.code_search,
+                        title_search = excluded.title_search,
+                        body_search = excluded.body_search
+                    """,
+                    rows,
+                )
+                upserted += len(rows)
+                if batch.complete:
+                    deleted += self._delete_missing(
+                        conn,
+                        "search_documents",
+                        "entity_id",
+                        (row[1] for row in rows),
+                        scope={"entity_type": entity_type},
+                    )
+            conn.commit()
+        return upserted, deleted
+
+
+def _document_row(document: SearchDocument) -> Tuple[Any, ...]:
+    return (
+        document.entity_type,
+        document.entity_id,
+        document.code,
+        document.title,
+        document.subtitle,
+        normalize(document.code),
+        normalize(document.title),
+        normalize(_join(document.subtitle, document.body)),
+    )
+
+
+async def refresh_search_index() -> None:
+    """Scheduled refresh of the typeahead search index (incremental, periodically full)."""
+    if not search_index.is_configured:
+        logger.warning("Search index not configured; skipping refresh")
+        return
+    try:
+        await search_index.refresh(default_sources())
+    except ValueError as exc:
+        logger.warning("Search index refresh failed", extra={"error": str(exc)})
+
+
+search_index = SearchIndex()
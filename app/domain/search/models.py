@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+SearchEntityType = Literal["item", "customer", "vendor", "crm_account", "subcontracting_customer"]
+
+
+class SearchHit(BaseModel):
+    entity_type: SearchEntityType
+    entity_id: str
+    code: Optional[str] = None
+    title: str
+    subtitle: Optional[str] = None
+    rank: float = Field(description="Lower is better; exact and prefix code/title matches rank first")
+
+
+class SearchResponse(BaseModel):
+    query: str
+    items: List[SearchHit] = Field(default_factory=list)
+    count: int
+    took_ms: float
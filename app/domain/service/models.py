@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional
 
 from pydantic import BaseModel, Field
@@ -126,3 +126,29 @@ class ServiceItemAsset(BaseModel):
     rapport_iso: Optional[str] = None
     optional_fields: List[ServiceItemOptionalFieldDetail] = Field(default_factory=list)
 
+
+class ServiceCatalogEquipement(ServiceEquipement):
+    modeles: List[ServiceModele] = Field(default_factory=list)
+    optional_field_types: List[ServiceItemOptionalFieldType] = Field(
+        default_factory=list,
+        description="Optional field types whose equipment matches this equipment's description",
+    )
+
+
+class ServiceCatalogDivision(ServiceDivision):
+    equipements: List[ServiceCatalogEquipement] = Field(default_factory=list)
+
+
+class ServiceCatalogBundle(BaseModel):
+    version: int = Field(description="Increments each time the in-memory catalog is reloaded")
+    etag: str
+    loaded_at: datetime
+    divisions: List[ServiceCatalogDivision] = Field(default_factory=list)
+    unassigned_equipements: List[ServiceCatalogEquipement] = Field(
+        default_factory=list,
+        description="Equipments without a known division",
+    )
+    shared_optional_field_types: List[ServiceItemOptionalFieldType] = Field(
+        default_factory=list,
+        description="Optional field types not tied to a catalog equipment",
+    )
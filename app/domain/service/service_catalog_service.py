@@ -1,10 +1,27 @@
-"""Service catalog and asset lookup for Cedule Service tables."""
+"""
+Service catalog and asset lookup for Cedule Service tables.
+
+The service-intake form cascades division -> equipment -> model -> optional field types
+every time it opens. The catalog is therefore held as one versioned in-memory tree,
+loaded with a single query, kept warm by a scheduled reload and dropped whenever a
+service item is created. Customer assets are cached briefly per customer.
+"""
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.domain.service.models import (
+    ServiceCatalogBundle,
+    ServiceCatalogDivision,
+    ServiceCatalogEquipement,
     ServiceDivision,
     ServiceEquipement,
     ServiceModele,
@@ -16,6 +33,7 @@ from app.domain.service.models import (
     ServiceItemOptionalFieldDetail,
     ServiceItemOptionalFieldType,
 )
+from app.errors import DatabaseError
 from app.integrations.cedule_service_repository import (
     CeduleServiceRepository,
     _clean_str,
@@ -23,24 +41,181 @@ from app.integrations.cedule_service_repository import (
     _safe_date,
     _safe_bool,
 )
+from app.integrations.sql_executor import CEDULE_DB, run_sql
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServiceCatalogSnapshot:
+    """One load of the catalog: the flat lists behind the list endpoints plus the bundle tree."""
+
+    divisions: List[ServiceDivision]
+    equipements: List[ServiceEquipement]
+    modeles: List[ServiceModele]
+    field_types: List[ServiceItemOptionalFieldType]
+    bundle: ServiceCatalogBundle
+    loaded_at: float
+
+
+class ServiceCatalogCache:
+    """Versioned catalog snapshot plus a per-customer asset LRU, shared by all service instances."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: Optional[int] = None,
+        asset_ttl_seconds: Optional[int] = None,
+        max_customers: Optional[int] = None,
+    ) -> None:
+        self.ttl_seconds = settings.service_catalog_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.asset_ttl_seconds = (
+            settings.service_asset_cache_ttl_seconds if asset_ttl_seconds is None else asset_ttl_seconds
+        )
+        self.max_customers = max_customers or settings.service_asset_cache_max_customers
+        # Serialises catalog loads so concurrent misses share one query.
+        self.load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ServiceCatalogSnapshot] = None
+        self._version = 0
+        self._last_etag: Optional[str] = None
+        # Bumped on invalidation; loads and asset fetches started earlier are not stored.
+        self._generation = 0
+        self._assets: "OrderedDict[str, Tuple[float, List[ServiceItemAsset]]]" = OrderedDict()
+        self._catalog_hits = 0
+        self._catalog_loads = 0
+        self._asset_hits = 0
+        self._asset_misses = 0
+        self._invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def catalog(self) -> Optional[ServiceCatalogSnapshot]:
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.loaded_at >= self.ttl_seconds:
+                return None
+            self._catalog_hits += 1
+            return snapshot
+
+    def store_catalog(
+        self,
+        tree: Dict[str, Any],
+        flat: Tuple[List[ServiceDivision], List[ServiceEquipement], List[ServiceModele], List[ServiceItemOptionalFieldType]],
+        generation: int,
+    ) -> ServiceCatalogSnapshot:
+        """Stamp `tree` with a content ETag and version, caching it unless invalidated meanwhile."""
+        etag = _catalog_etag(tree)
+        with self._lock:
+            self._catalog_loads += 1
+            if etag != self._last_etag:
+                self._version += 1
+                self._last_etag = etag
+            bundle = ServiceCatalogBundle(
+                version=self._version,
+                etag=etag,
+                loaded_at=datetime.now(timezone.utc),
+                **tree,
+            )
+            snapshot = ServiceCatalogSnapshot(*flat, bundle=bundle, loaded_at=time.monotonic())
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
+
+    def get_assets(self, customer_key: str) -> Optional[List[ServiceItemAsset]]:
+        with self._lock:
+            entry = self._assets.get(customer_key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._asset_misses += 1
+                return None
+            self._assets.move_to_end(customer_key)
+            self._asset_hits += 1
+            return entry[1]
+
+    def put_assets(self, customer_key: str, assets: List[ServiceItemAsset], generation: int) -> None:
+        if self.asset_ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._assets[customer_key] = (time.monotonic() + self.asset_ttl_seconds, assets)
+            self._assets.move_to_end(customer_key)
+            while len(self._assets) > self.max_customers:
+                self._assets.popitem(last=False)
+
+    def invalidate(self, customer_key: Optional[str] = None) -> None:
+        """Drop the catalog snapshot and, when given, one customer's assets."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._snapshot = None
+            if customer_key is not None:
+                self._assets.pop(customer_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+            self._assets.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                "catalog_version": self._version,
+                "catalog_etag": self._last_etag,
+                "catalog_cached": snapshot is not None,
+                "catalog_age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+                "catalog_hits": self._catalog_hits,
+                "catalog_loads": self._catalog_loads,
+                "asset_customers": len(self._assets),
+                "asset_hits": self._asset_hits,
+                "asset_misses": self._asset_misses,
+                "invalidations": self._invalidations,
+            }
 
 
 class ServiceCatalogService:
-    def __init__(self, repository: Optional[CeduleServiceRepository] = None) -> None:
+    def __init__(
+        self,
+        repository: Optional[CeduleServiceRepository] = None,
+        cache: Optional[ServiceCatalogCache] = None,
+    ) -> None:
         self._repository = repository or CeduleServiceRepository()
+        self._cache = cache or service_catalog_cache
 
     @property
     def is_configured(self) -> bool:
         return self._repository.is_configured
 
+    def get_catalog_bundle(self) -> ServiceCatalogBundle:
+        """Whole catalog tree with its ETag, from memory when warm."""
+        return self._catalog().bundle
+
+    def refresh_catalog(self) -> ServiceCatalogBundle:
+        """Reload the catalog now (used by the warming job)."""
+        with self._cache.load_lock:
+            return self._load_catalog().bundle
+
     def list_divisions(self) -> List[ServiceDivision]:
-        return self._repository.list_divisions()
+        return list(self._catalog().divisions)
 
     def list_equipements(self, division_id: Optional[int] = None) -> List[ServiceEquipement]:
-        return self._repository.list_equipements(division_id=division_id)
+        equipements = self._catalog().equipements
+        if division_id is None:
+            return list(equipements)
+        return [equipement for equipement in equipements if equipement.division_id == division_id]
 
     def list_modeles(self, equipement_id: Optional[int] = None) -> List[ServiceModele]:
-        return self._repository.list_modeles(equipement_id=equipement_id)
+        modeles = self._catalog().modeles
+        if equipement_id is None:
+            return list(modeles)
+        wanted = _match_key(equipement_id)
+        return [modele for modele in modeles if _match_key(modele.equipement_id) == wanted]
 
     def list_service_items(
         self,
@@ -67,15 +242,26 @@ class ServiceCatalogService:
         equipment: Optional[str] = None,
         field_type: Optional[str] = None,
     ) -> List[ServiceItemOptionalFieldType]:
-        return self._repository.list_optional_field_types(
-            equipment=equipment,
-            field_type=field_type,
-        )
+        types = self._catalog().field_types
+        if equipment:
+            types = [entry for entry in types if _match_key(entry.equipment) == _match_key(equipment)]
+        if field_type:
+            types = [entry for entry in types if _match_key(entry.field_type) == _match_key(field_type)]
+        return list(types)
 
     def create_service_item(self, payload: ServiceItemCreateRequest) -> ServiceItemCreateResponse:
-        return self._repository.create_service_item(payload)
+        created = self._repository.create_service_item(payload)
+        # The insert has committed; drop the catalog version and this customer's assets.
+        self._cache.invalidate(_match_key(payload.customer_id))
+        return created
 
     def get_customer_assets(self, customer_id: str) -> List[ServiceItemAsset]:
+        customer_key = _match_key(customer_id)
+        cached = self._cache.get_assets(customer_key)
+        if cached is not None:
+            return list(cached)
+
+        generation = self._cache.generation
         rows = self._repository.fetch_customer_asset_rows(customer_id)
         assets: Dict[int, ServiceItemAsset] = {}
 
@@ -125,5 +311,147 @@ class ServiceCatalogService:
                 )
             )
 
-        return list(assets.values())
+        result = list(assets.values())
+        self._cache.put_assets(customer_key, result, generation)
+        return list(result)
+
+    def _catalog(self) -> ServiceCatalogSnapshot:
+        snapshot = self._cache.catalog()
+        if snapshot is not None:
+            return snapshot
+        with self._cache.load_lock:
+            snapshot = self._cache.catalog()
+            if snapshot is not None:
+                return snapshot
+            return self._load_catalog()
+
+    def _load_catalog(self) -> ServiceCatalogSnapshot:
+        generation = self._cache.generation
+        rows = self._repository.fetch_catalog_rows()
+        flat = _catalog_lists(rows)
+        return self._cache.store_catalog(_catalog_tree(*flat), flat, generation)
+
+
+def _match_key(value: Optional[object]) -> str:
+    """Comparison key matching SQL Server's case-insensitive, trim-insensitive equality."""
+    return (_clean_str(value) or "").casefold()
+
+
+def _id_sort_key(value: Optional[str]) -> Tuple[int, int, str]:
+    text = value or ""
+    return (0, int(text), "") if text.isdigit() else (1, 0, text.casefold())
+
+
+def _catalog_lists(
+    rows: List[dict],
+) -> Tuple[List[ServiceDivision], List[ServiceEquipement], List[ServiceModele], List[ServiceItemOptionalFieldType]]:
+    divisions: List[ServiceDivision] = []
+    equipements: List[ServiceEquipement] = []
+    modeles: List[ServiceModele] = []
+    field_types: List[ServiceItemOptionalFieldType] = []
+    for row in rows:
+        kind = row.get("kind")
+        if kind == "division":
+            divisions.append(
+                ServiceDivision(
+                    id=_safe_int(row.get("id")) or 0,
+                    description=_clean_str(row.get("description")),
+                )
+            )
+        elif kind == "equipement":
+            equipements.append(
+                ServiceEquipement(
+                    id=_clean_str(row.get("id")) or "",
+                    description=_clean_str(row.get("description")),
+                    division_id=_safe_int(row.get("parent_id")),
+                )
+            )
+        elif kind == "modele":
+            modeles.append(
+                ServiceModele(
+                    id=_clean_str(row.get("id")) or "",
+                    description=_clean_str(row.get("description")),
+                    equipement_id=_clean_str(row.get("parent_id")),
+                )
+            )
+        elif kind == "field_type":
+            field_types.append(
+                ServiceItemOptionalFieldType(
+                    field_type=_clean_str(row.get("id")) or "",
+                    attribute1_header=_clean_str(row.get("attribute1_header")),
+                    attribute2_header=_clean_str(row.get("attribute2_header")),
+                    attribute3_header=_clean_str(row.get("attribute3_header")),
+                    attribute4_header=_clean_str(row.get("attribute4_header")),
+                    equipment=_clean_str(row.get("description")),
+                )
+            )
+
+    divisions.sort(key=lambda division: division.id)
+    equipements.sort(key=lambda equipement: _id_sort_key(equipement.id))
+    modeles.sort(key=lambda modele: _id_sort_key(modele.id))
+    field_types.sort(key=lambda entry: entry.field_type.casefold())
+    return divisions, equipements, modeles, field_types
+
+
+def _catalog_tree(
+    divisions: List[ServiceDivision],
+    equipements: List[ServiceEquipement],
+    modeles: List[ServiceModele],
+    field_types: List[ServiceItemOptionalFieldType],
+) -> Dict[str, Any]:
+    """Nest models and field types under equipments, and equipments under divisions."""
+    modeles_by_equipement: Dict[str, List[ServiceModele]] = {}
+    for modele in modeles:
+        modeles_by_equipement.setdefault(_match_key(modele.equipement_id), []).append(modele)
+    types_by_equipment: Dict[str, List[ServiceItemOptionalFieldType]] = {}
+    for entry in field_types:
+        types_by_equipment.setdefault(_match_key(entry.equipment), []).append(entry)
+
+    division_nodes = {
+        division.id: ServiceCatalogDivision(**division.model_dump()) for division in divisions
+    }
+    unassigned: List[ServiceCatalogEquipement] = []
+    matched_equipment: set[str] = set()
+    for equipement in equipements:
+        description_key = _match_key(equipement.description)
+        node = ServiceCatalogEquipement(
+            **equipement.model_dump(),
+            modeles=modeles_by_equipement.get(_match_key(equipement.id), []),
+            optional_field_types=types_by_equipment.get(description_key, []) if description_key else [],
+        )
+        if description_key:
+            matched_equipment.add(description_key)
+        parent = division_nodes.get(equipement.division_id) if equipement.division_id is not None else None
+        if parent is None:
+            unassigned.append(node)
+        else:
+            parent.equipements.append(node)
+
+    shared = [entry for entry in field_types if _match_key(entry.equipment) not in matched_equipment]
+    return {
+        "divisions": list(division_nodes.values()),
+        "unassigned_equipements": unassigned,
+        "shared_optional_field_types": shared,
+    }
+
+
+def _catalog_etag(tree: Dict[str, Any]) -> str:
+    content = ServiceCatalogBundle(version=0, etag="", loaded_at=datetime(1970, 1, 1, tzinfo=timezone.utc), **tree)
+    payload = content.model_dump_json(include={"divisions", "unassigned_equipements", "shared_optional_field_types"})
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+async def refresh_service_catalog() -> None:
+    """Scheduled reload that keeps the Service catalog tree warm."""
+    service = ServiceCatalogService()
+    if not service.is_configured:
+        logger.warning("Cedule database not configured; skipping Service catalog refresh")
+        return
+    try:
+        await run_sql(CEDULE_DB, service.refresh_catalog)
+    except DatabaseError as exc:
+        logger.warning("Service catalog refresh failed", extra={"error": str(exc)})
+
+
+service_catalog_cache = ServiceCatalogCache()
 
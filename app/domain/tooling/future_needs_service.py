@@ -14,6 +14,7 @@ from app.domain.tooling.models import (
     FutureToolingToolSummary,
 )
 from app.domain.tooling.nc_program_source import (
+    ProgramToolsCache,
     get_tool_description,
     get_tool_id,
     get_tool_use_time_value,
@@ -97,10 +98,12 @@ class FutureToolingNeedService:
         self,
         production_client: FastemsProductionClient | None = None,
         nc_program_client: FastemsNCProgramClient | None = None,
+        program_tools_cache: ProgramToolsCache | None = None,
     ) -> None:
         self._production_client = production_client or FastemsProductionClient()
         self._nc_program_client = nc_program_client
         self._nc_program_clients_by_source: dict[str, FastemsNCProgramClient] = {}
+        self._program_tools_cache = program_tools_cache
 
     async def get_future_needs(
         self,
@@ -278,10 +281,15 @@ class FutureToolingNeedService:
         semaphore = asyncio.Semaphore(12)
         client = self._client_for_source(tool_source)
 
-        async def _fetch(program_name: str) -> tuple[str, list[dict[str, Any]]]:
+        async def _load(program_name: str) -> list[dict[str, Any]]:
             async with semaphore:
-                rows = await client.get_program_tools(program_name)
-                return program_name, rows
+                return await client.get_program_tools(program_name)
+
+        async def _fetch(program_name: str) -> tuple[str, list[dict[str, Any]]]:
+            if self._program_tools_cache is None:
+                return program_name, await _load(program_name)
+            rows = await self._program_tools_cache.get(tool_source, program_name, lambda: _load(program_name))
+            return program_name, rows
 
         payload = await asyncio.gather(*[_fetch(name) for name in sorted(program_names)])
         return dict(payload)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from typing import Any, Awaitable, Callable
 
 from app.settings import settings
 
@@ -31,6 +32,41 @@ def resolve_tool_source(work_center_no: str, requested_source: str | None = None
     return "fastems1"
 
 
+class ProgramToolsCache:
+    """
+    NC program tool lists shared by the tooling services of one refresh run.
+
+    Keyed by (tool source, program); concurrent lookups of the same program await a
+    single fetch. Failed fetches are not kept.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str], asyncio.Future[list[dict[str, Any]]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        tool_source: str,
+        program_name: str,
+        loader: Callable[[], Awaitable[list[dict[str, Any]]]],
+    ) -> list[dict[str, Any]]:
+        key = (tool_source, program_name)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = asyncio.ensure_future(loader())
+            self._entries[key] = entry
+        else:
+            self.hits += 1
+        try:
+            return await asyncio.shield(entry)
+        except Exception:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            raise
+
+
 def nc_program_base_url_for_source(tool_source: str) -> str | None:
     normalized = normalize_tool_source(tool_source) or "fastems1"
     if normalized == "fastems2":
@@ -15,6 +15,7 @@ from app.domain.tooling.models import (
     ToolingUsageHistoryToolSummary,
 )
 from app.domain.tooling.nc_program_source import (
+    ProgramToolsCache,
     get_tool_description,
     get_tool_id,
     get_tool_use_time_value,
@@ -136,10 +137,12 @@ class ToolingUsageHistoryService:
         self,
         erp_client: ERPClient | None = None,
         nc_program_client: FastemsNCProgramClient | None = None,
+        program_tools_cache: ProgramToolsCache | None = None,
     ) -> None:
         self._erp_client = erp_client or ERPClient()
         self._nc_program_client = nc_program_client
         self._nc_program_clients_by_source: dict[str, FastemsNCProgramClient] = {}
+        self._program_tools_cache = program_tools_cache
 
     async def get_usage_history(
         self,
@@ -418,10 +421,15 @@ class ToolingUsageHistoryService:
         semaphore = asyncio.Semaphore(12)
         client = self._client_for_source(tool_source)
 
-        async def _fetch(program_name: str) -> tuple[str, list[dict[str, Any]]]:
+        async def _load(program_name: str) -> list[dict[str, Any]]:
             async with semaphore:
-                rows = await client.get_program_tools(program_name)
-                return program_name, rows
+                return await client.get_program_tools(program_name)
+
+        async def _fetch(program_name: str) -> tuple[str, list[dict[str, Any]]]:
+            if self._program_tools_cache is None:
+                return program_name, await _load(program_name)
+            rows = await self._program_tools_cache.get(tool_source, program_name, lambda: _load(program_name))
+            return program_name, rows
 
         payload = await asyncio.gather(*[_fetch(name) for name in sorted(program_names)])
         return dict(payload)
@@ -5,7 +5,7 @@ Data providers for Fastems1 Autopilot.
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Sequence, Set
 import asyncio
 import logging
 
@@ -164,27 +164,71 @@ def _parse_date(value: Optional[str]):
         return None
 
 
+def piece_code(part_id: str, operation_code: Optional[str]) -> str:
+    """Fixture matrix key for a part operation (e.g. ``7403032-2OP``)."""
+    suffix = (operation_code or "1OP").upper()
+    if not suffix.endswith("OP"):
+        suffix = f"{suffix}OP"
+    digits = "".join(ch for ch in suffix if ch.isdigit())
+    if digits:
+        suffix = f"{int(digits)}OP"
+    return f"{part_id}-{suffix}".upper()
+
+
+def operation_suffix_from_id(operation_id: Optional[object]) -> str:
+    """Operation suffix (``2OP``) derived from a planned job's operation id."""
+    op_value = str(operation_id or "").strip()
+    suffix = None
+    try:
+        op_num = int(float(op_value))
+        if op_num >= 10000:
+            suffix = f"{max(op_num // 10000, 1)}OP"
+    except ValueError:
+        pass
+    if not suffix:
+        cleaned = op_value.upper()
+        if not cleaned.endswith("OP"):
+            cleaned = f"{cleaned}OP"
+        digits = "".join(ch for ch in cleaned if ch.isdigit())
+        if digits:
+            suffix = f"{int(digits)}OP"
+        else:
+            suffix = "1OP"
+    return suffix
+
+
 class FixtureProvider:
-    """Fixture and pallet lookup using the Cedule Autopilot view."""
+    """
+    Fixture and pallet lookup using the Cedule Autopilot view.
+
+    Lookups accept pre-loaded fixture matrix ``rows`` (e.g. from the shop-floor snapshot)
+    and only query the view when none are given.
+    """
 
     def __init__(self, repository: Optional[CeduleAutopilotRepository] = None) -> None:
         self._repository = repository or CeduleAutopilotRepository()
         self._default_pallets = self._repository.list_machine_pallets()
 
     def _piece_code(self, part_id: str, operation_code: Optional[str]) -> str:
-        suffix = (operation_code or "1OP").upper()
-        if not suffix.endswith("OP"):
-            suffix = f"{suffix}OP"
-        digits = "".join(ch for ch in suffix if ch.isdigit())
-        if digits:
-            suffix = f"{int(digits)}OP"
-        return f"{part_id}-{suffix}".upper()
+        return piece_code(part_id, operation_code)
+
+    def _matrix_rows(self, piece_code: str, rows: Optional[List[FixtureMatrixRow]]) -> List[FixtureMatrixRow]:
+        if rows is not None:
+            return rows
+        return self._repository.get_fixture_matrix(piece_code)
+
+    def load_fixture_matrices(self, piece_codes: Sequence[str]) -> Dict[str, List[FixtureMatrixRow]]:
+        """Load the fixture matrix of several piece codes (blocking; call from a worker thread)."""
+        return self._repository.get_fixture_matrices(piece_codes)
 
     async def get_fixture_states(
-        self, part_id: str, operation_suffix: Optional[str]
+        self,
+        part_id: str,
+        operation_suffix: Optional[str],
+        rows: Optional[List[FixtureMatrixRow]] = None,
     ) -> List[FixtureState]:
         piece_code = self._piece_code(part_id, operation_suffix)
-        rows = self._repository.get_fixture_matrix(piece_code)
+        rows = self._matrix_rows(piece_code, rows)
         if not rows:
             logger.info("Fixture matrix returned no rows", extra={"piece_code": piece_code})
         fixtures: Dict[str, FixtureState] = {}
@@ -201,10 +245,13 @@ class FixtureProvider:
         return list(fixtures.values())
 
     async def get_ready_machine_pallets(
-        self, part_id: str, operation_suffix: Optional[str]
+        self,
+        part_id: str,
+        operation_suffix: Optional[str],
+        rows: Optional[List[FixtureMatrixRow]] = None,
     ) -> List[MachinePalletState]:
         piece_code = self._piece_code(part_id, operation_suffix)
-        rows = self._repository.get_fixture_matrix(piece_code)
+        rows = self._matrix_rows(piece_code, rows)
         logger.debug(
             "Loaded fixture rows for pallet selection",
             extra={
@@ -265,9 +312,14 @@ class FixtureProvider:
         )
         return pallets
 
-    async def get_required_plaque_model(self, part_id: str, operation_suffix: Optional[str]) -> Optional[str]:
+    async def get_required_plaque_model(
+        self,
+        part_id: str,
+        operation_suffix: Optional[str],
+        rows: Optional[List[FixtureMatrixRow]] = None,
+    ) -> Optional[str]:
         piece_code = self._piece_code(part_id, operation_suffix)
-        rows = self._repository.get_fixture_matrix(piece_code)
+        rows = self._matrix_rows(piece_code, rows)
         for row in rows:
             if row.required_plaque_model:
                 return _normalize_code(row.required_plaque_model)
@@ -280,10 +332,11 @@ class FixtureProvider:
         self,
         part_id: str,
         operation_suffix: Optional[str],
-        machine_pallet_id: Optional[str]
+        machine_pallet_id: Optional[str],
+        rows: Optional[List[FixtureMatrixRow]] = None,
     ) -> Dict[str, Optional[str]]:
         piece_code = self._piece_code(part_id, operation_suffix)
-        rows = self._repository.get_fixture_matrix(piece_code)
+        rows = self._matrix_rows(piece_code, rows)
         required = None
         for row in rows:
             if row.fixture_code:
@@ -394,24 +447,34 @@ class MaterialProvider:
             return self._cache[part_id]
 
         storage = await self._client.list_storage()
-        pallets: List[MaterialPalletState] = []
-        for row in storage:
-            item = (row.get("ITEM_ID") or "").strip()
-            if item != part_id:
-                continue
-            pallets.append(
-                MaterialPalletState(
-                    pallet_id=str(row.get("PALLET_NBR")),
-                    content_type="raw",
-                    work_order=None,
-                    part_id=item,
-                    quantity_available=row.get("AMOUNT"),
-                    location=row.get("BATCH"),
-                )
-            )
+        pallets = material_pallets_by_part(storage).get(part_id, [])
         self._cache[part_id] = pallets
         return pallets
 
+    async def list_pallets_by_part(self) -> Dict[str, List[MaterialPalletState]]:
+        """Load the whole storage once and group raw-material pallets by part."""
+        storage = await self._client.list_storage()
+        return material_pallets_by_part(storage)
+
+
+def material_pallets_by_part(storage: List[Dict[str, Any]]) -> Dict[str, List[MaterialPalletState]]:
+    pallets: Dict[str, List[MaterialPalletState]] = {}
+    for row in storage:
+        item = (row.get("ITEM_ID") or "").strip()
+        if not item:
+            continue
+        pallets.setdefault(item, []).append(
+            MaterialPalletState(
+                pallet_id=str(row.get("PALLET_NBR")),
+                content_type="raw",
+                work_order=None,
+                part_id=item,
+                quantity_available=row.get("AMOUNT"),
+                location=row.get("BATCH"),
+            )
+        )
+    return pallets
+
 
 class PalletRouteProvider:
     """Provides live pallet route status."""
@@ -447,6 +510,10 @@ class PalletRouteProvider:
             return None
         return self._cache.get(str(pallet_id))
 
+    def statuses(self) -> Dict[str, Dict[str, Any]]:
+        """Current route status by pallet (the mapping is replaced, never mutated, on refresh)."""
+        return self._cache
+
 
 class ToolingProvider:
     """Combines NC program tool requirements and machine tool inventory."""
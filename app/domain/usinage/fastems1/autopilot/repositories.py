@@ -14,7 +14,7 @@ import uuid
 
 import json
 
-from sqlalchemy import text
+from sqlalchemy import TextClause, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
@@ -83,6 +83,56 @@ def _is_time_in_window(current: time_type, start: time_type, end: time_type) ->
     return current >= start or current < end
 
 
+# SQL Server caps a statement at 2100 parameters; 9 per row plus the shared batch id/timestamp.
+_PLAN_INSERT_CHUNK_ROWS = 200
+_PLAN_ROW_COLUMNS = (
+    "machine_id",
+    "sequence_index",
+    "work_order",
+    "part_id",
+    "operation_id",
+    "machine_pallet_id",
+    "material_pallet_id",
+    "estimated_setup",
+    "estimated_cycle",
+)
+
+
+def _plan_insert_statement(rows: Sequence[dict]) -> tuple[TextClause, dict]:
+    """Multi-row INSERT for fastems1.AutopilotPlannedJob with numbered bind parameters."""
+    values = []
+    params: dict = {}
+    for index, row in enumerate(rows):
+        placeholders = []
+        for column in _PLAN_ROW_COLUMNS:
+            key = f"{column}_{index}"
+            params[key] = row[column]
+            placeholders.append(f":{key}")
+        values.append(f"(:plan_batch_id, :ts_planned, {', '.join(placeholders)}, 'planned')")
+    statement = text(
+        """
+        INSERT INTO fastems1.AutopilotPlannedJob
+        (
+            PlanBatchId,
+            TsPlannedUtc,
+            MachineId,
+            SequenceIndex,
+            WorkOrder,
+            PartId,
+            OperationId,
+            MachinePalletId,
+            MaterialPalletId,
+            EstimatedSetupMinutes,
+            EstimatedCycleMinutes,
+            Status
+        )
+        VALUES
+        """
+        + ",\n".join(values)
+    )
+    return statement, params
+
+
 @dataclass
 class PlannedJobRow:
     planned_job_id: int
@@ -140,40 +190,7 @@ class AutopilotRepository:
             except SQLAlchemyError as exc:
                 logger.error("Failed to retire previous planned jobs", exc_info=exc)
             try:
-                insert_stmt = text(
-                    """
-                    INSERT INTO fastems1.AutopilotPlannedJob
-                    (
-                        PlanBatchId,
-                        TsPlannedUtc,
-                        MachineId,
-                        SequenceIndex,
-                        WorkOrder,
-                        PartId,
-                        OperationId,
-                        MachinePalletId,
-                        MaterialPalletId,
-                        EstimatedSetupMinutes,
-                        EstimatedCycleMinutes,
-                        Status
-                    )
-                    VALUES
-                    (
-                        :plan_batch_id,
-                        :ts_planned,
-                        :machine_id,
-                        :sequence_index,
-                        :work_order,
-                        :part_id,
-                        :operation_id,
-                        :machine_pallet_id,
-                        :material_pallet_id,
-                        :estimated_setup,
-                        :estimated_cycle,
-                        'planned'
-                    )
-                    """
-                )
+                rows = []
                 for entry in entries:
                     part_numeric = _coerce_int(entry.part_numeric_id, entry.part_id)
                     operation_numeric = _coerce_int(entry.operation_numeric_id, entry.operation_id)
@@ -191,11 +208,8 @@ class AutopilotRepository:
                         )
                     else:
                         material_pallet_numeric = None
-                    self._session.execute(
-                        insert_stmt,
+                    rows.append(
                         {
-                            "plan_batch_id": plan_batch_numeric,
-                            "ts_planned": ts_now,
                             "machine_id": entry.machine_id,
                             "sequence_index": entry.sequence_index,
                             "work_order": entry.work_order,
@@ -205,8 +219,12 @@ class AutopilotRepository:
                             "material_pallet_id": material_pallet_numeric,
                             "estimated_setup": entry.estimated_setup_minutes,
                             "estimated_cycle": entry.estimated_cycle_minutes,
-                        },
+                        }
                     )
+                for start in range(0, len(rows), _PLAN_INSERT_CHUNK_ROWS):
+                    statement, params = _plan_insert_statement(rows[start : start + _PLAN_INSERT_CHUNK_ROWS])
+                    params.update({"plan_batch_id": plan_batch_numeric, "ts_planned": ts_now})
+                    self._session.execute(statement, params)
                 return plan_batch_id
             except SQLAlchemyError as exc:
                 logger.error("Failed to insert Autopilot plan batch", exc_info=exc)
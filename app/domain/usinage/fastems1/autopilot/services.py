@@ -6,7 +6,8 @@ from __future__ import annotations
 
 from dataclasses import asdict
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Sequence, Set
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
 import logging
 
 from fastapi import HTTPException, status
@@ -14,11 +15,13 @@ from fastapi import HTTPException, status
 from app.domain.usinage.fastems1.autopilot.models import (
     ActionPlan,
     ActionPlanStep,
+    MachinePalletState,
     PlanCandidate,
     ScoreBreakdown,
     ShiftWindow,
     SuggestionResult,
     ToolRequirement,
+    WorkOrderOperation,
 )
 from app.domain.usinage.fastems1.autopilot.providers import (
     FixtureProvider,
@@ -26,11 +29,16 @@ from app.domain.usinage.fastems1.autopilot.providers import (
     PalletRouteProvider,
     ToolingProvider,
     WorkOrderProvider,
+    operation_suffix_from_id,
+    piece_code,
 )
 from app.domain.usinage.fastems1.autopilot.repositories import (
     AutopilotRepository,
     PlannedJobRow,
 )
+from app.domain.usinage.fastems1.autopilot.shop_floor import ShopFloorSnapshot, ShopFloorStatePoller
+from app.integrations.cedule_autopilot_repository import FixtureMatrixRow
+from app.integrations.sql_executor import CEDULE_DB, run_sql
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -73,14 +81,12 @@ class AutopilotPlannerService:
         self._tooling_provider = tooling_provider
         self._material_provider = material_provider
         self._pallet_route_provider = pallet_route_provider
-        self._reserved_pallet_ids: Set[str] = set()
 
     async def refresh_plan(
         self,
         jobs_per_machine: Optional[int] = None,
         machine_ids: Optional[Sequence[str]] = None,
     ) -> Dict[str, object]:
-        self._reserved_pallet_ids.clear()
         if jobs_per_machine is not None and jobs_per_machine <= 0:
             jobs_per_machine = None
         jobs_per_machine = jobs_per_machine if jobs_per_machine is not None else settings.fastems1_plan_jobs_per_machine
@@ -102,7 +108,7 @@ class AutopilotPlannerService:
         if not available_machines:
             available_machines = machine_ids
 
-        plan_entries: List[PlanCandidate] = []
+        slots: List[Tuple[str, int, WorkOrderOperation]] = []
         scheduled_jobs: Set[tuple[str, str, str]] = set()
         for machine_id in available_machines:
             machine_ops = _filter_operations_for_machine(operations, machine_id)
@@ -112,29 +118,51 @@ class AutopilotPlannerService:
                 job_key = (op.work_order, op.part_id, op.operation_id)
                 if job_key in scheduled_jobs:
                     continue
-                ready_pallet = await self._pick_ready_pallet(op.part_id, op.operation_code, machine_id)
-                estimated_setup = 12.0 if ready_pallet else 25.0
-                material_pallet = await self._pick_material_pallet(op.part_id)
-                plan_entries.append(
-                    PlanCandidate(
-                        work_order=op.work_order,
-                        part_id=op.part_id,
-                        operation_id=op.operation_id,
-                        machine_id=machine_id,
-                        machine_pallet_id=ready_pallet.pallet_id if ready_pallet else None,
-                        material_pallet_id=material_pallet.pallet_id if material_pallet else None,
-                        estimated_setup_minutes=estimated_setup,
-                        estimated_cycle_minutes=max(op.estimated_cycle_minutes, 1.0),
-                        sequence_index=seq_index,
-                        part_numeric_id=op.part_numeric_id,
-                        operation_numeric_id=op.operation_numeric_id or op.line_number,
-                        machine_pallet_numeric_id=ready_pallet.numeric_id if ready_pallet else None,
-                        material_pallet_numeric_id=_safe_int_for_id(material_pallet.pallet_id) if material_pallet else None,
-                        program_name=op.program_name,
-                    )
-                )
+                slots.append((machine_id, seq_index, op))
                 scheduled_jobs.add(job_key)
 
+        # One fixture matrix query, one storage read and one route refresh for the whole plan.
+        piece_codes = [piece_code(op.part_id, op.operation_code) for _, _, op in slots]
+        matrices, material_by_part, _ = await asyncio.gather(
+            run_sql(CEDULE_DB, self._fixture_provider.load_fixture_matrices, piece_codes),
+            self._material_provider.list_pallets_by_part(),
+            self._pallet_route_provider.ensure_cache(),
+        )
+        rankings = await asyncio.gather(
+            *(
+                self._rank_ready_pallets(op.part_id, op.operation_code, machine_id, matrices.get(code, []))
+                for (machine_id, _, op), code in zip(slots, piece_codes)
+            )
+        )
+
+        # Reservations are resolved afterwards in machine/sequence order, so a pallet wanted
+        # by several candidates always goes to the same one regardless of evaluation timing.
+        reserved_pallet_ids: Set[str] = set()
+        plan_entries: List[PlanCandidate] = []
+        for (machine_id, seq_index, op), (ranked_pallets, required_plaque) in zip(slots, rankings):
+            ready_pallet = self._reserve_pallet(machine_id, ranked_pallets, required_plaque, reserved_pallet_ids)
+            estimated_setup = 12.0 if ready_pallet else 25.0
+            material_pallets = material_by_part.get((op.part_id or "").strip()) or []
+            material_pallet = material_pallets[0] if material_pallets else None
+            plan_entries.append(
+                PlanCandidate(
+                    work_order=op.work_order,
+                    part_id=op.part_id,
+                    operation_id=op.operation_id,
+                    machine_id=machine_id,
+                    machine_pallet_id=ready_pallet.pallet_id if ready_pallet else None,
+                    material_pallet_id=material_pallet.pallet_id if material_pallet else None,
+                    estimated_setup_minutes=estimated_setup,
+                    estimated_cycle_minutes=max(op.estimated_cycle_minutes, 1.0),
+                    sequence_index=seq_index,
+                    part_numeric_id=op.part_numeric_id,
+                    operation_numeric_id=op.operation_numeric_id or op.line_number,
+                    machine_pallet_numeric_id=ready_pallet.numeric_id if ready_pallet else None,
+                    material_pallet_numeric_id=_safe_int_for_id(material_pallet.pallet_id) if material_pallet else None,
+                    program_name=op.program_name,
+                )
+            )
+
         if not plan_entries:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -148,11 +176,22 @@ class AutopilotPlannerService:
             "planned_jobs": len(plan_entries),
         }
 
-    async def _pick_ready_pallet(self, part_id: str, operation_code: Optional[str], machine_id: str):
-        ready_pallets = await self._fixture_provider.get_ready_machine_pallets(part_id, operation_code)
-        required_plaque = await self._fixture_provider.get_required_plaque_model(part_id, operation_code)
+    async def _rank_ready_pallets(
+        self,
+        part_id: str,
+        operation_code: Optional[str],
+        machine_id: str,
+        rows: List[FixtureMatrixRow],
+    ) -> Tuple[List[MachinePalletState], Optional[str]]:
+        """
+        Usable pallets for one candidate in order of preference, plus the required plaque.
+
+        Nothing is reserved here; `_reserve_pallet` picks from the ranking once every
+        candidate has been evaluated.
+        """
+        ready_pallets = await self._fixture_provider.get_ready_machine_pallets(part_id, operation_code, rows=rows)
+        required_plaque = await self._fixture_provider.get_required_plaque_model(part_id, operation_code, rows=rows)
 
-        await self._pallet_route_provider.ensure_cache()
         status_cache: Dict[str, Optional[Dict[str, Any]]] = {}
         for pallet in ready_pallets:
             status_cache[pallet.pallet_id] = self._pallet_route_provider.get_status(pallet.pallet_id)
@@ -183,43 +222,41 @@ class AutopilotPlannerService:
                 return True
             return False
 
-        for pallet in ready_pallets:
-            if pallet.pallet_id in self._reserved_pallet_ids:
-                continue
-            if not _is_pallet_compatible(pallet):
-                continue
-            if not _pallet_phase_is_finished(status_cache.get(pallet.pallet_id or "")):
-                continue
-            if pallet.machine_id and pallet.machine_id.upper() == machine_id.upper():
-                self._reserved_pallet_ids.add(pallet.pallet_id)
-                return pallet
-        for pallet in ready_pallets:
-            if pallet.pallet_id in self._reserved_pallet_ids:
-                continue
-            if not _is_pallet_compatible(pallet):
-                continue
-            if not _pallet_phase_is_finished(status_cache.get(pallet.pallet_id or "")):
+        usable = [
+            pallet
+            for pallet in ready_pallets
+            if _is_pallet_compatible(pallet) and _pallet_phase_is_finished(status_cache.get(pallet.pallet_id or ""))
+        ]
+        # Pallets already assigned to this machine first; the sort is stable.
+        usable.sort(key=lambda pallet: not (pallet.machine_id and pallet.machine_id.upper() == machine_id.upper()))
+        return usable, required_plaque
+
+    def _reserve_pallet(
+        self,
+        machine_id: str,
+        ranked_pallets: Sequence[MachinePalletState],
+        required_plaque: Optional[str],
+        reserved_pallet_ids: Set[str],
+    ) -> Optional[MachinePalletState]:
+        for pallet in ranked_pallets:
+            if pallet.pallet_id in reserved_pallet_ids:
                 continue
-            self._reserved_pallet_ids.add(pallet.pallet_id)
+            reserved_pallet_ids.add(pallet.pallet_id)
             return pallet
 
         compatible = self._fixture_provider.get_compatible_machine_pallet(
             machine_id,
             required_plaque,
-            exclude_ids=self._reserved_pallet_ids,
+            exclude_ids=reserved_pallet_ids,
         )
         if compatible and compatible.pallet_id:
             status = self._pallet_route_provider.get_status(compatible.pallet_id)
             if _pallet_phase_is_finished(status):
-                self._reserved_pallet_ids.add(compatible.pallet_id)
+                reserved_pallet_ids.add(compatible.pallet_id)
                 return compatible
 
         return None
 
-    async def _pick_material_pallet(self, part_id: str):
-        pallets = await self._material_provider.get_pallets_for_part(part_id)
-        return pallets[0] if pallets else None
-
 
 def _is_machine_available(status_row: Optional[dict]) -> bool:
     if not status_row:
@@ -242,7 +279,13 @@ def _filter_operations_for_machine(operations, machine_id: str):
 
 
 class AutopilotSuggestionService:
-    """Uses plan entries plus runtime context to pick the best next job."""
+    """
+    Uses plan entries plus runtime context to pick the best next job.
+
+    With a shop-floor poller, runtime context (operations, tool inventories, NC program
+    tools, pallet routes, fixture matrices) comes from its latest snapshot; providers are
+    only called when the snapshot is missing, stale, or lacks an entry.
+    """
 
     def __init__(
         self,
@@ -251,12 +294,26 @@ class AutopilotSuggestionService:
         tooling_provider: ToolingProvider,
         pallet_route_provider: PalletRouteProvider,
         workorder_provider: WorkOrderProvider,
+        shop_floor: Optional[ShopFloorStatePoller] = None,
     ) -> None:
         self._repository = repository
         self._fixture_provider = fixture_provider
         self._tooling_provider = tooling_provider
         self._pallet_route_provider = pallet_route_provider
         self._workorder_provider = workorder_provider
+        self._shop_floor = shop_floor
+
+    async def _current_snapshot(self) -> Optional[ShopFloorSnapshot]:
+        if self._shop_floor is None:
+            return None
+        snapshot = await self._shop_floor.ensure_snapshot()
+        if not snapshot.is_fresh(settings.fastems1_shop_floor_max_staleness_seconds):
+            logger.warning(
+                "Fastems1 shop-floor snapshot is stale; using live provider calls",
+                extra={"version": snapshot.version},
+            )
+            return None
+        return snapshot
 
     async def next_suggestion(self, max_alternatives: int = 0, include_details: bool = False) -> SuggestionResult:
         plan_batch_id = self._repository.fetch_latest_plan_batch()
@@ -264,7 +321,8 @@ class AutopilotSuggestionService:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "No plan batch available")
 
         planned_jobs = self._repository.list_planned_jobs(plan_batch_id)
-        await self._hydrate_job_metadata(planned_jobs)
+        snapshot = await self._current_snapshot()
+        await self._hydrate_job_metadata(planned_jobs, snapshot)
         planned_jobs = [job for job in planned_jobs if job.status == "planned"]
         if not planned_jobs:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "No planned jobs remaining in batch")
@@ -285,13 +343,17 @@ class AutopilotSuggestionService:
             }
         )
         tool_inventories: Dict[int, Dict[str, ToolState]] = {}
-        if machine_numeric_ids:
+        if snapshot is not None:
+            tool_inventories = snapshot.tool_inventories
+        elif machine_numeric_ids:
             tool_lists = await self._tooling_provider.get_machine_tool_states(machine_numeric_ids)
             for machine_id, states in tool_lists.items():
                 tool_inventories[machine_id] = {
                     str(state.tool_id): state for state in states if state.tool_id is not None
                 }
-        program_tool_cache: Dict[str, List[ToolRequirement]] = {}
+        program_tool_cache: Dict[str, List[ToolRequirement]] = (
+            dict(snapshot.program_tools) if snapshot is not None else {}
+        )
         tool_penalties: Dict[int, float] = {}
         tool_missing: Dict[int, List[str]] = {}
         for job in eligible:
@@ -314,7 +376,7 @@ class AutopilotSuggestionService:
 
         scored.sort(key=lambda item: item[0].total)
         best_score, best_job = scored[0]
-        action_plan = await self._build_action_plan(best_job)
+        action_plan = await self._build_action_plan(best_job, snapshot)
         decision_id = self._repository.insert_decision(
             best_job,
             best_score,
@@ -339,7 +401,9 @@ class AutopilotSuggestionService:
 
         details_payload = None
         if include_details:
-            details_payload = await self._build_details(best_job, tool_missing.get(best_job.planned_job_id, []))
+            details_payload = await self._build_details(
+                best_job, tool_missing.get(best_job.planned_job_id, []), snapshot
+            )
 
         return SuggestionResult(
             decision_id=decision_id,
@@ -376,14 +440,23 @@ class AutopilotSuggestionService:
             balance_penalty=balance_penalty,
         )
 
-    async def _build_action_plan(self, job: PlannedJobRow) -> ActionPlan:
+    async def _pallet_status(
+        self, pallet_id: Optional[str], snapshot: Optional[ShopFloorSnapshot]
+    ) -> Optional[Dict[str, Any]]:
+        if snapshot is not None:
+            return snapshot.pallet_status(pallet_id)
         await self._pallet_route_provider.ensure_cache()
-        pallet_status = self._pallet_route_provider.get_status(job.machine_pallet_id)
+        return self._pallet_route_provider.get_status(pallet_id)
+
+    async def _build_action_plan(self, job: PlannedJobRow, snapshot: Optional[ShopFloorSnapshot] = None) -> ActionPlan:
+        pallet_status = await self._pallet_status(job.machine_pallet_id, snapshot)
         op_suffix = _derive_operation_suffix(job)
+        fixture_rows = snapshot.fixture_rows(job.part_id, op_suffix) if snapshot is not None else None
         fixture_details = await self._fixture_provider.get_fixture_details(
             job.part_id,
             op_suffix,
             job.machine_pallet_id,
+            rows=fixture_rows,
         )
         required_fixture = fixture_details.get("required_fixture")
         current_fixture = fixture_details.get("current_fixture")
@@ -461,8 +534,7 @@ class AutopilotSuggestionService:
             )
         )
 
-        op_suffix = _derive_operation_suffix(job)
-        fixture_info = await self._fixture_provider.get_fixture_states(job.part_id, op_suffix)
+        fixture_info = await self._fixture_provider.get_fixture_states(job.part_id, op_suffix, rows=fixture_rows)
         hardware = [
             {"item": fixture.fixture_code, "description": fixture.description, "location": fixture.storage_location}
             for fixture in fixture_info[:3]
@@ -509,14 +581,19 @@ class AutopilotSuggestionService:
         penalty = float(len(missing)) * 5.0
         return penalty, missing
 
-    async def _build_details(self, job: PlannedJobRow, missing_tools: List[str]) -> Dict[str, Any]:
+    async def _build_details(
+        self,
+        job: PlannedJobRow,
+        missing_tools: List[str],
+        snapshot: Optional[ShopFloorSnapshot] = None,
+    ) -> Dict[str, Any]:
         suffix = _derive_operation_suffix(job)
         fixture_info = await self._fixture_provider.get_fixture_details(
             job.part_id,
             suffix,
             job.machine_pallet_id,
+            rows=snapshot.fixture_rows(job.part_id, suffix) if snapshot is not None else None,
         )
-        pallet_status = self._pallet_route_provider.get_status(job.machine_pallet_id)
         return {
             "machine_pallet": job.machine_pallet_id,
             "material_pallet": job.material_pallet_id,
@@ -526,10 +603,15 @@ class AutopilotSuggestionService:
             "missing_tools": missing_tools,
         }
 
-    async def _hydrate_job_metadata(self, jobs: List[PlannedJobRow]) -> None:
+    async def _hydrate_job_metadata(
+        self, jobs: List[PlannedJobRow], snapshot: Optional[ShopFloorSnapshot] = None
+    ) -> None:
         if not jobs:
             return
-        operations = await self._workorder_provider.list_active_operations()
+        if snapshot is not None:
+            operations = snapshot.operations
+        else:
+            operations = await self._workorder_provider.list_active_operations()
         lookup: Dict[tuple[str, Optional[int]], WorkOrderOperation] = {}
         for op in operations:
             key = (op.work_order, op.operation_numeric_id or op.line_number)
@@ -594,24 +676,7 @@ class AutopilotControlService:
 
 
 def _derive_operation_suffix(job: PlannedJobRow) -> str:
-    op_value = str(job.operation_id or "").strip()
-    suffix = None
-    try:
-        op_num = int(float(op_value))
-        if op_num >= 10000:
-            suffix = f"{max(op_num // 10000, 1)}OP"
-    except ValueError:
-        pass
-    if not suffix:
-        cleaned = op_value.upper()
-        if not cleaned.endswith("OP"):
-            cleaned = f"{cleaned}OP"
-        digits = "".join(ch for ch in cleaned if ch.isdigit())
-        if digits:
-            suffix = f"{int(digits)}OP"
-        else:
-            suffix = "1OP"
-    return suffix
+    return operation_suffix_from_id(job.operation_id)
 
 
 def _derive_program_name(job: PlannedJobRow) -> Optional[str]:
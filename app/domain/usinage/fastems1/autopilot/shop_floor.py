@@ -0,0 +1,275 @@
+"""
+Live shop-floor state for Fastems1 Autopilot.
+
+A background poller refreshes each Fastems/Cedule source on its own fixed interval and
+publishes an immutable, versioned `ShopFloorSnapshot`. Suggestions score against the
+latest snapshot instead of calling the cell endpoints per request, which keeps the poll
+load on Fastems predictable regardless of how often operators ask for the next job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.domain.usinage.fastems1.autopilot.models import (
+    MaterialPalletState,
+    ToolRequirement,
+    ToolState,
+    WorkOrderOperation,
+)
+from app.domain.usinage.fastems1.autopilot.providers import (
+    FixtureProvider,
+    MaterialProvider,
+    PalletRouteProvider,
+    ToolingProvider,
+    WorkOrderProvider,
+    operation_suffix_from_id,
+    piece_code,
+)
+from app.integrations.cedule_autopilot_repository import FixtureMatrixRow
+from app.integrations.sql_executor import CEDULE_DB, run_sql
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_PROGRAM_FETCH_CONCURRENCY = 4
+
+
+@dataclass(frozen=True)
+class ShopFloorSnapshot:
+    """
+    One consistent view of the cell. Treat every mapping as read-only: the poller
+    publishes a new snapshot instead of mutating a published one.
+    """
+
+    version: int = 0
+    operations: Tuple[WorkOrderOperation, ...] = ()
+    tool_inventories: Dict[int, Dict[str, ToolState]] = field(default_factory=dict)
+    program_tools: Dict[str, List[ToolRequirement]] = field(default_factory=dict)
+    pallet_routes: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    material_pallets: Dict[str, List[MaterialPalletState]] = field(default_factory=dict)
+    fixture_matrices: Dict[str, List[FixtureMatrixRow]] = field(default_factory=dict)
+    refreshed_at: Dict[str, float] = field(default_factory=dict)
+    published_at: Optional[datetime] = None
+
+    def age_seconds(self, source: str) -> Optional[float]:
+        refreshed = self.refreshed_at.get(source)
+        if refreshed is None:
+            return None
+        return time.monotonic() - refreshed
+
+    def is_fresh(self, max_age_seconds: float) -> bool:
+        """True when every source has been loaded and none is older than `max_age_seconds`."""
+        ages = [self.age_seconds(source) for source in ShopFloorStatePoller.SOURCES]
+        return all(age is not None and age <= max_age_seconds for age in ages)
+
+    def pallet_status(self, pallet_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if pallet_id is None:
+            return None
+        return self.pallet_routes.get(str(pallet_id))
+
+    def fixture_rows(self, part_id: str, operation_suffix: Optional[str]) -> Optional[List[FixtureMatrixRow]]:
+        """Fixture matrix rows for a part operation, or None when the snapshot does not hold it."""
+        return self.fixture_matrices.get(piece_code(part_id, operation_suffix))
+
+
+class ShopFloorStatePoller:
+    """Keeps a `ShopFloorSnapshot` current with one polling loop per source."""
+
+    SOURCES = ("operations", "tools", "pallet_routes", "material_storage", "fixtures")
+
+    def __init__(
+        self,
+        *,
+        workorder_provider: WorkOrderProvider,
+        tooling_provider: ToolingProvider,
+        pallet_route_provider: PalletRouteProvider,
+        material_provider: MaterialProvider,
+        fixture_provider: FixtureProvider,
+        machine_ids: Sequence[int],
+        intervals: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self._workorder_provider = workorder_provider
+        self._tooling_provider = tooling_provider
+        self._pallet_route_provider = pallet_route_provider
+        self._material_provider = material_provider
+        self._fixture_provider = fixture_provider
+        self._machine_ids = list(machine_ids)
+        self._intervals = {
+            "operations": settings.fastems1_shop_floor_operations_poll_seconds,
+            "tools": settings.fastems1_shop_floor_tools_poll_seconds,
+            "pallet_routes": settings.fastems1_shop_floor_pallet_routes_poll_seconds,
+            "material_storage": settings.fastems1_shop_floor_storage_poll_seconds,
+            "fixtures": settings.fastems1_shop_floor_fixtures_poll_seconds,
+            **(intervals or {}),
+        }
+        self._refreshers: Dict[str, Callable[[], Awaitable[Dict[str, Any]]]] = {
+            "operations": self._load_operations,
+            "tools": self._load_tools,
+            "pallet_routes": self._load_pallet_routes,
+            "material_storage": self._load_material_storage,
+            "fixtures": self._load_fixtures,
+        }
+        self._snapshot = ShopFloorSnapshot()
+        self._tasks: List[asyncio.Task] = []
+        self._warmup: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> ShopFloorSnapshot:
+        return self._snapshot
+
+    @property
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        """Load every source once (operations first), then start one polling loop per source.
+
+        Warming up before the loops exist keeps the fixture loop from publishing matrices
+        computed from an empty operations list.
+        """
+        if self.is_running:
+            return
+        if self._warmup is None or self._warmup.done():
+            self._warmup = asyncio.create_task(self.refresh_all())
+        await asyncio.shield(self._warmup)
+        if self.is_running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._poll_loop(source), name=f"fastems1-shop-floor-{source}")
+            for source in self.SOURCES
+        ]
+        logger.info("Fastems1 shop-floor poller started", extra={"intervals": self._intervals})
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def ensure_snapshot(self) -> ShopFloorSnapshot:
+        """Return the current snapshot, loading every source once on a cold start."""
+        if self._snapshot.version == 0:
+            if self._warmup is None or self._warmup.done():
+                self._warmup = asyncio.create_task(self.refresh_all())
+            await asyncio.shield(self._warmup)
+        return self._snapshot
+
+    async def refresh_all(self) -> ShopFloorSnapshot:
+        # Operations first: tool programs and fixture matrices are keyed off them.
+        await self.refresh("operations")
+        await asyncio.gather(*(self.refresh(source) for source in self.SOURCES if source != "operations"))
+        return self._snapshot
+
+    async def refresh(self, source: str) -> ShopFloorSnapshot:
+        """Reload one source and publish a new snapshot version; failures keep the previous data."""
+        try:
+            changes = await self._refreshers[source]()
+        except Exception as exc:
+            logger.warning(
+                "Fastems1 shop-floor refresh failed; keeping previous state",
+                extra={"source": source, "error": str(exc)},
+            )
+            return self._snapshot
+        # No await below: the merge and publish are atomic with respect to the other loops.
+        added_programs = changes.pop("program_tools_added", None)
+        if added_programs:
+            changes["program_tools"] = {**self._snapshot.program_tools, **added_programs}
+        rebuilt_programs = changes.pop("program_tools_rebuilt", None)
+        if rebuilt_programs is not None:
+            attempted, fetched = rebuilt_programs
+            # Replace the map: finished programs and failed fetches drop out. Programs the
+            # pass did not cover were added by an operations refresh meanwhile; keep them.
+            active = set(_program_names(self._snapshot.operations))
+            kept = {
+                name: tools
+                for name, tools in self._snapshot.program_tools.items()
+                if name in active and name not in attempted
+            }
+            changes["program_tools"] = {**kept, **fetched}
+        self._snapshot = dataclasses.replace(
+            self._snapshot,
+            version=self._snapshot.version + 1,
+            refreshed_at={**self._snapshot.refreshed_at, source: time.monotonic()},
+            published_at=datetime.now(timezone.utc),
+            **changes,
+        )
+        return self._snapshot
+
+    async def _poll_loop(self, source: str) -> None:
+        interval = max(float(self._intervals[source]), 1.0)
+        # `start` has just loaded every source; the first poll is one interval away.
+        await asyncio.sleep(interval)
+        while True:
+            started = time.monotonic()
+            await self.refresh(source)
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 0.0))
+
+    async def _load_operations(self) -> Dict[str, Any]:
+        operations = tuple(await self._workorder_provider.list_active_operations())
+        changes: Dict[str, Any] = {"operations": operations}
+        missing_programs = [
+            name for name in _program_names(operations) if name not in self._snapshot.program_tools
+        ]
+        if missing_programs:
+            changes["program_tools_added"] = await self._fetch_program_tools(missing_programs)
+        return changes
+
+    async def _load_tools(self) -> Dict[str, Any]:
+        tool_lists = await self._tooling_provider.get_machine_tool_states(self._machine_ids)
+        return {
+            "tool_inventories": {
+                machine_id: {str(state.tool_id): state for state in states if state.tool_id is not None}
+                for machine_id, states in tool_lists.items()
+            }
+        }
+
+    async def _load_pallet_routes(self) -> Dict[str, Any]:
+        await self._pallet_route_provider.refresh(force=True)
+        return {"pallet_routes": self._pallet_route_provider.statuses()}
+
+    async def _load_material_storage(self) -> Dict[str, Any]:
+        return {"material_pallets": await self._material_provider.list_pallets_by_part()}
+
+    async def _load_fixtures(self) -> Dict[str, Any]:
+        """Reload fixture matrices and NC program tools for every active operation."""
+        operations = self._snapshot.operations
+        piece_codes: List[str] = []
+        for op in operations:
+            if not op.part_id:
+                continue
+            # Planning looks fixtures up by operation code, suggestions by the suffix
+            # derived from the planned operation id; keep both keys warm.
+            piece_codes.append(piece_code(op.part_id, op.operation_code))
+            piece_codes.append(piece_code(op.part_id, operation_suffix_from_id(op.operation_id)))
+        matrices = await run_sql(CEDULE_DB, self._fixture_provider.load_fixture_matrices, piece_codes)
+        program_names = _program_names(operations)
+        program_tools = await self._fetch_program_tools(program_names)
+        return {"fixture_matrices": matrices, "program_tools_rebuilt": (set(program_names), program_tools)}
+
+    async def _fetch_program_tools(self, program_names: Sequence[str]) -> Dict[str, List[ToolRequirement]]:
+        semaphore = asyncio.Semaphore(_PROGRAM_FETCH_CONCURRENCY)
+
+        async def _load(name: str) -> Optional[List[ToolRequirement]]:
+            async with semaphore:
+                try:
+                    return await self._tooling_provider.get_tool_requirements(name)
+                except Exception as exc:
+                    logger.warning(
+                        "Failed to load NC program tools",
+                        extra={"program_name": name, "error": str(exc)},
+                    )
+                    return None
+
+        results = await asyncio.gather(*(_load(name) for name in program_names))
+        return {name: tools for name, tools in zip(program_names, results) if tools is not None}
+
+
+def _program_names(operations: Sequence[WorkOrderOperation]) -> List[str]:
+    return list(dict.fromkeys(op.program_name for op in operations if op.program_name))
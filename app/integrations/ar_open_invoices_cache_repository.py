@@ -4,16 +4,24 @@ import json
 import logging
 import os
 import sqlite3
-from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
+_LEGACY_TABLE = "ar_open_invoices_cache"
+
 
 class ArOpenInvoicesCacheRepository:
-    """SQLite-backed cache for open AR invoices."""
+    """
+    SQLite-backed cache for open AR invoices.
+
+    Each cached invoice is one row keyed by (cache_key, invoice_key) with its customer,
+    invoice number and due date lifted into indexed columns, so partial refreshes are
+    row upserts and screens filter, sort and page in SQL instead of loading the book.
+    """
 
     def __init__(self, db_path: Optional[str] = None) -> None:
         self._db_path = db_path or settings.ar_open_invoices_cache_path
@@ -49,55 +57,290 @@ class ArOpenInvoicesCacheRepository:
         with self._connect() as conn:
             conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS ar_open_invoices_cache (
+                CREATE TABLE IF NOT EXISTS ar_open_invoices_cache_state (
                     cache_key TEXT PRIMARY KEY,
-                    payload_json TEXT NOT NULL,
                     updated_at TEXT NOT NULL
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ar_open_invoice_rows (
+                    cache_key TEXT NOT NULL,
+                    invoice_key TEXT NOT NULL,
+                    invoice_no TEXT,
+                    customer_no TEXT,
+                    due_date TEXT,
+                    payload_json TEXT NOT NULL,
+                    PRIMARY KEY (cache_key, invoice_key)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ar_open_invoice_rows_customer "
+                "ON ar_open_invoice_rows (cache_key, customer_no)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ar_open_invoice_rows_due_date "
+                "ON ar_open_invoice_rows (cache_key, due_date)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ar_open_invoice_rows_invoice_no "
+                "ON ar_open_invoice_rows (cache_key, invoice_no)"
+            )
+            self._migrate_legacy_payloads(conn)
             conn.commit()
 
-    def get_cache(self, cache_key: str) -> Optional[Tuple[datetime, list[Dict[str, Any]]]]:
+    def _migrate_legacy_payloads(self, conn: sqlite3.Connection) -> None:
+        """Explode payloads from the former one-blob-per-key table into rows, once."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (_LEGACY_TABLE,)
+        ).fetchone()
+        if not exists:
+            return
+        for cache_key, payload_json, updated_at in conn.execute(
+            f"SELECT cache_key, payload_json, updated_at FROM {_LEGACY_TABLE}"
+        ).fetchall():
+            try:
+                payload = json.loads(payload_json or "[]")
+            except json.JSONDecodeError:
+                payload = []
+            if not isinstance(payload, list):
+                payload = []
+            rows = [(key, item) for item in payload if (key := invoice_cache_key(item))]
+            self._write_rows(conn, cache_key, rows, replace=True)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO ar_open_invoices_cache_state (cache_key, updated_at)
+                VALUES (?, ?)
+                """,
+                (cache_key, updated_at or datetime.utcnow().isoformat()),
+            )
+        conn.execute(f"DROP TABLE {_LEGACY_TABLE}")
+        logger.info("Migrated AR open invoice cache to per-invoice rows")
+
+    def get_status(self, cache_key: str) -> Optional[Tuple[datetime, int]]:
+        """Return (updated_at, invoice_count) for an initialized cache key."""
         if not self._enabled:
             return None
         with self._connect() as conn:
             row = conn.execute(
-                "SELECT payload_json, updated_at FROM ar_open_invoices_cache WHERE cache_key = ?",
+                "SELECT updated_at FROM ar_open_invoices_cache_state WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if not row:
+                return None
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM ar_open_invoice_rows WHERE cache_key = ?",
                 (cache_key,),
             ).fetchone()
-        if not row:
+        return _parse_updated_at(row[0]), int(count)
+
+    def query_rows(
+        self,
+        cache_key: str,
+        *,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        customer_no: Optional[str] = None,
+        invoice_no: Optional[str] = None,
+        exclude_customer_prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return matching cached payloads ordered by due date (undated last), or None
+        when `cache_key` has never been refreshed.
+        """
+        if not self._enabled:
             return None
-        payload_json, updated_at_raw = row
-        if not payload_json:
+        where, params = _row_filters(
+            cache_key,
+            due_from=due_from,
+            due_to=due_to,
+            customer_no=customer_no,
+            invoice_no=invoice_no,
+            exclude_customer_prefix=exclude_customer_prefix,
+        )
+        sql = (
+            f"SELECT payload_json FROM ar_open_invoice_rows WHERE {where} "
+            "ORDER BY due_date IS NULL, due_date, invoice_key"
+        )
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([int(limit), max(int(offset), 0)])
+        with self._connect() as conn:
+            if not self._is_initialized(conn, cache_key):
+                return None
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(payload_json) for (payload_json,) in rows]
+
+    def count_rows(
+        self,
+        cache_key: str,
+        *,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        customer_no: Optional[str] = None,
+        invoice_no: Optional[str] = None,
+        exclude_customer_prefix: Optional[str] = None,
+    ) -> Optional[int]:
+        if not self._enabled:
             return None
-        try:
-            payload = json.loads(payload_json)
-        except json.JSONDecodeError:
+        where, params = _row_filters(
+            cache_key,
+            due_from=due_from,
+            due_to=due_to,
+            customer_no=customer_no,
+            invoice_no=invoice_no,
+            exclude_customer_prefix=exclude_customer_prefix,
+        )
+        with self._connect() as conn:
+            if not self._is_initialized(conn, cache_key):
+                return None
+            (count,) = conn.execute(
+                f"SELECT COUNT(*) FROM ar_open_invoice_rows WHERE {where}", params
+            ).fetchone()
+        return int(count)
+
+    def upsert_rows(self, cache_key: str, rows: Iterable[Tuple[str, Dict[str, Any]]]) -> datetime:
+        """Insert or overwrite the given (invoice_key, payload) rows, leaving the others."""
+        return self._store(cache_key, rows, replace=False)
+
+    def replace_rows(self, cache_key: str, rows: Iterable[Tuple[str, Dict[str, Any]]]) -> datetime:
+        """Replace every row of `cache_key` with the given (invoice_key, payload) rows."""
+        return self._store(cache_key, rows, replace=True)
+
+    def get_cache(self, cache_key: str) -> Optional[Tuple[datetime, list[Dict[str, Any]]]]:
+        status = self.get_status(cache_key)
+        if status is None:
             return None
-        if not isinstance(payload, list):
+        payload = self.query_rows(cache_key)
+        if payload is None:
             return None
-        try:
-            updated_at = datetime.fromisoformat(updated_at_raw)
-        except ValueError:
-            updated_at = datetime.utcnow()
-        return updated_at, payload
+        return status[0], payload
 
     def upsert_cache(self, cache_key: str, payload: list[Dict[str, Any]]) -> datetime:
+        rows = [(key, item) for item in payload if (key := invoice_cache_key(item))]
+        return self.replace_rows(cache_key, rows)
+
+    def _store(
+        self, cache_key: str, rows: Iterable[Tuple[str, Dict[str, Any]]], *, replace: bool
+    ) -> datetime:
         if not self._enabled:
             raise ValueError("Cache storage not configured")
         updated_at = datetime.utcnow()
-        payload_json = json.dumps(payload)
         with self._connect() as conn:
+            self._write_rows(conn, cache_key, rows, replace=replace)
             conn.execute(
                 """
-                INSERT INTO ar_open_invoices_cache (cache_key, payload_json, updated_at)
-                VALUES (?, ?, ?)
-                ON CONFLICT(cache_key) DO UPDATE SET
-                    payload_json = excluded.payload_json,
-                    updated_at = excluded.updated_at
+                INSERT INTO ar_open_invoices_cache_state (cache_key, updated_at)
+                VALUES (?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET updated_at = excluded.updated_at
                 """,
-                (cache_key, payload_json, updated_at.isoformat()),
+                (cache_key, updated_at.isoformat()),
             )
             conn.commit()
         return updated_at
+
+    @staticmethod
+    def _write_rows(
+        conn: sqlite3.Connection,
+        cache_key: str,
+        rows: Iterable[Tuple[str, Dict[str, Any]]],
+        *,
+        replace: bool,
+    ) -> None:
+        if replace:
+            conn.execute("DELETE FROM ar_open_invoice_rows WHERE cache_key = ?", (cache_key,))
+        conn.executemany(
+            """
+            INSERT INTO ar_open_invoice_rows
+                (cache_key, invoice_key, invoice_no, customer_no, due_date, payload_json)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key, invoice_key) DO UPDATE SET
+                invoice_no = excluded.invoice_no,
+                customer_no = excluded.customer_no,
+                due_date = excluded.due_date,
+                payload_json = excluded.payload_json
+            """,
+            (
+                (
+                    cache_key,
+                    invoice_key,
+                    _text_or_none(payload.get("invoice_no")),
+                    _text_or_none(payload.get("customer_no")),
+                    _text_or_none(payload.get("due_date")),
+                    json.dumps(payload),
+                )
+                for invoice_key, payload in rows
+            ),
+        )
+
+    @staticmethod
+    def _is_initialized(conn: sqlite3.Connection, cache_key: str) -> bool:
+        return (
+            conn.execute(
+                "SELECT 1 FROM ar_open_invoices_cache_state WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            is not None
+        )
+
+
+def invoice_cache_key(payload_item: Dict[str, Any]) -> Optional[str]:
+    """Stable identity of a cached AR entry: ledger entry number, else invoice fields."""
+    entry_no = payload_item.get("entry_no")
+    if entry_no not in (None, ""):
+        return f"entry:{entry_no}"
+
+    invoice_no = str(payload_item.get("invoice_no") or "").strip()
+    if not invoice_no:
+        return None
+
+    customer_no = str(payload_item.get("customer_no") or "").strip()
+    document_type = str(payload_item.get("document_type") or "").strip()
+    due_date = str(payload_item.get("due_date") or "").strip()
+    posting_date = str(payload_item.get("posting_date") or "").strip()
+    return "|".join([invoice_no, customer_no, document_type, due_date, posting_date])
+
+
+def _row_filters(
+    cache_key: str,
+    *,
+    due_from: Optional[date],
+    due_to: Optional[date],
+    customer_no: Optional[str],
+    invoice_no: Optional[str],
+    exclude_customer_prefix: Optional[str],
+) -> Tuple[str, List[Any]]:
+    clauses = ["cache_key = ?"]
+    params: List[Any] = [cache_key]
+    if due_from:
+        clauses.append("due_date >= ?")
+        params.append(due_from.isoformat())
+    if due_to:
+        clauses.append("due_date <= ?")
+        params.append(due_to.isoformat())
+    if customer_no:
+        clauses.append("customer_no = ?")
+        params.append(customer_no)
+    if invoice_no:
+        clauses.append("invoice_no = ?")
+        params.append(invoice_no)
+    if exclude_customer_prefix:
+        clauses.append("(customer_no IS NULL OR UPPER(customer_no) NOT LIKE ?)")
+        params.append(f"{exclude_customer_prefix.upper()}%")
+    return " AND ".join(clauses), params
+
+
+def _text_or_none(value: Any) -> Optional[str]:
+    if value in (None, ""):
+        return None
+    return str(value)
+
+
+def _parse_updated_at(raw: str) -> datetime:
+    try:
+        return datetime.fromisoformat(raw)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
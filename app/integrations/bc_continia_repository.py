@@ -11,7 +11,7 @@ from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal
 from functools import lru_cache
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
 
 from sqlalchemy import create_engine, text
@@ -21,6 +21,7 @@ from sqlalchemy.pool import QueuePool
 from urllib.parse import quote_plus
 
 from app.errors import DatabaseError
+from app.integrations.sql_staging import fast_executemany_dbapi, stage_rows, staging_table
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -37,6 +38,7 @@ VENDOR_TABLE = "[Gilbert-Tech$Vendor$437dbf0e-84ff-417a-965d-ed2bb9650972]"
 PAYMENT_TERMS_TABLE = (
     "[Gilbert-Tech$Payment Terms$437dbf0e-84ff-417a-965d-ed2bb9650972]"
 )
+_DOCUMENT_KEYS_TABLE = "#cdc_document_keys"
 
 
 @dataclass(slots=True)
@@ -228,79 +230,150 @@ class BusinessCentralContiniaRepository:
         return [d for d in docs if d.document_no]
 
     def get_document_values_batch(
-        self, document_nos: Sequence[str]
+        self,
+        document_nos: Sequence[str],
+        *,
+        codes: Optional[Sequence[str]] = None,
     ) -> Dict[str, ContiniaValues]:
         """
         Fetch CDC Document Values for a batch of document numbers.
         Returns mapping: document_no -> ContiniaValues.
+
+        On SQL Server (pyodbc) the keys are loaded into a session temp table in one
+        ``fast_executemany`` round trip and joined server-side; rows are streamed back in
+        `continia_values_fetch_size` batches. `codes` restricts the value codes returned.
         """
         if not self._engine:
             raise DatabaseError("Business Central SQL connection is not configured")
-        if not document_nos:
+        keys = list(dict.fromkeys(str(x).strip() for x in document_nos if x is not None and str(x).strip()))
+        if not keys:
             return {}
+        code_filter = sorted({str(code).strip().upper() for code in codes or () if str(code).strip()})
 
-        # Chunk to avoid SQL Server parameter limits
-        chunk_size = 500
         result: Dict[str, ContiniaValues] = {}
+        dbapi = fast_executemany_dbapi(self._engine)
+        try:
+            if dbapi is None:
+                rows = self._query_document_values_chunked(keys, code_filter)
+            else:
+                rows = self._query_document_values_bulk(dbapi, keys, code_filter)
+            for doc_no, code, text_value, decimal_value, date_value in rows:
+                _add_document_value(result, doc_no, code, text_value, decimal_value, date_value)
+        except (SQLAlchemyError, getattr(dbapi, "Error", SQLAlchemyError)) as exc:
+            logger.error("Failed to query CDC Document Value table", exc_info=exc)
+            raise DatabaseError("Unable to query Continia CDC values") from exc
 
-        for i in range(0, len(document_nos), chunk_size):
-            chunk = [str(x) for x in document_nos[i : i + chunk_size]]
-            placeholders = ", ".join([f":p{i}_{j}" for j in range(len(chunk))])
-            params = {f"p{i}_{j}": chunk[j] for j in range(len(chunk))}
+        return result
 
-            query = text(
+    def _query_document_values_bulk(
+        self, dbapi: Any, keys: List[str], code_filter: List[str]
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Stream value rows for `keys` through a session temp table joined server-side."""
+        code_clause = ""
+        code_params: List[str] = []
+        if code_filter:
+            code_clause = f"AND UPPER(DV.Code) IN ({', '.join('?' for _ in code_filter)})"
+            code_params = code_filter
+        fetch_size = max(int(settings.continia_values_fetch_size), 1)
+
+        create_keys = (
+            f"CREATE TABLE {_DOCUMENT_KEYS_TABLE} "
+            "([DocumentNo] NVARCHAR(50) COLLATE DATABASE_DEFAULT NOT NULL PRIMARY KEY)"
+        )
+        with staging_table(self._engine, _DOCUMENT_KEYS_TABLE, create_keys) as (_, cursor):
+            stage_rows(cursor, dbapi, _DOCUMENT_KEYS_TABLE, ("[DocumentNo]",), [(key,) for key in keys])
+            cursor.execute(
                 f"""
                 SELECT
-                    [Document No_] as DocumentNo,
-                    Code,
-                    [Value (Text)] as TextValue,
-                    [Value (Decimal)] as DecimalValue,
-                    [Value (Date)] as DateValue
-                FROM {CDC_DOCUMENT_VALUE_TABLE}
-                WHERE
-                    [Document No_] IN ({placeholders})
-                    AND [Is Valid] = 1
-                """
+                    DV.[Document No_],
+                    DV.Code,
+                    DV.[Value (Text)],
+                    DV.[Value (Decimal)],
+                    DV.[Value (Date)]
+                FROM {_DOCUMENT_KEYS_TABLE} K
+                INNER JOIN {CDC_DOCUMENT_VALUE_TABLE} DV
+                    ON DV.[Document No_] = K.[DocumentNo]
+                WHERE DV.[Is Valid] = 1
+                {code_clause}
+                """,
+                *code_params,
             )
+            while True:
+                batch = cursor.fetchmany(fetch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield tuple(row)
+
+    def _query_document_values_chunked(
+        self, keys: List[str], code_filter: List[str]
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Portable path: bound-parameter IN lists, all chunks on one connection."""
+        # Chunk to avoid SQL Server parameter limits
+        chunk_size = 500
+        code_clause = ""
+        code_params: Dict[str, str] = {}
+        if code_filter:
+            code_clause = f"AND UPPER(Code) IN ({', '.join(f':code_{j}' for j in range(len(code_filter)))})"
+            code_params = {f"code_{j}": code for j, code in enumerate(code_filter)}
+
+        with self._engine.connect() as connection:
+            for i in range(0, len(keys), chunk_size):
+                chunk = keys[i : i + chunk_size]
+                placeholders = ", ".join([f":p{j}" for j in range(len(chunk))])
+                params = {f"p{j}": chunk[j] for j in range(len(chunk))}
+                query = text(
+                    f"""
+                    SELECT
+                        [Document No_] as DocumentNo,
+                        Code,
+                        [Value (Text)] as TextValue,
+                        [Value (Decimal)] as DecimalValue,
+                        [Value (Date)] as DateValue
+                    FROM {CDC_DOCUMENT_VALUE_TABLE}
+                    WHERE
+                        [Document No_] IN ({placeholders})
+                        AND [Is Valid] = 1
+                        {code_clause}
+                    """
+                )
+                for row in connection.execute(query, {**params, **code_params}):
+                    yield tuple(row)
+
+
+def _add_document_value(
+    result: Dict[str, ContiniaValues],
+    doc_no_value: Any,
+    code_value: Any,
+    tv: Any,
+    dv: Any,
+    datev: Any,
+) -> None:
+    doc_no = str(doc_no_value or "").strip()
+    code = str(code_value or "").strip().upper()
+    if not doc_no or not code:
+        return
+    values = result.get(doc_no)
+    if values is None:
+        values = result[doc_no] = ContiniaValues(
+            document_no=doc_no,
+            text_values={},
+            decimal_values={},
+            date_values={},
+        )
 
-            try:
-                with self._engine.connect() as connection:
-                    rows = connection.execute(query, params).mappings().all()
-            except SQLAlchemyError as exc:
-                logger.error("Failed to query CDC Document Value table", exc_info=exc)
-                raise DatabaseError("Unable to query Continia CDC values") from exc
-
-            for row in rows:
-                doc_no = str(row.get("DocumentNo") or "").strip()
-                code = str(row.get("Code") or "").strip().upper()
-                if not doc_no or not code:
-                    continue
-                if doc_no not in result:
-                    result[doc_no] = ContiniaValues(
-                        document_no=doc_no,
-                        text_values={},
-                        decimal_values={},
-                        date_values={},
-                    )
-
-                tv = row.get("TextValue")
-                dv = row.get("DecimalValue")
-                datev = row.get("DateValue")
-
-                if tv not in (None, ""):
-                    result[doc_no].text_values[code] = str(tv).strip()
-                if dv is not None:
-                    try:
-                        result[doc_no].decimal_values[code] = Decimal(str(dv))
-                    except Exception:
-                        pass
-                if datev is not None and isinstance(datev, (date, datetime)):
-                    if isinstance(datev, datetime):
-                        result[doc_no].date_values[code] = datev.date()
-                    else:
-                        result[doc_no].date_values[code] = datev
-
-        return result
+    if tv not in (None, ""):
+        values.text_values[code] = str(tv).strip()
+    if dv is not None:
+        try:
+            values.decimal_values[code] = Decimal(str(dv))
+        except Exception:
+            pass
+    if datev is not None and isinstance(datev, (date, datetime)):
+        if isinstance(datev, datetime):
+            values.date_values[code] = datev.date()
+        else:
+            values.date_values[code] = datev
 
 
 def _clean_str(value: Optional[object]) -> Optional[str]:
@@ -5,17 +5,20 @@ Fixture/pallet data access for Fastems1 Autopilot.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 import logging
 
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError, ProgrammingError
 
 from app.integrations.cedule_repository import get_cedule_engine
+from app.integrations.schema_capabilities import schema_capabilities
 
 logger = logging.getLogger(__name__)
 
+FIXTURE_MATRIX_VIEW = "[Cedule].[dbo].[Autopilot_FixtureMatrix]"
+
 
 @dataclass(slots=True)
 class FixtureMatrixRow:
@@ -62,7 +65,70 @@ class CeduleAutopilotRepository:
     def is_configured(self) -> bool:
         return self._engine is not None
 
-    def get_fixture_matrix(self, piece_code: str) -> List[FixtureMatrixRow]:
+    def get_fixture_matrices(self, piece_codes: Sequence[str]) -> Dict[str, List[FixtureMatrixRow]]:
+        """
+        Fixture matrix of several piece codes, reading Autopilot_FixtureMatrix in one query.
+
+        Codes whose matrix rows are incomplete still go through the per-code enrichment
+        fallbacks of `get_fixture_matrix`.
+        """
+        codes = list(dict.fromkeys(code for code in piece_codes if code))
+        if not codes:
+            return {}
+        if not self._engine:
+            logger.warning("Cedule Autopilot repository not configured; returning empty fixture matrices")
+            return {code: [] for code in codes}
+
+        # Older revisions of the view have no plaque columns; the enrichment fallbacks
+        # of get_fixture_matrix fill them in.
+        if self._has_plaque_columns() is False:
+            plaque_columns = "NULL AS RequiredPlaqueModel, NULL AS PalletPlaqueModel"
+        else:
+            plaque_columns = "RequiredPlaqueModel, PalletPlaqueModel"
+        query = text(
+            f"""
+            SELECT
+                PieceCode,
+                RequiredGabaritNumero AS FixtureCode,
+                GabaritDescription,
+                CONCAT(FixtureStorageRow, '-', FixtureStorageColumn) AS StorageLocation,
+                RequiredMachineOperation,
+                MachinePalletId,
+                MachinePalletNumber,
+                MachineForPallet,
+                IsFixtureActive,
+                {plaque_columns}
+            FROM Cedule.dbo.Autopilot_FixtureMatrix
+            WHERE UPPER(RTRIM(LTRIM(PieceCode))) IN :piece_codes_upper
+            """
+        ).bindparams(bindparam("piece_codes_upper", expanding=True))
+        params = {"piece_codes_upper": list(dict.fromkeys(code.upper() for code in codes))}
+        try:
+            with self._engine.connect() as connection:
+                rows = connection.execute(query, params).mappings().all()
+        except SQLAlchemyError as exc:
+            if "RequiredPlaqueModel" in str(exc):
+                schema_capabilities.invalidate(self._engine)
+            logger.warning(
+                "Batched Autopilot_FixtureMatrix query failed; loading piece codes one by one",
+                extra={"piece_codes": len(codes), "error": str(exc)},
+            )
+            return {code: self.get_fixture_matrix(code) for code in codes}
+
+        rows_by_code: Dict[str, List[dict]] = {}
+        for row in rows:
+            key = (row.get("PieceCode") or "").strip().upper()
+            rows_by_code.setdefault(key, []).append(row)
+        return {
+            code: self.get_fixture_matrix(code, prefetched_rows=rows_by_code.get(code.upper(), []))
+            for code in codes
+        }
+
+    def get_fixture_matrix(
+        self,
+        piece_code: str,
+        prefetched_rows: Optional[Sequence[dict]] = None,
+    ) -> List[FixtureMatrixRow]:
         if not self._engine:
             logger.warning("Cedule Autopilot repository not configured; returning empty fixture matrix")
             return []
@@ -94,22 +160,28 @@ class CeduleAutopilotRepository:
                 OR UPPER(RTRIM(LTRIM(PieceCode))) = :piece_code_upper
             """
         )
-        try:
-            with self._engine.connect() as connection:
-                rows = connection.execute(query, params).mappings().all()
-        except ProgrammingError as exc:
-            if "RequiredPlaqueModel" in str(exc):
-                logger.warning(
-                    "Autopilot_FixtureMatrix missing plaque columns; using compatibility query",
-                    extra={"piece_code": piece_code},
-                )
-                rows = self._query_fixture_matrix_compat(piece_code, params)
-            else:
+        if prefetched_rows is not None:
+            rows = prefetched_rows
+        elif self._has_plaque_columns() is False:
+            rows = self._query_fixture_matrix_compat(piece_code, params)
+        else:
+            try:
+                with self._engine.connect() as connection:
+                    rows = connection.execute(query, params).mappings().all()
+            except ProgrammingError as exc:
+                if "RequiredPlaqueModel" in str(exc):
+                    schema_capabilities.invalidate(self._engine)
+                    logger.warning(
+                        "Autopilot_FixtureMatrix missing plaque columns; using compatibility query",
+                        extra={"piece_code": piece_code},
+                    )
+                    rows = self._query_fixture_matrix_compat(piece_code, params)
+                else:
+                    logger.error("Failed to query Autopilot_FixtureMatrix", exc_info=exc, extra={"piece_code": piece_code})
+                    return []
+            except SQLAlchemyError as exc:
                 logger.error("Failed to query Autopilot_FixtureMatrix", exc_info=exc, extra={"piece_code": piece_code})
                 return []
-        except SQLAlchemyError as exc:
-            logger.error("Failed to query Autopilot_FixtureMatrix", exc_info=exc, extra={"piece_code": piece_code})
-            return []
 
         results: List[FixtureMatrixRow] = []
         for row in rows:
@@ -295,6 +367,10 @@ class CeduleAutopilotRepository:
             )
         return results
 
+    def _has_plaque_columns(self) -> Optional[bool]:
+        """Whether the fixture matrix view exposes plaque models (None when unknown)."""
+        return schema_capabilities.has_column(self._engine, FIXTURE_MATRIX_VIEW, "RequiredPlaqueModel")
+
     def _query_fixture_matrix_compat(self, piece_code: str, params: dict) -> List[dict]:
         if not self._engine:
             return []
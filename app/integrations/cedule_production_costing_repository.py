@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import datetime as dt
 import logging
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
 from uuid import UUID, uuid4
 
 from sqlalchemy import text
@@ -11,9 +11,36 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app.errors import DatabaseError
 from app.integrations.cedule_repository import get_cedule_engine
+from app.integrations.sql_staging import fast_executemany_dbapi, stage_rows, staging_table
 
 logger = logging.getLogger(__name__)
 
+# Engines whose snapshot schema was already validated; repositories are created per request
+# so the check is tracked per engine rather than per instance.
+_SCHEMA_VERIFIED_ENGINES: set[int] = set()
+
+_SNAPSHOT_COLUMNS = (
+    "scan_id",
+    "source_type",
+    "source_no",
+    "source_base_item_no",
+    "header_last_modified_at",
+    "line_key",
+    "row_json",
+)
+_STAGE_TABLE = "#cost_share_snapshot_stage"
+_STAGE_TABLE_SQL = f"""
+CREATE TABLE {_STAGE_TABLE} (
+    [scan_id] UNIQUEIDENTIFIER NOT NULL,
+    [source_type] NVARCHAR(20) NOT NULL,
+    [source_no] NVARCHAR(100) NOT NULL,
+    [source_base_item_no] NVARCHAR(50) NOT NULL,
+    [header_last_modified_at] DATETIME2(3) NULL,
+    [line_key] NVARCHAR(200) NULL,
+    [row_json] NVARCHAR(MAX) NOT NULL
+)
+"""
+
 
 class CeduleProductionCostingRepository:
     """Persistence for ERP production costing snapshots in Cedule."""
@@ -30,6 +57,9 @@ class CeduleProductionCostingRepository:
         """Validate snapshot schema availability without requiring DDL permissions."""
         if self._schema_checked or not self._engine:
             return
+        if id(self._engine) in _SCHEMA_VERIFIED_ENGINES:
+            self._schema_checked = True
+            return
 
         required_tables = (
             "[Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SCANS]",
@@ -39,6 +69,7 @@ class CeduleProductionCostingRepository:
         missing = self._find_missing_tables(required_tables)
         if not missing:
             self._schema_checked = True
+            _SCHEMA_VERIFIED_ENGINES.add(id(self._engine))
             return
 
         missing_str = ", ".join(missing)
@@ -417,6 +448,76 @@ class CeduleProductionCostingRepository:
             raise DatabaseError("Unable to persist costing line snapshots") from exc
         return len(rows)
 
+    def bulk_insert_line_snapshots(self, rows: Iterable[dict[str, Any]], *, chunk_size: int = 5000) -> int:
+        """
+        Load snapshot rows through a session staging table merged in chunked transactions.
+
+        Each chunk is shipped in one round trip with pyodbc ``fast_executemany`` and merged
+        into the snapshot table; lines already present for the same scan with identical
+        content are skipped, so a retried chunk does not duplicate lines. Returns the number
+        of rows the merges inserted. Other drivers fall back to ``insert_line_snapshots``.
+        """
+        if not self._engine:
+            raise DatabaseError("Cedule database not configured")
+
+        chunk_size = max(1, int(chunk_size))
+        dbapi = fast_executemany_dbapi(self._engine)
+        if dbapi is None:
+            return sum(self.insert_line_snapshots(chunk) for chunk in _chunked(rows, chunk_size))
+
+        persisted = 0
+        try:
+            with staging_table(self._engine, _STAGE_TABLE, _STAGE_TABLE_SQL) as (raw_conn, cursor):
+                for chunk in _chunked(rows, chunk_size):
+                    cursor.execute(f"TRUNCATE TABLE {_STAGE_TABLE}")
+                    stage_rows(
+                        cursor,
+                        dbapi,
+                        _STAGE_TABLE,
+                        _SNAPSHOT_COLUMNS,
+                        [tuple(row.get(column) for column in _SNAPSHOT_COLUMNS) for row in chunk],
+                        wide_columns=("row_json",),
+                    )
+                    cursor.execute(
+                        f"""
+                        MERGE [Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SNAPSHOT] AS target
+                        USING {_STAGE_TABLE} AS source
+                            ON target.scan_id = source.scan_id
+                           AND target.source_type = source.source_type
+                           AND target.source_no = source.source_no
+                           AND ISNULL(target.line_key, N'') = ISNULL(source.line_key, N'')
+                           AND target.row_json = source.row_json
+                        WHEN NOT MATCHED BY TARGET THEN
+                            INSERT ({', '.join(_SNAPSHOT_COLUMNS)})
+                            VALUES ({', '.join(f'source.{column}' for column in _SNAPSHOT_COLUMNS)});
+                        """
+                    )
+                    # Rows the MERGE matched (already loaded) are not counted as persisted.
+                    persisted += max(int(cursor.rowcount or 0), 0)
+                    raw_conn.commit()
+        except (SQLAlchemyError, getattr(dbapi, "Error", SQLAlchemyError)) as exc:
+            logger.error("Failed to bulk load costing line snapshots", exc_info=exc)
+            raise DatabaseError("Unable to persist costing line snapshots") from exc
+        return persisted
+
+    def delete_scan(self, scan_id: UUID) -> None:
+        """Remove a scan and (through the cascading FK) its snapshot lines."""
+        if not self._engine:
+            raise DatabaseError("Cedule database not configured")
+
+        stmt = text(
+            """
+            DELETE FROM [Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SCANS]
+            WHERE scan_id = :scan_id
+            """
+        )
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(stmt, {"scan_id": str(scan_id)})
+        except SQLAlchemyError as exc:
+            logger.error("Failed to delete costing scan", exc_info=exc)
+            raise DatabaseError("Unable to delete costing scan") from exc
+
     def list_item_snapshot_rows(
         self,
         *,
@@ -500,3 +601,81 @@ class CeduleProductionCostingRepository:
             raise DatabaseError("Unable to query grouped costing snapshots") from exc
 
         return [dict(row) for row in rows]
+
+    def list_source_snapshot_rows(
+        self,
+        *,
+        source_type: str,
+        source_no: str,
+        base_item_no: str,
+    ) -> list[dict[str, Any]]:
+        """Return the line rows of the latest successful snapshot for one routing/BOM number."""
+        if not self._engine:
+            raise DatabaseError("Cedule database not configured")
+
+        stmt = text(
+            """
+            WITH latest AS (
+                SELECT TOP (1) ls.scan_id
+                FROM [Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SNAPSHOT] ls
+                INNER JOIN [Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SCANS] sc
+                    ON sc.scan_id = ls.scan_id
+                WHERE ls.source_base_item_no = :base_item_no
+                  AND ls.source_type = :source_type
+                  AND ls.source_no = :source_no
+                  AND sc.status = 'success'
+                ORDER BY sc.scan_started_at DESC, ls.scan_id DESC
+            )
+            SELECT
+                ls.snapshot_id,
+                ls.scan_id,
+                ls.source_type,
+                ls.source_no,
+                ls.source_base_item_no,
+                ls.header_last_modified_at,
+                ls.line_key,
+                ls.row_json,
+                sc.scan_started_at,
+                sc.scan_finished_at
+            FROM [Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SNAPSHOT] ls
+            INNER JOIN latest
+                ON latest.scan_id = ls.scan_id
+            INNER JOIN [Cedule].[dbo].[30_COMPTABILITÉ ET FINANCES_COST_SHARE_SCANS] sc
+                ON sc.scan_id = ls.scan_id
+            WHERE ls.source_base_item_no = :base_item_no
+              AND ls.source_type = :source_type
+              AND ls.source_no = :source_no
+            ORDER BY ls.snapshot_id ASC
+            """
+        )
+
+        try:
+            with self._engine.connect() as conn:
+                rows = (
+                    conn.execute(
+                        stmt,
+                        {
+                            "source_type": source_type,
+                            "source_no": source_no,
+                            "base_item_no": base_item_no,
+                        },
+                    )
+                    .mappings()
+                    .all()
+                )
+        except SQLAlchemyError as exc:
+            logger.error("Failed to query costing source snapshot", exc_info=exc)
+            raise DatabaseError("Unable to query costing source snapshot") from exc
+
+        return [dict(row) for row in rows]
+
+
+def _chunked(rows: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    chunk: list[dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
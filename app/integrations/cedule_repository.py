@@ -11,10 +11,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 import logging
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, create_engine, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.pool import QueuePool
@@ -25,6 +25,9 @@ from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Stay well under SQL Server's 2100 parameter limit per statement.
+_CERTIFICATE_BATCH_SIZE = 1000
+
 
 @dataclass(slots=True)
 class MillTestCertificate:
@@ -143,15 +146,90 @@ class MillTestCertificateRepository:
         if not row:
             return None
 
-        return MillTestCertificate(
-            part_number=row.get("part_number", "").strip(),
-            country_of_melt_and_pour=_clean_str(row.get("country_of_melt_and_pour")),
-            country_of_manufacture=_clean_str(row.get("country_of_manufacture")),
-            material_description=_clean_str(row.get("material_description")),
-            line_total_weight=_safe_float(row.get("line_total_weight")),
-            weight_unit=_clean_str(row.get("weight_unit")),
-            certification_date=row.get("certification_date"),
-        )
+        return _row_to_certificate(row)
+
+    def get_latest_certificates(self, part_numbers: Iterable[str]) -> Dict[str, MillTestCertificate]:
+        """
+        Return the most recent certificate for each part number.
+
+        Ranks certificates per part with ROW_NUMBER() so a whole batch resolves in one
+        round trip per 1000 parts instead of one TOP 1 query per part.
+        """
+        unique_parts = sorted({part for part in part_numbers if part})
+        if not unique_parts or not self._engine:
+            return {}
+
+        query = text(
+            """
+            SELECT
+                part_number,
+                country_of_melt_and_pour,
+                country_of_manufacture,
+                material_description,
+                line_total_weight,
+                weight_unit,
+                certification_date
+            FROM (
+                SELECT
+                    part_number,
+                    country_of_melt_and_pour,
+                    country_of_manufacture,
+                    material_description,
+                    line_total_weight,
+                    weight_unit,
+                    certification_date,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY part_number
+                        ORDER BY
+                            CASE WHEN certification_date = '0001-01-01' THEN NULL ELSE certification_date END DESC,
+                            created_at DESC
+                    ) AS certificate_rank
+                FROM [Cedule].[dbo].[Achat_Mill_Test_Certificate]
+                WHERE part_number IN :part_numbers
+            ) ranked
+            WHERE certificate_rank = 1
+            """
+        ).bindparams(bindparam("part_numbers", expanding=True))
+
+        # The Cedule collation matches part numbers case- and trailing-space-insensitively,
+        # so map each returned row back to the part number(s) the caller asked for.
+        requested: Dict[str, List[str]] = {}
+        for part in unique_parts:
+            requested.setdefault(_part_key(part), []).append(part)
+
+        certificates: Dict[str, MillTestCertificate] = {}
+        try:
+            with self._engine.connect() as connection:
+                for start in range(0, len(unique_parts), _CERTIFICATE_BATCH_SIZE):
+                    chunk = unique_parts[start : start + _CERTIFICATE_BATCH_SIZE]
+                    for row in connection.execute(query, {"part_numbers": chunk}).mappings():
+                        certificate = _row_to_certificate(row)
+                        for part in requested.get(_part_key(certificate.part_number), ()):
+                            certificates[part] = certificate
+        except SQLAlchemyError as exc:
+            logger.error(
+                "Failed to query Cedule mill test certificates",
+                exc_info=exc,
+                extra={"part_count": len(unique_parts)},
+            )
+            raise DatabaseError("Unable to query mill test certificates") from exc
+        return certificates
+
+
+def _part_key(part_number: str) -> str:
+    return part_number.strip().casefold()
+
+
+def _row_to_certificate(row) -> MillTestCertificate:
+    return MillTestCertificate(
+        part_number=(row.get("part_number") or "").strip(),
+        country_of_melt_and_pour=_clean_str(row.get("country_of_melt_and_pour")),
+        country_of_manufacture=_clean_str(row.get("country_of_manufacture")),
+        material_description=_clean_str(row.get("material_description")),
+        line_total_weight=_safe_float(row.get("line_total_weight")),
+        weight_unit=_clean_str(row.get("weight_unit")),
+        certification_date=row.get("certification_date"),
+    )
 
 
 def _clean_str(value: Optional[str]) -> Optional[str]:
@@ -312,6 +312,65 @@ class CeduleServiceRepository:
             for row in rows
         ]
 
+    def fetch_catalog_rows(self) -> List[dict]:
+        """Divisions, equipments, models and optional field types in one round trip.
+
+        Rows carry a ``kind`` discriminator; ``parent_id`` is the division of an equipment
+        or the equipment of a model, and ``description`` is the equipment of a field type.
+        """
+        if not self._engine:
+            raise DatabaseError("Cedule database not configured")
+
+        query = text(
+            """
+            SELECT
+                'division' AS kind,
+                CAST(Id AS NVARCHAR(100)) AS id,
+                CAST(Descr AS NVARCHAR(400)) AS description,
+                CAST(NULL AS NVARCHAR(100)) AS parent_id,
+                CAST(NULL AS NVARCHAR(400)) AS attribute1_header,
+                CAST(NULL AS NVARCHAR(400)) AS attribute2_header,
+                CAST(NULL AS NVARCHAR(400)) AS attribute3_header,
+                CAST(NULL AS NVARCHAR(400)) AS attribute4_header
+            FROM [Cedule].[dbo].[Service_Division]
+            UNION ALL
+            SELECT
+                'equipement',
+                CAST(Id AS NVARCHAR(100)),
+                CAST(DescEquipement AS NVARCHAR(400)),
+                CAST(DivisionId AS NVARCHAR(100)),
+                NULL, NULL, NULL, NULL
+            FROM [Cedule].[dbo].[Service_Equipement]
+            UNION ALL
+            SELECT
+                'modele',
+                CAST(Id AS NVARCHAR(100)),
+                CAST(DescModele AS NVARCHAR(400)),
+                CAST(EquipementId AS NVARCHAR(100)),
+                NULL, NULL, NULL, NULL
+            FROM [Cedule].[dbo].[Service_Modele]
+            UNION ALL
+            SELECT
+                'field_type',
+                CAST(Type AS NVARCHAR(100)),
+                CAST(Equipment AS NVARCHAR(400)),
+                NULL,
+                CAST(Attribut1Header AS NVARCHAR(400)),
+                CAST(Attribut2Header AS NVARCHAR(400)),
+                CAST(Attibut3Header AS NVARCHAR(400)),
+                CAST(Attribut4Header AS NVARCHAR(400))
+            FROM [Cedule].[dbo].[Service_ServItemOptionalFTypes]
+            """
+        )
+        try:
+            with self._engine.connect() as connection:
+                rows = connection.execute(query).mappings().all()
+        except SQLAlchemyError as exc:
+            logger.error("Failed to query the Service catalog", exc_info=exc)
+            raise DatabaseError("Unable to query the Service catalog") from exc
+
+        return [dict(row) for row in rows]
+
     def create_service_item(self, payload: ServiceItemCreateRequest) -> ServiceItemCreateResponse:
         if not self._engine:
             raise DatabaseError("Cedule database not configured")
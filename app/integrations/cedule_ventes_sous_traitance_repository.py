@@ -49,9 +49,15 @@ from app.domain.ventes_sous_traitance.models import (
 )
 from app.errors import DatabaseError
 from app.integrations.cedule_repository import get_cedule_engine
+from app.integrations.schema_capabilities import schema_capabilities
 
 logger = logging.getLogger(__name__)
 
+_MACHINES_TABLE = "[Cedule].[dbo].[40_VENTES_SOUSTRAITANCE_machines]"
+_MACHINE_CAPABILITIES_TABLE = "[Cedule].[dbo].[40_VENTES_SOUSTRAITANCE_machine_capabilities]"
+_MACHINE_CAPABILITY_OPTIONS_TABLE = "[Cedule].[dbo].[40_VENTES_SOUSTRAITANCE_machine_capability_options]"
+_PART_ROUTINGS_TABLE = "[Cedule].[dbo].[40_VENTES_SOUSTRAITANCE_part_routings]"
+
 
 def _safe_int(value: Any, default: int = 0) -> int:
     try:
@@ -143,6 +149,18 @@ class CeduleVentesSousTraitanceRepository:
     def is_configured(self) -> bool:
         return self._engine is not None
 
+    def _table_missing(self, table: str) -> bool:
+        """
+        True when the cached schema shows `table` does not exist.
+
+        An unknown schema (probe failed) reports False so the query runs and the
+        `_is_missing_table_error` handlers still apply.
+        """
+        return schema_capabilities.has_table(self._engine, table) is False
+
+    def _column_missing(self, table: str, column: str) -> bool:
+        return schema_capabilities.has_column(self._engine, table, column) is False
+
     def list_customers(self, *, search: Optional[str], limit: int = 200) -> list[CustomerSummary]:
         if not self._engine:
             raise DatabaseError("Cedule database not configured")
@@ -173,6 +191,26 @@ class CeduleVentesSousTraitanceRepository:
             raise DatabaseError("Unable to list customers") from exc
         return [self._to_customer(row) for row in rows]
 
+    def list_all_customers(self) -> list[CustomerSummary]:
+        """Every customer, unbounded (used to rebuild local indexes, not for UI listing)."""
+        if not self._engine:
+            raise DatabaseError("Cedule database not configured")
+        stmt = text(
+            """
+            SELECT
+                [customer_id], [name], [email], [phone], [ship_to_address], [contact_name], [global_quote_comment], [created_at]
+            FROM [Cedule].[dbo].[40_VENTES_SOUSTRAITANCE_customers]
+            ORDER BY [customer_id]
+            """
+        )
+        try:
+            with self._engine.connect() as conn:
+                rows = conn.execute(stmt).mappings().all()
+        except SQLAlchemyError as exc:
+            logger.error("Failed to list all subcontracting customers", exc_info=exc)
+            raise DatabaseError("Unable to list customers") from exc
+        return [self._to_customer(row) for row in rows]
+
     def create_customer(self, payload: CustomerCreateRequest) -> CustomerSummary:
         if not self._engine:
             raise DatabaseError("Cedule database not configured")
@@ -432,10 +470,15 @@ class CeduleVentesSousTraitanceRepository:
             ORDER BY [capability_code] ASC, [usage_count] DESC, [capability_value] ASC
             """
         )
+        if self._table_missing(_MACHINE_CAPABILITY_OPTIONS_TABLE):
+            if self._table_missing(_MACHINE_CAPABILITIES_TABLE):
+                return []
+            table_stmt = fallback_stmt
+            params = fallback_params
         try:
             with self._engine.connect() as conn:
                 rows = conn.execute(table_stmt, params).mappings().all()
-                if not rows:
+                if not rows and table_stmt is not fallback_stmt:
                     rows = conn.execute(fallback_stmt, fallback_params).mappings().all()
         except SQLAlchemyError as exc:
             if _is_missing_table_error(exc):
@@ -582,6 +625,8 @@ class CeduleVentesSousTraitanceRepository:
             ORDER BY COUNT(1) DESC, [capability_value] ASC
             """
         )
+        if self._table_missing(_MACHINE_CAPABILITIES_TABLE):
+            return []
         try:
             with self._engine.connect() as conn:
                 rows = conn.execute(summary_stmt, params).mappings().all()
@@ -649,6 +694,8 @@ class CeduleVentesSousTraitanceRepository:
             ORDER BY [machine_name] ASC
             """
         )
+        if self._table_missing(_MACHINES_TABLE):
+            return []
         try:
             with self._engine.connect() as conn:
                 rows = conn.execute(stmt, params).mappings().all()
@@ -675,6 +722,8 @@ class CeduleVentesSousTraitanceRepository:
             WHERE [machine_id] = :machine_id
             """
         )
+        if self._table_missing(_MACHINES_TABLE):
+            return None
         try:
             with self._engine.connect() as conn:
                 row = conn.execute(stmt, {"machine_id": str(machine_id)}).mappings().first()
@@ -2461,6 +2510,11 @@ class CeduleVentesSousTraitanceRepository:
             if confidence_score > 1 and confidence_score <= 100:
                 confidence_score = confidence_score / 100.0
             confidence_score = max(0.0, min(1.0, confidence_score))
+        if self._column_missing(_PART_ROUTINGS_TABLE, "confidence_score"):
+            logger.warning(
+                "Routing metadata columns are missing. Run docs/ventes_sous_traitance_llm_feature_schema.sql to enable scenario metadata."
+            )
+            return
         stmt = text(
             """
             UPDATE [Cedule].[dbo].[40_VENTES_SOUSTRAITANCE_part_routings]
@@ -0,0 +1,164 @@
+"""
+Cached schema capabilities for SQL Server databases.
+
+Several repositories support more than one revision of a table or view (renamed
+columns, optional tables). Instead of running the preferred query and retrying a
+variant whenever SQL Server rejects it, they ask this cache which tables and columns
+exist. Each (engine, database) pair is probed with a single INFORMATION_SCHEMA query
+and the result is kept for `schema_capability_cache_ttl_seconds`.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_DATABASE_NAME = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def _split_table_name(table: str) -> tuple[str, str, str]:
+    """Split ``[Db].[schema].[Table]`` (brackets optional) into lower-cased parts."""
+    parts = [part.strip().strip("[]").strip().lower() for part in table.split(".")]
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(f"Expected a three-part table name, got {table!r}")
+    return parts[0], parts[1], parts[2]
+
+
+@dataclass(frozen=True)
+class SchemaCapabilities:
+    """Tables (and views) of one database with their column names, all lower-cased."""
+
+    database: str
+    columns_by_table: dict[tuple[str, str], frozenset[str]] = field(default_factory=dict)
+    probed_at: float = 0.0
+
+    def has_table(self, schema: str, table: str) -> bool:
+        return (schema.lower(), table.lower()) in self.columns_by_table
+
+    def has_column(self, schema: str, table: str, column: str) -> bool:
+        return column.lower() in self.columns_by_table.get((schema.lower(), table.lower()), frozenset())
+
+
+@dataclass
+class _Entry:
+    capabilities: Optional[SchemaCapabilities]
+    expires_at: float
+
+
+class SchemaCapabilityCache:
+    """
+    Per-engine cache of `SchemaCapabilities`.
+
+    Lookups return None when the schema could not be probed so callers keep their
+    error-driven fallback for that case.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._entries: "weakref.WeakKeyDictionary[Engine, dict[str, _Entry]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._probe_locks: dict[tuple[int, str], threading.Lock] = {}
+
+    @property
+    def ttl_seconds(self) -> float:
+        if self._ttl_seconds is not None:
+            return self._ttl_seconds
+        return float(settings.schema_capability_cache_ttl_seconds)
+
+    def get(self, engine: Engine, database: str) -> Optional[SchemaCapabilities]:
+        database = database.lower()
+        entry = self._cached(engine, database)
+        if entry is not None:
+            return entry.capabilities
+
+        with self._probe_lock(engine, database):
+            # Another thread may have probed while we waited.
+            entry = self._cached(engine, database)
+            if entry is not None:
+                return entry.capabilities
+            capabilities = self._probe(engine, database)
+            with self._lock:
+                self._entries.setdefault(engine, {})[database] = _Entry(
+                    capabilities=capabilities,
+                    expires_at=time.monotonic() + self.ttl_seconds,
+                )
+            return capabilities
+
+    def has_table(self, engine: Engine, table: str) -> Optional[bool]:
+        database, schema, name = _split_table_name(table)
+        capabilities = self.get(engine, database)
+        if capabilities is None:
+            return None
+        return capabilities.has_table(schema, name)
+
+    def has_column(self, engine: Engine, table: str, column: str) -> Optional[bool]:
+        database, schema, name = _split_table_name(table)
+        capabilities = self.get(engine, database)
+        if capabilities is None:
+            return None
+        return capabilities.has_column(schema, name, column)
+
+    def invalidate(self, engine: Optional[Engine] = None) -> None:
+        """Forget probed schemas (all engines when `engine` is None), e.g. after a migration."""
+        with self._lock:
+            if engine is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(engine, None)
+
+    def _cached(self, engine: Engine, database: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(engine, {}).get(database)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        return entry
+
+    def _probe_lock(self, engine: Engine, database: str) -> threading.Lock:
+        with self._lock:
+            return self._probe_locks.setdefault((id(engine), database), threading.Lock())
+
+    def _probe(self, engine: Engine, database: str) -> Optional[SchemaCapabilities]:
+        if not _DATABASE_NAME.match(database):
+            logger.warning("Refusing to probe schema of unexpected database name", extra={"database": database})
+            return None
+        query = text(
+            f"""
+            SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME
+            FROM [{database}].INFORMATION_SCHEMA.COLUMNS
+            """
+        )
+        try:
+            with engine.connect() as connection:
+                rows = connection.execute(query).all()
+        except SQLAlchemyError as exc:
+            logger.warning(
+                "Schema capability probe failed; repositories fall back to error-driven detection",
+                extra={"database": database, "error": str(exc)},
+            )
+            return None
+
+        columns: dict[tuple[str, str], set[str]] = {}
+        for table_schema, table_name, column_name in rows:
+            key = (str(table_schema).lower(), str(table_name).lower())
+            columns.setdefault(key, set()).add(str(column_name).lower())
+        return SchemaCapabilities(
+            database=database,
+            columns_by_table={key: frozenset(names) for key, names in columns.items()},
+            probed_at=time.monotonic(),
+        )
+
+
+schema_capabilities = SchemaCapabilityCache()
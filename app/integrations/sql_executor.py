@@ -0,0 +1,188 @@
+"""
+Dedicated, bounded thread pools for the synchronous SQL repositories.
+
+Every repository in this package talks to MSSQL through blocking pyodbc calls. Running
+them with ``asyncio.to_thread`` puts them on the loop's default executor, where they
+compete with SMB, OCR and PDF work. Each database instead gets its own executor sized
+to its connection pool, with a bounded admission queue (callers wait instead of
+piling up threads) and counters exposed on ``/metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CEDULE_DB = "cedule"
+BC_SQL_DB = "bc_sql"
+TOOL_PREDICTION_DB = "tool_prediction"
+WINDCHILL_DB = "windchill"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class SqlExecutor:
+    """Thread pool for one database with bounded admission and queue-depth counters."""
+
+    def __init__(self, name: str, *, max_workers: int, max_pending: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"sql-{name}")
+        # asyncio primitives bind to one loop; keep one admission semaphore per loop.
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._queued = 0
+        self._running = 0
+        self._peak_queued = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._queue_wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run `fn(*args, **kwargs)` on this database's pool, waiting while it is saturated."""
+        loop = asyncio.get_running_loop()
+        slots = self._slots_for(loop)
+        with self._lock:
+            self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        try:
+            with self._lock:
+                self._submitted += 1
+                self._queued += 1
+                self._peak_queued = max(self._peak_queued, self._queued)
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, self._invoke, time.perf_counter(), fn, args, kwargs)
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._queued,
+                "waiting_for_admission": self._waiting,
+                "peak_queued": self._peak_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_queue_wait_ms": round(self._queue_wait_seconds * 1000 / started, 3) if started else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _slots_for(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+            self._slots[loop] = slots
+        return slots
+
+    def _invoke(self, submitted_at: float, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any]) -> T:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._queue_wait_seconds += time.perf_counter() - submitted_at
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+
+_executors: Dict[str, SqlExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_sql_executor(database: str) -> SqlExecutor:
+    """Return the shared executor for `database`, creating it on first use."""
+    with _executors_lock:
+        executor = _executors.get(database)
+        if executor is None:
+            executor = SqlExecutor(
+                database,
+                max_workers=settings.sql_executor_max_workers,
+                max_pending=settings.sql_executor_max_pending,
+            )
+            _executors[database] = executor
+        return executor
+
+
+async def run_sql(database: str, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Shorthand for ``get_sql_executor(database).run(fn, *args, **kwargs)``."""
+    return await get_sql_executor(database).run(fn, *args, **kwargs)
+
+
+def sql_executor_metrics() -> Dict[str, Dict[str, Any]]:
+    with _executors_lock:
+        executors = dict(_executors)
+    return {name: executor.metrics() for name, executor in sorted(executors.items())}
+
+
+def shutdown_sql_executors() -> None:
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+
+class AsyncRepository(Generic[R]):
+    """
+    Awaitable view of a synchronous repository or service.
+
+    Public methods are returned as coroutine functions that run on the database's
+    executor, so routes can ``await`` them or ``asyncio.gather`` several independent
+    reads. Coroutine methods and plain attributes pass through unchanged; the wrapped
+    object stays available as ``sync``.
+    """
+
+    def __init__(self, target: R, database: str, *, executor: Optional[SqlExecutor] = None) -> None:
+        self._target = target
+        self._executor = executor or get_sql_executor(database)
+
+    @property
+    def sync(self) -> R:
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name.startswith("_") or not callable(attribute) or inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def _call(*args: Any, **kwargs: Any) -> Any:
+            return await self._executor.run(attribute, *args, **kwargs)
+
+        return _call
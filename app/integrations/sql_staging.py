@@ -0,0 +1,88 @@
+"""
+Session temp-table staging for bulk loads and key joins on SQL Server.
+
+Repositories that need to ship many rows (snapshot loads, MERGE sources, key lists to
+join against) stage them in a ``#temp`` table with one pyodbc ``fast_executemany``
+round trip instead of one statement per row or per parameter chunk. Other drivers
+get ``None`` from `fast_executemany_dbapi` and keep their portable path.
+"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from typing import Any, Collection, Iterator, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def fast_executemany_dbapi(engine: Optional[Engine]) -> Optional[Any]:
+    """Return the pyodbc DBAPI module when `engine` can use fast_executemany."""
+    if engine is None:
+        return None
+    dialect = engine.dialect
+    if dialect.name != "mssql" or getattr(dialect, "driver", "") != "pyodbc":
+        return None
+    return getattr(dialect, "loaded_dbapi", None) or getattr(dialect, "dbapi", None)
+
+
+def _drop_sql(table: str) -> str:
+    return f"IF OBJECT_ID('tempdb..{table}') IS NOT NULL DROP TABLE {table}"
+
+
+@contextmanager
+def staging_table(engine: Engine, table: str, create_sql: str) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield ``(raw_connection, cursor)`` with the session temp table `table` created.
+
+    `create_sql` creates `table` (a leftover from a pooled connection is dropped first).
+    The work inside the block is rolled back on error; the table is dropped and the
+    connection returned to the pool either way.
+    """
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        cursor.execute(f"{_drop_sql(table)};\n{create_sql}")
+        raw_conn.commit()
+        try:
+            yield raw_conn, cursor
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            try:
+                raw_conn.cursor().execute(_drop_sql(table))
+                raw_conn.commit()
+            except Exception:
+                logger.debug("Failed to drop staging table %s", table, exc_info=True)
+    finally:
+        raw_conn.close()
+
+
+def stage_rows(
+    cursor: Any,
+    dbapi: Any,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    *,
+    wide_columns: Collection[str] = (),
+) -> None:
+    """
+    Insert `rows` (tuples ordered like `columns`) into `table` in one round trip.
+
+    `wide_columns` are bound as NVARCHAR(MAX) so fast_executemany does not size a
+    fixed buffer from the first row's value and truncate longer ones.
+    """
+    if not rows:
+        return
+    cursor.fast_executemany = True
+    if wide_columns:
+        wide_text = (getattr(dbapi, "SQL_WVARCHAR", -9), 0, 0)
+        cursor.setinputsizes([wide_text if column in wide_columns else None for column in columns])
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        list(rows),
+    )
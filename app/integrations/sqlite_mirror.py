@@ -0,0 +1,130 @@
+"""Shared plumbing for the local SQLite mirrors of Business Central, Dataverse and Cedule data."""
+
+from __future__ import annotations
+
+import logging
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteMirrorStore(ABC):
+    """
+    Base for SQLite stores kept in sync with a remote system.
+
+    Provides the connection setup, a key/value state table for watermarks and refresh
+    timestamps, the "is a full refresh due" check, and the keep-set delete that full
+    refreshes use to drop rows that disappeared upstream. Subclasses create their own
+    tables in `_init_schema` and call `_create_state_table` there.
+    """
+
+    _label = "SQLite mirror"
+    _state_table = "mirror_state"
+
+    def __init__(self, db_path: Optional[str]) -> None:
+        self._db_path = db_path
+        self._enabled = True
+        if not self._db_path:
+            self._enabled = False
+            return
+        try:
+            os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+            self._init_schema()
+        except (OSError, sqlite3.OperationalError) as exc:
+            logger.warning("Failed to initialize %s storage: %s", self._label, exc)
+            self._enabled = False
+
+    @property
+    def is_configured(self) -> bool:
+        return self._enabled
+
+    @abstractmethod
+    def _init_schema(self) -> None:
+        """Create the mirror's tables, including the state table."""
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            try:
+                conn.execute("PRAGMA journal_mode=DELETE")
+            except sqlite3.OperationalError:
+                pass
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_state_table(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self._state_table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """
+        )
+
+    def _all_state(self, conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute(f"SELECT key, value FROM {self._state_table}").fetchall())
+
+    def _get_state(self, key: str) -> Optional[str]:
+        if not self._enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT value FROM {self._state_table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                f"""
+                INSERT INTO {self._state_table} (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (key, value),
+            )
+            conn.commit()
+
+    def _seconds_since_state(self, key: str) -> Optional[float]:
+        """Age of an ISO timestamp stored under `key`, or None when missing or unreadable."""
+        raw = self._get_state(key)
+        if not raw:
+            return None
+        try:
+            stamped_at = datetime.fromisoformat(raw)
+        except ValueError:
+            return None
+        return (datetime.now(timezone.utc) - stamped_at).total_seconds()
+
+    def _full_refresh_due(self, interval_hours: float) -> bool:
+        age = self._seconds_since_state("last_full_refresh_at")
+        return age is None or age / 3600 >= interval_hours
+
+    @staticmethod
+    def _delete_missing(
+        conn: sqlite3.Connection,
+        table: str,
+        key_column: str,
+        keep: Iterable[str],
+        *,
+        scope: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Delete `table` rows whose `key_column` is not in `keep`, within the `scope` columns."""
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS mirror_keep (id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM mirror_keep")
+        conn.executemany(
+            "INSERT OR IGNORE INTO mirror_keep (id) VALUES (?)", [(value,) for value in keep]
+        )
+        clauses = [f"{key_column} NOT IN (SELECT id FROM mirror_keep)"]
+        params = []
+        for column, value in (scope or {}).items():
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        cursor = conn.execute(f"DELETE FROM {table} WHERE {' AND '.join(clauses)}", params)
+        return int(cursor.rowcount or 0)
@@ -12,9 +12,12 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app.errors import DatabaseError
 from app.integrations.cedule_repository import get_cedule_engine
+from app.integrations.schema_capabilities import schema_capabilities
 
 logger = logging.getLogger(__name__)
 
+TOOL_INSTANCE_HISTORY_TABLE = "[Cedule].[dbo].[ToolInstanceHistory]"
+
 
 class ToolPredictionFeatureRepository:
     """Queries Cedule ToolingTasks/ToolInstanceHistory for model features."""
@@ -96,6 +99,7 @@ class ToolPredictionFeatureRepository:
             query_fallback,
             params={},
             error_message="Unable to query tool prediction inventory metrics",
+            primary_requires=(TOOL_INSTANCE_HISTORY_TABLE, "SnapshotTimestamp"),
         )
 
         features: dict[str, dict[str, float | int]] = {}
@@ -255,6 +259,7 @@ class ToolPredictionFeatureRepository:
                 "t0": t0,
             },
             error_message="Unable to query tool prediction wear metrics",
+            primary_requires=(TOOL_INSTANCE_HISTORY_TABLE, "SnapshotDate"),
         )
 
         features: dict[str, dict[str, float]] = {}
@@ -275,23 +280,41 @@ class ToolPredictionFeatureRepository:
         *,
         params: dict[str, Any],
         error_message: str,
+        primary_requires: Optional[tuple[str, str]] = None,
     ) -> list[dict[str, Any]]:
+        """
+        Run `primary_query`, or `fallback_query` when it fails.
+
+        `primary_requires` names the (table, column) the primary variant depends on; when
+        the cached schema shows it missing, the fallback runs directly.
+        """
         if not self._engine:
             return []
 
+        if primary_requires is not None:
+            table, column = primary_requires
+            if schema_capabilities.has_column(self._engine, table, column) is False:
+                return self._run_query(fallback_query, params=params, error_message=error_message)
+
         try:
             with self._engine.connect() as connection:
                 rows = connection.execute(primary_query, params).mappings().all()
                 return [dict(row) for row in rows]
         except SQLAlchemyError as primary_exc:
             logger.debug("Primary tool-prediction feature query failed, trying fallback", exc_info=primary_exc)
-            try:
-                with self._engine.connect() as connection:
-                    rows = connection.execute(fallback_query, params).mappings().all()
-                    return [dict(row) for row in rows]
-            except SQLAlchemyError as exc:
-                logger.error(error_message, exc_info=exc)
-                raise DatabaseError(error_message) from exc
+            if primary_requires is not None and "invalid column name" in str(primary_exc).lower():
+                # The schema changed under the cached probe.
+                schema_capabilities.invalidate(self._engine)
+            return self._run_query(fallback_query, params=params, error_message=error_message)
+
+    def _run_query(self, query: Any, *, params: dict[str, Any], error_message: str) -> list[dict[str, Any]]:
+        try:
+            with self._engine.connect() as connection:
+                rows = connection.execute(query, params).mappings().all()
+                return [dict(row) for row in rows]
+        except SQLAlchemyError as exc:
+            logger.error(error_message, exc_info=exc)
+            raise DatabaseError(error_message) from exc
 
 
 def _clean_tool_id(value: Any) -> Optional[str]:
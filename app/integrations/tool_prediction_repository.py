@@ -15,12 +15,47 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.pool import QueuePool
 
 from app.errors import DatabaseError
+from app.integrations.sql_staging import fast_executemany_dbapi, stage_rows, staging_table
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
 TOOL_PREDICTION_TABLE = "[dbo].[90_USINAGE_ToolPrediction_DailySnapshot]"
+_STAGE_TABLE = "#tool_prediction_stage"
+
+# Persisted columns, in staging/insert order; updated_at is set by the server.
+_SNAPSHOT_COLUMNS = (
+    "snapshot_date",
+    "generated_at",
+    "work_center_no",
+    "machine_center",
+    "tool_id",
+    "total_required_use_time_seconds",
+    "rows_count",
+    "program_count",
+    "total_remaining_life",
+    "inventory_instances",
+    "available_instances",
+    "sister_count_total",
+    "sister_count_available",
+    "sister_count_machine",
+    "time_since_last_use_hours",
+    "uses_last_24h",
+    "uses_last_7d",
+    "wear_rate_24h",
+    "wear_rate_7d",
+    "tool_usage_minutes_90d",
+    "future_usage_minutes_24h",
+    "future_usage_minutes_48h",
+    "future_usage_minutes_7d",
+    "shortage_probability",
+    "shortage_label",
+    "prediction_payload_json",
+    "predictor_response_json",
+)
+_MERGE_KEY_COLUMNS = {"snapshot_date", "machine_center", "tool_id"}
+_JSON_COLUMNS = {"prediction_payload_json", "predictor_response_json"}
 
 
 def _build_tool_prediction_url() -> Optional[str]:
@@ -92,81 +127,17 @@ class ToolPredictionSnapshotRepository:
         generated_at: datetime,
         rows: list[dict[str, Any]],
     ) -> int:
+        """
+        Replace the snapshot of one machine center for `snapshot_date`.
+
+        On SQL Server (pyodbc) rows are shipped to a session staging table in one
+        ``fast_executemany`` round trip and merged set-based: changed tools are updated,
+        new ones inserted and tools no longer predicted deleted. Other drivers delete and
+        re-insert.
+        """
         if not self._engine:
             return 0
 
-        delete_query = text(
-            f"""
-            DELETE FROM {TOOL_PREDICTION_TABLE}
-            WHERE snapshot_date = :snapshot_date
-              AND machine_center = :machine_center
-            """
-        )
-        insert_query = text(
-            f"""
-            INSERT INTO {TOOL_PREDICTION_TABLE} (
-                snapshot_date,
-                generated_at,
-                work_center_no,
-                machine_center,
-                tool_id,
-                total_required_use_time_seconds,
-                rows_count,
-                program_count,
-                total_remaining_life,
-                inventory_instances,
-                available_instances,
-                sister_count_total,
-                sister_count_available,
-                sister_count_machine,
-                time_since_last_use_hours,
-                uses_last_24h,
-                uses_last_7d,
-                wear_rate_24h,
-                wear_rate_7d,
-                tool_usage_minutes_90d,
-                future_usage_minutes_24h,
-                future_usage_minutes_48h,
-                future_usage_minutes_7d,
-                shortage_probability,
-                shortage_label,
-                prediction_payload_json,
-                predictor_response_json,
-                updated_at
-            )
-            VALUES (
-                :snapshot_date,
-                :generated_at,
-                :work_center_no,
-                :machine_center,
-                :tool_id,
-                :total_required_use_time_seconds,
-                :rows_count,
-                :program_count,
-                :total_remaining_life,
-                :inventory_instances,
-                :available_instances,
-                :sister_count_total,
-                :sister_count_available,
-                :sister_count_machine,
-                :time_since_last_use_hours,
-                :uses_last_24h,
-                :uses_last_7d,
-                :wear_rate_24h,
-                :wear_rate_7d,
-                :tool_usage_minutes_90d,
-                :future_usage_minutes_24h,
-                :future_usage_minutes_48h,
-                :future_usage_minutes_7d,
-                :shortage_probability,
-                :shortage_label,
-                :prediction_payload_json,
-                :predictor_response_json,
-                SYSUTCDATETIME()
-            )
-            """
-        )
-
         serializable_rows: list[dict[str, Any]] = []
         for row in rows:
             payload_json = row.get("prediction_payload_json")
@@ -183,18 +154,22 @@ class ToolPredictionSnapshotRepository:
                 }
             )
 
+        dbapi = fast_executemany_dbapi(self._engine)
         try:
-            with self._engine.begin() as connection:
-                connection.execute(
-                    delete_query,
-                    {
-                        "snapshot_date": snapshot_date,
-                        "machine_center": machine_center,
-                    },
+            if dbapi is None:
+                self._replace_snapshot_rows(
+                    snapshot_date=snapshot_date,
+                    machine_center=machine_center,
+                    rows=serializable_rows,
                 )
-                if serializable_rows:
-                    connection.execute(insert_query, serializable_rows)
-        except SQLAlchemyError as exc:
+            else:
+                self._merge_snapshot_rows(
+                    dbapi,
+                    snapshot_date=snapshot_date,
+                    machine_center=machine_center,
+                    rows=serializable_rows,
+                )
+        except (SQLAlchemyError, getattr(dbapi, "Error", SQLAlchemyError)) as exc:
             logger.error(
                 "Failed to upsert tool prediction snapshot rows",
                 exc_info=exc,
@@ -208,6 +183,81 @@ class ToolPredictionSnapshotRepository:
 
         return len(serializable_rows)
 
+    def _replace_snapshot_rows(
+        self,
+        *,
+        snapshot_date: str,
+        machine_center: str,
+        rows: list[dict[str, Any]],
+    ) -> None:
+        delete_query = text(
+            f"""
+            DELETE FROM {TOOL_PREDICTION_TABLE}
+            WHERE snapshot_date = :snapshot_date
+              AND machine_center = :machine_center
+            """
+        )
+        insert_query = text(
+            f"""
+            INSERT INTO {TOOL_PREDICTION_TABLE} ({", ".join(_SNAPSHOT_COLUMNS)}, updated_at)
+            VALUES ({", ".join(f":{column}" for column in _SNAPSHOT_COLUMNS)}, SYSUTCDATETIME())
+            """
+        )
+        with self._engine.begin() as connection:
+            connection.execute(
+                delete_query,
+                {
+                    "snapshot_date": snapshot_date,
+                    "machine_center": machine_center,
+                },
+            )
+            if rows:
+                connection.execute(insert_query, rows)
+
+    def _merge_snapshot_rows(
+        self,
+        dbapi: Any,
+        *,
+        snapshot_date: str,
+        machine_center: str,
+        rows: list[dict[str, Any]],
+    ) -> None:
+        create_stage = (
+            f"SELECT TOP 0 {', '.join(_SNAPSHOT_COLUMNS)} INTO {_STAGE_TABLE} FROM {TOOL_PREDICTION_TABLE}"
+        )
+        with staging_table(self._engine, _STAGE_TABLE, create_stage) as (raw_conn, cursor):
+            stage_rows(
+                cursor,
+                dbapi,
+                _STAGE_TABLE,
+                _SNAPSHOT_COLUMNS,
+                [tuple(row.get(column) for column in _SNAPSHOT_COLUMNS) for row in rows],
+                wide_columns=_JSON_COLUMNS,
+            )
+            updatable = [column for column in _SNAPSHOT_COLUMNS if column not in _MERGE_KEY_COLUMNS]
+            cursor.execute(
+                f"""
+                WITH target AS (
+                    SELECT *
+                    FROM {TOOL_PREDICTION_TABLE}
+                    WHERE snapshot_date = ? AND machine_center = ?
+                )
+                MERGE target AS t
+                USING {_STAGE_TABLE} AS s
+                    ON t.tool_id = s.tool_id
+                WHEN MATCHED THEN
+                    UPDATE SET {", ".join(f"{column} = s.{column}" for column in updatable)},
+                        updated_at = SYSUTCDATETIME()
+                WHEN NOT MATCHED BY TARGET THEN
+                    INSERT ({", ".join(_SNAPSHOT_COLUMNS)}, updated_at)
+                    VALUES ({", ".join(f"s.{column}" for column in _SNAPSHOT_COLUMNS)}, SYSUTCDATETIME())
+                WHEN NOT MATCHED BY SOURCE THEN
+                    DELETE;
+                """,
+                (snapshot_date, machine_center),
+            )
+            raw_conn.commit()
+
     def get_latest_snapshot_date(self, *, machine_center: Optional[str] = None) -> Optional[str]:
         if not self._engine:
             return None
@@ -22,9 +22,17 @@ import uvicorn
 
 from app.settings import settings
 from app.db import verify_database_connection, dispose_engine
+from app.integrations.sql_executor import shutdown_sql_executors
+from app.domain.edi.sftp_outbox import edi_outbox
+from app.domain.documents.pdf_rendering import pdf_renderer
 from app.errors import register_exception_handlers
 from app.routers import health, purchasing
-from app.audit import cleanup_expired_idempotency_keys, cleanup_old_audit_logs
+from app.audit import (
+    audit_writer,
+    cleanup_expired_idempotency_keys,
+    cleanup_old_audit_logs,
+    replay_audit_dead_letters,
+)
 from app.domain.kpi.planner_daily_report_jobs import refresh_planner_kpi_cache
 from app.domain.kpi.jobs_snapshot_jobs import refresh_jobs_snapshot
 from app.domain.kpi.sales_stats_jobs import refresh_sales_stats_snapshot
@@ -34,6 +42,11 @@ from app.domain.finance.ar_jobs import refresh_ar_payment_stats
 from app.domain.finance.ar_cache_jobs import refresh_ar_open_invoices_cache
 from app.domain.finance.cashflow_jobs import refresh_cashflow_projection_default_window
 from app.domain.erp.production_costing_snapshot_jobs import refresh_production_costing_snapshot
+from app.domain.erp.posted_invoice_tracking_index import sync_posted_invoice_tracking_index
+from app.domain.erp.customer_directory import refresh_customer_directory
+from app.domain.crm.mirror import refresh_crm_mirror
+from app.domain.search.index import refresh_search_index
+from app.domain.service.service_catalog_service import refresh_service_catalog
 from app.domain.tooling.future_needs_jobs import refresh_tooling_future_needs_cache
 from app.domain.tooling.usage_history_jobs import refresh_tooling_usage_history_cache
 from app.db import get_db_session
@@ -161,6 +174,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
             name="Cleanup old audit logs"
         )
 
+        scheduler.add_job(
+            replay_audit_dead_letters,
+            "interval",
+            minutes=settings.audit_dead_letter_replay_minutes,
+            id="audit_dead_letter_replay",
+            name="Replay dead-lettered audit rows",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=dt.datetime.now(),
+        )
+
         scheduler.add_job(
             refresh_planner_kpi_cache,
             "cron",
@@ -222,6 +247,65 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
             replace_existing=True,
         )
 
+        scheduler.add_job(
+            sync_posted_invoice_tracking_index,
+            "interval",
+            minutes=settings.bc_tracking_index_sync_minutes,
+            id="bc_tracking_index_sync",
+            name="Sync posted invoice tracking index",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=dt.datetime.now(),
+        )
+
+        scheduler.add_job(
+            refresh_customer_directory,
+            "interval",
+            minutes=settings.bc_customer_directory_refresh_minutes,
+            id="bc_customer_directory_refresh",
+            name="Refresh customer directory",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=dt.datetime.now(),
+        )
+
+        scheduler.add_job(
+            refresh_crm_mirror,
+            "interval",
+            minutes=settings.crm_mirror_refresh_minutes,
+            id="crm_mirror_refresh",
+            name="Refresh CRM mirror",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=dt.datetime.now(),
+        )
+
+        scheduler.add_job(
+            refresh_search_index,
+            "interval",
+            minutes=settings.search_index_refresh_minutes,
+            id="search_index_refresh",
+            name="Refresh typeahead search index",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
+        scheduler.add_job(
+            refresh_service_catalog,
+            "interval",
+            minutes=settings.service_catalog_refresh_minutes,
+            id="service_catalog_refresh",
+            name="Refresh Service catalog",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=dt.datetime.now(),
+        )
+
         scheduler.add_job(
             refresh_cashflow_projection_default_window,
             "cron",
@@ -308,6 +392,19 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
         geocode_warmup_task = asyncio.create_task(customer_geocode_cache.warm_from_bc())
     else:
         logger.warning("GOOGLE_API_KEY not configured; geocode cache warm-up skipped")
+
+    shop_floor_poller = None
+    shop_floor_start_task = None
+    if settings.fastems1_autopilot_enabled and settings.fastems1_shop_floor_poll_enabled:
+        try:
+            from app.api.v1.usinage.fastems1.autopilot.router import get_shop_floor_poller
+
+            shop_floor_poller = get_shop_floor_poller()
+            # Warm-up talks to Fastems and Cedule; run it off the startup path.
+            shop_floor_start_task = asyncio.create_task(shop_floor_poller.start())
+        except Exception as e:
+            logger.warning(f"Failed to start Fastems1 shop-floor poller: {e}")
+            shop_floor_poller = None
     
     logger.info(f"{settings.app_name} startup complete")
     
@@ -324,8 +421,19 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
     if geocode_warmup_task and not geocode_warmup_task.done():
         geocode_warmup_task.cancel()
+
+    if shop_floor_start_task is not None and not shop_floor_start_task.done():
+        shop_floor_start_task.cancel()
+        await asyncio.gather(shop_floor_start_task, return_exceptions=True)
+    if shop_floor_poller is not None:
+        await shop_floor_poller.stop()
     
+    await asyncio.to_thread(edi_outbox.shutdown)
+    await asyncio.to_thread(audit_writer.shutdown)
+    pdf_renderer.shutdown()
+
     # Dispose database connections
+    shutdown_sql_executors()
     dispose_engine()
     logger.info("Database connections closed")
     
@@ -6,7 +6,7 @@ Using protocols ensures that the domain layer depends on abstractions
 rather than concrete implementations, and helps mypy catch missing methods.
 """
 
-from typing import Protocol, Dict, Any, List, Optional, Type
+from typing import Protocol, Dict, Any, List, Optional, Sequence, Type
 from datetime import date, datetime
 from decimal import Decimal
 from pydantic import BaseModel
@@ -76,6 +76,27 @@ class ERPClientProtocol(Protocol):
         """
         ...
     
+    async def get_polines_for_documents(self, po_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Retrieve the raw lines (with ETags) of several purchase orders in bulk.
+        
+        Args:
+            po_ids: Purchase Order IDs
+            
+        Returns:
+            Raw PO line records
+        """
+        ...
+    
+    async def patch_poline(self, system_id: str, updates: Dict[str, Any], etag: str) -> Dict[str, Any]:
+        """
+        Patch a PO line, failing with a conflict when its ETag changed.
+        
+        Returns:
+            Updated raw PO line record (empty if the ERP returned no body)
+        """
+        ...
+    
     async def create_receipt(self, po_id: str, lines: List[Dict[str, Any]], receipt_date: date) -> Dict[str, Any]:
         """
         Create a goods receipt in ERP.
@@ -18,6 +18,13 @@ logger = logging.getLogger(__name__)
 from app.deps import get_db
 from app.settings import settings
 from app.db import verify_database_connection
+from app.integrations.sql_executor import sql_executor_metrics
+from app.domain.edi.sftp_outbox import edi_outbox
+from app.audit import audit_writer, idempotency_cache
+from app.api.v1.communications.conversations import conversation_service
+from app.domain.documents.pdf_rendering import pdf_renderer
+from app.domain.documents.technical_sheet_templates import compiled_template_cache
+from app.domain.service.service_catalog_service import service_catalog_cache
 from app.adapters.ocr_client import OCRClient
 from app.adapters.ai_client import AIClient
 
@@ -253,6 +260,24 @@ async def _do_get_metrics(db: Session) -> Dict[str, Any]:
             logger.warning(f"Failed to get database metrics: {e}")
         metrics["database"] = {"error": str(e)}
     
+    # Dedicated SQL executor queue depths (one pool per database)
+    metrics["sql_executors"] = sql_executor_metrics()
+
+    # EDI SFTP outbox (kept-alive session, batch counters)
+    metrics["edi_outbox"] = edi_outbox.metrics()
+
+    # Buffered audit/idempotency writes and idempotency LRU
+    metrics["audit_write_behind"] = audit_writer.metrics()
+    metrics["idempotency_cache"] = idempotency_cache.metrics()
+
+    # Assembled Front conversations served from memory
+    metrics["conversation_cache"] = conversation_service.cache.metrics()
+
+    # PDF render pool and rendered-page cache
+    metrics["pdf_rendering"] = pdf_renderer.metrics()
+    metrics["technical_sheet_templates"] = compiled_template_cache.metrics()
+    metrics["service_catalog"] = service_catalog_cache.metrics()
+
     # Add idempotency metrics
     try:
         result = db.execute(
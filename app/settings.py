@@ -101,6 +101,12 @@ class Settings(BaseSettings):
         default="ODBC Driver 18 for SQL Server",
         description="ODBC driver to use for Cedule SQL connections"
     )
+    schema_capability_cache_ttl_seconds: int = Field(
+        default=900,
+        ge=0,
+        le=86400,
+        description="Seconds a probed INFORMATION_SCHEMA table/column listing is reused by repositories with query variants",
+    )
 
     # Business Central SQL Server (for Continia CDC tables)
     bc_sql_server: Optional[str] = Field(
@@ -123,6 +129,12 @@ class Settings(BaseSettings):
         default="ODBC Driver 18 for SQL Server",
         description="ODBC driver to use for Business Central SQL connections",
     )
+    continia_values_fetch_size: int = Field(
+        default=2000,
+        ge=1,
+        le=100000,
+        description="Rows fetched per round trip when streaming Continia CDC document values",
+    )
 
     # Windchill SQL Server (for KPI queries)
     windchill_db_dsn: Optional[str] = Field(
@@ -284,6 +296,25 @@ class Settings(BaseSettings):
         description="Optional fixed Front channel ID for receivables outbound email",
     )
 
+    front_conversation_cache_ttl_seconds: int = Field(
+        default=30,
+        ge=0,
+        le=3600,
+        description="Seconds an assembled Front conversation is served from memory (0 disables the cache)",
+    )
+
+    front_conversation_cache_max_entries: int = Field(
+        default=500,
+        ge=1,
+        le=10000,
+        description="Maximum number of assembled Front conversations kept in memory",
+    )
+
+    front_webhook_secret: Optional[str] = Field(
+        default=None,
+        description="Front webhook signing secret; when set, webhook signatures are verified",
+    )
+
     toolkit_base_url: str = Field(
         default="https://api.gilbert-tech.com:7778",
         description="Base URL for Gilbert Tech internal toolkit services"
@@ -333,6 +364,12 @@ class Settings(BaseSettings):
         default=445,
         description="TCP port for SMB (usually 445)"
     )
+    technical_sheet_template_cache_size: int = Field(
+        default=64,
+        ge=1,
+        le=10000,
+        description="Compiled technical sheet templates (fields, options, fill writer) kept in memory, keyed by content hash"
+    )
 
     # Fastems1 Autopilot configuration
     fastems1_autopilot_enabled: bool = Field(
@@ -381,6 +418,40 @@ class Settings(BaseSettings):
         ge=1,
         description="Optional cap on planned jobs per machine (None = plan everything)"
     )
+    fastems1_shop_floor_poll_enabled: bool = Field(
+        default=True,
+        description="Run the Fastems1 shop-floor poller that feeds Autopilot suggestions (when Autopilot is enabled)",
+    )
+    fastems1_shop_floor_operations_poll_seconds: int = Field(
+        default=30,
+        ge=1,
+        description="Interval between Fastems1 active operation polls",
+    )
+    fastems1_shop_floor_tools_poll_seconds: int = Field(
+        default=60,
+        ge=1,
+        description="Interval between Fastems1 machine tool inventory polls",
+    )
+    fastems1_shop_floor_pallet_routes_poll_seconds: int = Field(
+        default=5,
+        ge=1,
+        description="Interval between Fastems1 pallet route polls",
+    )
+    fastems1_shop_floor_storage_poll_seconds: int = Field(
+        default=60,
+        ge=1,
+        description="Interval between Fastems1 material storage polls",
+    )
+    fastems1_shop_floor_fixtures_poll_seconds: int = Field(
+        default=300,
+        ge=1,
+        description="Interval between fixture matrix and NC program tool reloads",
+    )
+    fastems1_shop_floor_max_staleness_seconds: int = Field(
+        default=600,
+        ge=1,
+        description="Oldest shop-floor source age Autopilot suggestions accept before calling providers live",
+    )
     tooling_future_needs_cache_db_path: str = Field(
         default="/app/data/tooling_future_needs_cache.sqlite",
         description="SQLite path for persisted tooling future-needs daily cache",
@@ -435,6 +506,18 @@ class Settings(BaseSettings):
             "Comma-separated work_center_no:machine_center pairs used for daily tool shortage predictions"
         ),
     )
+    tool_prediction_api_batch_size: int = Field(
+        default=500,
+        ge=1,
+        le=10000,
+        description="Max tool rows sent per tool shortage prediction request; larger sets are split and sent concurrently",
+    )
+    tool_prediction_refresh_concurrency: int = Field(
+        default=4,
+        ge=1,
+        le=32,
+        description="Work center/machine center targets refreshed concurrently by the daily tool prediction snapshot",
+    )
 
     openai_api_key: Optional[str] = Field(
         default=None,
@@ -515,6 +598,46 @@ class Settings(BaseSettings):
         ge=1,
         description="Max seconds to wait for ShipToAddress lookups per customer"
     )
+    bc_odata_stream_page_size: int = Field(
+        default=1000,
+        ge=1,
+        le=20000,
+        description="Records per OData page (odata.maxpagesize) when streaming Business Central list exports",
+    )
+    bc_tracking_index_db_path: str = Field(
+        default="/app/data/bc_tracking_index.sqlite",
+        description="SQLite path for the package tracking number -> posted sales invoice index",
+    )
+    bc_tracking_index_sync_minutes: int = Field(
+        default=15,
+        ge=1,
+        le=1440,
+        description="Minutes between incremental syncs of the posted-invoice tracking index",
+    )
+    bc_tracking_index_max_staleness_seconds: int = Field(
+        default=1800,
+        ge=0,
+        description=(
+            "Batch tracking lookups start a background index sync when its last sync is older than this "
+            "(the scheduled sync normally keeps it fresher)"
+        ),
+    )
+    bc_customer_directory_db_path: str = Field(
+        default="/app/data/bc_customer_directory.sqlite",
+        description="SQLite path for the materialized customer directory (customer + division + ship-to + geocode)",
+    )
+    bc_customer_directory_refresh_minutes: int = Field(
+        default=30,
+        ge=1,
+        le=1440,
+        description="Minutes between incremental refreshes of the customer directory",
+    )
+    bc_customer_directory_full_refresh_hours: int = Field(
+        default=24,
+        ge=1,
+        le=720,
+        description="Hours between full customer directory rebuilds, which drop deleted customers and ship-tos",
+    )
 
     google_geocode_persist_enabled: bool = Field(
         default=True,
@@ -561,6 +684,19 @@ class Settings(BaseSettings):
         default=30,
         description="Days to keep daily cashflow projection cache entries",
     )
+    cashflow_open_month_partition_ttl_seconds: int = Field(
+        default=900,
+        ge=0,
+        description="Seconds cached ERP rows of the current/future months are reused before refetching",
+    )
+    cashflow_closed_month_partition_ttl_hours: int = Field(
+        default=24,
+        ge=0,
+        description=(
+            "Hours cached ERP rows of closed months are pinned before refetching "
+            "(posted documents still change as they are paid)"
+        ),
+    )
     cashflow_refresh_hour: int = Field(
         default=5,
         ge=0,
@@ -654,6 +790,70 @@ class Settings(BaseSettings):
         default=None,
         description="Dynamics organization ID",
     )
+    crm_mirror_db_path: str = Field(
+        default="/app/data/crm_mirror.sqlite",
+        description="SQLite path for the local CRM opportunity/account/contact mirror",
+    )
+    crm_mirror_refresh_minutes: int = Field(
+        default=15,
+        ge=1,
+        le=1440,
+        description="Minutes between incremental (modifiedon watermark) refreshes of the CRM mirror",
+    )
+    crm_mirror_full_refresh_hours: int = Field(
+        default=24,
+        ge=1,
+        le=720,
+        description="Hours between full CRM mirror refreshes, which drop records deleted in Dynamics",
+    )
+    crm_mirror_max_staleness_minutes: int = Field(
+        default=60,
+        ge=1,
+        le=10080,
+        description="CRM endpoints fall back to the live Web API when the mirror's last refresh is older than this",
+    )
+
+    search_index_db_path: str = Field(
+        default="/app/data/search_index.sqlite",
+        description="SQLite path for the typeahead trigram index (items, customers, vendors, CRM accounts)",
+    )
+    search_index_refresh_minutes: int = Field(
+        default=10,
+        ge=1,
+        le=1440,
+        description="Minutes between incremental refreshes of the typeahead search index",
+    )
+    search_index_full_refresh_hours: int = Field(
+        default=24,
+        ge=1,
+        le=720,
+        description="Hours between full search index rebuilds, which drop deleted entities",
+    )
+
+    service_catalog_ttl_seconds: int = Field(
+        default=900,
+        ge=0,
+        le=86400,
+        description="Seconds the in-memory Service catalog tree (divisions, equipments, models, field types) is served before reloading",
+    )
+    service_catalog_refresh_minutes: int = Field(
+        default=10,
+        ge=1,
+        le=1440,
+        description="Minutes between scheduled reloads that keep the Service catalog warm",
+    )
+    service_asset_cache_ttl_seconds: int = Field(
+        default=120,
+        ge=0,
+        le=86400,
+        description="Seconds a customer's Service assets are served from memory; creating a service item drops them",
+    )
+    service_asset_cache_max_customers: int = Field(
+        default=500,
+        ge=1,
+        le=100000,
+        description="Customers whose Service assets are kept in memory",
+    )
     
     # ClickUp Configuration
     clickup_api_base_url: str = Field(
@@ -803,6 +1003,42 @@ class Settings(BaseSettings):
         description="Maximum concurrent requests sent to ElekNet"
     )
 
+    # EDI SFTP outbound transmission
+    edi_sftp_batch_size: int = Field(
+        default=25,
+        ge=1,
+        le=500,
+        description="Maximum EDI documents uploaded per SFTP batch"
+    )
+
+    edi_sftp_batch_window_ms: int = Field(
+        default=250,
+        ge=0,
+        le=10000,
+        description="How long the SFTP outbox waits for more documents before uploading a batch"
+    )
+
+    edi_sftp_idle_timeout_seconds: int = Field(
+        default=300,
+        ge=5,
+        le=3600,
+        description="Close the kept-alive SFTP session after this many idle seconds"
+    )
+
+    edi_sftp_keepalive_seconds: int = Field(
+        default=30,
+        ge=0,
+        le=600,
+        description="SSH keepalive interval for the SFTP session (0 disables keepalives)"
+    )
+
+    edi_bulk_send_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="Maximum purchase orders prepared concurrently by the bulk EDI 850 endpoint"
+    )
+
     # Application Configuration
     app_name: str = Field(
         default="LPG Core Platform API",
@@ -887,6 +1123,54 @@ class Settings(BaseSettings):
         ge=1,
         description="Database connection timeout in seconds"
     )
+    sql_executor_max_workers: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="Threads per database in the dedicated SQL executors; keep at or below the engine pool size plus overflow"
+    )
+    sql_executor_max_pending: int = Field(
+        default=64,
+        ge=0,
+        le=10000,
+        description="Calls allowed to queue per SQL executor before further callers wait for admission"
+    )
+    pdf_render_max_workers: int = Field(
+        default=2,
+        ge=1,
+        le=32,
+        description="Worker processes for PDF rasterising and text extraction"
+    )
+    pdf_render_max_concurrent_requests: int = Field(
+        default=4,
+        ge=1,
+        le=256,
+        description="PDF render/extract calls admitted at once; further callers wait"
+    )
+    pdf_render_max_pages: int = Field(
+        default=12,
+        ge=1,
+        le=500,
+        description="Maximum distinct pages rasterised for one request"
+    )
+    pdf_render_max_request_mb: int = Field(
+        default=48,
+        ge=1,
+        le=2048,
+        description="Maximum encoded image output (MB) returned for one render request"
+    )
+    pdf_render_max_page_megapixels: int = Field(
+        default=16,
+        ge=1,
+        le=400,
+        description="Pixel cap per rendered page; zoom is reduced for larger pages"
+    )
+    pdf_render_cache_mb: int = Field(
+        default=64,
+        ge=0,
+        le=4096,
+        description="Memory (MB) for the LRU of rendered pages keyed by content hash, page, zoom and clip"
+    )
     
     request_timeout: int = Field(
         default=60,
@@ -1058,6 +1342,67 @@ class Settings(BaseSettings):
         description="Batch size for Cedule inserts of production costing snapshot rows",
     )
 
+    production_costing_bulk_load_enabled: bool = Field(
+        default=True,
+        description="Load costing snapshot lines through the staging-table bulk loader (fast_executemany + MERGE)",
+    )
+
+    production_costing_bulk_chunk_size: int = Field(
+        default=5000,
+        ge=500,
+        le=100000,
+        description="Rows per staged chunk (and commit) for the costing snapshot bulk loader",
+    )
+
+    production_costing_rate_table_max_age_hours: int = Field(
+        default=36,
+        ge=1,
+        le=720,
+        description="Hours before the in-memory work center rate table is considered stale",
+    )
+
+    bom_explosion_cache_ttl_seconds: int = Field(
+        default=21600,
+        ge=0,
+        le=604800,
+        description="Maximum age in seconds of memoized BOM explosions (0 disables cross-request memoization)",
+    )
+
+    bom_explosion_watermark_check_seconds: int = Field(
+        default=60,
+        ge=0,
+        le=3600,
+        description="Minimum seconds between production costing watermark checks for the BOM explosion cache",
+    )
+
+    bom_explosion_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=50,
+        description="Maximum concurrent Business Central item lookups while exploding a BOM level",
+    )
+
+    tariff_batch_chunk_size: int = Field(
+        default=50,
+        ge=1,
+        le=1000,
+        description="Items exploded and certificate-resolved together per chunk of a batch tariff calculation",
+    )
+
+    tariff_batch_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=50,
+        description="Maximum BOM explosions running concurrently within a batch tariff chunk",
+    )
+
+    po_bulk_update_max_concurrency: int = Field(
+        default=4,
+        ge=1,
+        le=16,
+        description="Maximum concurrent PO line PATCH requests sent to Business Central by a bulk update",
+    )
+
     ar_payment_stats_refresh_day: str = Field(
         default="mon-sun",
         description="Day of week for AR payment stats refresh (cron format)"
@@ -1119,6 +1464,65 @@ class Settings(BaseSettings):
         ge=1,
         description="Number of days to retain audit logs"
     )
+
+    audit_write_behind_enabled: bool = Field(
+        default=True,
+        description="Buffer audit and idempotency inserts and flush them in multi-row batches"
+    )
+
+    audit_queue_max_size: int = Field(
+        default=10000,
+        ge=100,
+        le=1000000,
+        description="Maximum buffered audit/idempotency writes before callers fall back to inline inserts"
+    )
+
+    audit_flush_interval_ms: int = Field(
+        default=500,
+        ge=10,
+        le=60000,
+        description="Maximum time a buffered audit write waits before being flushed"
+    )
+
+    audit_flush_batch_size: int = Field(
+        default=200,
+        ge=1,
+        le=200,
+        description="Rows per multi-row audit INSERT (bounded by the 2100 parameter limit of SQL Server)"
+    )
+
+    audit_flush_max_retries: int = Field(
+        default=3,
+        ge=0,
+        le=10,
+        description="Retries of a failed buffered audit flush before its rows are dead-lettered"
+    )
+
+    audit_flush_retry_backoff_ms: int = Field(
+        default=250,
+        ge=0,
+        le=30000,
+        description="Initial backoff between audit flush retries (doubles on each attempt)"
+    )
+
+    audit_dead_letter_path: str = Field(
+        default="/app/data/audit_dead_letter.jsonl",
+        description="JSONL file holding audit/idempotency rows that could not be flushed, replayed later"
+    )
+
+    audit_dead_letter_replay_minutes: int = Field(
+        default=5,
+        ge=1,
+        le=1440,
+        description="Minutes between replays of the audit dead-letter file"
+    )
+
+    idempotency_cache_size: int = Field(
+        default=4096,
+        ge=0,
+        le=1000000,
+        description="In-memory LRU entries consulted before idempotency lookups hit SQL (0 disables)"
+    )
     
     @field_validator("db_dsn")
     @classmethod
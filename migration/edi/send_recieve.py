@@ -2,7 +2,7 @@ import configparser
 import os
 import platform
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Optional, Set, Tuple
 
 import posixpath
 
@@ -169,20 +169,45 @@ def _connect_sftp(host: str, port: int, username: str, password: str) -> Tuple[p
     return ssh_client, ssh_client.open_sftp()
 
 
-def _ensure_remote_directory(sftp_client: paramiko.SFTPClient, remote_directory: str) -> None:
-    """Create the remote directory tree if it does not already exist."""
+def _ensure_remote_directory(
+    sftp_client: paramiko.SFTPClient,
+    remote_directory: str,
+    known_directories: Optional[Set[str]] = None,
+) -> None:
+    """Create the remote directory tree if it does not already exist.
+
+    When `known_directories` is given, directories already in it are not checked
+    again and every directory confirmed or created is added to it, so a kept-alive
+    session only pays the ``stat`` round trips once per folder.
+    """
 
     if not remote_directory:
         return
+    if known_directories is not None and remote_directory in known_directories:
+        return
 
     parts = [part for part in remote_directory.split("/") if part]
     current = ""
     for part in parts:
         current = f"{current}/{part}" if current else part
+        if known_directories is not None and current in known_directories:
+            continue
         try:
             sftp_client.stat(current)
         except FileNotFoundError:
             sftp_client.mkdir(current)
+        if known_directories is not None:
+            known_directories.add(current)
+    if known_directories is not None:
+        known_directories.add(remote_directory)
+
+
+def _remote_path_for(local_file_path: str, remote_folder_path: Optional[str]) -> str:
+    """Remote destination for `local_file_path` inside `remote_folder_path`."""
+
+    remote_filename = os.path.basename(local_file_path)
+    cleaned_folder = (remote_folder_path or "").strip("/")
+    return posixpath.join(cleaned_folder, remote_filename) if cleaned_folder else remote_filename
 
 
 def send_file(
@@ -222,13 +247,7 @@ def send_file(
                 resolved_password,
             )
 
-            remote_filename = os.path.basename(local_file_path)
-            cleaned_folder = (resolved_remote_folder or "").strip("/")
-            remote_path = (
-                posixpath.join(cleaned_folder, remote_filename)
-                if cleaned_folder
-                else remote_filename
-            )
+            remote_path = _remote_path_for(local_file_path, resolved_remote_folder)
 
             remote_directory = posixpath.dirname(remote_path)
             _ensure_remote_directory(sftp_client, remote_directory)
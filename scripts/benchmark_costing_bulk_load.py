@@ -0,0 +1,166 @@
+"""
+Benchmark: production costing snapshot line writes (row-by-row executes vs bulk loader).
+
+Writes synthetic routing lines into the configured Cedule costing snapshot tables under
+throw-away scans (trigger_source="benchmark") and reports rows/second for:
+
+  - full:  one stream of every line, as a bootstrap scan persists them
+  - delta: many small per-source batches, as a delta scan persists changed headers
+
+Each scan is deleted afterwards (snapshot lines cascade), and benchmark scans are never
+marked successful, so they are invisible to costing reads while the benchmark runs.
+
+Usage:
+  python3 scripts/benchmark_costing_bulk_load.py --sources 2000 --lines-per-source 12
+  python3 scripts/benchmark_costing_bulk_load.py --modes delta --chunk-size 10000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from uuid import UUID
+
+# Allow running as a script from repo root without installing the package.
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.integrations.cedule_production_costing_repository import (  # noqa: E402
+    CeduleProductionCostingRepository,
+)
+
+LEGACY_BATCH_SIZE = 500
+
+
+def _synthetic_rows(scan_id: UUID, sources: int, lines_per_source: int) -> Iterator[list[dict[str, Any]]]:
+    """Yield one list of snapshot rows per synthetic routing."""
+    for source_index in range(sources):
+        source_no = f"BENCH{source_index:06d}-01"
+        rows = []
+        for line_index in range(lines_per_source):
+            line = {
+                "Routing_No": source_no,
+                "Operation_No": str((line_index + 1) * 10),
+                "Type": "Work Center",
+                "No": f"WC-{line_index % 17:02d}",
+                "Setup_Time": 15,
+                "Run_Time": 1.25,
+                "Description": "Benchmark operation " * 4,
+            }
+            rows.append(
+                {
+                    "scan_id": str(scan_id),
+                    "source_type": "routing",
+                    "source_no": source_no,
+                    "source_base_item_no": source_no.split("-", 1)[0],
+                    "header_last_modified_at": None,
+                    "line_key": f"{line['Operation_No']}|{line['Type']}|{line['No']}",
+                    "row_json": json.dumps(line, separators=(",", ":")),
+                }
+            )
+        yield rows
+
+
+def _legacy_full(repo: CeduleProductionCostingRepository, batches: Iterator[list[dict[str, Any]]], _: int) -> int:
+    written = 0
+    pending: list[dict[str, Any]] = []
+    for rows in batches:
+        pending.extend(rows)
+        if len(pending) >= LEGACY_BATCH_SIZE:
+            written += repo.insert_line_snapshots(pending)
+            pending = []
+    if pending:
+        written += repo.insert_line_snapshots(pending)
+    return written
+
+
+def _legacy_delta(repo: CeduleProductionCostingRepository, batches: Iterator[list[dict[str, Any]]], _: int) -> int:
+    return sum(repo.insert_line_snapshots(rows) for rows in batches)
+
+
+def _bulk(repo: CeduleProductionCostingRepository, batches: Iterator[list[dict[str, Any]]], chunk_size: int) -> int:
+    written = 0
+    pending: list[dict[str, Any]] = []
+    for rows in batches:
+        pending.extend(rows)
+        if len(pending) >= chunk_size:
+            written += repo.bulk_insert_line_snapshots(pending, chunk_size=chunk_size)
+            pending = []
+    if pending:
+        written += repo.bulk_insert_line_snapshots(pending, chunk_size=chunk_size)
+    return written
+
+
+def _run(
+    repo: CeduleProductionCostingRepository,
+    *,
+    label: str,
+    scan_mode: str,
+    writer: Callable[[CeduleProductionCostingRepository, Iterator[list[dict[str, Any]]], int], int],
+    sources: int,
+    lines_per_source: int,
+    chunk_size: int,
+) -> dict[str, Any]:
+    scan_id = repo.create_scan(scan_mode=scan_mode, trigger_source="benchmark", since_modified_at=None)
+    try:
+        started = time.perf_counter()
+        rows = writer(repo, _synthetic_rows(scan_id, sources, lines_per_source), chunk_size)
+        elapsed = time.perf_counter() - started
+    finally:
+        repo.delete_scan(scan_id)
+    return {
+        "mode": scan_mode,
+        "writer": label,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=1000, help="Synthetic routings per scan")
+    parser.add_argument("--lines-per-source", type=int, default=12, help="Lines per synthetic routing")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Bulk loader chunk size")
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=("full", "delta"),
+        default=["full", "delta"],
+        help="Scan shapes to benchmark",
+    )
+    parser.add_argument("--skip-legacy", action="store_true", help="Only benchmark the bulk loader")
+    args = parser.parse_args()
+
+    repo = CeduleProductionCostingRepository()
+    if not repo.is_configured:
+        print("Cedule database is not configured (set CEDULE_DB_DSN or CEDULE_SQL_*).", file=sys.stderr)
+        return 1
+    repo.ensure_schema()
+
+    results = []
+    for mode in args.modes:
+        legacy_writer = _legacy_full if mode == "full" else _legacy_delta
+        writers = [("bulk", _bulk)] if args.skip_legacy else [("legacy", legacy_writer), ("bulk", _bulk)]
+        for label, writer in writers:
+            results.append(
+                _run(
+                    repo,
+                    label=label,
+                    scan_mode=mode,
+                    writer=writer,
+                    sources=args.sources,
+                    lines_per_source=args.lines_per_source,
+                    chunk_size=args.chunk_size,
+                )
+            )
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
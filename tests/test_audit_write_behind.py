@@ -0,0 +1,157 @@
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import audit
+from app.audit import AuditWriteBehind, get_idempotency_record, save_idempotency_record, write_audit_log
+from app.errors import IdempotencyException
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _FakeEngine:
+    def __init__(self, existing_keys=()):
+        self.statements = []
+        self.existing_keys = set(existing_keys)
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params):
+        self.statements.append((str(statement), params))
+        keys = [value for name, value in params.items() if name.startswith("key_")]
+        return _Result([(key,) for key in keys if key not in self.existing_keys])
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = AuditWriteBehind(max_size=100, flush_batch_size=50, flush_interval_seconds=0.05)
+    monkeypatch.setattr(audit, "audit_writer", writer)
+    audit.idempotency_cache.clear()
+    yield writer
+    writer.shutdown()
+    audit.idempotency_cache.clear()
+
+
+def _session(engine):
+    session = MagicMock(spec=Session)
+    session.get_bind.return_value = engine
+    return session
+
+
+def test_audit_entries_are_flushed_in_one_multi_row_insert(writer):
+    engine = _FakeEngine()
+    session = _session(engine)
+
+    for line_no in range(3):
+        assert write_audit_log(session, "POLine.PriceChanged", "tester", po_id="PO-1", line_no=line_no, next={"price": 1}) is None
+
+    assert writer.flush()
+    session.execute.assert_not_called()
+    session.commit.assert_not_called()
+    assert len(engine.statements) == 1
+    sql, params = engine.statements[0]
+    assert "INSERT INTO [platform-code-app_audit]" in sql
+    assert [params[f"line_no_{index}"] for index in range(3)] == [0, 1, 2]
+    assert params["next_2"] == '{"price": 1}'
+    assert writer.metrics()["flushed_rows"] == 3
+
+    session.execute.return_value.scalar.return_value = 42
+    assert write_audit_log(session, "Receipt.Created", "tester", po_id="PO-1", durable=True) == 42
+    session.commit.assert_called_once()
+
+
+def test_idempotency_records_are_served_from_memory_and_conflicts_detected(writer):
+    engine = _FakeEngine(existing_keys={"taken"})
+    session = _session(engine)
+
+    assert save_idempotency_record(session, "key-1", {"po_id": "PO-1"}) is True
+    assert get_idempotency_record(session, "key-1") == {"po_id": "PO-1"}
+    assert save_idempotency_record(session, "key-1", {"po_id": "PO-1"}) is False
+    with pytest.raises(IdempotencyException):
+        save_idempotency_record(session, "key-1", {"po_id": "PO-2"})
+    session.execute.assert_not_called()
+
+    save_idempotency_record(session, "taken", {"po_id": "PO-3"})
+    assert writer.flush()
+    sql, params = engine.statements[0]
+    assert "WHERE NOT EXISTS" in sql
+    assert {params["key_0"], params["key_1"]} == {"key-1", "taken"}
+    # The row that lost the race is evicted so the next lookup reads SQL.
+    assert audit.idempotency_cache.get("taken") is None
+    assert audit.idempotency_cache.get("key-1") == {"po_id": "PO-1"}
+
+
+def test_durable_batch_audit_is_one_multi_row_insert_and_commit(writer):
+    session = _session(_FakeEngine())
+    entries = [
+        {"action": "POLine.PriceChanged", "actor": "buyer", "po_id": "PO-1", "line_no": n, "next": {"unit_price": "6"}, "bulk": True}
+        for n in range(3)
+    ]
+
+    assert audit.write_audit_logs(session, entries, durable=True) == 3
+
+    session.execute.assert_called_once()
+    statement, params = session.execute.call_args.args
+    assert str(statement).count("(:at_") == 3
+    assert params["reason_0"] == 'Context: {"bulk": true}'
+    session.commit.assert_called_once()
+
+
+
+class _FailingEngine(_FakeEngine):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def execute(self, statement, params):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        return super().execute(statement, params)
+
+
+def test_failed_flush_is_retried_then_dead_lettered_and_replayed(tmp_path, monkeypatch):
+    dead_letter = tmp_path / "audit_dead_letter.jsonl"
+    writer = AuditWriteBehind(
+        max_size=100,
+        flush_batch_size=50,
+        flush_interval_seconds=0.01,
+        max_retries=1,
+        retry_backoff_seconds=0,
+        dead_letter_path=str(dead_letter),
+    )
+    monkeypatch.setattr(audit, "audit_writer", writer)
+    try:
+        retried = _FailingEngine(failures=1)
+        write_audit_log(_session(retried), "POLine.PriceChanged", "tester", po_id="PO-1", line_no=1)
+        assert writer.flush()
+        assert len(retried.statements) == 1
+        assert writer.metrics()["retries"] == 1
+
+        down = _FailingEngine(failures=2)
+        write_audit_log(_session(down), "POLine.PriceChanged", "tester", po_id="PO-2", line_no=2)
+        assert writer.flush()
+        assert down.statements == []
+        assert writer.metrics()["dead_lettered_rows"] == 1
+        assert dead_letter.exists()
+
+        recovered = _FakeEngine()
+        assert writer.replay_dead_letters(recovered) == 1
+        _, params = recovered.statements[0]
+        assert params["po_id_0"] == "PO-2"
+        assert isinstance(params["at_0"], datetime)
+        assert not dead_letter.exists()
+        assert writer.replay_dead_letters(recovered) == 0
+    finally:
+        writer.shutdown()
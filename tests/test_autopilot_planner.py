@@ -0,0 +1,144 @@
+"""
+Fastems1 Autopilot plan generation tests.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from app.domain.usinage.fastems1.autopilot import repositories as autopilot_repositories
+from app.domain.usinage.fastems1.autopilot.models import MaterialPalletState, PlanCandidate, WorkOrderOperation
+from app.domain.usinage.fastems1.autopilot.providers import FixtureProvider
+from app.domain.usinage.fastems1.autopilot.repositories import AutopilotRepository
+from app.domain.usinage.fastems1.autopilot.services import AutopilotPlannerService
+from app.integrations.cedule_autopilot_repository import FixtureMatrixRow
+
+
+def _matrix_row(code: str, pallet_id: int, machine_id: str) -> FixtureMatrixRow:
+    return FixtureMatrixRow(
+        piece_code=code,
+        fixture_code="FX-1",
+        fixture_description=None,
+        storage_location=None,
+        machine_operation=None,
+        machine_pallet_id=pallet_id,
+        machine_pallet_number=str(pallet_id),
+        machine_id=machine_id,
+        is_active=True,
+        required_plaque_model=None,
+        pallet_plaque_model=None,
+    )
+
+
+class _CeduleRepository:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def list_machine_pallets(self):
+        return []
+
+    def get_fixture_matrices(self, piece_codes):
+        self.batches.append(list(piece_codes))
+        return {code: [_matrix_row(code, 1, "DMC2"), _matrix_row(code, 2, "DMC1")] for code in piece_codes}
+
+    def get_fixture_matrix(self, piece_code):
+        raise AssertionError("planner must not query fixture matrices one code at a time")
+
+
+class _WorkOrders:
+    async def list_active_operations(self):
+        return [
+            WorkOrderOperation(work_order=f"WO-{n}", part_id="PART-01", operation_id=str(n * 10), operation_code="1OP")
+            for n in (1, 2, 3)
+        ]
+
+
+class _Materials:
+    def __init__(self) -> None:
+        self.loads = 0
+
+    async def list_pallets_by_part(self):
+        self.loads += 1
+        return {"PART-01": [MaterialPalletState(pallet_id="77", content_type="raw", work_order=None, part_id="PART-01")]}
+
+
+class _PalletRoutes:
+    async def ensure_cache(self):
+        return None
+
+    def get_status(self, pallet_id):
+        return {"phase": "Fini"}
+
+
+class _PlanRepository:
+    def __init__(self) -> None:
+        self.entries: list[PlanCandidate] = []
+
+    def list_machine_status(self):
+        return {}
+
+    def create_plan_batch(self, entries):
+        self.entries = list(entries)
+        return "batch-1"
+
+
+@pytest.mark.asyncio
+async def test_refresh_plan_prefetches_once_and_reserves_pallets_in_plan_order():
+    cedule = _CeduleRepository()
+    materials = _Materials()
+    plan_repository = _PlanRepository()
+    planner = AutopilotPlannerService(
+        plan_repository,
+        _WorkOrders(),
+        FixtureProvider(cedule),
+        tooling_provider=None,
+        material_provider=materials,
+        pallet_route_provider=_PalletRoutes(),
+    )
+
+    result = await planner.refresh_plan(jobs_per_machine=3, machine_ids=["DMC1", "DMC2"])
+
+    assert result["planned_jobs"] == 3
+    assert cedule.batches == [["PART-01-1OP"] * 3]
+    assert materials.loads == 1
+    # DMC1's own pallet goes to its first job, the other matrix pallet to the second;
+    # the third finds nothing left to reserve.
+    assert [entry.machine_pallet_id for entry in plan_repository.entries] == ["2", "1", None]
+    assert [entry.estimated_setup_minutes for entry in plan_repository.entries] == [12.0, 12.0, 25.0]
+    assert {entry.material_pallet_id for entry in plan_repository.entries} == {"77"}
+
+
+class _RecordingSession:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict]] = []
+
+    def execute(self, statement, params=None):
+        self.calls.append((str(statement), params or {}))
+
+
+def test_create_plan_batch_writes_rows_with_multi_row_inserts(monkeypatch):
+    monkeypatch.setattr(autopilot_repositories, "_PLAN_INSERT_CHUNK_ROWS", 2)
+    session = _RecordingSession()
+    entries = [
+        PlanCandidate(
+            work_order=f"WO-{n}",
+            part_id="101",
+            operation_id="10",
+            machine_id="DMC1",
+            machine_pallet_id=None,
+            material_pallet_id=None,
+            estimated_setup_minutes=25.0,
+            estimated_cycle_minutes=5.0,
+            sequence_index=n,
+        )
+        for n in (1, 2, 3)
+    ]
+
+    AutopilotRepository(session).create_plan_batch(entries)
+
+    inserts = [(sql, params) for sql, params in session.calls if "INSERT INTO" in sql]
+    assert len(session.calls) == 1 + len(inserts)
+    assert len(inserts) == 2
+    assert [params["work_order_0"] for _, params in inserts] == ["WO-1", "WO-3"]
+    assert inserts[0][1]["work_order_1"] == "WO-2"
+    assert inserts[0][0].count("'planned'") == 2
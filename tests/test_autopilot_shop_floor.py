@@ -0,0 +1,258 @@
+"""
+Fastems1 Autopilot shop-floor snapshot tests.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+from app.domain.usinage.fastems1.autopilot.models import (
+    MaterialPalletState,
+    ToolRequirement,
+    ToolState,
+    WorkOrderOperation,
+)
+from app.domain.usinage.fastems1.autopilot.repositories import PlannedJobRow
+from app.domain.usinage.fastems1.autopilot.services import AutopilotSuggestionService
+from app.domain.usinage.fastems1.autopilot.shop_floor import ShopFloorStatePoller
+from app.integrations.cedule_autopilot_repository import FixtureMatrixRow
+
+
+class _WorkOrders:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def list_active_operations(self):
+        self.calls += 1
+        return [
+            WorkOrderOperation(
+                work_order="WO-001",
+                part_id="PART-01",
+                operation_id="OP-10",
+                operation_code="1OP",
+                operation_numeric_id=10,
+                program_name="PART-01-1OP",
+            )
+        ]
+
+
+class _Tooling:
+    def __init__(self) -> None:
+        self.requirement_calls: list[str] = []
+        self.fail_inventory = False
+
+    async def get_machine_tool_states(self, machine_ids):
+        if self.fail_inventory:
+            raise RuntimeError("tooling API down")
+        return {machine_id: [ToolState(tool_id="T1", is_present=True, remaining_life_seconds=600)] for machine_id in machine_ids}
+
+    async def get_tool_requirements(self, program_name):
+        self.requirement_calls.append(program_name)
+        return [ToolRequirement(tool_id="T1", usage_time_seconds=60), ToolRequirement(tool_id="T9")]
+
+
+class _PalletRoutes:
+    def __init__(self) -> None:
+        self._statuses = {"PAL-1": {"phase": "Fini"}}
+
+    async def refresh(self, force: bool = False) -> None:
+        return None
+
+    def statuses(self):
+        return self._statuses
+
+
+class _Materials:
+    async def list_pallets_by_part(self):
+        return {"PART-01": [MaterialPalletState(pallet_id="M1", content_type="raw", work_order=None, part_id="PART-01", quantity_available=3)]}
+
+
+class _Fixtures:
+    def __init__(self) -> None:
+        self.live_queries = 0
+
+    def load_fixture_matrices(self, piece_codes):
+        return {
+            code: [
+                FixtureMatrixRow(
+                    piece_code=code,
+                    fixture_code="FX-1",
+                    fixture_description=None,
+                    storage_location=None,
+                    machine_operation=None,
+                    machine_pallet_id=None,
+                    machine_pallet_number=None,
+                    machine_id=None,
+                    is_active=None,
+                    required_plaque_model=None,
+                    pallet_plaque_model=None,
+                )
+            ]
+            for code in piece_codes
+        }
+
+    async def get_fixture_details(self, part_id, operation_suffix, machine_pallet_id, rows=None):
+        if rows is None:
+            self.live_queries += 1
+            rows = []
+        required = rows[0].fixture_code if rows else None
+        return {"required_fixture": required, "current_fixture": required}
+
+    async def get_fixture_states(self, part_id, operation_suffix, rows=None):
+        if rows is None:
+            self.live_queries += 1
+        return []
+
+
+class _Repository:
+    def __init__(self) -> None:
+        self.job = PlannedJobRow(
+            planned_job_id=1,
+            plan_batch_id="batch-1",
+            machine_id="DMC1",
+            sequence_index=1,
+            work_order="WO-001",
+            part_id="STALE",
+            operation_id="10",
+            machine_pallet_id="PAL-1",
+            material_pallet_id=None,
+            estimated_setup_minutes=12.0,
+            estimated_cycle_minutes=25.0,
+            status="planned",
+            operation_numeric_id=10,
+        )
+
+    def fetch_latest_plan_batch(self):
+        return "batch-1"
+
+    def list_planned_jobs(self, plan_batch_id):
+        return [self.job]
+
+    def list_active_ignores(self):
+        return []
+
+    def get_active_shift_window(self):
+        return None
+
+    def insert_decision(self, job, score, action_plan=None, shift_window_id=None):
+        return 7
+
+    def update_planned_job_status(self, planned_job_id, status, decision_id=None):
+        return None
+
+
+def _poller(tooling: _Tooling, fixtures: _Fixtures, workorders: _WorkOrders) -> ShopFloorStatePoller:
+    return ShopFloorStatePoller(
+        workorder_provider=workorders,
+        tooling_provider=tooling,
+        pallet_route_provider=_PalletRoutes(),
+        material_provider=_Materials(),
+        fixture_provider=fixtures,
+        machine_ids=[1],
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_all_publishes_versioned_snapshot_and_keeps_state_on_failure():
+    tooling = _Tooling()
+    poller = _poller(tooling, _Fixtures(), _WorkOrders())
+
+    snapshot = await poller.refresh_all()
+
+    assert snapshot.version == len(ShopFloorStatePoller.SOURCES)
+    assert snapshot.is_fresh(60)
+    assert snapshot.tool_inventories[1]["T1"].remaining_life_seconds == 600
+    assert [t.tool_id for t in snapshot.program_tools["PART-01-1OP"]] == ["T1", "T9"]
+    assert snapshot.fixture_rows("PART-01", "1OP")[0].fixture_code == "FX-1"
+    assert snapshot.pallet_status("PAL-1") == {"phase": "Fini"}
+    assert snapshot.material_pallets["PART-01"][0].pallet_id == "M1"
+
+    tooling.fail_inventory = True
+    after = await poller.refresh("tools")
+    assert after is snapshot
+    assert after.tool_inventories[1]["T1"].is_present is True
+
+
+@pytest.mark.asyncio
+async def test_suggestion_scores_against_snapshot_without_live_calls():
+    tooling = _Tooling()
+    fixtures = _Fixtures()
+    workorders = _WorkOrders()
+    poller = _poller(tooling, fixtures, workorders)
+    await poller.refresh_all()
+    calls_after_warmup = (workorders.calls, len(tooling.requirement_calls))
+
+    service = AutopilotSuggestionService(
+        _Repository(),
+        fixtures,
+        tooling,
+        pallet_route_provider=None,
+        workorder_provider=workorders,
+        shop_floor=poller,
+    )
+    result = await service.next_suggestion(include_details=True)
+
+    assert result.part_id == "PART-01"
+    assert result.details["missing_tools"] == ["T9"]
+    assert result.details["fixture_required"] == "FX-1"
+    assert (workorders.calls, len(tooling.requirement_calls)) == calls_after_warmup
+    assert fixtures.live_queries == 0
+
+
+@pytest.mark.asyncio
+async def test_start_warms_up_before_polling():
+    tooling = _Tooling()
+    poller = _poller(tooling, _Fixtures(), _WorkOrders())
+
+    await poller.start()
+    try:
+        snapshot = poller.snapshot
+        assert poller.is_running
+        assert snapshot.version == len(ShopFloorStatePoller.SOURCES)
+        assert snapshot.fixture_rows("PART-01", "1OP")[0].fixture_code == "FX-1"
+    finally:
+        await poller.stop()
+
+
+@pytest.mark.asyncio
+async def test_fixture_pass_rebuilds_program_tools_for_active_operations():
+    tooling = _Tooling()
+    poller = _poller(tooling, _Fixtures(), _WorkOrders())
+    snapshot = await poller.refresh_all()
+    new_op = WorkOrderOperation(
+        work_order="WO-002",
+        part_id="PART-02",
+        operation_id="OP-10",
+        operation_code="1OP",
+        operation_numeric_id=10,
+        program_name="NEW-PROG",
+    )
+    poller._snapshot = dataclasses.replace(
+        snapshot, program_tools={**snapshot.program_tools, "FINISHED-PROG": []}
+    )
+    fetch = poller._fetch_program_tools
+
+    async def _fetch_while_operations_refresh(names):
+        fetched = await fetch(names)
+        # An operations refresh publishes a new program while this pass is running.
+        poller._snapshot = dataclasses.replace(
+            poller._snapshot,
+            operations=poller._snapshot.operations + (new_op,),
+            program_tools={**poller._snapshot.program_tools, "NEW-PROG": []},
+        )
+        return fetched
+
+    poller._fetch_program_tools = _fetch_while_operations_refresh
+    after = await poller.refresh("fixtures")
+    assert set(after.program_tools) == {"PART-01-1OP", "NEW-PROG"}
+
+    poller._fetch_program_tools = fetch
+
+    async def _failing_requirements(program_name):
+        raise RuntimeError("tool list unavailable")
+
+    tooling.get_tool_requirements = _failing_requirements
+    failed = await poller.refresh("fixtures")
+    assert set(failed.program_tools) == set()
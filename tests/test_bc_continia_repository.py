@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.integrations import bc_continia_repository
+from app.integrations.bc_continia_repository import BusinessCentralContiniaRepository
+
+_ROWS = [
+    ("C-1", "amountinclvat", None, Decimal("125.50"), None),
+    ("C-1", "DOCDATE", None, None, datetime(2026, 3, 1, 8, 30)),
+    ("C-2", "CURRCODE", "USD", None, None),
+]
+
+
+class _Cursor:
+    def __init__(self, log: list) -> None:
+        self._log = log
+        self._pending: list = []
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        self._log.append(("execute", sql, params))
+        if "INNER JOIN" in sql:
+            self._pending = list(_ROWS)
+
+    def executemany(self, sql, rows):
+        self._log.append(("executemany", sql, list(rows), self.fast_executemany))
+
+    def fetchmany(self, size):
+        batch, self._pending = self._pending[:size], self._pending[size:]
+        return batch
+
+
+class _RawConnection:
+    def __init__(self, log: list) -> None:
+        self._log = log
+        self.closed = False
+
+    def cursor(self):
+        return _Cursor(self._log)
+
+    def commit(self):
+        self._log.append(("commit",))
+
+    def close(self):
+        self.closed = True
+
+
+class _Connection:
+    def __init__(self, engine: "_FakeEngine") -> None:
+        self._engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self._engine.queries.append(dict(params or {}))
+        keys = {value for name, value in (params or {}).items() if name.startswith("p")}
+        return [row for row in _ROWS if row[0] in keys]
+
+
+class _FakeEngine:
+    def __init__(self, dialect_name: str, driver: str = "") -> None:
+        self.dialect = SimpleNamespace(name=dialect_name, driver=driver, dbapi=SimpleNamespace(Error=RuntimeError))
+        self.connections = 0
+        self.queries: list[dict] = []
+        self.log: list = []
+        self.raw = _RawConnection(self.log)
+
+    def connect(self):
+        self.connections += 1
+        return _Connection(self)
+
+    def raw_connection(self):
+        return self.raw
+
+
+def test_bulk_lookup_stages_keys_once_and_streams_joined_rows(monkeypatch) -> None:
+    monkeypatch.setattr(bc_continia_repository.settings, "continia_values_fetch_size", 2)
+    engine = _FakeEngine("mssql", "pyodbc")
+    repository = BusinessCentralContiniaRepository(engine=engine)
+
+    values = repository.get_document_values_batch(["C-1", " C-1 ", "C-2", ""], codes=["amountinclvat", "DOCDATE"])
+
+    inserts = [entry for entry in engine.log if entry[0] == "executemany"]
+    assert len(inserts) == 1
+    assert inserts[0][2] == [("C-1",), ("C-2",)]
+    assert inserts[0][3] is True
+    join = next(entry for entry in engine.log if entry[0] == "execute" and "INNER JOIN" in entry[1])
+    assert join[2] == ("AMOUNTINCLVAT", "DOCDATE")
+    assert engine.raw.closed
+    assert values["C-1"].decimal_values == {"AMOUNTINCLVAT": Decimal("125.50")}
+    assert values["C-1"].date_values["DOCDATE"].isoformat() == "2026-03-01"
+    assert values["C-2"].text_values == {"CURRCODE": "USD"}
+
+
+def test_fallback_chunks_on_one_connection(monkeypatch) -> None:
+    engine = _FakeEngine("sqlite")
+    repository = BusinessCentralContiniaRepository(engine=engine)
+    document_nos = ["C-1", "C-2"] + [f"X-{n}" for n in range(600)]
+
+    values = repository.get_document_values_batch(document_nos)
+
+    assert engine.connections == 1
+    assert len(engine.queries) == 2
+    assert set(values) == {"C-1", "C-2"}
+    assert engine.log == []
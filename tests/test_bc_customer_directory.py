@@ -0,0 +1,185 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.erp import business_central as bc_api
+from app.api.v1.erp.business_central import get_odata_service
+from app.domain.erp import customer_directory as directory_module
+from app.domain.erp.customer_directory import CustomerDirectory
+from app.domain.erp.models import GeocodedLocation
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def clear_dependency_overrides():
+    app.dependency_overrides.clear()
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def geocode_cache(monkeypatch):
+    cached = {"CUST01": GeocodedLocation(latitude=45.5, longitude=-73.6, status="OK")}
+    monkeypatch.setattr(
+        directory_module.customer_geocode_cache,
+        "get_cached",
+        lambda customer_no, address: cached.get(customer_no),
+    )
+    schedule_refresh = AsyncMock()
+    monkeypatch.setattr(directory_module.customer_geocode_cache, "schedule_refresh", schedule_refresh)
+    return cached, schedule_refresh
+
+
+class _DirectoryService:
+    def __init__(self, customers, ship_tos, dimensions):
+        self.customers = customers
+        self.ship_tos = ship_tos
+        self.dimensions = dimensions
+        self.resources = []
+
+    async def iter_collection_pages(self, resource, **kwargs):
+        self.resources.append(resource)
+        yield list(self.customers)
+
+    async def fetch_collection_paged(self, resource, **kwargs):
+        self.resources.append(resource)
+        if resource.startswith("ShipToAddress"):
+            return list(self.ship_tos)
+        if resource.startswith("DefaultDimensions"):
+            return list(self.dimensions)
+        return []
+
+
+def _customer(no, name, modified):
+    return {"No": no, "Name": name, "Address": f"{no} Main St", "City": "Montreal", "SystemModifiedAt": modified}
+
+
+def test_refresh_materializes_and_applies_incremental_changes(tmp_path, geocode_cache):
+    _cached, schedule_refresh = geocode_cache
+    directory = CustomerDirectory(str(tmp_path / "directory.sqlite"))
+    service = _DirectoryService(
+        customers=[_customer("CUST01", "Acme", "2026-01-01T00:00:00Z"), _customer("CUST02", "Beta", "2026-01-02T00:00:00Z")],
+        ship_tos=[{"Customer_No": "CUST01", "Code": "MAIN", "Address": "1 Dock Rd", "SystemModifiedAt": "2026-01-01T00:00:00Z"}],
+        dimensions=[{"No": "CUST01", "Table_ID": 18, "Dimension_Code": "DIVISION", "Dimension_Value_Code": "CONST"}],
+    )
+
+    first = asyncio.run(directory.refresh(service))
+
+    assert first.full is True
+    assert first.rows_rebuilt == 2
+    total, rows = directory.page(per_page=10)
+    assert total == 2
+    assert [row["customer_no"] for row in rows] == ["CUST01", "CUST02"]
+    assert rows[0]["division"] == "CONST"
+    assert rows[0]["geocode"]["status"] == "OK"
+    assert [entry["ship_to_code"] for entry in rows[0]["ship_to_addresses"]] == ["MAIN"]
+    assert rows[1]["ship_to_addresses"][0]["source"] == "customer"
+    schedule_refresh.assert_awaited_once_with("CUST02", "CUST02 Main St, Montreal")
+
+    service.customers = [_customer("CUST02", "Beta Renamed", "2026-01-03T00:00:00Z")]
+    service.ship_tos = [{"Customer_No": "CUST01", "Code": "YARD", "Address": "9 Yard Rd", "SystemModifiedAt": "2026-01-03T00:00:00Z"}]
+    service.resources.clear()
+
+    second = asyncio.run(directory.refresh(service))
+
+    assert second.full is False
+    assert "SystemModifiedAt%20gt%202026-01-02T00%3A00%3A00Z" in service.resources[0]
+    total, rows = directory.page(per_page=10, search="beta")
+    assert total == 1 and rows[0]["name"] == "Beta Renamed"
+    _, rows = directory.page(division="CONST")
+    assert [entry["ship_to_code"] for entry in rows[0]["ship_to_addresses"]] == ["MAIN", "YARD"]
+    assert directory.status()["customer_watermark"] == "2026-01-03T00:00:00Z"
+    assert directory.status()["ship_to_watermark"] == "2026-01-03T00:00:00Z"
+
+
+def test_failed_lookup_aborts_refresh_and_watermarks_advance_separately(tmp_path, geocode_cache):
+    directory = CustomerDirectory(str(tmp_path / "directory.sqlite"))
+    service = _DirectoryService(
+        customers=[_customer("CUST01", "Acme", "2026-01-05T00:00:00Z")],
+        ship_tos=[{"Customer_No": "CUST01", "Code": "MAIN", "Address": "1 Dock Rd", "SystemModifiedAt": "2026-01-01T00:00:00Z"}],
+        dimensions=[{"No": "CUST01", "Table_ID": 18, "Dimension_Code": "DIVISION", "Dimension_Value_Code": "CONST"}],
+    )
+    asyncio.run(directory.refresh(service))
+    assert directory.status()["ship_to_watermark"] == "2026-01-01T00:00:00Z"
+
+    fetch_collection_paged = service.fetch_collection_paged
+
+    async def _dimensions_down(resource, **kwargs):
+        if resource.startswith("DefaultDimensions"):
+            raise httpx.ConnectError("Business Central unreachable")
+        return await fetch_collection_paged(resource, **kwargs)
+
+    service.fetch_collection_paged = _dimensions_down
+    with pytest.raises(httpx.RequestError):
+        asyncio.run(directory.refresh(service, full=True))
+
+    _, rows = directory.page()
+    assert rows[0]["division"] == "CONST"
+    assert [entry["ship_to_code"] for entry in rows[0]["ship_to_addresses"]] == ["MAIN"]
+
+    service.fetch_collection_paged = fetch_collection_paged
+    service.resources.clear()
+    asyncio.run(directory.refresh(service))
+    ship_to_resource = next(resource for resource in service.resources if resource.startswith("ShipToAddress"))
+    assert "2026-01-01T00%3A00%3A00Z" in ship_to_resource
+
+
+def test_directory_endpoint_pages_and_projects(tmp_path, geocode_cache, monkeypatch):
+    directory = CustomerDirectory(str(tmp_path / "directory.sqlite"))
+    monkeypatch.setattr(bc_api, "customer_directory", directory)
+    service = _DirectoryService(
+        customers=[_customer(f"CUST{n:02d}", f"Customer {n:02d}", "2026-01-01T00:00:00Z") for n in range(1, 4)],
+        ship_tos=[],
+        dimensions=[],
+    )
+    app.dependency_overrides[get_odata_service] = lambda: service
+    asyncio.run(directory.refresh(service))
+    client = TestClient(app)
+
+    response = client.get(
+        "/api/v1/erp/bc/customers/directory",
+        params={"page": 2, "per_page": 2, "fields": "name,city"},
+    )
+
+    assert response.status_code == 200, response.text
+    payload = response.json()
+    assert payload["data"] == [{"customer_no": "CUST03", "name": "Customer 03", "city": "Montreal"}]
+    assert payload["meta"]["pagination"]["total_items"] == 3
+    assert payload["meta"]["pagination"]["total_pages"] == 2
+
+    invalid = client.get("/api/v1/erp/bc/customers/directory", params={"fields": "name,credit_limit"})
+    assert invalid.status_code == 422
+
+
+def test_cold_directory_is_built_in_the_background(tmp_path, geocode_cache, monkeypatch):
+    directory = CustomerDirectory(str(tmp_path / "directory.sqlite"))
+    service = _DirectoryService(
+        customers=[_customer("CUST01", "Customer 01", "2026-01-01T00:00:00Z")], ship_tos=[], dimensions=[]
+    )
+
+    async def _scenario():
+        assert directory.refresh_in_background_if_cold(service)
+        assert directory.refresh_in_background_if_cold(service)
+        await directory._background_refresh
+        return directory.refresh_in_background_if_cold(service)
+
+    assert asyncio.run(_scenario()) is False
+    assert directory.is_seeded
+    assert sum(resource.startswith("Customers") for resource in service.resources) == 1
+
+
+def test_directory_endpoint_answers_503_while_cold(tmp_path, monkeypatch):
+    directory = CustomerDirectory(str(tmp_path / "directory.sqlite"))
+    started = []
+    monkeypatch.setattr(directory, "refresh_in_background_if_cold", lambda service: started.append(service) or True)
+    monkeypatch.setattr(bc_api, "customer_directory", directory)
+    app.dependency_overrides[get_odata_service] = lambda: object()
+
+    response = TestClient(app).get("/api/v1/erp/bc/customers/directory")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    assert len(started) == 1
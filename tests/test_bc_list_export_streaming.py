@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.erp.business_central import get_odata_service
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def clear_dependency_overrides():
+    app.dependency_overrides.clear()
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
+
+
+class _PagedService:
+    def __init__(self, pages, *, fail_first=False, fail_after=None):
+        self._pages = pages
+        self._fail_first = fail_first
+        self._fail_after = fail_after
+        self.calls = []
+
+    async def fetch_collection(self, resource, **kwargs):
+        self.calls.append(("fetch_collection", resource, kwargs))
+        return [record for page in self._pages for record in page]
+
+    async def iter_collection_pages(self, resource, **kwargs):
+        self.calls.append(("iter_collection_pages", resource, kwargs))
+        if self._fail_first:
+            request = httpx.Request("GET", resource)
+            raise httpx.HTTPStatusError("boom", request=request, response=httpx.Response(500, request=request))
+        for index, page in enumerate(self._pages):
+            if index == self._fail_after:
+                raise httpx.ConnectError("connection reset", request=httpx.Request("GET", resource))
+            yield page
+
+
+_PAGES = [
+    [{"@odata.etag": "W/1", "No": "ITEM-1", "Description": "Bolt"}],
+    [{"@odata.etag": "W/2", "No": "ITEM-2", "Description": "Nut, hex"}],
+]
+
+
+def test_items_stream_as_ndjson_with_select(client):
+    service = _PagedService(_PAGES)
+    app.dependency_overrides[get_odata_service] = lambda: service
+
+    response = client.get("/api/v1/erp/bc/items", params={"format": "ndjson", "select": "No, Description"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["No"] for line in lines] == ["ITEM-1", "ITEM-2"]
+    assert service.calls == [
+        ("iter_collection_pages", "Items", {"filter_field": "No", "filter_value": None, "top": None, "select": ["No", "Description"]})
+    ]
+
+
+def test_items_stream_as_csv_uses_first_record_columns(client):
+    app.dependency_overrides[get_odata_service] = lambda: _PagedService(_PAGES)
+
+    response = client.get("/api/v1/erp/bc/items", params={"format": "csv"})
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows == [["No", "Description"], ["ITEM-1", "Bolt"], ["ITEM-2", "Nut, hex"]]
+
+
+def test_stream_maps_first_page_failure_to_bad_gateway(client):
+    app.dependency_overrides[get_odata_service] = lambda: _PagedService(_PAGES, fail_first=True)
+
+    response = client.get("/api/v1/erp/bc/vendors", params={"format": "ndjson"})
+
+    assert response.status_code == 502
+
+
+def test_stream_failure_after_first_page_aborts_the_response(client):
+    app.dependency_overrides[get_odata_service] = lambda: _PagedService(_PAGES, fail_after=1)
+
+    with pytest.raises(httpx.ConnectError):
+        client.get("/api/v1/erp/bc/items", params={"format": "ndjson"})
+
+
+def test_json_mode_and_select_validation(client):
+    service = _PagedService(_PAGES)
+    app.dependency_overrides[get_odata_service] = lambda: service
+
+    response = client.get("/api/v1/erp/bc/items", params={"no": "ITEM-1"})
+    assert response.status_code == 200
+    assert service.calls[-1] == ("fetch_collection", "Items", {"filter_field": "No", "filter_value": "ITEM-1", "top": None})
+
+    assert client.get("/api/v1/erp/bc/items", params={"select": "No;DROP"}).status_code == 422
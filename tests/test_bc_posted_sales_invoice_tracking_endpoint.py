@@ -1,3 +1,4 @@
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
@@ -5,7 +6,9 @@ import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api.v1.erp import business_central as bc_api
 from app.api.v1.erp.business_central import get_odata_service
+from app.domain.erp.posted_invoice_tracking_index import PostedInvoiceTrackingIndex
 from app.main import app
 
 
@@ -217,3 +220,110 @@ def test_get_posted_sales_invoice_by_tracking_sums_transport_lines_and_invoices(
     assert second["transport_charge"]["matched_lines_count"] == 1
     assert second["transport_charge"]["amount_excl_tax"] == 25.0
     assert len(second["transport_charge"]["lines"]) == 1
+
+
+class _IndexSyncService:
+    def __init__(self, pages):
+        self._pages = pages
+        self.header_resources = []
+        self.line_resources = []
+
+    async def iter_collection_pages(self, resource, **kwargs):
+        self.header_resources.append(resource)
+        for page in self._pages:
+            yield page
+
+    async def fetch_collection_paged(self, resource, **kwargs):
+        self.line_resources.append(resource)
+        return [
+            {"Document_No": "INV-1", "No": "41800", "Line_Amount_Excl_Tax": 40.0},
+            {"Document_No": "INV-2", "No": "41800", "Line_Amount_Excl_Tax": 12.5},
+        ]
+
+
+def test_tracking_index_syncs_incrementally_and_drops_cleared_numbers(tmp_path):
+    index = PostedInvoiceTrackingIndex(str(tmp_path / "tracking.sqlite"))
+    first = _IndexSyncService(
+        [
+            [
+                {"No": "INV-1", "Package_Tracking_No": "111", "SystemModifiedAt": "2026-03-01T10:00:00Z"},
+                {"No": "INV-2", "Package_Tracking_No": "222", "SystemModifiedAt": "2026-03-01T11:00:00Z"},
+            ],
+            [{"No": "INV-3", "Package_Tracking_No": "", "SystemModifiedAt": "2026-03-01T12:00:00Z"}],
+        ]
+    )
+
+    result = asyncio.run(index.sync(first))
+
+    assert (result.invoices_seen, result.invoices_indexed) == (3, 2)
+    assert result.watermark == "2026-03-01T12:00:00Z"
+    assert "%24filter" not in first.header_resources[0]
+    assert len(first.line_resources) == 1
+    found = index.lookup(["111", "222", "999"])
+    assert set(found) == {"111", "222"}
+    assert found["111"][0][1][0]["Line_Amount_Excl_Tax"] == 40.0
+
+    second = _IndexSyncService(
+        [[{"No": "INV-2", "Package_Tracking_No": "", "SystemModifiedAt": "2026-03-02T08:00:00Z"}]]
+    )
+    asyncio.run(index.sync(second))
+
+    assert "SystemModifiedAt%20gt%202026-03-01T12%3A00%3A00Z" in second.header_resources[0]
+    assert set(index.lookup(["111", "222"])) == {"111"}
+    assert index.status()["invoice_count"] == 1
+
+
+def test_batch_tracking_lookup_resolves_from_index(client: TestClient, tmp_path, monkeypatch):
+    index = PostedInvoiceTrackingIndex(str(tmp_path / "tracking.sqlite"))
+    monkeypatch.setattr(bc_api, "posted_invoice_tracking_index", index)
+    service = _IndexSyncService(
+        [[{"No": "INV-1", "Package_Tracking_No": "111", "Currency_Code": "CAD", "SystemModifiedAt": "2026-03-01T10:00:00Z"}]]
+    )
+    app.dependency_overrides[get_odata_service] = lambda: service
+    asyncio.run(index.sync(service))
+
+    response = client.post(
+        "/api/v1/erp/bc/posted-sales-invoices/by-tracking/batch",
+        json={"tracking_numbers": [":111", "111", "999"]},
+    )
+
+    assert response.status_code == 200, response.text
+    payload = response.json()
+    assert payload["requested_count"] == 2
+    assert payload["not_found"] == ["999"]
+    assert payload["results"][0]["tracking_number"] == "111"
+    assert payload["results"][0]["total_transport_charge_by_currency"] == {"CAD": 40.0}
+    assert payload["index"]["invoice_count"] == 1
+
+    # Requests never sync a fresh index.
+    client.post("/api/v1/erp/bc/posted-sales-invoices/by-tracking/batch", json={"tracking_numbers": ["111"]})
+    assert len(service.header_resources) == 1
+
+
+def test_stale_index_is_synced_once_by_queued_callers(tmp_path):
+    index = PostedInvoiceTrackingIndex(str(tmp_path / "tracking.sqlite"))
+    service = _IndexSyncService(
+        [[{"No": "INV-1", "Package_Tracking_No": "111", "SystemModifiedAt": "2026-03-01T10:00:00Z"}]]
+    )
+
+    async def _concurrent():
+        return await asyncio.gather(*(index.sync_if_stale(service, max_age_seconds=60) for _ in range(3)))
+
+    results = asyncio.run(_concurrent())
+
+    assert sum(result is not None for result in results) == 1
+    assert len(service.header_resources) == 1
+    assert index.is_stale(60) is False
+
+
+def test_background_sync_logs_unexpected_failures(tmp_path, monkeypatch, caplog):
+    from app.domain.erp import posted_invoice_tracking_index as tracking_module
+
+    index = PostedInvoiceTrackingIndex(str(tmp_path / "tracking.sqlite3"))
+    monkeypatch.setattr(index, "sync", AsyncMock(side_effect=KeyError("No")))
+    monkeypatch.setattr(tracking_module, "BusinessCentralODataService", lambda: object())
+
+    with caplog.at_level("ERROR", logger=tracking_module.__name__):
+        asyncio.run(tracking_module._sync_logged(index))
+
+    assert "Posted invoice tracking index sync failed unexpectedly" in caplog.text
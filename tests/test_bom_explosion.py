@@ -0,0 +1,105 @@
+import datetime as dt
+
+import pytest
+
+from app.domain.erp.bom_explosion import BomExplosionCache, BomExplosionEngine
+
+
+class _StubERPClient:
+    def __init__(self) -> None:
+        self.items = {
+            "ASM-A": {"No": "ASM-A", "Production_BOM_No": "BOM-A"},
+            "ASM-B": {"No": "ASM-B", "Production_BOM_No": "BOM-B"},
+            "RAW-1": {"No": "RAW-1"},
+            "RAW-2": {"No": "RAW-2"},
+        }
+        self.boms = {
+            "BOM-TOP": [
+                {"Type": "Item", "No": "ASM-A", "Quantity_per": 2},
+                {"Type": "Item", "No": "ASM-B", "Quantity_per": 1},
+                {"Type": "Item", "No": "RAW-1", "Quantity_per": 3},
+                {"Type": "Resource", "No": "LABOR", "Quantity_per": 1},
+            ],
+            "BOM-A": [
+                {"Type": "Item", "No": "RAW-1", "Quantity_per": 1.5},
+                {"Type": "Item", "No": "ASM-B", "Quantity_per": 2},
+            ],
+            "BOM-B": [{"Type": "Item", "No": "RAW-2", "Quantity_per": 4}],
+        }
+        self.batch_calls: list[list[str]] = []
+        self.item_calls: list[str] = []
+
+    async def get_item(self, item_id: str):
+        self.item_calls.append(item_id)
+        return self.items.get(item_id)
+
+    async def get_bom_component_lines_batch(self, bom_nos):
+        self.batch_calls.append(sorted(bom_nos))
+        return {bom_no: list(self.boms.get(bom_no, [])) for bom_no in bom_nos}
+
+
+class _StubRepository:
+    is_configured = True
+
+    def __init__(self, watermark: dt.datetime) -> None:
+        self.watermark = watermark
+
+    def get_source_last_modified(self, source_type: str):
+        assert source_type == "bom"
+        return self.watermark
+
+
+@pytest.mark.asyncio
+async def test_explode_fetches_one_batch_per_level_and_flattens_quantities():
+    client = _StubERPClient()
+    engine = BomExplosionEngine(erp_client=client, cache=BomExplosionCache(ttl_seconds=3600))
+
+    quantities = await engine.explode_quantities("BOM-TOP")
+
+    # RAW-1: 2 * 1.5 + 3 ; RAW-2: 2 * 2 * 4 + 1 * 4
+    assert quantities == {"RAW-1": pytest.approx(6.0), "RAW-2": pytest.approx(20.0)}
+    assert client.batch_calls == [["BOM-TOP"], ["BOM-A", "BOM-B"]]
+    assert sorted(client.item_calls) == ["ASM-A", "ASM-B", "RAW-1", "RAW-2"]
+
+
+@pytest.mark.asyncio
+async def test_flattened_sub_assemblies_are_shared_across_engines():
+    cache = BomExplosionCache(ttl_seconds=3600)
+    await BomExplosionEngine(erp_client=_StubERPClient(), cache=cache).explode("BOM-TOP")
+
+    client = _StubERPClient()
+    lines = await BomExplosionEngine(erp_client=client, cache=cache).explode("BOM-A", multiplier=2)
+
+    assert client.batch_calls == []
+    assert [(line["No"], line["Quantity_per"]) for line in lines] == [("RAW-1", 3.0), ("RAW-2", 16.0)]
+
+
+@pytest.mark.asyncio
+async def test_watermark_change_invalidates_memoized_explosions():
+    cache = BomExplosionCache(ttl_seconds=3600, watermark_check_seconds=0)
+    repository = _StubRepository(dt.datetime(2026, 2, 1))
+    await BomExplosionEngine(erp_client=_StubERPClient(), cache=cache, repository=repository).explode(
+        "BOM-B"
+    )
+
+    client = _StubERPClient()
+    await BomExplosionEngine(erp_client=client, cache=cache, repository=repository).explode("BOM-B")
+    assert client.batch_calls == []
+
+    repository.watermark = dt.datetime(2026, 2, 2)
+    await BomExplosionEngine(erp_client=client, cache=cache, repository=repository).explode("BOM-B")
+    assert client.batch_calls == [["BOM-B"]]
+
+
+@pytest.mark.asyncio
+async def test_recursive_bom_is_skipped_and_not_memoized():
+    client = _StubERPClient()
+    client.items["LOOP"] = {"No": "LOOP", "Production_BOM_No": "BOM-TOP"}
+    client.boms["BOM-B"].append({"Type": "Item", "No": "LOOP", "Quantity_per": 1})
+    cache = BomExplosionCache(ttl_seconds=3600)
+    engine = BomExplosionEngine(erp_client=client, cache=cache)
+
+    quantities = await engine.explode_quantities("BOM-TOP")
+
+    assert quantities["RAW-2"] == pytest.approx(20.0)
+    assert cache.get_flattened("BOM-TOP") is None
@@ -0,0 +1,189 @@
+"""
+Tests for the bulk PO line update service and endpoint.
+"""
+
+import asyncio
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.deps import get_db
+from app.domain.dtos import BulkPOLineChange, BulkUpdatePOLinesCommand
+from app.domain.purchasing_service import PurchasingService
+from app.errors import ERPConflict
+from app.main import app
+
+
+NEXT_WEEK = date.today() + timedelta(days=7)
+
+
+def _row(po_id, line_no, **overrides):
+    row = {
+        "Document_No": po_id,
+        "Line_No": line_no,
+        "SystemId": f"sys-{po_id}-{line_no}",
+        "@odata.etag": f"W/\"{po_id}-{line_no}\"",
+        "No": "ITEM-1",
+        "Description": "Widget",
+        "Quantity": 10,
+        "Unit_of_Measure_Code": "EA",
+        "Direct_Unit_Cost": 5.0,
+        "Line_Amount": 50.0,
+        "Promised_Receipt_Date": "2026-01-15",
+        "Quantity_Received": 0,
+        "Quantity_Invoiced": 0,
+    }
+    row.update(overrides)
+    return row
+
+
+class _FakeERP:
+    def __init__(self, rows, conflict_ids=(), delays=None):
+        self.rows = rows
+        self.conflict_ids = set(conflict_ids)
+        self.delays = delays or {}
+        self.reads = []
+        self.patches = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def get_polines_for_documents(self, po_ids):
+        self.reads.append(list(po_ids))
+        return [row for row in self.rows if row["Document_No"] in po_ids]
+
+    async def patch_poline(self, system_id, updates, etag):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delays.get(system_id, 0.01))
+        self.in_flight -= 1
+        if system_id in self.conflict_ids:
+            raise ERPConflict("PO line was modified concurrently")
+        self.patches.append((system_id, updates, etag))
+        return {}
+
+
+def _command(changes):
+    return BulkUpdatePOLinesCommand(changes=changes, reason="Vendor backlog", actor="buyer", trace_id="t-1")
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_validates_in_memory_and_patches_with_etags():
+    erp = _FakeERP(
+        rows=[
+            _row("PO-1", 10000),
+            _row("PO-1", 20000, Quantity_Received=4),
+            _row("PO-2", 10000),
+            _row("PO-2", 20000),
+        ],
+        conflict_ids={"sys-PO-2-20000"},
+    )
+    service = PurchasingService(erp_client=erp, ai_client=MagicMock())
+    changes = [
+        BulkPOLineChange(po_id="PO-1", line_no=10000, new_date=NEXT_WEEK, new_price=Decimal("6.00")),
+        BulkPOLineChange(po_id="PO-1", line_no=20000, new_price=Decimal("7.00")),
+        BulkPOLineChange(po_id="PO-2", line_no=10000, new_quantity=Decimal("12")),
+        BulkPOLineChange(po_id="PO-2", line_no=20000, new_date=NEXT_WEEK),
+        BulkPOLineChange(po_id="PO-2", line_no=10000, new_date=NEXT_WEEK),
+        BulkPOLineChange(po_id="PO-3", line_no=10000, new_date=NEXT_WEEK),
+    ]
+
+    with patch("app.domain.purchasing_service.write_audit_logs") as audit:
+        results = [result async for result in service.update_polines_bulk(_command(changes), MagicMock(spec=Session), max_concurrency=2)]
+
+    by_key = {(result.po_id, result.line_no, result.status): result for result in results}
+    assert len(results) == 6
+    assert erp.reads == [["PO-1", "PO-1", "PO-2", "PO-2", "PO-2", "PO-3"]]
+    assert by_key[("PO-1", 20000, "error")].error["code"] == "VALIDATION_ERROR"
+    assert by_key[("PO-2", 10000, "error")].error["context"]["field"] == "changes"
+    assert by_key[("PO-3", 10000, "error")].error["code"] == "ERP_NOT_FOUND"
+    assert by_key[("PO-2", 20000, "error")].error["code"] == "ERP_CONFLICT"
+
+    updated = by_key[("PO-1", 10000, "updated")].line
+    assert updated.promise_date == NEXT_WEEK and updated.unit_price == Decimal("6.0")
+    assert by_key[("PO-2", 10000, "updated")].line.quantity == Decimal("12.0")
+    assert sorted(erp.patches) == [
+        ("sys-PO-1-10000", {"Promised_Receipt_Date": NEXT_WEEK.isoformat(), "Direct_Unit_Cost": 6.0}, 'W/"PO-1-10000"'),
+        ("sys-PO-2-10000", {"Quantity": 12.0}, 'W/"PO-2-10000"'),
+    ]
+    assert erp.peak <= 2
+
+    assert audit.call_count == 2
+    entries = [entry for call in audit.call_args_list for entry in call.args[1]]
+    assert sorted((entry["po_id"], entry["action"]) for entry in entries) == [
+        ("PO-1", "POLine.PriceChanged"),
+        ("PO-1", "POLine.PromiseDateChanged"),
+        ("PO-2", "POLine.QuantityChanged"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_reports_lines_without_etag_instead_of_overwriting():
+    row = _row("PO-1", 10000)
+    del row["@odata.etag"]
+    erp = _FakeERP(rows=[row])
+    service = PurchasingService(erp_client=erp, ai_client=MagicMock())
+    changes = [BulkPOLineChange(po_id="PO-1", line_no=10000, new_date=NEXT_WEEK)]
+
+    with patch("app.domain.purchasing_service.write_audit_logs") as audit:
+        results = [result async for result in service.update_polines_bulk(_command(changes), MagicMock(spec=Session))]
+
+    assert [(result.status, result.error["code"]) for result in results] == [("error", "ERP_CONFLICT")]
+    assert erp.patches == []
+    audit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_abandoned_bulk_update_finishes_and_audits_patches_already_sent():
+    line_nos = (10000, 20000, 30000, 40000)
+    erp = _FakeERP(
+        rows=[_row("PO-1", line_no) for line_no in line_nos],
+        delays={"sys-PO-1-10000": 0, "sys-PO-1-20000": 0.05, "sys-PO-1-30000": 0.05},
+    )
+    service = PurchasingService(erp_client=erp, ai_client=MagicMock())
+    changes = [BulkPOLineChange(po_id="PO-1", line_no=line_no, new_date=NEXT_WEEK) for line_no in line_nos]
+
+    with patch("app.domain.purchasing_service.write_audit_logs") as audit:
+        stream = service.update_polines_bulk(_command(changes), MagicMock(spec=Session), max_concurrency=2)
+        first = await stream.__anext__()
+        await stream.aclose()
+
+    assert (first.line_no, first.status) == (10000, "updated")
+    assert sorted(system_id for system_id, _, _ in erp.patches) == [
+        "sys-PO-1-10000",
+        "sys-PO-1-20000",
+        "sys-PO-1-30000",
+    ]
+    assert sorted(call.args[1][0]["line_no"] for call in audit.call_args_list) == [10000, 20000, 30000]
+
+
+def test_bulk_update_endpoint_streams_ndjson():
+    erp = _FakeERP(rows=[_row("PO-1", 10000)])
+    service = PurchasingService(erp_client=erp, ai_client=MagicMock())
+    app.dependency_overrides[get_db] = lambda: MagicMock(spec=Session)
+    try:
+        with patch("app.api.v1.erp.purchase_orders.purchasing_service", service), patch(
+            "app.domain.purchasing_service.write_audit_logs"
+        ):
+            response = TestClient(app).post(
+                "/api/v1/erp/po/lines/bulk-update",
+                json={
+                    "reason": "Reschedule",
+                    "changes": [
+                        {"po_id": "PO-1", "line_no": 10000, "new_date": NEXT_WEEK.isoformat()},
+                        {"po_id": "PO-1", "line_no": 30000, "new_date": NEXT_WEEK.isoformat()},
+                    ],
+                },
+                headers={"X-User-ID": "buyer"},
+            )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["line_no"], line["status"]) for line in lines] == [(30000, "error"), (10000, "updated")]
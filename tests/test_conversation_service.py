@@ -262,3 +262,62 @@ def test_send_receivables_email_accepts_customer_no(monkeypatch):
 
     assert response.to == ["ar-customer@example.com"]
     assert response.customer_no == "C10000"
+
+
+class PagedFrontClient(StubFrontClient):
+    """Stub returning messages one per page, recording the request order."""
+
+    calls: list = []
+
+    async def get_conversation(self, conversation_id: str):
+        self.calls.append("conversation")
+        await asyncio.sleep(0)
+        return CONVERSATION_DATA
+
+    async def get_conversation_comments(self, conversation_id: str):
+        self.calls.append("comments")
+        return {"_results": COMMENTS}
+
+    async def get_conversation_messages(self, conversation_id: str, page: str | None = None):
+        self.calls.append(f"messages:{page}")
+        index = int(page) if page else 0
+        pagination = {"next": str(index + 1)} if index + 1 < len(MESSAGES) else {}
+        return {"_results": [MESSAGES[index]], "_pagination": pagination}
+
+
+def test_get_conversation_fetches_concurrently_and_caches_until_write():
+    PagedFrontClient.calls = []
+    service = ConversationService(front_client_class=PagedFrontClient)
+
+    conversation = run(service.get_conversation(CONVERSATION_ID))
+
+    assert [message.id for message in conversation.messages] == ["msg_1", "msg_2"]
+    assert PagedFrontClient.calls[:3] == ["conversation", "comments", "messages:None"]
+    assert PagedFrontClient.calls[3:] == ["messages:1"]
+
+    assert run(service.get_conversation(CONVERSATION_ID)) is conversation
+    assert len(PagedFrontClient.calls) == 4
+
+    run(service.create_comment(CONVERSATION_ID, ConversationCommentRequest(body="note")))
+    run(service.get_conversation(CONVERSATION_ID))
+    assert len(PagedFrontClient.calls) == 8
+
+    assert service.handle_webhook_event({"type": "sync", "payload": {"conversation": {"id": CONVERSATION_ID}}}) == [
+        CONVERSATION_ID
+    ]
+    assert service.cache.get(CONVERSATION_ID) is None
+
+
+def test_conversation_cache_skips_fetches_started_before_invalidation():
+    from app.domain.communications.conversation_service import ConversationCache
+
+    cache = ConversationCache(ttl_seconds=60, max_entries=2)
+    conversation = run(ConversationService(front_client_class=StubFrontClient).get_conversation(CONVERSATION_ID))
+
+    token = cache.begin()
+    cache.invalidate(CONVERSATION_ID)
+    cache.put(CONVERSATION_ID, conversation, token)
+    assert cache.get(CONVERSATION_ID) is None
+
+    cache.put(CONVERSATION_ID, conversation, cache.begin())
+    assert cache.get(CONVERSATION_ID) is conversation
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from app.domain.crm.mirror import CRMMirror
+from app.domain.crm.service import CRMService
+from app.settings import settings
+
+
+class _DynamicsClient:
+    def __init__(self, collections):
+        self.collections = collections
+        self.calls = []
+
+    async def get_collection(self, entity_set, *, select=None, filter_expr=None, order_by=None, top=None):
+        self.calls.append((entity_set, filter_expr))
+        return list(self.collections.get(entity_set, []))
+
+
+def _this_month(day: int) -> str:
+    return date.today().replace(day=day).isoformat()
+
+
+def _opportunity(opportunity_id, state, *, value=1000, probability=50, close=None, actual=None, modified):
+    return {
+        "opportunityid": opportunity_id,
+        "name": f"Deal {opportunity_id}",
+        "statecode": state,
+        "estimatedvalue": value,
+        "closeprobability": probability,
+        "estimatedclosedate": close,
+        "actualvalue": actual,
+        "actualclosedate": _this_month(2) if actual is not None else None,
+        "_customerid_value@OData.Community.Display.V1.FormattedValue": "Acme",
+        "modifiedon": modified,
+    }
+
+
+def test_refresh_mirrors_entities_and_serves_sales_reads_locally(tmp_path):
+    mirror = CRMMirror(str(tmp_path / "crm.sqlite"))
+    client = _DynamicsClient(
+        {
+            "accounts": [{"accountid": "acc-1", "name": "Acme Corp", "modifiedon": "2026-01-01T00:00:00Z"}],
+            "contacts": [
+                {"contactid": "con-1", "fullname": "Jane Doe", "emailaddress1": "jane@acme.com", "modifiedon": "2026-01-01T00:00:00Z"}
+            ],
+            "opportunities": [
+                _opportunity("opp-1", 0, close=_this_month(20), modified="2026-01-01T00:00:00Z"),
+                _opportunity("opp-2", 0, value=3000, probability=10, close=_this_month(25), modified="2026-01-02T00:00:00Z"),
+                _opportunity("opp-3", 1, actual=2500, modified="2026-01-02T00:00:00Z"),
+                _opportunity("opp-4", 2, actual=0, modified="2026-01-02T00:00:00Z"),
+            ],
+        }
+    )
+
+    first = asyncio.run(mirror.refresh(client))
+
+    assert first.full is True and first.opportunities_seen == 4
+    assert all(filter_expr is None for _, filter_expr in client.calls)
+
+    service = CRMService(client=client, mirror=mirror)
+    client.calls.clear()
+
+    stats = asyncio.run(service.get_sales_stats())
+    assert stats.open_opportunities_count == 2
+    assert stats.open_pipeline_amount == 4000.0
+    assert stats.weighted_pipeline_amount == 800.0
+    assert (stats.won_this_month_count, stats.won_this_month_amount, stats.lost_this_month_count) == (1, 2500.0, 1)
+
+    pipeline = asyncio.run(service.get_sales_pipeline(top=1))
+    assert [item.opportunity_id for item in pipeline.items] == ["opp-1"]
+    assert pipeline.items[0].customer_name == "Acme"
+
+    forecast = asyncio.run(service.get_sales_forecast(months=2))
+    assert forecast.buckets[0].open_opportunities_count == 2
+    assert forecast.buckets[0].weighted_amount == 800.0
+    assert forecast.buckets[1].open_opportunities_count == 0
+
+    assert asyncio.run(service.get_accounts(search="acme")).items[0].account_id == "acc-1"
+    assert asyncio.run(service.get_contacts(search="jane@")).items[0].full_name == "Jane Doe"
+    assert client.calls == []
+
+    client.collections["opportunities"] = [
+        _opportunity("opp-1", 1, actual=900, modified="2026-01-03T00:00:00Z"),
+    ]
+    second = asyncio.run(mirror.refresh(client, full=False))
+
+    assert second.full is False
+    assert ("opportunities", "modifiedon ge 2026-01-02T00:00:00Z") in client.calls
+    assert asyncio.run(service.get_sales_stats()).open_opportunities_count == 1
+    assert mirror.status()["watermarks"]["opportunities"] == "2026-01-03T00:00:00Z"
+
+    third = asyncio.run(mirror.refresh(client, full=True))
+    assert third.rows_deleted == 3
+    assert mirror.status()["counts"]["opportunities"] == 1
+
+
+def test_service_queries_dynamics_until_mirror_has_refreshed(tmp_path):
+    mirror = CRMMirror(str(tmp_path / "crm.sqlite"))
+    client = _DynamicsClient({"accounts": [{"accountid": "acc-9", "name": "Remote"}]})
+
+    response = asyncio.run(CRMService(client=client, mirror=mirror).get_accounts(top=5))
+
+    assert response.items[0].account_id == "acc-9"
+    assert client.calls == [("accounts", None)]
+
+
+def test_service_falls_back_to_dynamics_when_mirror_is_stale(tmp_path):
+    mirror = CRMMirror(str(tmp_path / "crm.sqlite"))
+    asyncio.run(mirror.refresh(_DynamicsClient({"accounts": [{"accountid": "acc-1", "name": "Local"}]})))
+    assert mirror.is_ready
+
+    stale = datetime.now(timezone.utc) - timedelta(minutes=settings.crm_mirror_max_staleness_minutes + 1)
+    mirror._set_state("last_refreshed_at", stale.isoformat())
+    client = _DynamicsClient({"accounts": [{"accountid": "acc-9", "name": "Remote"}]})
+
+    response = asyncio.run(CRMService(client=client, mirror=mirror).get_accounts(top=5))
+
+    assert not mirror.is_ready
+    assert response.items[0].account_id == "acc-9"
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from app.domain.edi.service import EDIService
@@ -94,3 +96,52 @@ async def test_generate_purchase_order_850_requires_non_empty_lines():
 
     with pytest.raises(InvalidPurchaseOrderError):
         await service.generate_purchase_order_850("POEMPTY")
+
+
+class _RecordingOutbox:
+    def __init__(self):
+        self.files = []
+
+    async def send(self, local_file_path, **kwargs):
+        from migration.edi import SFTPSendResult
+
+        self.files.append(local_file_path)
+        return SFTPSendResult(True, remote_path=f"out/{local_file_path.rsplit('/', 1)[-1]}")
+
+
+class _CountingERPClient(_FakeERPClient):
+    def __init__(self):
+        self.vendor_calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def get_purchase_order_for_edi(self, po_number: str):
+        if po_number == "MISSING":
+            return None
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return await super().get_purchase_order_for_edi(po_number)
+
+    async def get_vendor(self, vendor_code: str):
+        self.vendor_calls += 1
+        await asyncio.sleep(0.01)
+        return await super().get_vendor(vendor_code)
+
+
+@pytest.mark.asyncio
+async def test_send_purchase_orders_850_runs_concurrently_and_reports_per_po(tmp_path, monkeypatch):
+    monkeypatch.setenv("EDI_BASE_PATH", str(tmp_path))
+    client = _CountingERPClient()
+    outbox = _RecordingOutbox()
+    service = EDIService(erp_client=client, outbox=outbox)
+
+    outcomes = await service.send_purchase_orders_850(["PO1", "PO2", "MISSING", "PO1", "PO3"], max_concurrency=4)
+
+    assert [outcome.po_number for outcome in outcomes] == ["PO1", "PO2", "MISSING", "PO3"]
+    assert [outcome.result.sent for outcome in outcomes if outcome.result] == [True, True, True]
+    assert outcomes[2].result is None and outcomes[2].error["code"] == "PO_NOT_FOUND"
+    assert client.peak == 3
+    assert client.vendor_calls == 1
+    assert len(outbox.files) == 3
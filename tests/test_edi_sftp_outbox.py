@@ -0,0 +1,134 @@
+import asyncio
+import threading
+
+from app.domain.edi.sftp_outbox import SFTPOutbox
+
+
+class _Transport:
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, seconds):
+        self.keepalive = seconds
+
+
+class _SSH:
+    def __init__(self):
+        self.transport = _Transport()
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.active = False
+
+
+class _SFTP:
+    def __init__(self, ssh, directories, drop_after=None):
+        self.ssh = ssh
+        self.directories = directories
+        self.drop_after = drop_after
+        self.puts = []
+        self.stats = []
+        self.threads = set()
+
+    def stat(self, path):
+        self.stats.append(path)
+        if path not in self.directories:
+            raise FileNotFoundError(path)
+
+    def mkdir(self, path):
+        self.directories.add(path)
+
+    def put(self, local_path, remote_path):
+        self.threads.add(threading.current_thread().name)
+        if self.drop_after is not None and len(self.puts) >= self.drop_after:
+            self.ssh.transport.active = False
+            raise EOFError("connection reset")
+        self.puts.append(remote_path)
+
+    def close(self):
+        pass
+
+
+class _Server:
+    def __init__(self, drop_first_session_after=None):
+        self.directories = set()
+        self.sessions = []
+        self.drop_first_session_after = drop_first_session_after
+
+    def connect(self):
+        ssh = _SSH()
+        drop_after = self.drop_first_session_after if not self.sessions else None
+        sftp = _SFTP(ssh, self.directories, drop_after=drop_after)
+        self.sessions.append(sftp)
+        return ssh, sftp
+
+
+def _write_files(tmp_path, count):
+    paths = []
+    for index in range(count):
+        path = tmp_path / f"PO_{index}.edi"
+        path.write_text("ISA", encoding="ascii")
+        paths.append(str(path))
+    return paths
+
+
+def test_outbox_batches_uploads_over_one_kept_alive_session(tmp_path):
+    server = _Server()
+    outbox = SFTPOutbox(
+        connect=server.connect,
+        remote_folder_path="/outbound/850",
+        batch_window_seconds=0.2,
+        keepalive_seconds=15,
+    )
+    paths = _write_files(tmp_path, 4)
+
+    async def _run():
+        return await asyncio.gather(*(outbox.send(path) for path in paths + [str(tmp_path / "missing.edi")]))
+
+    try:
+        results = asyncio.run(_run())
+        later = asyncio.run(outbox.send(paths[0]))
+    finally:
+        outbox.shutdown()
+
+    assert [result.success for result in results] == [True, True, True, True, False]
+    assert results[0].remote_path == "outbound/850/PO_0.edi"
+    assert "does not exist" in results[-1].message
+    assert later.success is True
+    assert len(server.sessions) == 1
+    session = server.sessions[0]
+    assert session.ssh.transport.keepalive == 15
+    assert session.threads == {"edi-sftp-outbox"}
+    # The directory tree is checked once; later uploads reuse the cache.
+    assert session.stats == ["outbound", "outbound/850"]
+    metrics = outbox.metrics()
+    assert metrics["files_sent"] == 5 and metrics["files_failed"] == 1
+    assert metrics["connections_opened"] == 1
+    assert metrics["batches"] == 2
+    assert metrics["worker_running"] is False
+
+
+def test_outbox_reconnects_when_the_session_drops(tmp_path):
+    server = _Server(drop_first_session_after=1)
+    outbox = SFTPOutbox(connect=server.connect, remote_folder_path="out", batch_window_seconds=0.2)
+    paths = _write_files(tmp_path, 3)
+
+    async def _run():
+        return await asyncio.gather(*(outbox.send(path, remove_local_on_success=True) for path in paths))
+
+    try:
+        results = asyncio.run(_run())
+    finally:
+        outbox.shutdown()
+
+    assert all(result.success for result in results)
+    assert len(server.sessions) == 2
+    assert server.sessions[0].puts == ["out/PO_0.edi"]
+    assert server.sessions[1].puts == ["out/PO_1.edi", "out/PO_2.edi"]
+    assert not any((tmp_path / f"PO_{index}.edi").exists() for index in range(3))
@@ -1,8 +1,9 @@
 import asyncio
-from datetime import datetime
+from datetime import date
 from decimal import Decimal
 
 from app.domain.finance.accounts_receivable_service import AccountsReceivableService
+from app.integrations.ar_open_invoices_cache_repository import ArOpenInvoicesCacheRepository
 
 
 class _LedgerERPStub:
@@ -24,24 +25,6 @@ class _StatsRepoEmpty:
         return {}
 
 
-class _CacheRepoStub:
-    def __init__(self, existing_payload):
-        self.is_configured = True
-        self._cache = (datetime.utcnow(), list(existing_payload))
-        self.saved_payload = None
-
-    def get_cache(self, cache_key):
-        _ = cache_key
-        return self._cache
-
-    def upsert_cache(self, cache_key, payload):
-        _ = cache_key
-        self.saved_payload = list(payload)
-        updated_at = datetime.utcnow()
-        self._cache = (updated_at, list(payload))
-        return updated_at
-
-
 def test_list_open_invoices_maps_customer_ledger_fields():
     erp = _LedgerERPStub(
         [
@@ -83,7 +66,7 @@ def test_list_open_invoices_maps_customer_ledger_fields():
     assert invoice.closed is False
 
 
-def test_refresh_open_invoices_cache_keeps_distinct_entries_with_same_document_no():
+def test_refresh_open_invoices_cache_keeps_distinct_entries_with_same_document_no(tmp_path):
     erp = _LedgerERPStub(
         [
             {
@@ -98,7 +81,9 @@ def test_refresh_open_invoices_cache_keeps_distinct_entries_with_same_document_n
             }
         ]
     )
-    cache_repo = _CacheRepoStub(
+    cache_repo = ArOpenInvoicesCacheRepository(str(tmp_path / "ar_cache.sqlite"))
+    cache_repo.upsert_cache(
+        "open_invoices",
         [
             {
                 "entry_no": 1,
@@ -109,7 +94,7 @@ def test_refresh_open_invoices_cache_keeps_distinct_entries_with_same_document_n
                 "remaining_amount": "100.00",
                 "remaining_amt": "100.00",
             }
-        ]
+        ],
     )
     svc = AccountsReceivableService(
         erp_client=erp,
@@ -120,5 +105,44 @@ def test_refresh_open_invoices_cache_keeps_distinct_entries_with_same_document_n
     status = asyncio.run(svc.refresh_open_invoices_cache("open_invoices", replace=False))
 
     assert status.invoice_count == 2
-    assert cache_repo.saved_payload is not None
-    assert {item["entry_no"] for item in cache_repo.saved_payload} == {1, 2}
+    cached = svc.get_cached_open_invoices("open_invoices")
+    assert cached is not None
+    assert {item.entry_no for item in cached} == {1, 2}
+
+
+def test_cached_open_invoices_filter_and_page_in_storage(tmp_path):
+    cache_repo = ArOpenInvoicesCacheRepository(str(tmp_path / "ar_cache.sqlite"))
+    cache_repo.upsert_cache(
+        "open_invoices",
+        [
+            {"entry_no": 1, "invoice_no": "INV-1", "customer_no": "CUST-A", "due_date": "2026-02-01"},
+            {"entry_no": 2, "invoice_no": "INV-2", "customer_no": "CUST-A", "due_date": "2026-01-01"},
+            {"entry_no": 3, "invoice_no": "INV-3", "customer_no": "CUST-B", "due_date": None},
+            {"entry_no": 4, "invoice_no": "INV-4", "customer_no": "ZZ-INTERNAL", "due_date": "2025-01-01"},
+        ],
+    )
+    erp = _LedgerERPStub(
+        [
+            {
+                "Entry_No": 1,
+                "Document_No": "INV-1",
+                "Customer_No": "CUST-A",
+                "Due_Date": "2026-03-15",
+                "Remaining_Amount": "10.00",
+                "Open": True,
+            }
+        ]
+    )
+    svc = AccountsReceivableService(erp_client=erp, stats_repo=_StatsRepoEmpty(), cache_repo=cache_repo)
+
+    assert [inv.invoice_no for inv in svc.get_cached_open_invoices("open_invoices")] == ["INV-2", "INV-1", "INV-3"]
+    assert svc.count_cached_open_invoices("open_invoices", customer_no="CUST-A") == 2
+    page = svc.get_cached_open_invoices("open_invoices", due_from=date(2026, 1, 15), limit=1)
+    assert [inv.invoice_no for inv in page] == ["INV-1"]
+
+    asyncio.run(svc.refresh_open_invoices_cache("open_invoices", invoice_no="INV-1"))
+
+    refreshed = svc.get_cached_open_invoices("open_invoices", invoice_no="INV-1")
+    assert refreshed[0].due_date == date(2026, 3, 15)
+    assert svc.get_cache_status("open_invoices").invoice_count == 4
+    assert svc.get_cached_open_invoices("other_key") is None
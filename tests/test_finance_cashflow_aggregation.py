@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+
+from app.domain.finance.cashflow_aggregation import CashflowColumns, to_fixed
+from app.domain.finance.models import CashflowSource, CurrencyCode, TransactionType
+
+
+def _columns(*, keep_entries: bool) -> CashflowColumns:
+    columns = CashflowColumns(keep_entries=keep_entries)
+    columns.append(
+        day=date(2026, 3, 2),
+        amount=Decimal("100.25"),
+        currency=CurrencyCode.CAD,
+        transaction_type=TransactionType.DEPOSIT,
+        source=CashflowSource.ERP_SALES,
+        description="Posted Invoice INV-1",
+        reference_id="INV-1",
+    )
+    columns.append(
+        day=date(2026, 3, 2),
+        amount="40.10",
+        currency=CurrencyCode.CAD,
+        transaction_type=TransactionType.PAYMENT,
+        source=CashflowSource.ERP_PURCHASE,
+        description="Posted Purchase Inv PI-1",
+        reference_id="PI-1",
+    )
+    columns.append(
+        day=date(2026, 3, 3),
+        amount=7,
+        currency=CurrencyCode.USD,
+        transaction_type=TransactionType.PAYMENT,
+        source=CashflowSource.MANUAL,
+        description="Fees",
+    )
+    # Outside the requested window: ignored.
+    columns.append(
+        day=date(2026, 4, 1),
+        amount=5,
+        currency=CurrencyCode.CAD,
+        transaction_type=TransactionType.DEPOSIT,
+        source=CashflowSource.MANUAL,
+        description="Later",
+    )
+    return columns
+
+
+def test_aggregate_sums_fixed_point_amounts_per_day_and_currency():
+    flows = _columns(keep_entries=True).aggregate(date(2026, 3, 2), date(2026, 3, 3))
+
+    assert len(flows) == 2 * len(CurrencyCode)
+    cad = next(f for f in flows if f.date == date(2026, 3, 2) and f.currency == CurrencyCode.CAD)
+    assert cad.total_deposit == Decimal("100.25")
+    assert cad.total_payment == Decimal("40.1")
+    assert cad.net_flow == Decimal("60.15")
+    assert [e.reference_id for e in cad.entries] == ["INV-1", "PI-1"]
+    assert cad.entries[1].amount == Decimal("40.1")
+
+
+def test_aggregate_without_entries_and_with_currency_filter():
+    flows = _columns(keep_entries=False).aggregate(
+        date(2026, 3, 1), date(2026, 3, 3), currency_filter=CurrencyCode.USD
+    )
+
+    assert [f.currency for f in flows] == [CurrencyCode.USD] * 3
+    assert [f.net_flow for f in flows] == [Decimal("0"), Decimal("0"), Decimal("-7")]
+    assert all(f.entries == [] for f in flows)
+
+
+def test_to_fixed_rounds_half_up():
+    assert to_fixed(Decimal("1.23455")) == 12346
+    assert to_fixed(None) == 0
+
+
+def test_unknown_currency_is_warned_on_every_lookup(caplog):
+    from app.domain.finance.service import _currency_for_code
+
+    with caplog.at_level("WARNING", logger="app.domain.finance.service"):
+        assert _currency_for_code("xyz") is CurrencyCode.CAD
+        assert _currency_for_code("XYZ ") is CurrencyCode.CAD
+        assert _currency_for_code("usd") is CurrencyCode.USD
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages.count("Unknown currency code XYZ, defaulting to CAD") == 2
@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+from app.domain.finance.cashflow_projection_cache import CashflowProjectionCache
+from app.domain.finance.service import CashflowService
+from app.settings import settings
+
+
+class _ERPStub:
+    def __init__(self) -> None:
+        self.calls: list[tuple[date, date]] = []
+
+    async def get_posted_sales_invoices(self, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return [
+            {"No": "INV-1", "Due_Date": start_date.replace(day=5).isoformat()},
+            {"No": "INV-2", "Due_Date": start_date.replace(day=20).isoformat()},
+        ]
+
+
+class _ContiniaStub:
+    is_configured = True
+
+
+def _service(tmp_path) -> tuple[CashflowService, _ERPStub]:
+    erp = _ERPStub()
+    cache = CashflowProjectionCache(db_path=str(tmp_path / "cashflow.sqlite"))
+    return CashflowService(erp, None, _ContiniaStub(), partition_cache=cache), erp
+
+
+@pytest.mark.asyncio
+async def test_closed_month_partition_is_fetched_once_and_filtered_locally(tmp_path):
+    service, erp = _service(tmp_path)
+
+    partial = await service._load_source_month("posted_sales_invoices", date(2020, 3, 10), date(2020, 3, 31))
+    full = await service._load_source_month("posted_sales_invoices", date(2020, 3, 1), date(2020, 3, 31))
+
+    assert erp.calls == [(date(2020, 3, 1), date(2020, 3, 31))]
+    assert [row["No"] for row in partial] == ["INV-2"]
+    assert [row["No"] for row in full] == ["INV-1", "INV-2"]
+
+
+@pytest.mark.asyncio
+async def test_open_month_partition_is_revalidated(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cashflow_open_month_partition_ttl_seconds", 0)
+    service, erp = _service(tmp_path)
+    month_start = date.today().replace(day=1)
+
+    await service._load_source_month("posted_sales_invoices", month_start, month_start)
+    await service._load_source_month("posted_sales_invoices", month_start, month_start)
+
+    assert len(erp.calls) == 2
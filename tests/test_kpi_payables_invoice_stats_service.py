@@ -43,8 +43,8 @@ class _Values:
 class _StubContiniaRepo:
     is_configured = True
 
-    def get_document_values_batch(self, document_nos):
-        _ = document_nos
+    def get_document_values_batch(self, document_nos, *, codes=None):
+        _ = document_nos, codes
         return {
             "C-1": _Values(Decimal("125.00")),
         }
@@ -1,3 +1,4 @@
+import asyncio
 import datetime as dt
 
 import pytest
@@ -176,3 +177,78 @@ async def test_tool_prediction_service_refresh_and_latest(monkeypatch) -> None:
 def test_parse_tool_prediction_targets() -> None:
     targets = parse_tool_prediction_targets("40253:DMC100, 40279:NHX5500, 40253:DMC100")
     assert targets == [("40253", "DMC100"), ("40279", "NHX5500")]
+
+
+class _CountingFutureNeedsService(_StubFutureNeedsService):
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def get_future_needs(self, work_center_no: str, refresh: bool):
+        self.calls.append(work_center_no)
+        return await super().get_future_needs(work_center_no, refresh)
+
+
+class _MultiTargetSnapshotRepository(_StubSnapshotRepository):
+    def __init__(self) -> None:
+        super().__init__()
+        self.written: dict[str, int] = {}
+
+    def upsert_snapshot_rows(self, *, machine_center: str, rows: list[dict], **kwargs) -> int:
+        self.written[machine_center] = len(rows)
+        return super().upsert_snapshot_rows(machine_center=machine_center, rows=rows, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_refresh_runs_targets_concurrently_and_records_stage_timings(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.domain.kpi.tool_prediction_service.settings.tool_prediction_targets",
+        "40253:DMC100,40253:DMC200",
+    )
+    future_needs = _CountingFutureNeedsService()
+    snapshot_repo = _MultiTargetSnapshotRepository()
+    service = ToolPredictionKpiService(
+        future_needs_service=future_needs,
+        usage_history_service=_StubUsageHistoryService(),
+        feature_repository=_StubFeatureRepository(),
+        snapshot_repository=snapshot_repo,
+        predictor_client=_StubPredictorClient(),
+    )
+
+    written = await service.refresh_snapshot(snapshot_date=dt.date(2026, 3, 4), refresh_sources=True)
+
+    assert written == 2
+    assert snapshot_repo.written == {"DMC100": 1, "DMC200": 1}
+    # Both machine centers share work center 40253's future-needs build.
+    assert future_needs.calls == ["40253"]
+    for target in ("40253:DMC100", "40253:DMC200"):
+        stages = service.last_refresh_timings[target]
+        assert {"future_needs", "usage_history", "inventory_metrics", "predict", "write", "total"} <= set(stages)
+
+
+class _FailingTargetPredictorClient(_StubPredictorClient):
+    async def predict_rows(self, *, machine_center: str, rows: list[dict]):
+        if machine_center == "DMC100":
+            raise RuntimeError("predictor down")
+        await asyncio.sleep(0.02)
+        return await super().predict_rows(machine_center=machine_center, rows=rows)
+
+
+@pytest.mark.asyncio
+async def test_refresh_waits_for_every_target_before_raising(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.domain.kpi.tool_prediction_service.settings.tool_prediction_targets",
+        "40253:DMC100,40253:DMC200",
+    )
+    snapshot_repo = _MultiTargetSnapshotRepository()
+    service = ToolPredictionKpiService(
+        future_needs_service=_StubFutureNeedsService(),
+        usage_history_service=_StubUsageHistoryService(),
+        feature_repository=_StubFeatureRepository(),
+        snapshot_repository=snapshot_repo,
+        predictor_client=_FailingTargetPredictorClient(),
+    )
+
+    with pytest.raises(RuntimeError, match="predictor down"):
+        await service.refresh_snapshot(snapshot_date=dt.date(2026, 3, 4), refresh_sources=True)
+
+    assert snapshot_repo.written == {"DMC200": 1}
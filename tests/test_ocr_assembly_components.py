@@ -1,10 +1,12 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from fastapi.testclient import TestClient
 
 from app.main import create_app
 from app.deps import get_db
+from app.domain.documents.pdf_rendering import PdfRenderService
 from app.settings import settings
 
 
@@ -48,6 +50,11 @@ def client(monkeypatch):
 
     monkeypatch.setattr("app.main.verify_database_connection", _verify_database_connection)
     monkeypatch.setattr("app.main.dispose_engine", lambda: None)
+    # Keep the bubble lookup in-process; spawning the render pool here is slow and flaky.
+    monkeypatch.setattr(
+        "app.domain.ocr.assembly_components_service.pdf_renderer",
+        PdfRenderService(executor=ThreadPoolExecutor(max_workers=1)),
+    )
 
     app = create_app()
     app.dependency_overrides[get_db] = lambda: object()
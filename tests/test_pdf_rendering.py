@@ -0,0 +1,89 @@
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from app.domain.documents.pdf_rendering import InvalidPdfError, PageRenderSpec, PdfRenderService
+
+
+def _pdf(pages=3):
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page(width=400, height=300)
+        page.insert_text((40, 60), f"Page {number} BORE 12.5")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _service(**kwargs):
+    options = dict(max_workers=2, max_concurrent_requests=2, cache_max_bytes=10 * 1024 * 1024)
+    options.update(kwargs)
+    return PdfRenderService(executor=ThreadPoolExecutor(max_workers=2), **options)
+
+
+def _png_size(data_url):
+    png = base64.b64decode(data_url.split(",", 1)[1])
+    pixmap = fitz.Pixmap(png)
+    return pixmap.width, pixmap.height
+
+
+def test_render_pages_applies_budgets_and_serves_repeats_from_cache():
+    service = _service(max_pages=10)
+    pdf = _pdf()
+    specs = [
+        PageRenderSpec(0, 1.0),
+        PageRenderSpec(0, 2.0, clip=(0.5, 0.5, 1.0, 1.0)),
+        PageRenderSpec(1, 1.0),
+        PageRenderSpec(2, 1.0),
+        PageRenderSpec(7, 1.0),
+    ]
+
+    first = asyncio.run(service.render_pages(pdf, specs, max_pages=2))
+    assert [page.spec for page in first] == specs[:3]
+    assert not any(page.cached for page in first)
+    assert _png_size(first[0].data_url()) == (400, 300)
+    assert _png_size(first[1].data_url()) == (400, 300)
+    assert "".join(first[2].iter_data_url(chunk_size=1000)) == first[2].data_url()
+
+    second = asyncio.run(service.render_pages(pdf, specs))
+    assert [page.spec.page for page in second] == [0, 0, 1, 2]
+    assert [page.cached for page in second] == [True, True, True, False]
+    assert service.cache.metrics()["entries"] == 4
+
+    capped = asyncio.run(service.render_pages(pdf, specs, max_bytes=first[0].encoded_size))
+    assert [page.spec for page in capped] == specs[:1]
+    assert service.metrics()["budget_exceeded"] >= 2
+
+    with pytest.raises(InvalidPdfError):
+        asyncio.run(service.render_pages(b"not a pdf", specs))
+
+
+def test_large_pages_are_downscaled_and_text_is_extracted_per_page():
+    service = _service(max_page_pixels=30_000)
+    pdf = _pdf(pages=2)
+
+    urls = asyncio.run(service.render_data_urls(pdf, [PageRenderSpec(0, 4.0)]))
+    width, height = _png_size(urls[0])
+    assert width * height <= 30_000 * 1.02
+
+    pages = asyncio.run(service.extract_text(pdf))
+    assert [text.strip() for text in pages] == ["Page 1 BORE 12.5", "Page 2 BORE 12.5"]
+    assert asyncio.run(service.extract_text(pdf, max_pages=1)) == pages[:1]
+
+
+def test_worker_groups_share_the_request_byte_budget(monkeypatch):
+    service = _service(max_workers=3, max_request_bytes=9_000)
+    submitted = []
+    original_submit = service._submit
+
+    async def _submit(fn, /, *args, **kwargs):
+        submitted.append(kwargs.get("max_bytes"))
+        return await original_submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(service, "_submit", _submit)
+    asyncio.run(service.render_pages(_pdf(), [PageRenderSpec(page) for page in range(3)]))
+
+    assert submitted == [3_000, 3_000, 3_000]
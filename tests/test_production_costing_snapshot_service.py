@@ -39,6 +39,7 @@ class _StubRepository:
         self._scan_id = UUID("10000000-0000-0000-0000-000000000001")
         self._row: dict | None = None
         self.inserted = 0
+        self.bulk_calls: list[int] = []
         self.created_mode: str | None = None
         self.create_scan_calls = 0
         self.upsert_calls: list[tuple[str, dt.datetime | None]] = []
@@ -75,6 +76,11 @@ class _StubRepository:
         self.inserted += len(rows)
         return len(rows)
 
+    def bulk_insert_line_snapshots(self, rows, *, chunk_size):
+        _ = chunk_size
+        self.bulk_calls.append(len(rows))
+        return self.insert_line_snapshots(rows)
+
     def upsert_source_state(self, *, source_type: str, last_successful_modified_at, last_scan_id):
         _ = last_scan_id
         self.upsert_calls.append((source_type, last_successful_modified_at))
@@ -217,3 +223,118 @@ async def test_delta_scan_skips_when_header_date_equals_watermark():
     assert result.status == "skipped_no_changes"
     assert result.snapshot_created is False
     assert repo.create_scan_calls == 0
+
+
+@pytest.mark.asyncio
+async def test_latest_source_snapshot_parses_snapshot_lines():
+    class _SourceRepository(_StubRepository):
+        def list_source_snapshot_rows(self, *, source_type, source_no, base_item_no):
+            assert (source_type, source_no, base_item_no) == ("routing", "7403032-12", "7403032")
+            return [
+                {
+                    "scan_id": "10000000-0000-0000-0000-000000000001",
+                    "scan_started_at": dt.datetime(2026, 2, 18, 12, 0, 0),
+                    "header_last_modified_at": dt.datetime(2026, 2, 17),
+                    "row_json": '{"Routing_No":"7403032-12","Operation_No":"10"}',
+                },
+                {"scan_id": "10000000-0000-0000-0000-000000000001", "row_json": "not-json"},
+            ]
+
+    repo = _SourceRepository(routing_since=None, bom_since=None)
+    service = ProductionCostingSnapshotService(erp_client=_StubERPClient(), repository=repo)
+
+    snapshot = await service.get_latest_source_snapshot(source_type="routing", source_no=" 7403032-12 ")
+
+    assert snapshot is not None
+    assert snapshot.revision == "12"
+    assert snapshot.line_count == 2
+    assert snapshot.lines == [{"Routing_No": "7403032-12", "Operation_No": "10"}]
+
+
+@pytest.mark.asyncio
+async def test_delta_scan_buffers_changed_sources_into_one_bulk_load():
+    class _ManyRoutingsClient(_StubERPClient):
+        async def get_routing_headers(self, *, last_modified_after=None):
+            self.routing_headers_filters.append(last_modified_after)
+            return [{"No": f"74030{index}-12", "Last_Date_Modified": "2026-02-17"} for index in range(3)]
+
+    client = _ManyRoutingsClient()
+    repo = _StubRepository(routing_since=dt.datetime(2026, 2, 16), bom_since=dt.datetime(2026, 2, 18))
+    service = ProductionCostingSnapshotService(erp_client=client, repository=repo)
+
+    result = await service.run_scan(full_refresh=False, trigger_source="scheduler")
+
+    assert sorted(client.routing_lines_calls) == ["740300-12", "740301-12", "740302-12"]
+    assert result.routing_lines_count == 3
+    assert repo.bulk_calls == [3]
+
+
+def test_bulk_insert_falls_back_to_batched_inserts_without_pyodbc(monkeypatch):
+    from sqlalchemy import create_engine
+
+    from app.integrations.cedule_production_costing_repository import CeduleProductionCostingRepository
+
+    repo = CeduleProductionCostingRepository(engine=create_engine("sqlite://"))
+    batches: list[int] = []
+
+    def _insert(rows):
+        batches.append(len(rows))
+        return len(rows)
+
+    monkeypatch.setattr(repo, "insert_line_snapshots", _insert)
+
+    rows = ({"scan_id": "s", "line_key": str(index)} for index in range(5))
+    assert repo.bulk_insert_line_snapshots(rows, chunk_size=2) == 5
+    assert batches == [2, 2, 1]
+
+
+class _FakeBulkCursor:
+    def __init__(self, merged_per_chunk):
+        self.merged_per_chunk = list(merged_per_chunk)
+        self.rowcount = -1
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        self.rowcount = self.merged_per_chunk.pop(0) if "MERGE" in sql else -1
+        return self
+
+    def executemany(self, sql, params):
+        self.rowcount = len(params)
+
+    def setinputsizes(self, sizes):
+        pass
+
+
+class _FakeBulkConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_bulk_insert_counts_only_rows_the_merge_inserted(monkeypatch):
+    import types
+
+    from sqlalchemy import create_engine
+
+    from app.integrations import cedule_production_costing_repository as costing_module
+
+    repo = costing_module.CeduleProductionCostingRepository(engine=create_engine("sqlite://"))
+    cursor = _FakeBulkCursor(merged_per_chunk=[2, 0, 1])
+    monkeypatch.setattr(
+        costing_module, "fast_executemany_dbapi", lambda engine: types.SimpleNamespace(Error=RuntimeError)
+    )
+    monkeypatch.setattr(repo._engine, "raw_connection", lambda: _FakeBulkConnection(cursor))
+
+    rows = ({"scan_id": "s", "line_key": str(index)} for index in range(5))
+    assert repo.bulk_insert_line_snapshots(rows, chunk_size=2) == 3
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+import pytest
+
+from app.domain.erp.bom_explosion import BomExplosionCache, BomExplosionEngine
+from app.domain.erp.models import ProductionCostingSourceSnapshot
+from app.domain.erp.production_service import ProductionService
+from app.domain.erp.work_center_rates import WorkCenterRateTable
+from app.errors import DatabaseError
+
+
+class _StubERPClient:
+    def __init__(self) -> None:
+        self.routing_calls: list[str] = []
+        self.work_center_calls: list[str] = []
+        self.work_centers_calls = 0
+
+    async def get_item(self, item_id: str):
+        return {"No": item_id, "Routing_No": "R-100", "Production_BOM_No": ""}
+
+    async def get_bom_routing_lines(self, routing_no: str):
+        self.routing_calls.append(routing_no)
+        return [{"Type": "Work Center", "WorkCenterNo": "WC-2", "SetupTime": 10, "RunTime": 1}]
+
+    async def get_work_centers(self):
+        self.work_centers_calls += 1
+        return [{"No": "WC-1", "Unit_Cost": 60}, {"No": "WC-2", "Unit_Cost": 120}]
+
+    async def get_work_center(self, work_center_no: str):
+        self.work_center_calls.append(work_center_no)
+        return {"No": work_center_no, "Unit_Cost": 30}
+
+
+class _StubSnapshotService:
+    def __init__(self, lines=None, error: Exception | None = None) -> None:
+        self._lines = lines
+        self._error = error
+
+    async def get_latest_source_snapshot(self, *, source_type: str, source_no: str):
+        if self._error:
+            raise self._error
+        if self._lines is None:
+            return None
+        return ProductionCostingSourceSnapshot(
+            source_type=source_type,
+            source_no=source_no,
+            base_item_no=source_no,
+            scan_id="scan-1",
+            line_count=len(self._lines),
+            lines=self._lines,
+        )
+
+
+def _service(client, snapshot_service, rate_table):
+    return ProductionService(
+        erp_client=client,
+        bom_engine=BomExplosionEngine(erp_client=client, cache=BomExplosionCache(ttl_seconds=0)),
+        costing_snapshot_service=snapshot_service,
+        rate_table=rate_table,
+    )
+
+
+@pytest.mark.asyncio
+async def test_routing_costs_read_snapshot_lines_and_cached_rates():
+    client = _StubERPClient()
+    lines = [
+        {"Type": "Work Center", "Work_Center_No": "WC-1", "Setup_Time": 30, "Run_Time": 2},
+        {"Type": "Work Center", "Work_Center_No": "WC-9", "Setup_Time": 0, "Run_Time": 4},
+    ]
+    service = _service(client, _StubSnapshotService(lines), WorkCenterRateTable(max_age_seconds=3600))
+
+    result = await service.get_routing_costs("ITEM-1")
+
+    assert result.source == "snapshot"
+    assert result.snapshot_scan_id == "scan-1"
+    assert client.routing_calls == []
+    assert client.work_centers_calls == 1
+    assert client.work_center_calls == ["WC-9"]
+    assert result.lines[0].cost_per_minute == Decimal("1.0000")
+    assert result.lines[1].cost_per_minute == Decimal("0.5000")
+    assert result.total_cost == Decimal("34.0000")
+
+
+@pytest.mark.asyncio
+async def test_routing_costs_fall_back_to_erp_when_snapshot_unavailable():
+    client = _StubERPClient()
+    rate_table = WorkCenterRateTable(max_age_seconds=3600)
+    rate_table.replace([{"No": "WC-2", "Unit_Cost": 120}])
+    service = _service(client, _StubSnapshotService(error=DatabaseError("down")), rate_table)
+
+    result = await service.get_routing_costs("ITEM-1")
+
+    assert result.source == "erp"
+    assert result.snapshot_scan_id is None
+    assert client.routing_calls == ["R-100"]
+    assert client.work_centers_calls == 0
+    assert result.total_cost == Decimal("22.0000")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from sqlalchemy.exc import OperationalError
+
+from app.integrations.schema_capabilities import SchemaCapabilityCache
+from app.integrations.tool_prediction_feature_repository import ToolPredictionFeatureRepository
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+    def mappings(self):
+        return self
+
+
+class _Connection:
+    def __init__(self, engine: "_FakeEngine") -> None:
+        self._engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self._engine.statements.append(sql)
+        if "INFORMATION_SCHEMA.COLUMNS" in sql:
+            if self._engine.probe_fails:
+                raise OperationalError(sql, {}, Exception("permission denied"))
+            return _Result(self._engine.columns)
+        return _Result([])
+
+
+class _FakeEngine:
+    def __init__(self, columns, probe_fails: bool = False) -> None:
+        self.columns = columns
+        self.probe_fails = probe_fails
+        self.statements: list[str] = []
+
+    def connect(self):
+        return _Connection(self)
+
+    @property
+    def probes(self) -> int:
+        return sum("INFORMATION_SCHEMA.COLUMNS" in sql for sql in self.statements)
+
+
+_HISTORY_COLUMNS = [
+    ("dbo", "ToolInstanceHistory", "ToolId"),
+    ("dbo", "ToolInstanceHistory", "SnapshotDate"),
+]
+
+
+def test_probe_runs_once_per_engine_and_answers_tables_and_columns() -> None:
+    engine = _FakeEngine(_HISTORY_COLUMNS)
+    cache = SchemaCapabilityCache(ttl_seconds=300)
+
+    assert cache.has_table(engine, "[Cedule].[dbo].[ToolInstanceHistory]") is True
+    assert cache.has_column(engine, "Cedule.dbo.ToolInstanceHistory", "snapshotdate") is True
+    assert cache.has_column(engine, "[Cedule].[dbo].[ToolInstanceHistory]", "SnapshotTimestamp") is False
+    assert cache.has_table(engine, "[Cedule].[dbo].[Missing]") is False
+    assert engine.probes == 1
+
+    cache.invalidate(engine)
+    cache.has_table(engine, "[Cedule].[dbo].[ToolInstanceHistory]")
+    assert engine.probes == 2
+
+
+def test_failed_probe_reports_unknown() -> None:
+    engine = _FakeEngine([], probe_fails=True)
+    cache = SchemaCapabilityCache(ttl_seconds=300)
+
+    assert cache.has_column(engine, "[Cedule].[dbo].[ToolInstanceHistory]", "SnapshotDate") is None
+
+
+def test_feature_repository_picks_query_variant_from_schema() -> None:
+    engine = _FakeEngine(_HISTORY_COLUMNS)
+    repository = ToolPredictionFeatureRepository(engine=engine)
+
+    repository.list_inventory_metrics(machine_center="DMC100")
+    repository.list_inventory_metrics(machine_center="DMC100")
+
+    feature_queries = [sql for sql in engine.statements if "INFORMATION_SCHEMA" not in sql]
+    assert len(feature_queries) == 2
+    assert all("SnapshotTimestamp" not in sql for sql in feature_queries)
+    assert engine.probes == 1
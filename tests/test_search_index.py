@@ -0,0 +1,111 @@
+import asyncio
+import importlib
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.domain.search.index import (
+    SearchDocument,
+    SearchIndex,
+    SearchSourceBatch,
+    SubcontractingCustomerSearchSource,
+)
+from app.main import app
+
+search_router_module = importlib.import_module("app.api.v1.search.router")
+
+
+class _Source:
+    def __init__(self, entity_type, documents, *, watermark=None, complete=False):
+        self.entity_type = entity_type
+        self.documents = documents
+        self.watermark = watermark
+        self.complete = complete
+        self.seen_watermarks = []
+
+    async def fetch(self, watermark):
+        self.seen_watermarks.append(watermark)
+        return SearchSourceBatch(list(self.documents), self.watermark, complete=self.complete or watermark is None)
+
+
+def _item(no, description, vendor_item_no=""):
+    return SearchDocument("item", no, no, description, body=vendor_item_no)
+
+
+def _build(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+    items = _Source(
+        "item",
+        [
+            _item("BOLT-100", "Hex bolt M10"),
+            _item("100-BOLT", "Carriage bolt"),
+            _item("NUT-1", "Lock nut", vendor_item_no="SKF-BOLTLOCK"),
+        ],
+        watermark="2026-01-01T00:00:00Z",
+    )
+    customers = _Source("customer", [SearchDocument("customer", "C001", "C001", "Québec Acier", subtitle="Lévis")])
+    return index, items, customers
+
+
+def test_search_ranks_code_then_title_and_applies_incremental_changes(tmp_path):
+    index, items, customers = _build(tmp_path)
+    first = asyncio.run(index.refresh([items, customers]))
+    assert first.full is True and first.documents_upserted == 4
+
+    hits = index.search("bolt")
+    assert [hit.entity_id for hit in hits] == ["BOLT-100", "100-BOLT", "NUT-1"]
+    assert hits[0].rank < hits[1].rank < hits[2].rank
+
+    assert [hit.entity_id for hit in index.search("quebec")] == ["C001"]
+    assert [hit.entity_id for hit in index.search("Lev")] == ["C001"]
+    assert [hit.entity_id for hit in index.search("bo", entity_types=["item"])] == ["BOLT-100"]
+    assert index.search("hex m10")[0].entity_id == "BOLT-100"
+    assert index.search("bolt", entity_types=["customer"]) == []
+
+    items.documents = [_item("BOLT-100", "Hex bolt M12")]
+    items.watermark = "2026-01-02T00:00:00Z"
+    second = asyncio.run(index.refresh([items, customers], full=False))
+
+    assert items.seen_watermarks[-1] == "2026-01-01T00:00:00Z"
+    assert second.documents_deleted == 0
+    assert index.search("m12")[0].entity_id == "BOLT-100"
+    assert index.search("m10") == []
+    assert len(index.search("bolt")) == 3
+
+    items.documents = [_item("BOLT-100", "Hex bolt M12")]
+    third = asyncio.run(index.refresh([items], full=True))
+    assert third.documents_deleted == 2
+    assert index.status()["counts"] == {"customer": 1, "item": 1}
+
+
+def test_typeahead_endpoint_serves_local_index(tmp_path, monkeypatch):
+    index, items, customers = _build(tmp_path)
+    asyncio.run(index.refresh([items, customers]))
+    monkeypatch.setattr(search_router_module, "search_index", index)
+    client = TestClient(app)
+
+    started = time.perf_counter()
+    response = client.get("/api/v1/search/typeahead", params={"q": "acier", "types": ["customer", "item"]})
+
+    assert response.status_code == 200, response.text
+    payload = response.json()
+    assert payload["count"] == 1
+    assert payload["items"][0]["title"] == "Québec Acier"
+    assert payload["took_ms"] < (time.perf_counter() - started) * 1000
+
+    assert client.get("/api/v1/search/typeahead", params={"q": "x", "types": ["unknown"]}).status_code == 422
+
+
+def test_subcontracting_source_indexes_every_customer():
+    class _Repository:
+        def list_all_customers(self):
+            return [
+                SimpleNamespace(customer_id=f"id-{n}", name=f"Client {n}", contact_name=None, email=None, phone=None)
+                for n in range(1500)
+            ]
+
+    batch = asyncio.run(SubcontractingCustomerSearchSource(_Repository()).fetch(None))
+
+    assert batch.complete is True
+    assert len(batch.documents) == 1500
@@ -0,0 +1,104 @@
+import importlib
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from app.domain.service.models import ServiceItem, ServiceItemCreateRequest, ServiceItemCreateResponse
+from app.domain.service.service_catalog_service import ServiceCatalogCache, ServiceCatalogService
+from app.main import app
+
+service_router = importlib.import_module("app.api.v1.service.router")
+
+
+class _FakeRepository:
+    is_configured = True
+
+    def __init__(self):
+        self.catalog_calls = 0
+        self.asset_calls = 0
+        self.rows = [
+            {"kind": "division", "id": "2", "description": "Hydraulique", "parent_id": None},
+            {"kind": "division", "id": "1", "description": "Pneumatique", "parent_id": None},
+            {"kind": "equipement", "id": "10", "description": "Compresseur ", "parent_id": "1"},
+            {"kind": "equipement", "id": "9", "description": "Pompe", "parent_id": "2"},
+            {"kind": "equipement", "id": "X1", "description": "Divers", "parent_id": None},
+            {"kind": "modele", "id": "GA37", "description": "GA 37", "parent_id": "10"},
+            {"kind": "modele", "id": "P200", "description": "P 200", "parent_id": "9"},
+            {"kind": "field_type", "id": "Moteur", "description": "compresseur", "attribute1_header": "HP"},
+            {"kind": "field_type", "id": "Garantie", "description": None, "attribute1_header": "Mois"},
+        ]
+
+    def fetch_catalog_rows(self):
+        self.catalog_calls += 1
+        return list(self.rows)
+
+    def fetch_customer_asset_rows(self, customer_id):
+        self.asset_calls += 1
+        return [{"service_item_id": 5, "customer_id": customer_id, "equipement_id": "10"}]
+
+    def create_service_item(self, payload):
+        return ServiceItemCreateResponse(service_item=ServiceItem(service_item_id=6, customer_id=payload.customer_id))
+
+
+def _service():
+    repository = _FakeRepository()
+    return ServiceCatalogService(repository=repository, cache=ServiceCatalogCache(ttl_seconds=600)), repository
+
+
+def test_catalog_is_loaded_once_and_served_as_a_tree():
+    service, repository = _service()
+
+    assert [division.id for division in service.list_divisions()] == [1, 2]
+    assert [equipement.id for equipement in service.list_equipements()] == ["9", "10", "X1"]
+    assert [equipement.id for equipement in service.list_equipements(division_id=2)] == ["9"]
+    assert [modele.id for modele in service.list_modeles(equipement_id=" 10")] == ["GA37"]
+    assert [entry.field_type for entry in service.list_optional_field_types(equipment="COMPRESSEUR")] == ["Moteur"]
+
+    bundle = service.get_catalog_bundle()
+    assert repository.catalog_calls == 1
+    assert bundle.version == 1 and bundle.etag.startswith('"')
+    compresseur = bundle.divisions[0].equipements[0]
+    assert [modele.id for modele in compresseur.modeles] == ["GA37"]
+    assert [entry.field_type for entry in compresseur.optional_field_types] == ["Moteur"]
+    assert [equipement.id for equipement in bundle.unassigned_equipements] == ["X1"]
+    assert [entry.field_type for entry in bundle.shared_optional_field_types] == ["Garantie"]
+
+
+def test_create_service_item_invalidates_catalog_and_customer_assets():
+    service, repository = _service()
+    first = service.get_catalog_bundle()
+    service.get_customer_assets("C100")
+    service.get_customer_assets(" c100")
+    assert repository.asset_calls == 1
+
+    payload = ServiceItemCreateRequest(
+        customer_id="C100", equipement_id="10", date_livraison=date(2026, 1, 5), date_confirmee=True
+    )
+    service.create_service_item(payload)
+    unchanged = service.get_catalog_bundle()
+    assert repository.catalog_calls == 2
+    assert (unchanged.version, unchanged.etag) == (first.version, first.etag)
+
+    service.get_customer_assets("C100")
+    assert repository.asset_calls == 2
+
+    repository.rows.append({"kind": "modele", "id": "GA45", "description": "GA 45", "parent_id": "10"})
+    changed = service.refresh_catalog()
+    assert changed.version == 2 and changed.etag != first.etag
+
+
+def test_catalog_endpoint_revalidates_with_etag(monkeypatch):
+    service, repository = _service()
+    monkeypatch.setattr(service_router, "_get_service", lambda: service)
+    client = TestClient(app)
+
+    response = client.get("/api/v1/service/catalog")
+    assert response.status_code == 200, response.text
+    etag = response.headers["etag"]
+    assert response.json()["data"]["etag"] == etag
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    revalidated = client.get("/api/v1/service/catalog", headers={"If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert repository.catalog_calls == 1
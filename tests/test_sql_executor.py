@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+from app.integrations.sql_executor import AsyncRepository, SqlExecutor
+
+
+class _Repository:
+    def __init__(self) -> None:
+        self.threads: set[str] = set()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def read(self, value: int, *, delay: float = 0.02) -> int:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(delay)
+        with self._lock:
+            self.active -= 1
+        return value * 2
+
+    def fail(self) -> None:
+        raise RuntimeError("boom")
+
+    async def already_async(self) -> str:
+        return "async"
+
+
+def test_executor_bounds_workers_and_reports_queue_depth() -> None:
+    executor = SqlExecutor("test", max_workers=2, max_pending=1)
+    repository = _Repository()
+    facade = AsyncRepository(repository, "test", executor=executor)
+
+    async def _run():
+        return await asyncio.gather(*(facade.read(n) for n in range(6)))
+
+    try:
+        assert asyncio.run(_run()) == [0, 2, 4, 6, 8, 10]
+        assert repository.peak == 2
+        assert all(name.startswith("sql-test") for name in repository.threads)
+        metrics = executor.metrics()
+        assert metrics["submitted"] == metrics["completed"] == 6
+        assert metrics["running"] == metrics["queued"] == metrics["waiting_for_admission"] == 0
+        assert 1 <= metrics["peak_queued"] <= 3
+    finally:
+        executor.shutdown()
+
+
+def test_facade_counts_failures_and_passes_through_coroutines() -> None:
+    executor = SqlExecutor("test", max_workers=1, max_pending=0)
+    facade = AsyncRepository(_Repository(), "test", executor=executor)
+
+    async def _run():
+        try:
+            await facade.fail()
+        except RuntimeError:
+            pass
+        return await facade.already_async()
+
+    try:
+        assert asyncio.run(_run()) == "async"
+        assert executor.metrics()["failed"] == 1
+        assert isinstance(facade.sync, _Repository)
+    finally:
+        executor.shutdown()
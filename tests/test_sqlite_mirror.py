@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.integrations.sqlite_mirror import SQLiteMirrorStore
+
+
+class _Store(SQLiteMirrorStore):
+    _label = "test mirror"
+    _state_table = "test_mirror_state"
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS docs (kind TEXT NOT NULL, id TEXT NOT NULL)")
+            self._create_state_table(conn)
+            conn.commit()
+
+
+def test_state_round_trip_and_full_refresh_due(tmp_path):
+    store = _Store(str(tmp_path / "mirror.sqlite3"))
+    assert store.is_configured
+    assert store._full_refresh_due(12)
+
+    store._set_state("last_full_refresh_at", (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat())
+    assert not store._full_refresh_due(12)
+    assert store._full_refresh_due(1)
+
+    store._set_state("last_full_refresh_at", "not a timestamp")
+    assert store._full_refresh_due(12)
+    with store._connect() as conn:
+        assert store._all_state(conn) == {"last_full_refresh_at": "not a timestamp"}
+
+
+def test_delete_missing_only_touches_the_scoped_rows(tmp_path):
+    store = _Store(str(tmp_path / "mirror.sqlite3"))
+    with store._connect() as conn:
+        conn.executemany(
+            "INSERT INTO docs (kind, id) VALUES (?, ?)",
+            [("item", "1"), ("item", "2"), ("customer", "2"), ("customer", "3")],
+        )
+        deleted = store._delete_missing(conn, "docs", "id", ["1"], scope={"kind": "item"})
+        rows = conn.execute("SELECT kind, id FROM docs ORDER BY kind, id").fetchall()
+
+    assert deleted == 1
+    assert rows == [("customer", "2"), ("customer", "3"), ("item", "1")]
+
+
+def test_unconfigured_store_is_disabled():
+    store = _Store(None)
+    assert not store.is_configured
+    assert store._get_state("anything") is None
+
+
+def test_store_without_schema_hook_cannot_be_constructed(tmp_path):
+    class _Incomplete(SQLiteMirrorStore):
+        pass
+
+    with pytest.raises(TypeError):
+        _Incomplete(str(tmp_path / "mirror.sqlite3"))
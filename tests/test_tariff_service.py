@@ -1,11 +1,15 @@
 import pytest
 
+from app.domain.erp.bom_explosion import BomExplosionCache, BomExplosionEngine
 from app.domain.erp.tariff_service import TariffCalculationService
-from app.integrations.cedule_repository import MillTestCertificate
+from app.errors import ERPError
+from app.integrations.cedule_repository import MillTestCertificate, MillTestCertificateRepository
 
 
 class FakeERPClient:
     def __init__(self) -> None:
+        self.item_calls = []
+        self.bom_calls = []
         self.items = {
             "PARENT": {
                 "No": "PARENT",
@@ -76,15 +80,29 @@ class FakeERPClient:
         }
 
     async def get_item(self, item_id: str):
+        self.item_calls.append(item_id)
         return self.items.get(item_id)
 
     async def get_bom_component_lines(self, bom_no: str):
         return list(self.boms.get(bom_no, []))
 
+    async def get_bom_component_lines_batch(self, bom_nos):
+        self.bom_calls.append(list(bom_nos))
+        return {bom_no: list(self.boms.get(bom_no, [])) for bom_no in bom_nos}
+
 
 class FakeCertificateRepo:
     def __init__(self) -> None:
         self.is_configured = True
+        self.batch_calls = []
+
+    def get_latest_certificates(self, part_numbers):
+        self.batch_calls.append(list(part_numbers))
+        return {
+            part: certificate
+            for part in part_numbers
+            if (certificate := self.get_latest_certificate(part)) is not None
+        }
 
     def get_latest_certificate(self, part_number: str):
         mapping = {
@@ -139,3 +157,122 @@ async def test_tariff_service_builds_summary_and_materials():
     vendors = {m.vendor_no for m in response.materials}
     assert "VENDOR-1" in vendors
     assert response.report.startswith("TARIFF/WEIGHT CALCULATION REPORT")
+
+
+@pytest.mark.asyncio
+async def test_tariff_batch_shares_boms_and_resolves_certificates_once():
+    erp_client = FakeERPClient()
+    erp_client.items["PARENT-2"] = {"No": "PARENT-2", "Production_BOM_No": "BOM-001"}
+    erp_client.items["NO-BOM"] = {"No": "NO-BOM"}
+    certificate_repo = FakeCertificateRepo()
+    service = TariffCalculationService(
+        erp_client=erp_client,
+        certificate_repo=certificate_repo,
+        bom_engine=BomExplosionEngine(erp_client=erp_client, cache=BomExplosionCache()),
+    )
+
+    results = [
+        entry
+        async for entry in service.calculate_batch(["PARENT", "MISSING", "PARENT-2", "NO-BOM", "PARENT"])
+    ]
+
+    assert [entry.item_id for entry in results] == ["PARENT", "MISSING", "PARENT-2", "NO-BOM"]
+    assert [entry.status for entry in results] == ["ok", "error", "ok", "error"]
+    assert results[0].result.parent_country_of_melt_and_pour == "Canada"
+    assert results[2].result.summary.total_weight_kg == results[0].result.summary.total_weight_kg
+    assert results[1].error["code"] == "ERP_NOT_FOUND"
+    assert results[3].error["message"] == "Item is not linked to a production BOM"
+    assert sorted(bom for call in erp_client.bom_calls for bom in call) == ["BOM-001", "BOM-ASM"]
+    assert erp_client.item_calls.count("RAW-ROUND") == 1
+    assert certificate_repo.batch_calls == [["PARENT", "PARENT-2", "RAW-PLATE", "RAW-ROUND"]]
+
+
+@pytest.mark.asyncio
+async def test_tariff_batch_retries_failed_chunk_item_by_item():
+    erp_client = FakeERPClient()
+    erp_client.items["PARENT-2"] = {"No": "PARENT-2", "Production_BOM_No": "BOM-001"}
+    get_item = erp_client.get_item
+
+    async def _flaky_get_item(item_id):
+        if item_id == "BROKEN":
+            raise ERPError("Business Central timed out")
+        return await get_item(item_id)
+
+    erp_client.get_item = _flaky_get_item
+    service = TariffCalculationService(
+        erp_client=erp_client,
+        certificate_repo=FakeCertificateRepo(),
+        bom_engine=BomExplosionEngine(erp_client=erp_client, cache=BomExplosionCache()),
+    )
+
+    results = [
+        entry async for entry in service.calculate_batch(["PARENT", "BROKEN", "PARENT-2"], chunk_size=2)
+    ]
+
+    assert [(entry.item_id, entry.status) for entry in results] == [
+        ("PARENT", "ok"),
+        ("BROKEN", "error"),
+        ("PARENT-2", "ok"),
+    ]
+    assert results[1].error["message"] == "Business Central timed out"
+
+
+@pytest.mark.asyncio
+async def test_tariff_batch_isolates_a_failing_component_fetch():
+    erp_client = FakeERPClient()
+    erp_client.items["PARENT-BAD"] = {"No": "PARENT-BAD", "Production_BOM_No": "BOM-BAD"}
+    erp_client.boms["BOM-BAD"] = [dict(erp_client.boms["BOM-001"][1], No="BAD-COMP")]
+    get_item = erp_client.get_item
+
+    async def _flaky_get_item(item_id):
+        if item_id == "BAD-COMP":
+            raise ERPError("Business Central timed out")
+        return await get_item(item_id)
+
+    erp_client.get_item = _flaky_get_item
+    service = TariffCalculationService(
+        erp_client=erp_client,
+        certificate_repo=FakeCertificateRepo(),
+        bom_engine=BomExplosionEngine(erp_client=erp_client, cache=BomExplosionCache()),
+    )
+
+    results = [entry async for entry in service.calculate_batch(["PARENT", "PARENT-BAD"], chunk_size=2)]
+
+    assert [(entry.item_id, entry.status) for entry in results] == [("PARENT", "ok"), ("PARENT-BAD", "error")]
+
+
+class _FakeCertificateEngine:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def connect(self):
+        engine = self
+
+        class _Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def execute(self, query, params):
+                class _Result:
+                    def mappings(self):
+                        return list(engine.rows)
+
+                return _Result()
+
+        return _Connection()
+
+
+def test_latest_certificates_are_keyed_by_requested_part_number():
+    repo = MillTestCertificateRepository(
+        engine=_FakeCertificateEngine(
+            [{"part_number": "RAW-ROUND  ", "country_of_melt_and_pour": "USA", "country_of_manufacture": "Mexico"}]
+        )
+    )
+
+    certificates = repo.get_latest_certificates(["raw-round", "RAW-ROUND", "RAW-PLATE"])
+
+    assert sorted(certificates) == ["RAW-ROUND", "raw-round"]
+    assert certificates["raw-round"].country_of_melt_and_pour == "USA"
@@ -0,0 +1,111 @@
+import asyncio
+from pathlib import Path
+
+import fitz
+
+from app.domain.documents.technical_sheet_service import TechnicalSheetService
+from app.domain.documents.technical_sheet_templates import CompiledTemplateCache
+
+
+def _form_pdf():
+    doc = fitz.open()
+    page = doc.new_page()
+    specs = [
+        ("Description", fitz.PDF_WIDGET_TYPE_TEXT, None),
+        ("Hors tout", fitz.PDF_WIDGET_TYPE_CHECKBOX, None),
+        ("Unité mesure", fitz.PDF_WIDGET_TYPE_COMBOBOX, ["UN", "PI"]),
+    ]
+    for index, (name, field_type, choices) in enumerate(specs):
+        widget = fitz.Widget()
+        widget.field_name = name
+        widget.field_type = field_type
+        widget.rect = fitz.Rect(50, 50 + 40 * index, 250, 70 + 40 * index)
+        if choices:
+            widget.choice_values = choices
+            widget.field_value = choices[0]
+        page.add_widget(widget)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _service(tmp_path, pdf_bytes):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "FicheProduit.pdf").write_bytes(pdf_bytes)
+    cache = CompiledTemplateCache(max_entries=4)
+    return TechnicalSheetService(file_share_service=object(), template_root=tmp_path, template_cache=cache), cache
+
+
+def _widget_values(pdf_bytes):
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return {widget.field_name: widget.field_value for widget in doc[0].widgets()}
+    finally:
+        doc.close()
+
+
+def test_template_is_compiled_once_and_filled_incrementally(tmp_path):
+    template = _form_pdf()
+    service, cache = _service(tmp_path, template)
+
+    fields = asyncio.run(service.get_template_fields(template_id="fiche-produit"))
+    assert fields["success"] is True
+    assert fields["data"]["options"] == {"Unité mesure": ["UN", "PI"]}
+
+    result = asyncio.run(
+        service.fill_fiche_technique(
+            fields={"Description": "Boulon hexagonal", "Hors tout": "Yes", "Unité  mesure": "pi"},
+            template_id="fiche-produit",
+        )
+    )
+    assert result["success"] is True, result
+    filled = result["content"]
+    assert filled.startswith(template)
+    assert len(filled) - len(template) < 2048
+    assert _widget_values(filled) == {"Description": "Boulon hexagonal", "Hors tout": "Yes", "Unité mesure": "PI"}
+
+    invalid = asyncio.run(service.fill_fiche_technique(fields={"Unité mesure": "KG"}, template_id="fiche-produit"))
+    assert invalid["error_code"] == "INVALID_OPTION"
+    assert cache.metrics()["misses"] == 1
+    assert cache.metrics()["hits"] == 2
+
+
+def test_filled_fiche_produit_reads_back_unicode_field_names(tmp_path):
+    service, _ = _service(tmp_path, Path("docs/FicheProduit.pdf").read_bytes())
+
+    result = asyncio.run(
+        service.fill_fiche_technique(
+            fields={"délais sem": "3", "Description Francaise": "Moteur 37KW"},
+            template_id="fiche-produit",
+        )
+    )
+    assert result["success"] is True, result
+
+    fields, _, source = asyncio.run(service._extract_fields_from_pdf(pdf_bytes=result["content"]))
+    assert source == "form_fields"
+    assert fields["délais sem"] == "3"
+    assert fields["Description Francaise"] == "Moteur 37KW"
+
+
+class _FileShare:
+    def __init__(self, pdf_bytes):
+        self.pdf_bytes = pdf_bytes
+
+    async def get_item_pdf(self, item_no):
+        return {"content": self.pdf_bytes, "filename": f"{item_no}.pdf"}
+
+
+def test_per_item_sheets_are_not_added_to_the_template_cache(tmp_path):
+    cache = CompiledTemplateCache(max_entries=4)
+    service = TechnicalSheetService(
+        file_share_service=_FileShare(_form_pdf()), template_root=tmp_path, template_cache=cache
+    )
+
+    read = asyncio.run(service.read_fiche_technique("ITEM-1"))
+    filled = asyncio.run(service.fill_fiche_technique(fields={"Description": "Boulon"}, item_no="ITEM-1"))
+
+    assert read["success"] is True and read["data"]["source"] == "form_fields"
+    assert read["data"]["fields"] == {"Unité mesure": "UN"}
+    assert filled["success"] is True, filled
+    assert cache.metrics()["entries"] == 0
+    assert cache.metrics()["misses"] == 0 and cache.metrics()["hits"] == 0
@@ -1,8 +1,10 @@
+import asyncio
 import datetime as dt
 
 import pytest
 
 from app.domain.tooling.future_needs_service import FutureToolingNeedService
+from app.domain.tooling.nc_program_source import ProgramToolsCache
 
 
 class _StubProductionClient:
@@ -227,3 +229,23 @@ async def test_future_tooling_needs_parses_fastems2_tool_payload(monkeypatch) ->
     assert tool_row.tool_use_time_seconds == 13
     assert tool_row.total_required_use_time_seconds == 26
     assert tool_row.tool_description == "FORET"
+
+
+@pytest.mark.asyncio
+async def test_program_tools_cache_shares_concurrent_lookups() -> None:
+    cache = ProgramToolsCache()
+    calls: list[str] = []
+
+    async def _load() -> list[dict]:
+        calls.append("P-1")
+        await asyncio.sleep(0)
+        return [{"tool_id": "1035"}]
+
+    first, second = await asyncio.gather(
+        cache.get("fastems1", "P-1", _load),
+        cache.get("fastems1", "P-1", _load),
+    )
+
+    assert first == second == [{"tool_id": "1035"}]
+    assert calls == ["P-1"]
+    assert (cache.hits, cache.misses) == (1, 1)